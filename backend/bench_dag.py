@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Benchmark for iterative DAG validation in VectorShift Pipeline Builder
+Times is_acyclic on large synthetic pipelines and reports peak memory
+
+Usage: python bench_dag.py [--nodes N] [--edges M] [--repeat R]
+"""
+
+import argparse
+import random
+import time
+import tracemalloc
+from typing import List, Tuple
+
+from graph import is_acyclic
+from sessions import IncrementalGraph
+
+
+def chain_graph(num_nodes: int) -> Tuple[List[str], List[Tuple[str, str]]]:
+    """Single path n0 -> n1 -> ... (the worst case for recursive DFS)"""
+    node_ids = [f"n{i}" for i in range(num_nodes)]
+    edges = [(node_ids[i], node_ids[i + 1]) for i in range(num_nodes - 1)]
+    return node_ids, edges
+
+
+def random_dag(num_nodes: int, num_edges: int, seed: int = 0) -> Tuple[List[str], List[Tuple[str, str]]]:
+    """Random DAG: every edge points forward in a shuffled node order"""
+    rng = random.Random(seed)
+    node_ids = [f"n{i}" for i in range(num_nodes)]
+    rng.shuffle(node_ids)
+    edges = []
+    for _ in range(num_edges):
+        u = rng.randrange(num_nodes - 1)
+        v = rng.randrange(u + 1, num_nodes)
+        edges.append((node_ids[u], node_ids[v]))
+    return node_ids, edges
+
+
+def fan_out_graph(width: int) -> Tuple[List[str], List[Tuple[str, str]]]:
+    """One source feeding `width` parallel nodes that all join into one sink"""
+    middle = [f"m{i}" for i in range(width)]
+    edges = [("source", node_id) for node_id in middle] + [(node_id, "sink") for node_id in middle]
+    return ["source"] + middle + ["sink"], edges
+
+
+def dense_dag(num_nodes: int) -> Tuple[List[str], List[Tuple[str, str]]]:
+    """Complete DAG: an edge from every node to every later node"""
+    node_ids = [f"n{i}" for i in range(num_nodes)]
+    edges = [(node_ids[i], node_ids[j]) for i in range(num_nodes) for j in range(i + 1, num_nodes)]
+    return node_ids, edges
+
+
+def with_back_edge(node_ids: List[str], edges: List[Tuple[str, str]]) -> List[Tuple[str, str]]:
+    """Close a cycle from the last node of a chain back to the first"""
+    return edges + [(node_ids[-1], node_ids[0])]
+
+
+def measure(name: str, node_ids, edges, expected: bool, repeat: int):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = is_acyclic(node_ids, edges)
+        timings.append(time.perf_counter() - start)
+        assert result == expected, f"{name}: expected {expected}, got {result}"
+
+    tracemalloc.start()
+    is_acyclic(node_ids, edges)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(f"{name:<28} V={len(node_ids):>8} E={len(edges):>8}  "
+          f"best={min(timings) * 1000:8.1f} ms  peak={peak / 2**20:6.1f} MiB")
+
+
+def measure_incremental(num_nodes: int, num_edges: int, seed: int = 0):
+    """Per-edge cost of adding edges one at a time to a live session"""
+    node_ids, edges = random_dag(num_nodes, num_edges, seed)
+    graph = IncrementalGraph.from_pipeline(node_ids, [])
+    start = time.perf_counter()
+    for i, (source, target) in enumerate(edges):
+        graph.add_edge(f"e{i}", source, target)
+    elapsed = time.perf_counter() - start
+    assert graph.is_dag
+    print(f"{'incremental add_edge':<28} V={num_nodes:>8} E={num_edges:>8}  "
+          f"mean={elapsed / num_edges * 1e6:8.1f} us/edge")
+
+
+def measure_parse(num_nodes: int, num_edges: int, repeat: int):
+    """Full /pipelines/parse body handling in strict (Pydantic) and lean modes, cache disabled"""
+    import json
+    from main import parse_body, validation_cache
+
+    node_ids, edges = random_dag(num_nodes, num_edges)
+    body = json.dumps({
+        "nodes": [{"id": node_id, "type": "transform", "position": {"x": 0, "y": 0},
+                   "data": {"nodeType": "transform", "transformation": "uppercase"}} for node_id in node_ids],
+        "edges": [{"id": f"e{i}", "source": source, "target": target,
+                   "sourceHandle": f"{source}-output", "targetHandle": f"{target}-input"}
+                  for i, (source, target) in enumerate(edges)],
+    }).encode()
+
+    for mode in ("strict", "lean"):
+        timings = []
+        for _ in range(repeat):
+            validation_cache.clear()
+            start = time.perf_counter()
+            parse_body(body, mode=mode)
+            timings.append(time.perf_counter() - start)
+        print(f"{'parse body (' + mode + ')':<28} V={num_nodes:>8} E={num_edges:>8}  "
+              f"best={min(timings) * 1000:8.1f} ms  body={len(body) / 2**20:6.1f} MiB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--nodes", type=int, default=100_000)
+    parser.add_argument("--edges", type=int, default=500_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--incremental-nodes", type=int, default=10_000)
+    parser.add_argument("--incremental-edges", type=int, default=20_000)
+    parser.add_argument("--parse-nodes", type=int, default=20_000)
+    parser.add_argument("--parse-edges", type=int, default=50_000)
+    args = parser.parse_args()
+
+    print("Running DAG Validation Benchmark...")
+    print("=" * 80)
+
+    node_ids, edges = chain_graph(args.nodes)
+    measure("chain (acyclic)", node_ids, edges, True, args.repeat)
+    measure("chain + back edge (cyclic)", node_ids, with_back_edge(node_ids, edges), False, args.repeat)
+
+    node_ids, edges = random_dag(args.nodes, args.edges)
+    measure("random DAG", node_ids, edges, True, args.repeat)
+    measure("random DAG + cycle", node_ids, edges + [(edges[0][1], edges[0][0])], False, args.repeat)
+
+    measure_incremental(args.incremental_nodes, args.incremental_edges)
+    measure_parse(args.parse_nodes, args.parse_edges, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
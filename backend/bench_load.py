@@ -0,0 +1,503 @@
+#!/usr/bin/env python3
+"""
+Load and soak test for the submit path of VectorShift Pipeline Builder
+Replays example pipelines against a local server and tracks throughput, tail latency, errors and memory
+
+Payloads are the pipelines of frontend/src/examples/pipelineExamples.js, the
+valid ones and the cyclic ones, each scaled up by laying `copies` renamed
+copies side by side on one canvas. Each request picks an example at random
+and a scale from the weighted `--scales` mix (default 1:60,10:25,100:12,1000:3,
+i.e. mostly small canvases with a tail of ~5000-node ones). It is sent the
+way submit.js sends it: JSON with React Flow's edge styling, gzip-compressed
+from 64 KiB. Every request gets a unique first edge ID, so it misses the
+validation cache, except a `--repeat-ratio` share that resends an unchanged
+canvas. Responses are checked: `is_dag` must match the example's category.
+
+Load is open-loop at `--rate` requests per second, with at most
+`--concurrency` in flight (rate 0: closed loop, each connection sends as
+soon as its previous response arrives). Latency counts from when a request
+was due rather than when it was sent, so a stalled server shows in the tail
+instead of silently lowering the rate; requests that would exceed a backlog
+of 100 per connection are dropped and counted. A probe sends GET / every
+`--probe-interval` seconds on its own connection. That endpoint does no
+work, so its latency is how long the server's event loop was blocked by
+other requests, e.g. parse work done on the loop instead of in a thread.
+
+serve.py is started on a free localhost port with `--workers` workers,
+unless `--url` points at a running server (`--pid` then names its process
+for memory sampling). Every `--window` seconds the resident memory of the
+server and its workers (from /proc) is sampled with the window's
+throughput, p99 and errors. The report gives totals, latency percentiles
+overall and per scale, error rate, the worst probe, and the memory growth
+rate fitted over every window but the first, so caches filling up during
+warm-up do not count as a leak. With `--max-p99-ms`, `--max-error-rate` or
+`--max-rss-growth-mib` it exits 1 when a limit is exceeded, for CI and
+overnight soak runs. The client shares the host: `client_cpu_s` close to
+the duration means the client, not the server, set the pace.
+
+Usage: python bench_load.py [--rate R] [--concurrency C] [--duration S] [--scales 1:60,10:25,...] [--url URL]
+"""
+
+import argparse
+import asyncio
+import gzip
+import itertools
+import json
+import os
+import random
+import re
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import httpx
+import numpy
+
+from bench_suite import environment, percentile
+from bench_workers import BACKEND_DIR, UNIQUE_KEY, free_port, start_server
+
+EXAMPLES_PATH = os.path.join(BACKEND_DIR, '..', 'frontend', 'src', 'examples', 'pipelineExamples.js')
+
+DEFAULT_SCALES = '1:60,10:25,100:12,1000:3'
+
+# submit.js compresses bodies from this size
+COMPRESS_MIN_BYTES = 64 * 1024
+
+# Requests waiting for a connection, per connection, before new ones are dropped
+MAX_BACKLOG_PER_CONNECTION = 100
+
+# Vertical distance between copies of an example on the canvas
+COPY_OFFSET_Y = 400
+
+JS_TOKEN = re.compile(r"""
+    (?P<skip>\s+|//[^\n]*|/\*.*?\*/)
+  | (?P<string>'(?:\\.|[^'\\])*'|"(?:\\.|[^"\\])*")
+  | (?P<number>-?\d+(?:\.\d+)?(?:[eE][+-]?\d+)?)
+  | (?P<word>[A-Za-z_$][\w$]*)
+  | (?P<punct>[{}\[\]:,])
+""", re.VERBOSE | re.DOTALL)
+
+JS_ESCAPES = {'n': '\n', 't': '\t', 'r': '\r', 'b': '\b', 'f': '\f', '0': '\0'}
+
+
+def parse_js_literal(text: str) -> Any:
+    """
+    A JavaScript object literal made of plain data (objects, arrays,
+    strings, numbers, booleans, null; unquoted keys, comments and trailing
+    commas allowed) as Python values
+    """
+    tokens = []
+    position = 0
+    while position < len(text):
+        match = JS_TOKEN.match(text, position)
+        if match is None:
+            raise ValueError(f"Unexpected {text[position]!r} at offset {position}")
+        position = match.end()
+        kind = match.lastgroup
+        token = match.group()
+        if kind == 'skip':
+            continue
+        if kind == 'string':
+            token = json.dumps(re.sub(r'\\(.)', lambda m: JS_ESCAPES.get(m.group(1), m.group(1)), token[1:-1]))
+        elif kind == 'word' and token not in ('true', 'false', 'null'):
+            token = json.dumps(token)
+        tokens.append(token)
+    # Trailing commas
+    tokens = [token for token, following in zip(tokens, tokens[1:] + ['']) if not (token == ',' and following in ('}', ']'))]
+    return json.loads(''.join(tokens))
+
+
+def load_examples(path: str = EXAMPLES_PATH) -> Dict[str, List[Dict[str, Any]]]:
+    """The `pipelineExamples` export: example pipelines by category (valid, invalid)"""
+    with open(path, encoding='utf-8') as f:
+        text = f.read()
+    start = text.index('=', text.index('pipelineExamples')) + 1
+    return parse_js_literal(text[start:text.rindex('}') + 1])
+
+
+def renamed(handle: Optional[str], old: str, new: str) -> Optional[str]:
+    """A React Flow handle ID (`<node id>-<handle>`) of a node renamed from `old` to `new`"""
+    if handle and handle.startswith(f"{old}-"):
+        return new + handle[len(old):]
+    return handle
+
+
+def scale_pipeline(example: Dict[str, Any], copies: int) -> Dict[str, Any]:
+    """`copies` side-by-side copies of an example, IDs and handles suffixed with the copy number"""
+    nodes, edges = [], []
+    for copy in range(copies):
+        name = {node['id']: f"{node['id']}_{copy}" for node in example['nodes']}
+        for node in example['nodes']:
+            position = node.get('position', {'x': 0, 'y': 0})
+            nodes.append({**node, 'id': name[node['id']],
+                          'position': {'x': position['x'], 'y': position['y'] + copy * COPY_OFFSET_Y}})
+        for edge in example['edges']:
+            source = name.get(edge['source'], edge['source'])
+            target = name.get(edge['target'], edge['target'])
+            edges.append({
+                **edge,
+                'id': f"{edge['id']}_{copy}",
+                'source': source,
+                'target': target,
+                'sourceHandle': renamed(edge.get('sourceHandle'), edge['source'], source),
+                'targetHandle': renamed(edge.get('targetHandle'), edge['target'], target),
+            })
+    return {'nodes': nodes, 'edges': edges}
+
+
+class Scenario:
+    """One example at one scale, as a body template with UNIQUE_KEY as its first edge ID"""
+
+    def __init__(self, example: Dict[str, Any], copies: int, is_dag: bool):
+        pipeline = scale_pipeline(example, copies)
+        if pipeline['edges']:
+            pipeline['edges'][0]['id'] = UNIQUE_KEY.decode()
+        self.name = f"{example['id']}x{copies}"
+        self.copies = copies
+        self.is_dag = is_dag
+        self.num_nodes = len(pipeline['nodes'])
+        self.num_edges = len(pipeline['edges'])
+        self.template = json.dumps(pipeline).encode()
+        # The body a repeated submission resends, compressed once
+        self.repeated = self.encode(b'repeat', compress=True)
+
+    def encode(self, key: bytes, compress: bool) -> Tuple[bytes, Dict[str, str]]:
+        body = self.template.replace(UNIQUE_KEY, key)
+        headers = {'Content-Type': 'application/json'}
+        if compress and len(body) >= COMPRESS_MIN_BYTES:
+            body = gzip.compress(body, 6)
+            headers['Content-Encoding'] = 'gzip'
+        return body, headers
+
+
+def parse_scales(spec: str) -> Dict[int, float]:
+    """'1:60,10:40' -> {1: 60.0, 10: 40.0}: copies per pipeline and their weight in the mix"""
+    scales = {}
+    for item in spec.split(','):
+        if not item.strip():
+            continue
+        copies, _, weight = item.partition(':')
+        try:
+            scales[int(copies)] = float(weight or 1)
+        except ValueError:
+            raise ValueError(f"Invalid scale '{item.strip()}', expected <copies>:<weight>")
+        if int(copies) < 1 or scales[int(copies)] < 0:
+            raise ValueError(f"Invalid scale '{item.strip()}', expected <copies>:<weight>")
+    return scales
+
+
+def build_scenarios(examples: Dict[str, List[Dict[str, Any]]], scales: Dict[int, float]) -> Tuple[List[Scenario], List[float]]:
+    """Every example at every scale, with weights that split each scale's share evenly between examples"""
+    pipelines = [(example, category == 'valid') for category, items in examples.items() for example in items]
+    scenarios, weights = [], []
+    for copies, weight in scales.items():
+        for example, is_dag in pipelines:
+            scenarios.append(Scenario(example, copies, is_dag))
+            weights.append(weight / len(pipelines))
+    return scenarios, weights
+
+
+def process_tree_rss(pid: int) -> Optional[int]:
+    """Resident bytes of a process and all its descendants, from /proc (None where unavailable)"""
+    total, pending, seen = 0, [pid], set()
+    while pending:
+        current = pending.pop()
+        if current in seen:
+            continue
+        seen.add(current)
+        try:
+            with open(f"/proc/{current}/status") as f:
+                total += next(int(line.split()[1]) * 1024 for line in f if line.startswith('VmRSS:'))
+            for task in os.listdir(f"/proc/{current}/task"):
+                with open(f"/proc/{current}/task/{task}/children") as f:
+                    pending.extend(int(child) for child in f.read().split())
+        except (OSError, StopIteration, ValueError):
+            if current == pid:
+                return None
+    return total
+
+
+def latency_summary(seconds: List[float]) -> Dict[str, Optional[float]]:
+    values = sorted(value * 1000 for value in seconds)
+    if not values:
+        return {'p50': None, 'p90': None, 'p99': None, 'p999': None, 'max': None}
+    return {
+        'p50': percentile(values, 50),
+        'p90': percentile(values, 90),
+        'p99': percentile(values, 99),
+        'p999': percentile(values, 99.9),
+        'max': values[-1],
+    }
+
+
+class Window:
+    """Requests and probes completed during one reporting window"""
+
+    def __init__(self):
+        self.latencies: List[float] = []
+        self.probes: List[float] = []
+        self.errors = 0
+
+
+async def run_load(client: httpx.AsyncClient, probe_client: Optional[httpx.AsyncClient], scenarios: List[Scenario],
+                   weights: List[float], duration: float, rate: float = 0.0, concurrency: int = 8,
+                   window: float = 10.0, probe_interval: float = 0.1, repeat_ratio: float = 0.0,
+                   path: str = '/pipelines/parse', compress: bool = True, rss: Optional[Callable[[], Optional[int]]] = None,
+                   seed: int = 0, log=print) -> Dict[str, Any]:
+    """Send the scenario mix for `duration` seconds and return the JSON-ready report (without thresholds)"""
+    rng = random.Random(seed)
+    slots = asyncio.Semaphore(concurrency)
+    counts = {'requests': 0, 'errors': 0, 'rejected': 0, 'mismatches': 0, 'dropped': 0}
+    latencies: List[float] = []
+    service: List[float] = []
+    by_scale: Dict[int, List[float]] = {}
+    probes: List[float] = []
+    windows: List[Dict[str, Any]] = []
+    current = Window()
+    in_flight = set()
+    stop = asyncio.Event()
+    started = time.perf_counter()
+    cpu_started = time.process_time()
+
+    async def send(sequence: int, due: float) -> None:
+        scenario = rng.choices(scenarios, weights)[0]
+        if rng.random() < repeat_ratio:
+            body, headers = scenario.repeated
+        else:
+            body, headers = scenario.encode(f"r{sequence}".encode(), compress)
+        async with slots:
+            sent = time.perf_counter()
+            try:
+                response = await client.post(path, content=body, headers=headers)
+                status = response.status_code
+                mismatch = status == 200 and path == '/pipelines/parse' and response.json().get('is_dag') != scenario.is_dag
+            except (httpx.HTTPError, ValueError):
+                status, mismatch = None, False
+        finished = time.perf_counter()
+        counts['requests'] += 1
+        if status is None or status >= 500:
+            counts['errors'] += 1
+            current.errors += 1
+            return
+        if status >= 400:
+            counts['rejected'] += 1
+        counts['mismatches'] += mismatch
+        latencies.append(finished - due)
+        service.append(finished - sent)
+        by_scale.setdefault(scenario.copies, []).append(finished - due)
+        current.latencies.append(finished - due)
+
+    async def closed_loop(worker: int) -> None:
+        for sequence in itertools.count(worker, concurrency):
+            if stop.is_set():
+                return
+            await send(sequence, time.perf_counter())
+            # An in-process transport may answer without suspending, which would starve the other tasks
+            await asyncio.sleep(0)
+
+    async def open_loop() -> None:
+        for sequence in itertools.count():
+            due = started + sequence / rate
+            delay = due - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            if stop.is_set():
+                return
+            if len(in_flight) >= concurrency * MAX_BACKLOG_PER_CONNECTION:
+                counts['dropped'] += 1
+                continue
+            task = asyncio.ensure_future(send(sequence, due))
+            in_flight.add(task)
+            task.add_done_callback(in_flight.discard)
+
+    async def probe() -> None:
+        while not stop.is_set():
+            sent = time.perf_counter()
+            try:
+                await probe_client.get('/')
+                elapsed = time.perf_counter() - sent
+                probes.append(elapsed)
+                current.probes.append(elapsed)
+            except httpx.HTTPError:
+                pass
+            await asyncio.sleep(probe_interval)
+
+    def close_window() -> None:
+        nonlocal current
+        finished, current = current, Window()
+        elapsed = time.perf_counter() - started
+        length = elapsed - (windows[-1]['elapsed_s'] if windows else 0.0)
+        resident = rss() if rss is not None else None
+        entry = {
+            'elapsed_s': elapsed,
+            'requests': len(finished.latencies) + finished.errors,
+            'throughput_per_s': len(finished.latencies) / length if length else 0.0,
+            'p99_ms': latency_summary(finished.latencies)['p99'],
+            'errors': finished.errors,
+            'probe_max_ms': max(finished.probes) * 1000 if finished.probes else None,
+            'rss_mib': resident / 2**20 if resident is not None else None,
+        }
+        windows.append(entry)
+        log(f"t={elapsed:7.1f}s  {entry['throughput_per_s']:8.1f} req/s  "
+            f"p99={entry['p99_ms'] or 0:9.2f} ms  errors={entry['errors']:<4} "
+            f"probe max={entry['probe_max_ms'] or 0:8.2f} ms  rss={entry['rss_mib'] or 0:8.1f} MiB")
+
+    loops = [asyncio.ensure_future(open_loop())] if rate > 0 else [asyncio.ensure_future(closed_loop(i)) for i in range(concurrency)]
+    if probe_client is not None and probe_interval > 0:
+        loops.append(asyncio.ensure_future(probe()))
+    deadline = started + duration
+    while time.perf_counter() < deadline:
+        await asyncio.sleep(min(window, deadline - time.perf_counter()))
+        close_window()
+    stop.set()
+    # Let what was sent finish, so its latency is counted
+    await asyncio.gather(*loops, *in_flight)
+    elapsed = time.perf_counter() - started
+    if current.latencies or current.errors:
+        close_window()
+
+    attempted = counts['requests'] + counts['dropped']
+    report = {
+        'environment': environment(),
+        'config': {'duration_s': duration, 'rate': rate, 'concurrency': concurrency, 'repeat_ratio': repeat_ratio,
+                   'path': path, 'compress': compress, 'seed': seed},
+        **counts,
+        'elapsed_s': elapsed,
+        'error_rate': (counts['errors'] + counts['dropped']) / attempted if attempted else 0.0,
+        'throughput_per_s': len(latencies) / elapsed if elapsed else 0.0,
+        'latency_ms': latency_summary(latencies),
+        'service_ms': latency_summary(service),
+        'by_scale': {
+            copies: {'requests': len(values), 'latency_ms': latency_summary(values)}
+            for copies, values in sorted(by_scale.items())
+        },
+        'probe_ms': latency_summary(probes),
+        'memory': memory_growth(windows),
+        'client_cpu_s': time.process_time() - cpu_started,
+        'windows': windows,
+    }
+    return report
+
+
+def memory_growth(windows: List[Dict[str, Any]]) -> Optional[Dict[str, float]]:
+    """Resident memory over the run, with the growth rate fitted over all windows but the first"""
+    samples = [(entry['elapsed_s'], entry['rss_mib']) for entry in windows if entry['rss_mib'] is not None]
+    if not samples:
+        return None
+    steady = samples[1:] if len(samples) > 2 else samples
+    slope = numpy.polyfit([t for t, _ in steady], [rss for _, rss in steady], 1)[0] if len(steady) > 1 else 0.0
+    return {
+        'start_mib': samples[0][1],
+        'end_mib': samples[-1][1],
+        'peak_mib': max(rss for _, rss in samples),
+        'growth_mib': samples[-1][1] - steady[0][1],
+        'growth_mib_per_hour': float(slope) * 3600,
+    }
+
+
+def check(report: Dict[str, Any], max_p99_ms: Optional[float] = None, max_error_rate: Optional[float] = None,
+          max_rss_growth_mib: Optional[float] = None) -> List[str]:
+    """Limits the report exceeds, as messages"""
+    failures = []
+    p99 = report['latency_ms']['p99']
+    if max_p99_ms is not None and p99 is not None and p99 > max_p99_ms:
+        failures.append(f"p99 latency {p99:.1f} ms > {max_p99_ms} ms")
+    if max_error_rate is not None and report['error_rate'] > max_error_rate:
+        failures.append(f"error rate {report['error_rate']:.2%} > {max_error_rate:.2%}")
+    if report['mismatches']:
+        failures.append(f"{report['mismatches']} response(s) with the wrong is_dag")
+    memory = report['memory']
+    if max_rss_growth_mib is not None and memory is not None and memory['growth_mib'] > max_rss_growth_mib:
+        failures.append(f"memory grew {memory['growth_mib']:.1f} MiB > {max_rss_growth_mib} MiB after warm-up")
+    return failures
+
+
+async def run_against(url: str, pid: Optional[int], scenarios: List[Scenario], weights: List[float], args) -> Dict[str, Any]:
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=args.timeout) as client, \
+            httpx.AsyncClient(base_url=url, timeout=args.timeout) as probe_client:
+        # Untimed: warms the server's caches and pools, and fails fast on a wrong URL
+        await client.get('/')
+        return await run_load(
+            client, probe_client, scenarios, weights, args.duration, args.rate, args.concurrency, args.window,
+            args.probe_interval, args.repeat_ratio, args.path, not args.no_compress,
+            (lambda: process_tree_rss(pid)) if pid else None, args.seed,
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--url", default=None, help="server to load (default: start serve.py on a free port)")
+    parser.add_argument("--pid", type=int, default=None, help="process of the --url server, for memory sampling")
+    parser.add_argument("--workers", type=int, default=1, help="serve.py workers when starting the server")
+    parser.add_argument("--rate", type=float, default=0.0, help="requests per second (default 0: closed loop)")
+    parser.add_argument("--concurrency", type=int, default=8, help="connections, i.e. requests in flight at most")
+    parser.add_argument("--duration", type=float, default=60.0, help="seconds of load")
+    parser.add_argument("--window", type=float, default=10.0, help="seconds per reported window and memory sample")
+    parser.add_argument("--scales", default=DEFAULT_SCALES, help="copies:weight pairs of the payload mix")
+    parser.add_argument("--repeat-ratio", type=float, default=0.1, help="share of requests resending an unchanged pipeline")
+    parser.add_argument("--path", default="/pipelines/parse", help="endpoint the pipelines are posted to")
+    parser.add_argument("--no-compress", action="store_true", help="never gzip request bodies")
+    parser.add_argument("--probe-interval", type=float, default=0.1, help="seconds between GET / probes (0: no probe)")
+    parser.add_argument("--timeout", type=float, default=60.0, help="per-request timeout in seconds")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--max-p99-ms", type=float, default=None)
+    parser.add_argument("--max-error-rate", type=float, default=None)
+    parser.add_argument("--max-rss-growth-mib", type=float, default=None, help="limit on memory growth after the first window")
+    parser.add_argument("--output", default="bench_load.json")
+    args = parser.parse_args()
+
+    try:
+        scales = parse_scales(args.scales)
+    except ValueError as e:
+        parser.error(str(e))
+    scenarios, weights = build_scenarios(load_examples(), scales)
+
+    print("Running Load Test...")
+    print(f"scenarios={len(scenarios)} scales={args.scales} rate={args.rate or 'closed loop'} "
+          f"concurrency={args.concurrency} duration={args.duration:.0f}s path={args.path}")
+    print("=" * 80)
+    if args.url:
+        report = asyncio.run(run_against(args.url, args.pid, scenarios, weights, args))
+    else:
+        port = free_port()
+        with tempfile.TemporaryDirectory() as directory:
+            server = start_server(args.workers, port, os.path.join(directory, "cache.sqlite3"))
+            try:
+                report = asyncio.run(run_against(f"http://127.0.0.1:{port}", server.pid, scenarios, weights, args))
+            finally:
+                server.terminate()
+                server.wait()
+    report['config']['workers'] = None if args.url else args.workers
+    report['config']['scales'] = scales
+
+    print("=" * 80)
+    latency, probe = report['latency_ms'], report['probe_ms']
+    print(f"{report['requests']} requests in {report['elapsed_s']:.1f}s: {report['throughput_per_s']:.1f} req/s, "
+          f"errors={report['errors']} dropped={report['dropped']} rejected={report['rejected']} "
+          f"error rate={report['error_rate']:.2%}")
+    if latency['p50'] is not None:
+        print(f"latency p50={latency['p50']:.2f} p99={latency['p99']:.2f} p99.9={latency['p999']:.2f} max={latency['max']:.2f} ms")
+    for copies, entry in report['by_scale'].items():
+        print(f"  x{copies:<5} {entry['requests']:>7} requests  p50={entry['latency_ms']['p50']:9.2f} ms  p99={entry['latency_ms']['p99']:9.2f} ms")
+    if probe['max'] is not None:
+        print(f"event loop probe p99={probe['p99']:.2f} max={probe['max']:.2f} ms")
+    if report['memory'] is not None:
+        memory = report['memory']
+        print(f"memory {memory['start_mib']:.1f} -> {memory['end_mib']:.1f} MiB (peak {memory['peak_mib']:.1f}), "
+              f"{memory['growth_mib_per_hour']:+.1f} MiB/hour after warm-up")
+    print(f"client CPU {report['client_cpu_s']:.1f}s")
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {args.output}")
+
+    failures = check(report, args.max_p99_ms, args.max_error_rate, args.max_rss_growth_mib)
+    for failure in failures:
+        print(f"FAILED: {failure}")
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite for /pipelines/parse in VectorShift Pipeline Builder
+Runs in-process, no backend server required
+
+Generates chains, wide fan-outs, random DAGs, dense DAGs and cyclic graphs
+at each size (in edges) and times every target on them:
+
+- analyze: main.analyze_topology on an already decoded topology (validation
+  and graph traversal only)
+- parse: main.parse_body, the function behind the endpoint (JSON decode,
+  strict schema validation and analysis)
+- http, http-lean: POST /pipelines/parse through FastAPI's TestClient, i.e.
+  the full ASGI stack, in strict and lean mode
+
+The validation cache is cleared before every timed call. Each case records
+latency percentiles, throughput and the peak memory of one traced call. The
+results are written as JSON, and `--compare` checks them against an earlier
+results file so regressions show up between commits.
+
+Usage: python bench_suite.py [--sizes 10,100,...] [--output FILE] [--compare OLD]
+"""
+
+import argparse
+import json
+import math
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy
+
+from bench_dag import chain_graph, dense_dag, fan_out_graph, random_dag
+
+GRAPHS = ('chain', 'fan_out', 'random', 'dense', 'cyclic')
+TARGETS = ('analyze', 'parse', 'http', 'http-lean')
+DEFAULT_SIZES = (10, 100, 1_000, 10_000, 100_000, 1_000_000)
+
+# Timed calls per case: enough for stable percentiles on small graphs,
+# a handful on large ones
+EDGE_BUDGET = 200_000
+MIN_REPEAT = 3
+MAX_REPEAT = 100
+
+
+def make_graph(shape: str, num_edges: int, seed: int = 0) -> Tuple[List[str], List[Tuple[str, str]]]:
+    """Node IDs and (source, target) pairs of a `shape` graph with about `num_edges` edges"""
+    num_edges = max(num_edges, 2)
+    if shape == 'chain':
+        return chain_graph(num_edges + 1)
+    if shape == 'fan_out':
+        return fan_out_graph(num_edges // 2)
+    if shape == 'random':
+        return random_dag(max(num_edges // 5, 2), num_edges, seed)
+    if shape == 'dense':
+        # Smallest complete DAG with at least num_edges edges
+        return dense_dag(math.ceil((1 + math.sqrt(1 + 8 * num_edges)) / 2))
+    if shape == 'cyclic':
+        # Random DAG plus one reversed edge per thousand, each closing a cycle
+        back_edges = max(num_edges // 1000, 1)
+        node_ids, edges = random_dag(max(num_edges // 5, 2), num_edges - back_edges, seed)
+        return node_ids, edges + [(target, source) for source, target in edges[:back_edges]]
+    raise ValueError(f"Unknown graph shape '{shape}'")
+
+
+def make_payload(node_ids: List[str], edges: List[Tuple[str, str]]) -> Dict[str, Any]:
+    """A pipeline as the frontend sends it: transform nodes wired output -> input"""
+    return {
+        'nodes': [{'id': node_id, 'type': 'transform', 'position': {'x': 0, 'y': 0},
+                   'data': {'nodeType': 'transform', 'transformation': 'uppercase'}} for node_id in node_ids],
+        'edges': [{'id': f"e{i}", 'source': source, 'target': target,
+                   'sourceHandle': f"{source}-output", 'targetHandle': f"{target}-input"}
+                  for i, (source, target) in enumerate(edges)],
+    }
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    """Nearest-rank percentile of an ascending list"""
+    return sorted_values[max(math.ceil(q / 100 * len(sorted_values)) - 1, 0)]
+
+
+def repeats_for(num_edges: int, repeat: Optional[int] = None) -> int:
+    if repeat:
+        return repeat
+    return max(MIN_REPEAT, min(MAX_REPEAT, EDGE_BUDGET // max(num_edges, 1)))
+
+
+def time_calls(call: Callable[[], Any], repeat: int, reset: Callable[[], None]) -> Dict[str, Any]:
+    """
+    Peak memory of one traced call, which doubles as the warm-up, then the
+    latency distribution of `repeat` untraced calls
+    """
+    reset()
+    tracemalloc.start()
+    call()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    timings = []
+    for _ in range(repeat):
+        reset()
+        start = time.perf_counter()
+        call()
+        timings.append(time.perf_counter() - start)
+
+    timings.sort()
+    mean = sum(timings) / len(timings)
+    return {
+        'repeat': repeat,
+        'latency_ms': {
+            'min': timings[0] * 1000,
+            'p50': percentile(timings, 50) * 1000,
+            'p90': percentile(timings, 90) * 1000,
+            'p99': percentile(timings, 99) * 1000,
+            'max': timings[-1] * 1000,
+            'mean': mean * 1000,
+        },
+        'throughput_per_s': 1 / mean if mean else None,
+        'peak_mib': peak / 2**20,
+    }
+
+
+def run_case(shape: str, num_edges: int, targets: List[str], repeat: Optional[int], max_http_edges: int) -> List[Dict[str, Any]]:
+    """Benchmark every target on one generated graph"""
+    from fastapi.testclient import TestClient
+    from fastpath import decode_topology
+    from main import analyze_topology, app, parse_body, validation_cache
+
+    node_ids, edges = make_graph(shape, num_edges)
+    payload = make_payload(node_ids, edges)
+    body = json.dumps(payload).encode()
+    topology = decode_topology(payload)
+    del payload
+    client = TestClient(app)
+    headers = {'content-type': 'application/json'}
+
+    calls = {
+        'analyze': lambda: analyze_topology(topology),
+        'parse': lambda: parse_body(body),
+        'http': lambda: client.post('/pipelines/parse', content=body, headers=headers).raise_for_status(),
+        'http-lean': lambda: client.post('/pipelines/parse?mode=lean', content=body, headers=headers).raise_for_status(),
+    }
+
+    results = []
+    for target in targets:
+        if target.startswith('http') and num_edges > max_http_edges:
+            continue
+        stats = time_calls(calls[target], repeats_for(len(edges), repeat), validation_cache.clear)
+        mean_s = stats['latency_ms']['mean'] / 1000
+        results.append({
+            'graph': shape,
+            'size': num_edges,
+            'nodes': len(node_ids),
+            'edges': len(edges),
+            'target': target,
+            **stats,
+            'edges_per_s': len(edges) / mean_s if mean_s else None,
+            'body_mib': len(body) / 2**20,
+        })
+    return results
+
+
+def environment() -> Dict[str, Any]:
+    """What the numbers were measured on"""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    try:
+        import orjson
+        orjson_version = orjson.__version__
+    except ImportError:  # pragma: no cover - orjson is optional
+        orjson_version = None
+    return {
+        'commit': commit,
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'numpy': numpy.__version__,
+        'orjson': orjson_version,
+    }
+
+
+def run_suite(sizes, graphs=GRAPHS, targets=TARGETS, repeat: Optional[int] = None,
+              max_http_edges: int = 100_000, log=print) -> Dict[str, Any]:
+    """Run every (graph, size) case and return the JSON-ready report"""
+    results = []
+    for num_edges in sizes:
+        for shape in graphs:
+            for result in run_case(shape, num_edges, list(targets), repeat, max_http_edges):
+                latency = result['latency_ms']
+                log(f"{shape:<8} E={result['edges']:>8} {result['target']:<10} "
+                    f"p50={latency['p50']:9.2f} ms  p99={latency['p99']:9.2f} ms  "
+                    f"{result['throughput_per_s']:9.1f}/s  peak={result['peak_mib']:7.1f} MiB")
+                results.append(result)
+    return {'environment': environment(), 'results': results}
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], threshold: float, log=print) -> List[Dict[str, Any]]:
+    """Cases whose p50 latency grew by more than `threshold` (a ratio) over the baseline"""
+    def key(result):
+        return result['graph'], result['size'], result['target']
+
+    previous = {key(result): result for result in baseline['results']}
+    regressions = []
+    for result in current['results']:
+        old = previous.get(key(result))
+        if old is None:
+            continue
+        ratio = result['latency_ms']['p50'] / old['latency_ms']['p50']
+        flag = 'REGRESSION' if ratio > threshold else ''
+        log(f"{result['graph']:<8} E={result['edges']:>8} {result['target']:<10} "
+            f"p50 {old['latency_ms']['p50']:9.2f} -> {result['latency_ms']['p50']:9.2f} ms  x{ratio:5.2f} {flag}")
+        if ratio > threshold:
+            regressions.append({'graph': result['graph'], 'size': result['size'], 'target': result['target'], 'ratio': ratio})
+    return regressions
+
+
+def parse_list(value: str) -> List[str]:
+    return [item.strip() for item in value.split(',') if item.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", default=','.join(map(str, DEFAULT_SIZES)),
+                        help="comma-separated edge counts")
+    parser.add_argument("--graphs", default=','.join(GRAPHS))
+    parser.add_argument("--targets", default=','.join(TARGETS))
+    parser.add_argument("--repeat", type=int, default=None,
+                        help="timed calls per case (default: scaled down with graph size)")
+    parser.add_argument("--max-http-edges", type=int, default=100_000,
+                        help="skip the HTTP targets above this many edges")
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--compare", default=None, help="earlier results file to compare against")
+    parser.add_argument("--threshold", type=float, default=1.2,
+                        help="p50 latency ratio over the baseline that counts as a regression")
+    args = parser.parse_args()
+
+    graphs, targets = parse_list(args.graphs), parse_list(args.targets)
+    for name, allowed in (('graph', GRAPHS), ('target', TARGETS)):
+        unknown = set(graphs if name == 'graph' else targets) - set(allowed)
+        if unknown:
+            parser.error(f"unknown {name}(s): {', '.join(sorted(unknown))}")
+
+    print("Running /pipelines/parse Benchmark Suite...")
+    print("=" * 80)
+    report = run_suite([int(size) for size in parse_list(args.sizes)], graphs, targets, args.repeat, args.max_http_edges)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        print("=" * 80)
+        regressions = compare(report, baseline, args.threshold)
+        if regressions:
+            print(f"{len(regressions)} case(s) slower than x{args.threshold} of {args.compare}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Load test for multi-worker serving (serve.py) in VectorShift Pipeline Builder
+Starts the server with each worker count and measures /pipelines/parse throughput
+
+For every worker count, serve.py is started on a free port with a fresh
+shared cache, and client processes send POST /pipelines/parse over
+keep-alive connections as fast as the server answers for `--duration`
+seconds, after an untimed `--warmup`. Each request carries a random DAG whose first edge ID is unique, so
+every request misses the validation cache and measures the CPU-bound path;
+`--same-body` sends one pipeline throughout to measure cache hits instead.
+The report shows throughput, latency percentiles and the speedup and
+efficiency relative to one worker. Client processes share the host with the
+server, so leave cores for them when reading the scaling numbers.
+
+Usage: python bench_workers.py [--workers 1,2,4] [--clients C] [--duration S] [--edges M]
+"""
+
+import argparse
+import http.client
+import json
+import multiprocessing
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Tuple
+
+import numpy
+
+from bench_dag import random_dag
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Placeholder for the per-request edge ID that keeps the cache cold
+UNIQUE_KEY = b'__KEY__'
+
+
+def pipeline_body(num_edges: int) -> bytes:
+    """A /pipelines/parse body: a random DAG with UNIQUE_KEY as its first edge ID"""
+    node_ids, edges = random_dag(max(num_edges // 5, 2), num_edges)
+    return json.dumps({
+        "nodes": [{"id": node_id, "type": "transform", "position": {"x": 0, "y": 0},
+                   "data": {"nodeType": "transform", "transformation": "uppercase"}} for node_id in node_ids],
+        "edges": [{"id": UNIQUE_KEY.decode() if i == 0 else f"e{i}", "source": source, "target": target,
+                   "sourceHandle": f"{source}-output", "targetHandle": f"{target}-input"}
+                  for i, (source, target) in enumerate(edges)],
+    }).encode()
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(workers: int, port: int, cache_path: str) -> subprocess.Popen:
+    """Start serve.py and wait until every worker could have come up"""
+    env = {**os.environ, "PIPELINE_SHARED_CACHE_PATH": cache_path}
+    process = subprocess.Popen(
+        [sys.executable, "serve.py", "--workers", str(workers), "--max-workers", str(workers), "--port", str(port),
+         "--host", "127.0.0.1", "--no-access-log", "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env,
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            connection = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            connection.request("GET", "/")
+            connection.getresponse().read()
+            connection.close()
+            # One worker answered; give the others the same head start
+            time.sleep(1 + 0.2 * workers)
+            return process
+        except OSError:
+            time.sleep(0.1)
+    process.terminate()
+    raise RuntimeError(f"serve.py with {workers} workers did not start on port {port}")
+
+
+def client_loop(port: int, body: bytes, client_id: int, duration: float, same_body: bool) -> Tuple[List[float], int]:
+    """Send requests back to back on one keep-alive connection; returns latencies and error count"""
+    connection = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+    headers = {"Content-Type": "application/json"}
+    latencies, errors, sent = [], 0, 0
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        payload = body if same_body else body.replace(UNIQUE_KEY, f"c{client_id}-{sent}".encode())
+        sent += 1
+        start = time.perf_counter()
+        try:
+            connection.request("POST", "/pipelines/parse", payload, headers)
+            response = connection.getresponse()
+            response.read()
+            if response.status != 200:
+                errors += 1
+        except (OSError, http.client.HTTPException):
+            errors += 1
+            connection.close()
+            connection = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+            continue
+        latencies.append(time.perf_counter() - start)
+    connection.close()
+    return latencies, errors
+
+
+def measure(workers: int, body: bytes, clients: int, duration: float, warmup: float, same_body: bool) -> Dict[str, Any]:
+    port = free_port()
+    with tempfile.TemporaryDirectory() as directory:
+        server = start_server(workers, port, os.path.join(directory, "cache.sqlite3"))
+        try:
+            with multiprocessing.Pool(clients) as pool:
+                # Untimed: lets every worker start its parse pool and warm up
+                pool.starmap(client_loop, [(port, body, -1 - i, warmup, same_body) for i in range(clients)])
+                start = time.perf_counter()
+                results = pool.starmap(client_loop, [(port, body, i, duration, same_body) for i in range(clients)])
+                elapsed = time.perf_counter() - start
+        finally:
+            server.terminate()
+            server.wait()
+    latencies = numpy.array([latency for client, _ in results for latency in client])
+    return {
+        "workers": workers,
+        "requests": len(latencies),
+        "errors": sum(errors for _, errors in results),
+        "throughput": len(latencies) / elapsed,
+        "p50_ms": float(numpy.percentile(latencies, 50) * 1000) if len(latencies) else None,
+        "p99_ms": float(numpy.percentile(latencies, 99) * 1000) if len(latencies) else None,
+    }
+
+
+def main():
+    cores = os.cpu_count() or 1
+    default_workers = sorted({1, *(2 ** k for k in range(1, cores.bit_length()) if 2 ** k <= cores), cores})
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--workers", default=",".join(map(str, default_workers)),
+                        help="comma-separated worker counts (default: powers of two up to the core count)")
+    parser.add_argument("--clients", type=int, default=None,
+                        help="concurrent client processes (default: twice the largest worker count)")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds of load per worker count")
+    parser.add_argument("--warmup", type=float, default=3.0, help="untimed seconds of load before each measurement")
+    parser.add_argument("--edges", type=int, default=1_000, help="edges per pipeline")
+    parser.add_argument("--same-body", action="store_true", help="send one pipeline throughout (cache hits)")
+    parser.add_argument("--output", default="bench_workers.json")
+    args = parser.parse_args()
+
+    worker_counts = [int(count) for count in args.workers.split(",") if count]
+    clients = args.clients or 2 * max(worker_counts)
+    body = pipeline_body(args.edges)
+
+    print("Running Multi-worker Load Test...")
+    print(f"cores={cores} clients={clients} edges={args.edges} body={len(body) / 1024:.0f} KiB "
+          f"duration={args.duration:.0f}s {'same body' if args.same_body else 'unique bodies'}")
+    print("=" * 80)
+    runs = []
+    for workers in worker_counts:
+        run = measure(workers, body, clients, args.duration, args.warmup, args.same_body)
+        baseline = runs[0] if runs else run
+        run["speedup"] = run["throughput"] / baseline["throughput"]
+        run["efficiency"] = run["speedup"] / (workers / baseline["workers"])
+        runs.append(run)
+        print(f"workers={workers:>3}  {run['throughput']:9.1f} req/s  p50={run['p50_ms']:8.2f} ms  "
+              f"p99={run['p99_ms']:8.2f} ms  speedup=x{run['speedup']:.2f}  "
+              f"efficiency={run['efficiency']:.0%}  errors={run['errors']}")
+
+    report = {"cores": cores, "clients": clients, "edges": args.edges, "duration": args.duration,
+              "same_body": args.same_body, "runs": runs}
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
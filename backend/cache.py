@@ -0,0 +1,274 @@
+"""
+Content-addressed result cache for pipeline validation.
+
+Results are keyed by a canonical hash of the pipeline topology: node IDs and
+types, edge IDs, endpoints and handles, and text node templates (which define
+a text node's input handles). Node `position`, the rest of `data` and the
+React Flow display fields on edges (`type`, `animated`, `markerEnd`, ...) are
+not read by validation, so moving a node or editing a field is still a cache
+hit.
+
+Each process keeps its own in-memory LRU. When several worker processes serve
+the API (see serve.py), PIPELINE_SHARED_CACHE_PATH adds a SQLite tier on the
+local disk that every worker reads and writes, so a pipeline validated by
+one worker is a hit in all of them.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Sequence, Tuple, Union
+
+try:
+    import orjson
+    dumps = orjson.dumps
+except ImportError:  # pragma: no cover - orjson is optional
+    def dumps(value: Any) -> bytes:
+        return json.dumps(value, separators=(',', ':')).encode()
+
+
+def topology_hash(
+    node_ids: Sequence[str],
+    node_types: Sequence[str],
+    edge_ids: Sequence[str],
+    sources: Sequence[str],
+    targets: Sequence[str],
+    source_handles: Sequence[Optional[str]],
+    target_handles: Sequence[Optional[str]],
+    templates: Sequence[Optional[str]] = (),
+) -> str:
+    """
+    Hash the topology columns of a pipeline. Order is preserved, so the same
+    graph submitted twice by the frontend hashes identically; a reordered
+    payload is a miss.
+    """
+    payload = dumps([node_ids, node_types, edge_ids, sources, targets, source_handles, target_handles, templates])
+    return hashlib.blake2b(payload, digest_size=16).hexdigest()
+
+
+def _estimate_size(value: Any) -> int:
+    """Approximate retained size of a JSON-like result, in bytes"""
+    return len(dumps(value))
+
+
+class ResultCache:
+    """
+    Thread-safe LRU cache with a time-to-live and bounds on both the number
+    of entries and their approximate total size. Least recently used entries
+    are evicted first; expired entries are dropped when they are looked up.
+    `sizeof` measures entries that are not JSON-like.
+    """
+
+    def __init__(self, max_entries: int = 1024, max_bytes: int = 64 * 2**20, ttl: float = 300.0,
+                 sizeof: Callable[[Any], int] = _estimate_size):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.sizeof = sizeof
+        self._entries: "OrderedDict[Hashable, Tuple[float, int, Any]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, size, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                self._bytes -= size
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Hashable, value: Any) -> bool:
+        """Store an entry; returns False when it alone exceeds max_bytes and was not stored"""
+        size = self.sizeof(value)
+        if size > self.max_bytes:
+            return False
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            self._entries[key] = (time.monotonic() + self.ttl, size, value)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, (_, evicted_size, _) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self.evictions += 1
+        return True
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
+
+
+class SharedTier:
+    """
+    Results in a SQLite database that every process on the host can open.
+    WAL mode lets readers proceed while another process writes. Entries
+    expire `ttl` seconds after they were written; when more than
+    `max_entries` exist the oldest tenth is removed. Errors such as a locked
+    database are treated as misses, so the tier never fails a request.
+    """
+
+    def __init__(self, path: str, max_entries: int = 100_000, ttl: float = 300.0):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        # (pid, connection) per thread; a forked child must not reuse its parent's connection
+        self._local = threading.local()
+        self._writes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _connection(self) -> sqlite3.Connection:
+        owner = getattr(self._local, 'owner', None)
+        if owner is not None and owner[0] == os.getpid():
+            return owner[1]
+        connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+        connection.execute('PRAGMA journal_mode=WAL')
+        connection.execute('PRAGMA synchronous=NORMAL')
+        connection.execute('CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, value BLOB NOT NULL, expires_at REAL NOT NULL)')
+        connection.execute('CREATE INDEX IF NOT EXISTS results_expires_at ON results (expires_at)')
+        self._local.owner = (os.getpid(), connection)
+        return connection
+
+    def get(self, key: str) -> Optional[Any]:
+        try:
+            row = self._connection().execute(
+                'SELECT value FROM results WHERE key = ? AND expires_at > ?', (key, time.time())
+            ).fetchone()
+        except sqlite3.Error:
+            row = None
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return json.loads(row[0])
+
+    def put(self, key: str, payload: bytes) -> None:
+        try:
+            self._connection().execute(
+                'INSERT OR REPLACE INTO results (key, value, expires_at) VALUES (?, ?, ?)',
+                (key, payload, time.time() + self.ttl)
+            )
+        except sqlite3.Error:
+            return
+        with self._lock:
+            self._writes += 1
+            check = self._writes % max(self.max_entries // 10, 1) == 0
+        if check:
+            self.evict()
+
+    def evict(self) -> None:
+        """Drop expired entries, then the oldest tenth when over max_entries"""
+        try:
+            connection = self._connection()
+            connection.execute('DELETE FROM results WHERE expires_at <= ?', (time.time(),))
+            excess = connection.execute('SELECT COUNT(*) FROM results').fetchone()[0] - self.max_entries
+            if excess > 0:
+                connection.execute(
+                    'DELETE FROM results WHERE key IN (SELECT key FROM results ORDER BY expires_at LIMIT ?)',
+                    (excess + self.max_entries // 10,)
+                )
+        except sqlite3.Error:
+            pass
+
+    def clear(self) -> None:
+        try:
+            self._connection().execute('DELETE FROM results')
+        except sqlite3.Error:
+            pass
+
+    def stats(self) -> Dict[str, Any]:
+        try:
+            entries = self._connection().execute('SELECT COUNT(*) FROM results').fetchone()[0]
+        except sqlite3.Error:
+            entries = None
+        return {
+            'path': self.path,
+            'entries': entries,
+            'max_entries': self.max_entries,
+            'ttl': self.ttl,
+            'hits': self.hits,
+            'misses': self.misses,
+        }
+
+
+class TieredResultCache:
+    """
+    A per-process ResultCache in front of a SharedTier. A shared hit is
+    promoted into memory; clearing empties the shared tier and this process's
+    memory (other processes keep theirs until their entries expire, which is
+    harmless since keys are content hashes).
+    """
+
+    def __init__(self, memory: ResultCache, shared: SharedTier):
+        self.memory = memory
+        self.shared = shared
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        value = self.memory.get(key)
+        if value is None:
+            value = self.shared.get(repr(key))
+            if value is not None:
+                self.memory.put(key, value)
+        return value
+
+    def put(self, key: Hashable, value: Any) -> bool:
+        self.shared.put(repr(key), dumps(value))
+        return self.memory.put(key, value)
+
+    def clear(self) -> None:
+        self.memory.clear()
+        self.shared.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self.memory.stats(), 'shared': self.shared.stats()}
+
+
+def cache_from_env() -> Union[ResultCache, TieredResultCache]:
+    """
+    Build the validation cache from PIPELINE_CACHE_* environment variables,
+    backed by a SharedTier when PIPELINE_SHARED_CACHE_PATH is set
+    """
+    ttl = float(os.environ.get('PIPELINE_CACHE_TTL', 300))
+    memory = ResultCache(
+        max_entries=int(os.environ.get('PIPELINE_CACHE_MAX_ENTRIES', 1024)),
+        max_bytes=int(os.environ.get('PIPELINE_CACHE_MAX_BYTES', 64 * 2**20)),
+        ttl=ttl,
+    )
+    path = os.environ.get('PIPELINE_SHARED_CACHE_PATH')
+    if not path:
+        return memory
+    shared = SharedTier(path, int(os.environ.get('PIPELINE_SHARED_CACHE_MAX_ENTRIES', 100_000)), ttl)
+    return TieredResultCache(memory, shared)
@@ -0,0 +1,165 @@
+"""
+Columnar kernels for math, filter and transform nodes.
+
+A value arriving on a handle as a list (or NumPy array) is a record batch:
+one column of rows that the node processes as a whole instead of one Python
+object at a time. Each node's settings are compiled once into a kernel (a
+NumPy ufunc, a boolean-mask predicate or a vectorized string function) and
+the kernel is applied to the whole column:
+
+- math: `a` and `b` broadcast against each other, so a column plus a scalar
+  works; division by zero and overflow fail the node as they do for scalars
+- filter: the condition becomes a boolean mask; `passed` carries the
+  matching rows and `failed` the rest, and an empty side produces nothing so
+  its branch is skipped
+- transform: NumPy string functions over the whole column
+- text: the compiled template (templates.py) renders one string per row
+
+Batches stay NumPy arrays between nodes; `to_python` turns them back into
+lists at the API boundary.
+"""
+
+import re
+from functools import lru_cache
+from typing import Any, Callable, Dict, Optional
+
+import numpy as np
+
+# NumPy 2 string ufuncs, falling back to the older np.char equivalents
+strings = getattr(np, 'strings', np.char)
+
+MATH_UFUNCS = {
+    'add': np.add,
+    'subtract': np.subtract,
+    'multiply': np.multiply,
+    'divide': np.true_divide,
+    'power': np.power,
+}
+
+
+def is_batch(value: Any) -> bool:
+    return isinstance(value, (list, tuple, np.ndarray))
+
+
+def batch_length(inputs: Dict[str, Any]) -> Optional[int]:
+    """Rows in the batch inputs of a node, or None when every input is a single value"""
+    lengths = {len(value) for value in inputs.values() if is_batch(value)}
+    if len(lengths) > 1:
+        raise ValueError(f"Batch inputs have different lengths: {sorted(lengths)}")
+    return lengths.pop() if lengths else None
+
+
+def as_array(values: Any) -> np.ndarray:
+    """
+    A batch as a 1-D array. Lists that NumPy would coerce (mixed strings and
+    numbers) or nest (rows that are lists) become object arrays, so rows keep
+    their original values.
+    """
+    if isinstance(values, np.ndarray):
+        return values
+    try:
+        array = np.asarray(values)
+    except ValueError:
+        array = None
+    if array is not None and array.ndim == 1 and (array.dtype.kind != 'U' or all(isinstance(row, str) for row in values)):
+        return array
+    array = np.empty(len(values), dtype=object)
+    for i, row in enumerate(values):
+        array[i] = row
+    return array
+
+
+def as_strings(values: np.ndarray) -> np.ndarray:
+    """Rows as strings the way the scalar runtimes see them: None is ''"""
+    if values.dtype.kind == 'U':
+        return values
+    if values.dtype == object:
+        values = np.where(values == None, '', values)  # noqa: E711 - elementwise comparison
+    return values.astype(str)
+
+
+def as_numbers(values: Any) -> Any:
+    """Batch to float64 (missing rows are 0, as for scalars), scalar to float"""
+    if not is_batch(values):
+        return float(values or 0)
+    array = as_array(values)
+    if array.dtype == object:
+        array = np.where((array == None) | (array == ''), 0, array)  # noqa: E711 - elementwise comparison
+    elif array.dtype.kind == 'U':
+        array = np.where(array == '', '0', array)
+    # Float columns are used as they are; kernels never write to their inputs
+    return array.astype(np.float64, copy=False)
+
+
+@lru_cache(maxsize=None)
+def math_kernel(operation: str) -> Callable[..., np.ndarray]:
+    """Kernel over columns and scalars; `out` may be an input column the caller owns, to compute in place"""
+    ufunc = MATH_UFUNCS[operation]
+
+    def kernel(a, b, out=None):
+        with np.errstate(divide='raise', over='raise', invalid='raise'):
+            return ufunc(as_numbers(a), as_numbers(b), out=out)
+    return kernel
+
+
+@lru_cache(maxsize=1024)
+def filter_kernel(condition: str, value: str) -> Callable[[np.ndarray], np.ndarray]:
+    """Boolean mask over a string column"""
+    if condition == 'contains':
+        return lambda column: strings.find(column, value) >= 0
+    if condition == 'equals':
+        return lambda column: column == value
+    if condition == 'startsWith':
+        return lambda column: strings.startswith(column, value)
+    if condition == 'endsWith':
+        return lambda column: strings.endswith(column, value)
+    if condition == 'regex':
+        search = np.frompyfunc(re.compile(value).search, 1, 1)
+        return lambda column: search(column) != None  # noqa: E711 - elementwise comparison
+    raise KeyError(condition)
+
+
+def _reverse(column: np.ndarray) -> np.ndarray:
+    return np.array([text[::-1] for text in column.tolist()], dtype=column.dtype)
+
+
+TRANSFORM_KERNELS: Dict[str, Callable[[np.ndarray], np.ndarray]] = {
+    'uppercase': strings.upper,
+    'lowercase': strings.lower,
+    'trim': strings.strip,
+    'reverse': _reverse,
+    'length': strings.str_len,
+}
+
+
+def apply_filter(condition: str, value: str, values: Any) -> Dict[str, np.ndarray]:
+    column = as_array(values)
+    mask = np.asarray(filter_kernel(condition, value)(as_strings(column)), dtype=bool)
+    outputs = {}
+    if mask.any():
+        outputs['passed'] = column[mask]
+    if not mask.all():
+        outputs['failed'] = column[~mask]
+    return outputs
+
+
+def apply_transform(transformation: str, values: Any) -> np.ndarray:
+    return TRANSFORM_KERNELS[transformation](as_strings(as_array(values)))
+
+
+def to_python(value: Any) -> Any:
+    """Replace NumPy arrays and scalars in a result with lists and Python numbers"""
+    if isinstance(value, (np.ndarray, np.generic)):
+        return value.tolist()
+    if isinstance(value, dict):
+        return {key: to_python(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [to_python(item) for item in value]
+    return value
+
+
+def json_default(value: Any) -> Any:
+    """`default` hook for json.dumps that understands NumPy values"""
+    if isinstance(value, (np.ndarray, np.generic)):
+        return value.tolist()
+    return str(value)
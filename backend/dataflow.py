@@ -0,0 +1,247 @@
+"""
+Chunked, streaming execution of pipelines over large inputs.
+
+PipelineExecutor.run materializes each node's full output before its
+successors start, so peak memory grows with the dataset. Here every node is
+an async operator instead: it reads fixed-size chunks of rows from a bounded
+queue per incoming edge, processes them, and writes its output chunks to the
+queues of its outgoing edges. A full queue makes the producer wait, so at
+most `max_pending` chunks are buffered per edge whatever the input size, and
+downstream nodes start on the first chunk while upstream is still reading.
+
+- A customInput whose run input is a list, array, iterator or async
+  iterator is a source that emits `chunk_size` rows at a time. Any other
+  input value is a constant broadcast to every row.
+- Node types registered with `batched=True` (math, filter, transform, text,
+  delay) run once per chunk on whole columns; the rest run once per row.
+- Inputs of a node with several streamed inputs are zipped row by row,
+  re-aligning chunk boundaries; streams of different lengths fail the node.
+- A node fed only by constants runs once and passes its outputs on as
+  constants, as PipelineExecutor would.
+- customOutput nodes are sinks. Each output chunk goes to the `on_event`
+  handler as an `output_chunk` event; without a handler the rows are
+  collected into the result instead, which is no longer constant-memory.
+"""
+
+import asyncio
+import collections.abc
+import itertools
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from columnar import is_batch, to_python
+from executor import BATCHED, NODE_RUNTIMES, EventHandler, ExecutionContext, PipelineExecutor, field, input_value
+
+END = object()
+
+
+class Constant:
+    """A value that is the same for every row"""
+
+    __slots__ = ('value',)
+
+    def __init__(self, value: Any):
+        self.value = value
+
+
+def is_stream(value: Any) -> bool:
+    return is_batch(value) or hasattr(value, '__aiter__') or isinstance(value, collections.abc.Iterator)
+
+
+async def source_chunks(value: Any, chunk_size: int) -> AsyncIterator[Any]:
+    """Split a list, array, iterator or async iterator into chunks of rows"""
+    if is_batch(value):
+        for start in range(0, len(value), chunk_size):
+            yield value[start:start + chunk_size]
+    elif hasattr(value, '__aiter__'):
+        chunk = []
+        async for row in value:
+            chunk.append(row)
+            if len(chunk) == chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+    else:
+        while True:
+            chunk = list(itertools.islice(value, chunk_size))
+            if not chunk:
+                return
+            yield chunk
+
+
+async def run_chunked(
+    executor: PipelineExecutor,
+    inputs: Optional[Dict[str, Any]] = None,
+    chunk_size: int = 1024,
+    max_pending: int = 4,
+    on_event: Optional[EventHandler] = None,
+) -> Dict[str, Any]:
+    """
+    Stream `inputs` through the pipeline of `executor` and return outputs
+    plus per-node row counts. Emits `output_chunk` events ({output, rows})
+    and a final `run_finished` to `on_event` if given.
+    """
+    context = ExecutionContext(inputs or {}, executor.llm, executor.api)
+    started = time.perf_counter()
+    outputs: Dict[str, Any] = {}
+    report: Dict[str, Dict[str, Any]] = {
+        node_id: {'status': 'pending', 'chunks': 0, 'rows_in': 0, 'rows_out': 0} for node_id in executor.nodes
+    }
+
+    def elapsed_ms() -> float:
+        return (time.perf_counter() - started) * 1000
+
+    # One bounded queue per edge: consumers see (target handle, queue),
+    # producers (source handle, queue)
+    inbound: Dict[str, List[Tuple[str, asyncio.Queue]]] = {node_id: [] for node_id in executor.nodes}
+    outbound: Dict[str, List[Tuple[Optional[str], asyncio.Queue]]] = {node_id: [] for node_id in executor.nodes}
+    for target, incoming in executor.incoming.items():
+        for source, source_handle, target_handle in incoming:
+            queue: asyncio.Queue = asyncio.Queue(maxsize=max_pending)
+            inbound[target].append((target_handle, queue))
+            outbound[source].append((source_handle, queue))
+
+    background: List[asyncio.Future] = []
+
+    async def send(node_id: str, produced: Dict[str, Any], wrap=None) -> None:
+        """Route one chunk (or constant) per output handle; edges without a source handle take a sole output"""
+        sole = next(iter(produced)) if len(produced) == 1 else None
+        for source_handle, queue in outbound[node_id]:
+            handle = sole if source_handle is None else source_handle
+            if handle in produced:
+                await queue.put(wrap(produced[handle]) if wrap else produced[handle])
+        report[node_id]['rows_out'] += sum(len(rows) for rows in produced.values()) if wrap is None else 0
+
+    async def drain(queue: asyncio.Queue) -> None:
+        while await queue.get() is not END:
+            pass
+
+    async def sink(node, name: str, rows: Any) -> None:
+        if on_event is not None:
+            await on_event({'event': 'output_chunk', 'output': name, 'rows': to_python(rows)})
+        else:
+            outputs.setdefault(name, []).extend(to_python(rows))
+
+    async def process(node, piece: Dict[str, Any], constants: Dict[str, Any], rows: int) -> Dict[str, Any]:
+        if node.type == 'customOutput':
+            await sink(node, field(node, 'outputName', node.id.replace('customOutput-', 'output_')),
+                       piece.get('value', next(iter(piece.values()))))
+            return {}
+        runtime = NODE_RUNTIMES[node.type]
+        if node.type in BATCHED:
+            return {handle: value for handle, value in (await runtime(node, {**constants, **piece}, context)).items()
+                    if not is_batch(value) or len(value)}
+        produced: Dict[str, List[Any]] = {}
+        for i in range(rows):
+            row = {**constants, **{handle: column[i] for handle, column in piece.items()}}
+            for handle, value in (await runtime(node, row, context)).items():
+                produced.setdefault(handle, []).append(value)
+        return produced
+
+    async def operator(node_id: str) -> None:
+        node = executor.nodes[node_id]
+        entry = report[node_id]
+        entry['status'] = 'running'
+        entry['started_ms'] = elapsed_ms()
+
+        if node.type == 'customInput':
+            value = input_value(node, context.inputs)
+            if is_stream(value):
+                async for chunk in source_chunks(value, chunk_size):
+                    entry['chunks'] += 1
+                    await send(node_id, {'value': chunk})
+            else:
+                await send(node_id, {'value': value}, wrap=Constant)
+            return
+
+        # Last edge wins per target handle, as in gather_inputs; the others are drained
+        channels: Dict[str, asyncio.Queue] = {}
+        for target_handle, queue in inbound[node_id]:
+            if target_handle in channels:
+                background.append(asyncio.ensure_future(drain(channels[target_handle])))
+            channels[target_handle] = queue
+
+        constants: Dict[str, Any] = {}
+        pending: Dict[str, Any] = {}
+        for handle, queue in channels.items():
+            message = await queue.get()
+            if isinstance(message, Constant):
+                constants[handle] = message.value
+                await drain(queue)
+            elif message is not END:
+                pending[handle] = message
+
+        if not pending:
+            if channels and not constants:
+                entry['status'] = 'skipped'
+                return
+            produced = await NODE_RUNTIMES[node.type](node, constants, context)
+            if node.type == 'customOutput':
+                outputs.update(context.outputs)
+            await send(node_id, produced, wrap=Constant)
+            return
+
+        # Zip the streamed inputs, cutting every chunk to the shortest one
+        while pending:
+            rows = min(len(chunk) for chunk in pending.values())
+            piece = {handle: chunk[:rows] for handle, chunk in pending.items()}
+            entry['chunks'] += 1
+            entry['rows_in'] += rows
+            produced = await process(node, piece, constants, rows)
+            if produced:
+                await send(node_id, produced)
+            ended = []
+            for handle, chunk in list(pending.items()):
+                if len(chunk) > rows:
+                    pending[handle] = chunk[rows:]
+                    continue
+                message = await channels[handle].get()
+                if message is END:
+                    ended.append(handle)
+                else:
+                    pending[handle] = message
+            if ended:
+                if len(ended) != len(pending):
+                    raise ValueError(f"Streamed inputs of node '{node_id}' have different lengths")
+                pending = {}
+
+    async def run_operator(node_id: str) -> None:
+        entry = report[node_id]
+        try:
+            await operator(node_id)
+        except Exception as e:
+            # No END downstream: gather fails and the whole run is cancelled
+            entry['status'] = 'failed'
+            entry['error'] = f"{type(e).__name__}: {e}"
+            entry['finished_ms'] = elapsed_ms()
+            raise
+        if entry['status'] == 'running':
+            entry['status'] = 'completed'
+        entry['finished_ms'] = elapsed_ms()
+        for _, queue in outbound[node_id]:
+            await queue.put(END)
+
+    tasks = [asyncio.ensure_future(run_operator(node_id)) for node_id in executor.order]
+    error = None
+    try:
+        await asyncio.gather(*tasks)
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+    finally:
+        for task in tasks + background:
+            task.cancel()
+
+    result = {
+        'status': 'failed' if error else 'completed',
+        'outputs': outputs,
+        'nodes': {node_id: report[node_id] for node_id in executor.order},
+        'timing': {'total_ms': elapsed_ms()},
+    }
+    if error:
+        result['error'] = error
+    if executor.optimization is not None:
+        result['optimizer'] = executor.optimization.summary()
+    if on_event is not None:
+        await on_event({'event': 'run_finished', **result})
+    return result
@@ -0,0 +1,574 @@
+"""
+Asyncio execution engine for VectorShift pipelines.
+
+Every node type the frontend defines has a runtime here, registered by its
+React Flow type. A run schedules nodes in dependency order and starts each
+node as soon as all of its inputs are available, so independent branches
+overlap on the event loop; `delay` and `api` nodes await instead of blocking.
+
+Values travel along edges from a source handle to a target handle. Handle
+names are the React Flow handle IDs without the `<node id>-` prefix, e.g.
+`llm-1-prompt` is the `prompt` input of node `llm-1`. A node whose incoming
+edges all come from handles that produced nothing (such as the unmatched
+branch of a filter) is skipped, and the skip propagates downstream.
+
+Math, filter, transform and text nodes given a list (a record batch) instead of a
+single value process the whole column at once with the NumPy kernels in
+columnar.py.
+
+LLM and API calls go through pluggable providers. The defaults are local
+stand-ins, so a whole pipeline can run offline.
+
+With a Scheduler (scheduler.py), batches for CPU-bound runtimes are computed
+on a worker pool and nodes waiting for a worker or a per-type concurrency cap
+are started in critical-path order.
+
+With an Optimizer (optimizer.py), the validated pipeline is rewritten before
+it runs: dead nodes are pruned, constant-only nodes folded and chains of
+pure nodes fused. Reports then cover the rewritten nodes, plus any merged
+node that failed, under its own ID; the result's `optimizer` entry lists the
+nodes that were removed or merged.
+
+With a NodeResultCache (node_cache.py), a node whose Merkle key was seen
+before reuses the stored outputs instead of running, so only the part of the
+graph downstream of a change re-executes. The key does not cover the
+providers, so share one cache only between executors using the same ones.
+"""
+
+import asyncio
+import json
+import operator
+import re
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from columnar import apply_filter, apply_transform, batch_length, is_batch, math_kernel
+from graph import analyze_graph
+from node_cache import NodeResultCache, node_key
+from templates import compile_template
+
+NodeRuntime = Callable[[Any, Dict[str, Any], 'ExecutionContext'], Awaitable[Dict[str, Any]]]
+
+EventHandler = Callable[[Dict[str, Any]], Awaitable[None]]
+
+NODE_RUNTIMES: Dict[str, NodeRuntime] = {}
+
+# Per node type: whether outputs may be stored in the node cache, as a bool
+# or a predicate over the outputs
+MEMOIZE: Dict[str, Any] = {}
+
+# Per node type: a predicate over the node saying whether its results may be
+# cached at all; node types without one always may
+CACHEABLE: Dict[str, Callable[[Any], bool]] = {}
+
+# api methods that do not change anything on the server
+SAFE_METHODS = frozenset({'GET', 'HEAD', 'OPTIONS'})
+
+# Node types whose runtime accepts whole columns (lists) as inputs
+BATCHED = set()
+
+# Node types whose runtime computes without awaiting, so it can run on a worker thread
+CPU_BOUND = set()
+
+
+class LLMProvider:
+    """Interface for the model behind `llm` nodes"""
+
+    async def complete(self, prompt: str, system: str = '') -> str:
+        raise NotImplementedError
+
+
+class EchoLLMProvider(LLMProvider):
+    """Offline stand-in that echoes the prompt after an optional simulated latency"""
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+
+    async def complete(self, prompt: str, system: str = '') -> str:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return f"[echo] {prompt}"
+
+
+class APIClient:
+    """Interface for the HTTP calls made by `api` nodes"""
+
+    async def request(self, method: str, url: str, headers: Dict[str, str], body: Any = None, params: Any = None) -> Any:
+        raise NotImplementedError
+
+
+class LocalAPIClient(APIClient):
+    """Offline stand-in that describes the request it was asked to make"""
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+
+    async def request(self, method: str, url: str, headers: Dict[str, str], body: Any = None, params: Any = None) -> Any:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return {'method': method, 'url': url, 'headers': headers, 'body': body, 'params': params}
+
+
+class ExecutionContext:
+    """Per-run state shared by node runtimes"""
+
+    def __init__(self, inputs: Dict[str, Any], llm: LLMProvider, api: APIClient):
+        self.inputs = inputs
+        self.llm = llm
+        self.api = api
+        self.outputs: Dict[str, Any] = {}
+
+
+class PartialFailure(Exception):
+    """
+    Raised by a runtime standing in for several drawn nodes (a fused chain)
+    when some of them failed. `outputs` are what it still produced and
+    `errors` the error message per failed node ID; the run reports each of
+    those nodes as failed under its own ID.
+    """
+
+    def __init__(self, outputs: Dict[str, Any], errors: Dict[str, str]):
+        super().__init__(outputs, errors)
+        self.outputs = outputs
+        self.errors = errors
+
+    def __str__(self) -> str:
+        return '; '.join(f"{node_id}: {error}" for node_id, error in self.errors.items())
+
+
+def node_runtime(*node_types: str, memoize: Any = True, cacheable: Optional[Callable[[Any], bool]] = None,
+                 batched: bool = False, cpu_bound: bool = False):
+    """
+    Register a coroutine as the runtime for one or more node types. `memoize`
+    is a bool or a predicate over the outputs saying whether they may be
+    cached; runtimes with side effects on the run must pass False.
+    `cacheable` is a predicate over the node for runtimes whose side effects
+    depend on its settings: a node it rejects is neither looked up in nor
+    stored in the cache, so it runs every time. `batched`
+    runtimes treat list inputs as columns, so chunked runs (dataflow.py)
+    call them once per chunk rather than once per row. `cpu_bound` runtimes
+    never await, so a Scheduler may run them on a worker thread (run_sync).
+    """
+    def register(func: NodeRuntime) -> NodeRuntime:
+        for node_type in node_types:
+            NODE_RUNTIMES[node_type] = func
+            MEMOIZE[node_type] = memoize
+            if cacheable is not None:
+                CACHEABLE[node_type] = cacheable
+            if batched:
+                BATCHED.add(node_type)
+            if cpu_bound:
+                CPU_BOUND.add(node_type)
+        return func
+    return register
+
+
+def run_sync(coroutine) -> Any:
+    """Drive a runtime coroutine that completes without awaiting, outside any event loop"""
+    try:
+        coroutine.send(None)
+    except StopIteration as e:
+        return e.value
+    coroutine.close()
+    raise RuntimeError('A cpu_bound runtime awaited')
+
+
+def field(node, name: str, default: Any = None) -> Any:
+    """Node field value, falling back to the frontend default like BaseNode does"""
+    value = (node.data or {}).get(name)
+    return value if value not in (None, '') else default
+
+
+def first_input(inputs: Dict[str, Any], name: str) -> Any:
+    """The named input, or the only input when edges carry no target handle"""
+    if name in inputs:
+        return inputs[name]
+    if len(inputs) == 1:
+        return next(iter(inputs.values()))
+    return None
+
+
+def input_value(node, run_inputs: Dict[str, Any]) -> Any:
+    """The run input a customInput node reads, by input name or node ID"""
+    name = field(node, 'inputName', node.id.replace('customInput-', 'input_'))
+    return run_inputs.get(name, run_inputs.get(node.id))
+
+
+@node_runtime('customInput', memoize=False)
+async def run_input(node, inputs, context):
+    return {'value': input_value(node, context.inputs)}
+
+
+@node_runtime('customOutput', memoize=False)
+async def run_output(node, inputs, context):
+    name = field(node, 'outputName', node.id.replace('customOutput-', 'output_'))
+    value = first_input(inputs, 'value')
+    context.outputs[name] = value
+    return {'value': value}
+
+
+@node_runtime('text', batched=True, cpu_bound=True)
+async def run_text(node, inputs, context):
+    plan = compile_template(field(node, 'text', '{{input}}'))
+    rows = batch_length(inputs)
+    if rows is not None:
+        return {'output': plan.render_batch(inputs, rows)}
+    return {'output': plan.render(inputs)}
+
+
+@node_runtime('llm')
+async def run_llm(node, inputs, context):
+    prompt = first_input(inputs, 'prompt')
+    system = inputs.get('system', '')
+    return {'response': await context.llm.complete('' if prompt is None else str(prompt), str(system or ''))}
+
+
+MATH_OPERATIONS = {
+    'add': operator.add,
+    'subtract': operator.sub,
+    'multiply': operator.mul,
+    'divide': operator.truediv,
+    'power': operator.pow,
+}
+
+
+@node_runtime('math', batched=True, cpu_bound=True)
+async def run_math(node, inputs, context):
+    if is_batch(inputs.get('a')) or is_batch(inputs.get('b')):
+        return {'result': math_kernel(field(node, 'operation', 'add'))(inputs.get('a', 0), inputs.get('b', 0))}
+    operation = MATH_OPERATIONS[field(node, 'operation', 'add')]
+    a = float(inputs.get('a', 0) or 0)
+    b = float(inputs.get('b', 0) or 0)
+    return {'result': operation(a, b)}
+
+
+FILTER_CONDITIONS = {
+    'contains': lambda text, value: value in text,
+    'equals': lambda text, value: text == value,
+    'startsWith': lambda text, value: text.startswith(value),
+    'endsWith': lambda text, value: text.endswith(value),
+    'regex': lambda text, value: re.search(value, text) is not None,
+}
+
+
+@node_runtime('filter', batched=True, cpu_bound=True)
+async def run_filter(node, inputs, context):
+    value = first_input(inputs, 'input')
+    if is_batch(value):
+        return apply_filter(field(node, 'condition', 'contains'), field(node, 'value', ''), value)
+    condition = FILTER_CONDITIONS[field(node, 'condition', 'contains')]
+    passed = condition('' if value is None else str(value), field(node, 'value', ''))
+    return {'passed': value} if passed else {'failed': value}
+
+
+TRANSFORMATIONS = {
+    'uppercase': lambda text: text.upper(),
+    'lowercase': lambda text: text.lower(),
+    'trim': lambda text: text.strip(),
+    'reverse': lambda text: text[::-1],
+    'length': len,
+}
+
+
+@node_runtime('transform', batched=True, cpu_bound=True)
+async def run_transform(node, inputs, context):
+    # customScript holds JavaScript for the browser and is not run server-side
+    value = first_input(inputs, 'input')
+    if is_batch(value):
+        return {'output': apply_transform(field(node, 'transformation', 'uppercase'), value)}
+    transformation = TRANSFORMATIONS[field(node, 'transformation', 'uppercase')]
+    return {'output': transformation('' if value is None else str(value))}
+
+
+DELAY_UNITS = {'ms': 0.001, 's': 1.0, 'm': 60.0}
+
+
+@node_runtime('delay', batched=True)
+async def run_delay(node, inputs, context):
+    duration = float(field(node, 'duration', 1000))
+    await asyncio.sleep(duration * DELAY_UNITS[field(node, 'unit', 'ms')])
+    return {'output': first_input(inputs, 'input')}
+
+
+def is_safe_request(node) -> bool:
+    return str(field(node, 'method', 'GET')).upper() in SAFE_METHODS
+
+
+# Only safe requests are cached, and failed ones are retried by the next run
+@node_runtime('api', memoize=lambda outputs: 'error' not in outputs, cacheable=is_safe_request)
+async def run_api(node, inputs, context):
+    headers = field(node, 'headers', '{}')
+    if isinstance(headers, str):
+        headers = json.loads(headers)
+    try:
+        response = await context.api.request(
+            field(node, 'method', 'GET'),
+            field(node, 'url', ''),
+            headers,
+            body=inputs.get('body'),
+            params=inputs.get('params'),
+        )
+    except Exception as e:
+        return {'error': str(e)}
+    return {'response': response}
+
+
+def handle_name(node_id: str, handle: Optional[str]) -> Optional[str]:
+    """Strip the `<node id>-` prefix React Flow puts on handle IDs"""
+    if handle and handle.startswith(f"{node_id}-"):
+        return handle[len(node_id) + 1:]
+    return handle
+
+
+class PipelineExecutor:
+    """
+    Runs one pipeline. Construction validates it: unknown node types and
+    cycles raise ValueError, and edges to missing nodes are ignored as in
+    is_dag. `run` may be called repeatedly with different inputs.
+    """
+
+    def __init__(self, nodes, edges, llm: Optional[LLMProvider] = None, api: Optional[APIClient] = None,
+                 cache: Optional[NodeResultCache] = None, scheduler=None, optimizer=None):
+        self.nodes = {node.id: node for node in nodes}
+        self.llm = llm or EchoLLMProvider()
+        self.api = api or LocalAPIClient()
+        self.cache = cache
+        self.scheduler = scheduler
+
+        unknown = sorted({node.type for node in self.nodes.values() if node.type not in NODE_RUNTIMES})
+        if unknown:
+            raise ValueError(f"No runtime for node types: {', '.join(unknown)}")
+
+        analysis = analyze_graph(list(self.nodes), [(edge.id, edge.source, edge.target) for edge in edges])
+        if not analysis['is_dag']:
+            cycle = analysis['cycles'][0]['nodes']
+            raise ValueError(f"Pipeline contains a cycle: {' -> '.join(cycle + cycle[:1])}")
+        self.order: List[str] = analysis['topological_order']
+        self.levels: List[List[str]] = analysis['levels']
+        # Type per drawn node in topological order; reports follow this order
+        self.drawn: Dict[str, str] = {node_id: self.nodes[node_id].type for node_id in self.order}
+
+        self.optimization = None
+        if optimizer is not None:
+            self.optimization = optimizer.optimize(list(self.nodes.values()), edges, self.order)
+            self.nodes = {node.id: node for node in self.optimization.nodes}
+            edges = self.optimization.edges
+            self.order = self.optimization.order
+            self.levels = analyze_graph(list(self.nodes), [(edge.id, edge.source, edge.target) for edge in edges])['levels']
+
+        # (source, source handle, target handle) per incoming edge, in edge order
+        self.incoming: Dict[str, List[tuple]] = {node_id: [] for node_id in self.nodes}
+        self.successors: Dict[str, List[str]] = {node_id: [] for node_id in self.nodes}
+        for edge in edges:
+            if edge.source not in self.nodes or edge.target not in self.nodes:
+                continue
+            self.incoming[edge.target].append((
+                edge.source,
+                handle_name(edge.source, edge.sourceHandle),
+                handle_name(edge.target, edge.targetHandle) or edge.source,
+            ))
+            self.successors[edge.source].append(edge.target)
+
+    def gather_inputs(self, node_id: str, results: Dict[str, Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """Collect a node's inputs; None means every incoming edge came up empty"""
+        incoming = self.incoming[node_id]
+        inputs: Dict[str, Any] = {}
+        for source, source_handle, target_handle in incoming:
+            outputs = results.get(source, {})
+            if source_handle is None and len(outputs) == 1:
+                source_handle = next(iter(outputs))
+            if source_handle in outputs:
+                inputs[target_handle] = outputs[source_handle]
+        if incoming and not inputs:
+            return None
+        return inputs
+
+    def node_keys(self, inputs: Dict[str, Any]) -> Dict[str, str]:
+        """Merkle key per node, in topological order so upstream keys exist first"""
+        keys: Dict[str, str] = {}
+        for node_id in self.order:
+            node = self.nodes[node_id]
+            upstream = [(target_handle, source_handle, keys[source]) for source, source_handle, target_handle in self.incoming[node_id]]
+            external = input_value(node, inputs) if node.type == 'customInput' else None
+            keys[node_id] = node_key(node.type, node.data or {}, upstream, external)
+        return keys
+
+    async def run(self, inputs: Optional[Dict[str, Any]] = None, on_event: Optional[EventHandler] = None) -> Dict[str, Any]:
+        """
+        Execute the pipeline and return outputs plus the latency report.
+
+        If `on_event` is given it is awaited with a `node_started` and a
+        `node_finished` event per node and a final `run_finished` event
+        carrying the full result. A slow handler delays the node that emitted
+        the event, which is how streaming consumers apply backpressure;
+        time spent in the handler is not counted in node durations.
+
+        Nodes served from the cache report status `completed` with
+        `cached: true` and no duration, and emit no `node_started`. With a
+        scheduler, durations exclude time spent waiting for a worker or a
+        concurrency cap, which is reported as `waited_ms`.
+        """
+        context = ExecutionContext(inputs or {}, self.llm, self.api)
+        keys = self.node_keys(context.inputs) if self.cache is not None else {}
+        cache_hits = cache_misses = 0
+        scheduler = self.scheduler
+        if scheduler is not None:
+            costs = {node_id: scheduler.estimate_ms(node.type, node.data or {}) for node_id, node in self.nodes.items()}
+            priorities = scheduler.priorities(self.order, self.successors, costs)
+        # Pool worker that computed each offloaded node, for locality
+        worker_of: Dict[str, int] = {}
+        offloaded = 0
+        pool_ms = waited_ms = 0.0
+        results: Dict[str, Dict[str, Any]] = {}
+        report: Dict[str, Dict[str, Any]] = {}
+        pending = {node_id: len(self.incoming[node_id]) for node_id in self.nodes}
+        started = time.perf_counter()
+
+        def elapsed_ms() -> float:
+            return (time.perf_counter() - started) * 1000
+
+        async def emit(event: str, **payload) -> None:
+            if on_event is not None:
+                await on_event({'event': event, **payload})
+
+        async def invoke(node_id: str, node, node_inputs: Dict[str, Any]) -> tuple:
+            """Run the node's runtime; returns (outputs, start ms, milliseconds waited)"""
+            nonlocal offloaded, pool_ms, waited_ms
+            runtime = NODE_RUNTIMES[node.type]
+            start_ms = elapsed_ms()
+            if scheduler is None:
+                return await runtime(node, node_inputs, context), start_ms, 0.0
+            offload = node.type in CPU_BOUND and (batch_length(node_inputs) or 0) >= scheduler.offload_rows
+            if offload:
+                func = lambda: run_sync(runtime(node, node_inputs, context))
+                worker = next((worker_of[source] for source, _, _ in self.incoming[node_id] if source in worker_of), None)
+            else:
+                func = lambda: runtime(node, node_inputs, context)
+                worker = None
+            outputs, ran_on, waited = await scheduler.run(node.type, priorities[node_id], func, offload, worker)
+            waited_ms += waited
+            if ran_on is not None:
+                worker_of[node_id] = ran_on
+                offloaded += 1
+                pool_ms += elapsed_ms() - start_ms - waited
+            return outputs, start_ms + waited, waited
+
+        async def run_node(node_id: str) -> None:
+            nonlocal cache_hits, cache_misses
+            node = self.nodes[node_id]
+            node_inputs = self.gather_inputs(node_id, results)
+            if node_inputs is None:
+                results[node_id] = {}
+                skipped_ms = elapsed_ms()
+                report[node_id] = {'status': 'skipped', 'started_ms': skipped_ms, 'finished_ms': skipped_ms, 'duration_ms': 0.0}
+                await emit('node_finished', node_id=node_id, type=node.type, **report[node_id])
+                return
+            key = keys.get(node_id)
+            memoize = MEMOIZE[node.type]
+            if key is not None and not CACHEABLE.get(node.type, bool)(node):
+                key = None
+            if key is not None and memoize is not False:
+                cached = self.cache.get(key)
+                if cached is not None:
+                    cache_hits += 1
+                    results[node_id] = cached
+                    cached_ms = elapsed_ms()
+                    report[node_id] = {'status': 'completed', 'outputs': cached, 'cached': True,
+                                       'started_ms': cached_ms, 'finished_ms': cached_ms, 'duration_ms': 0.0}
+                    await emit('node_finished', node_id=node_id, type=node.type, **report[node_id])
+                    return
+                cache_misses += 1
+            await emit('node_started', node_id=node_id, type=node.type, started_ms=elapsed_ms())
+            start_ms = elapsed_ms()
+            waited = 0.0
+            merged_failures: Dict[str, str] = {}
+            try:
+                results[node_id], start_ms, waited = await invoke(node_id, node, node_inputs)
+                status = {'status': 'completed', 'outputs': results[node_id]}
+                if key is not None and (memoize is True or (memoize and memoize(results[node_id]))):
+                    self.cache.put(key, results[node_id])
+            except PartialFailure as e:
+                # Not cached, so the failed nodes run again next time as they would unmerged
+                results[node_id] = e.outputs
+                merged_failures = dict(e.errors)
+                error = merged_failures.pop(node_id, None)
+                status = {'status': 'failed', 'error': error} if error else {'status': 'completed', 'outputs': e.outputs}
+            except Exception as e:
+                results[node_id] = {}
+                status = {'status': 'failed', 'error': f"{type(e).__name__}: {e}"}
+            finish_ms = elapsed_ms()
+            report[node_id] = {**status, 'started_ms': start_ms, 'finished_ms': finish_ms, 'duration_ms': finish_ms - start_ms}
+            if scheduler is not None:
+                report[node_id]['waited_ms'] = waited
+                if status['status'] == 'completed':
+                    scheduler.observe(node.type, report[node_id]['duration_ms'])
+            for merged_id, error in merged_failures.items():
+                # Their time is part of the node that ran them
+                report[merged_id] = {'status': 'failed', 'error': error, 'started_ms': finish_ms, 'finished_ms': finish_ms, 'duration_ms': 0.0}
+                await emit('node_finished', node_id=merged_id, type=self.drawn[merged_id], **report[merged_id])
+            await emit('node_finished', node_id=node_id, type=node.type, **report[node_id])
+
+        def start(ready: List[str]) -> None:
+            # Tasks reach their first await in creation order, so nodes that
+            # become ready together claim capped slots longest chain first
+            if scheduler is not None:
+                ready.sort(key=priorities.__getitem__, reverse=True)
+            for node_id in ready:
+                running[asyncio.ensure_future(run_node(node_id))] = node_id
+
+        running: Dict[asyncio.Future, str] = {}
+        start([node_id for node_id, count in pending.items() if count == 0])
+        try:
+            while running:
+                done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                ready = []
+                for task in done:
+                    node_id = running.pop(task)
+                    task.result()
+                    for successor in self.successors[node_id]:
+                        pending[successor] -= 1
+                        if pending[successor] == 0:
+                            ready.append(successor)
+                start(ready)
+        finally:
+            # Only non-empty if the run itself was cancelled or a handler raised
+            for task in running:
+                task.cancel()
+
+        total_ms = elapsed_ms()
+        node_time_ms = sum(entry['duration_ms'] for entry in report.values())
+        failed = sorted(node_id for node_id, entry in report.items() if entry['status'] == 'failed')
+        result = {
+            'status': 'failed' if failed else 'completed',
+            'outputs': context.outputs,
+            'nodes': {node_id: report[node_id] for node_id in self.drawn if node_id in report},
+            'timing': {
+                'total_ms': total_ms,
+                'node_time_ms': node_time_ms,
+                'critical_path_ms': self.critical_path_ms(report),
+                'parallelism': node_time_ms / total_ms if total_ms else 0.0,
+            },
+        }
+        if scheduler is not None:
+            workers = scheduler.pool.workers
+            result['timing']['scheduler'] = {
+                'workers': workers,
+                'offloaded': offloaded,
+                'waited_ms': waited_ms,
+                # Share of the pool's capacity over the run spent computing its nodes
+                'utilization': pool_ms / (workers * total_ms) if total_ms else 0.0,
+            }
+        if self.cache is not None:
+            result['cache'] = {'hits': cache_hits, 'misses': cache_misses}
+        if self.optimization is not None:
+            result['optimizer'] = self.optimization.summary()
+        await emit('run_finished', **result)
+        return result
+
+    def critical_path_ms(self, report: Dict[str, Dict[str, Any]]) -> float:
+        """Longest chain of measured node durations: the lower bound on total_ms for this run"""
+        finish: Dict[str, float] = {}
+        for node_id in self.order:
+            ready = max((finish[source] for source, _, _ in self.incoming[node_id]), default=0.0)
+            finish[node_id] = ready + report[node_id]['duration_ms']
+        return max(finish.values(), default=0.0)
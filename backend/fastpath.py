@@ -0,0 +1,130 @@
+"""
+Lean request decoding for large pipelines.
+
+Validation only reads node IDs/types, edge IDs, endpoints and handles, and
+the template of text nodes (its variables are the node's input handles).
+The lean path decodes the JSON body once (with orjson when it is installed)
+and copies just those fields into parallel lists, without building a
+Pydantic model per node and without looking at `position` or the rest of
+`data`. The Pydantic models in main.py remain the strict mode.
+"""
+
+import json
+from typing import Any, Iterator, List, Optional, Tuple
+
+from cache import topology_hash
+
+try:
+    import orjson
+    loads = orjson.loads
+except ImportError:  # pragma: no cover - orjson is optional
+    loads = json.loads
+
+
+class Topology:
+    """Column-wise topology of a pipeline: one list per field, no per-node objects"""
+
+    __slots__ = ('node_ids', 'node_types', 'templates', 'edge_ids', 'sources', 'targets', 'source_handles', 'target_handles')
+
+    def __init__(self):
+        self.node_ids: List[str] = []
+        self.node_types: List[str] = []
+        # data.text of text nodes, None for every other node
+        self.templates: List[Optional[str]] = []
+        self.edge_ids: List[str] = []
+        self.sources: List[str] = []
+        self.targets: List[str] = []
+        self.source_handles: List[Optional[str]] = []
+        self.target_handles: List[Optional[str]] = []
+
+    @classmethod
+    def from_pipeline(cls, pipeline) -> 'Topology':
+        """Topology of an already validated (strict mode) Pipeline"""
+        topology = cls()
+        topology.node_ids = [node.id for node in pipeline.nodes]
+        topology.node_types = [node.type for node in pipeline.nodes]
+        topology.templates = [_template(node.type, node.data) for node in pipeline.nodes]
+        topology.edge_ids = [edge.id for edge in pipeline.edges]
+        topology.sources = [edge.source for edge in pipeline.edges]
+        topology.targets = [edge.target for edge in pipeline.edges]
+        topology.source_handles = [edge.sourceHandle for edge in pipeline.edges]
+        topology.target_handles = [edge.targetHandle for edge in pipeline.edges]
+        return topology
+
+    @property
+    def num_nodes(self) -> int:
+        return len(self.node_ids)
+
+    @property
+    def num_edges(self) -> int:
+        return len(self.edge_ids)
+
+    def edge_pairs(self) -> Iterator[Tuple[str, str]]:
+        return zip(self.sources, self.targets)
+
+    def edge_triples(self) -> List[Tuple[str, str, str]]:
+        return list(zip(self.edge_ids, self.sources, self.targets))
+
+    def hash(self) -> str:
+        """Canonical topology hash, identical for strict and lean decoding"""
+        return topology_hash(
+            self.node_ids, self.node_types,
+            self.edge_ids, self.sources, self.targets, self.source_handles, self.target_handles,
+            self.templates,
+        )
+
+
+def _template(node_type: str, data: Any) -> Optional[str]:
+    if node_type != 'text' or not isinstance(data, dict):
+        return None
+    text = data.get('text')
+    return text if type(text) is str else None
+
+
+def _require_str(value: Any, what: str) -> str:
+    if type(value) is not str:
+        raise ValueError(f"{what} must be a string")
+    return value
+
+
+def _optional_str(value: Any, what: str) -> Optional[str]:
+    return None if value is None else _require_str(value, what)
+
+
+def decode_topology(payload: Any) -> Topology:
+    """
+    Pull the topology out of a decoded pipeline dict. Only the fields
+    validation reads are type-checked; everything else is left untouched.
+    Raises ValueError on a malformed payload.
+    """
+    if not isinstance(payload, dict):
+        raise ValueError('Pipeline must be a JSON object')
+    nodes = payload.get('nodes')
+    edges = payload.get('edges')
+    if not isinstance(nodes, list) or not isinstance(edges, list):
+        raise ValueError("Pipeline must have 'nodes' and 'edges' arrays")
+
+    topology = Topology()
+    node_ids = topology.node_ids
+    node_types = topology.node_types
+    templates = topology.templates
+    for i, node in enumerate(nodes):
+        try:
+            node_ids.append(_require_str(node['id'], f"nodes[{i}].id"))
+            node_type = _require_str(node['type'], f"nodes[{i}].type")
+        except (KeyError, TypeError):
+            raise ValueError(f"nodes[{i}] must be an object with 'id' and 'type'")
+        node_types.append(node_type)
+        templates.append(_template(node_type, node.get('data')))
+
+    for i, edge in enumerate(edges):
+        try:
+            topology.edge_ids.append(_require_str(edge['id'], f"edges[{i}].id"))
+            topology.sources.append(_require_str(edge['source'], f"edges[{i}].source"))
+            topology.targets.append(_require_str(edge['target'], f"edges[{i}].target"))
+            topology.source_handles.append(_optional_str(edge.get('sourceHandle'), f"edges[{i}].sourceHandle"))
+            topology.target_handles.append(_optional_str(edge.get('targetHandle'), f"edges[{i}].targetHandle"))
+        except (KeyError, TypeError, AttributeError):
+            raise ValueError(f"edges[{i}] must be an object with 'id', 'source' and 'target'")
+
+    return topology
@@ -0,0 +1,394 @@
+"""
+Graph analysis for VectorShift pipelines.
+
+Pipelines are loaded once into a CompactGraph: node IDs are interned to dense
+integers and edges are stored in CSR form, an `offsets` array of n + 1 row
+starts and a `targets` array holding each node's successors contiguously.
+That is a few bytes per edge instead of a Python list and int object per
+adjacency entry, and every analysis (cycle detection, topological order,
+execution levels, reachability) runs on the same arrays.
+
+Traversals are iterative and level-synchronous: each round expands the whole
+frontier at once. Wide frontiers are expanded with vectorized NumPy gathers;
+narrow ones (long chains) with a plain Python loop, where per-call NumPy
+overhead would dominate. Pipeline size is bounded by memory, not by Python's
+recursion limit.
+"""
+
+from itertools import chain, repeat
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Frontiers smaller than this are expanded in Python rather than with NumPy
+SMALL_FRONTIER = 32
+
+_EMPTY = np.zeros(0, dtype=np.int32)
+
+
+def index_nodes(node_ids: Iterable[str]) -> Dict[str, int]:
+    """Map each distinct node ID to a dense integer in first-seen order"""
+    index: Dict[str, int] = {}
+    for node_id in node_ids:
+        if node_id not in index:
+            index[node_id] = len(index)
+    return index
+
+
+class CompactGraph:
+    """
+    Immutable directed multigraph over interned node indices, in CSR form.
+
+    Successors of node u are `targets[offsets[u]:offsets[u + 1]]`, and
+    `edge_index` gives, for each of those slots, the position of the edge in
+    the list the graph was built from, so results can be mapped back to edge
+    IDs. Edges whose endpoints are not nodes are dropped.
+    """
+
+    __slots__ = ('ids', 'index', 'offsets', 'targets', 'edge_index', '_indegree')
+
+    def __init__(self, ids: List[str], index: Dict[str, int], offsets: np.ndarray, targets: np.ndarray, edge_index: np.ndarray):
+        self.ids = ids
+        self.index = index
+        self.offsets = offsets
+        self.targets = targets
+        self.edge_index = edge_index
+        self._indegree = None
+
+    @classmethod
+    def build(cls, node_ids: Iterable[str], sources: Sequence[str], targets: Sequence[str]) -> 'CompactGraph':
+        """Intern node IDs once and lay out the (sources[i], targets[i]) edges in CSR order"""
+        index = index_nodes(node_ids)
+        lookup = index.get
+        us = np.fromiter(map(lookup, sources, repeat(-1)), dtype=np.int32, count=len(sources))
+        vs = np.fromiter(map(lookup, targets, repeat(-1)), dtype=np.int32, count=len(targets))
+        return cls._from_endpoints(index, us, vs)
+
+    @classmethod
+    def from_pairs(cls, node_ids: Iterable[str], edges: Iterable[Tuple[str, str]]) -> 'CompactGraph':
+        """Build from (source, target) pairs without materializing per-column lists"""
+        index = index_nodes(node_ids)
+        flat = np.fromiter(map(index.get, chain.from_iterable(edges), repeat(-1)), dtype=np.int32)
+        return cls._from_endpoints(index, flat[0::2], flat[1::2])
+
+    @classmethod
+    def _from_endpoints(cls, index: Dict[str, int], us: np.ndarray, vs: np.ndarray) -> 'CompactGraph':
+        """CSR layout from interned endpoint arrays; -1 marks an unknown node"""
+        num_edges = len(us)
+        known = np.flatnonzero((us >= 0) & (vs >= 0)).astype(np.int32)
+        if known.size < num_edges:
+            us, vs = us[known], vs[known]
+
+        # Stable sort by source keeps each node's successors in edge order
+        slot_order = np.argsort(us, kind='stable')
+        offsets = np.zeros(len(index) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(us, minlength=len(index)), out=offsets[1:])
+        edge_index = known[slot_order] if known.size < num_edges else slot_order.astype(np.int32)
+        return cls(list(index), index, offsets, vs[slot_order], edge_index)
+
+    @property
+    def num_nodes(self) -> int:
+        return len(self.ids)
+
+    @property
+    def num_edges(self) -> int:
+        return len(self.targets)
+
+    @property
+    def indegree(self) -> np.ndarray:
+        if self._indegree is None:
+            self._indegree = np.bincount(self.targets, minlength=self.num_nodes)
+        return self._indegree
+
+    def sources(self) -> np.ndarray:
+        """Source node of every CSR slot, aligned with `targets`"""
+        return np.repeat(np.arange(self.num_nodes, dtype=np.int32), np.diff(self.offsets))
+
+    def successors(self, u: int) -> np.ndarray:
+        return self.targets[self.offsets[u]:self.offsets[u + 1]]
+
+    def transpose(self) -> 'CompactGraph':
+        """The same graph with every edge reversed (predecessor lists)"""
+        sources = self.sources()
+        slot_order = np.argsort(self.targets, kind='stable')
+        offsets = np.zeros(self.num_nodes + 1, dtype=np.int64)
+        np.cumsum(self.indegree, out=offsets[1:])
+        return CompactGraph(self.ids, self.index, offsets, sources[slot_order], self.edge_index[slot_order])
+
+    def expand(self, frontier: np.ndarray) -> np.ndarray:
+        """CSR slots of every out-edge of the frontier nodes"""
+        starts = self.offsets[frontier]
+        counts = self.offsets[frontier + 1] - starts
+        total = int(counts.sum())
+        if total == 0:
+            return _EMPTY
+        # Slot of the j-th out-edge of frontier[i] is starts[i] + j
+        base = np.repeat(starts - (np.cumsum(counts) - counts), counts)
+        return base + np.arange(total)
+
+    def topological_levels(self, reach: Optional[np.ndarray] = None) -> List[List[int]]:
+        """
+        Level-synchronous Kahn's algorithm. Level k holds the nodes whose
+        longest chain of predecessors has k edges, in index order; nodes
+        within a level have no dependencies on each other. Nodes on or
+        downstream of a cycle are never released, so for a cyclic graph the
+        levels cover fewer than `num_nodes` nodes.
+
+        `reach`, a boolean array over nodes, is propagated along every edge
+        the traversal releases, so on return it marks everything reachable
+        from the nodes initially set (for a DAG; see `reachable` otherwise).
+        """
+        remaining = self.indegree.copy()
+        frontier = np.flatnonzero(remaining == 0)
+        levels = []
+        # Memoryviews share the arrays' buffers but index to plain ints,
+        # far cheaper per element than NumPy scalar access
+        offsets_view, targets_view, remaining_view = map(memoryview, (self.offsets, self.targets, remaining))
+        reach_view = memoryview(reach) if reach is not None else None
+        while len(frontier):
+            if len(frontier) < SMALL_FRONTIER:
+                level = frontier if type(frontier) is list else frontier.tolist()
+                frontier = []
+                for u in level:
+                    successors = targets_view[offsets_view[u]:offsets_view[u + 1]]
+                    if reach_view is not None and reach_view[u]:
+                        for v in successors:
+                            reach_view[v] = True
+                    for v in successors:
+                        remaining_view[v] -= 1
+                        if remaining_view[v] == 0:
+                            frontier.append(v)
+                frontier.sort()
+            else:
+                level = np.asarray(frontier)
+                slots = self.expand(level)
+                released = self.targets[slots]
+                if reach is not None:
+                    counts = self.offsets[level + 1] - self.offsets[level]
+                    reach[released[np.repeat(reach[level], counts)]] = True
+                hit, counts = np.unique(released, return_counts=True)
+                remaining[hit] -= counts
+                frontier = hit[remaining[hit] == 0]
+                level = level.tolist()
+            levels.append(level)
+        return levels
+
+    def topological_order(self) -> List[int]:
+        """Node indices in topological order; shorter than num_nodes if there is a cycle"""
+        return [u for level in self.topological_levels() for u in level]
+
+    def is_acyclic(self) -> bool:
+        return sum(map(len, self.topological_levels())) == self.num_nodes
+
+    def find_cycles(self, placed: Sequence[int]) -> List[Tuple[List[int], List[int]]]:
+        """
+        Extract vertex-disjoint cycles from the nodes Kahn's algorithm could
+        not place (`placed` is its partial order). Every such node has an
+        unplaced predecessor, so walking predecessor links backwards from any
+        of them must eventually repeat a node.
+
+        Returns (node indices, edge positions) per cycle, both in forward edge
+        direction; edge positions index the edge list the graph was built from.
+        """
+        stuck = np.ones(self.num_nodes, dtype=bool)
+        stuck[placed] = False
+        sources = self.sources()
+        among_stuck = np.flatnonzero(stuck[sources] & stuck[self.targets])
+        # First edge (in CSR slot order) into each stuck node from another stuck node
+        into, first = np.unique(self.targets[among_stuck], return_index=True)
+        first_slot = among_stuck[first]
+        predecessor = dict(zip(into.tolist(), zip(sources[first_slot].tolist(), self.edge_index[first_slot].tolist())))
+
+        cycles = []
+        # Number of the walk that first reached each visited node
+        walk_of: Dict[int, int] = {}
+        for walk, start in enumerate(np.flatnonzero(stuck).tolist(), start=1):
+            if start in walk_of:
+                continue
+            path = []
+            x = start
+            while x not in walk_of:
+                walk_of[x] = walk
+                path.append(x)
+                x = predecessor[x][0]
+            if walk_of[x] != walk:
+                continue  # ran into a cycle found by an earlier walk
+
+            nodes = path[path.index(x):]
+            nodes.reverse()
+            edges = [predecessor[nodes[(i + 1) % len(nodes)]][1] for i in range(len(nodes))]
+            cycles.append((nodes, edges))
+
+        return cycles
+
+    def reachable(self, start: Iterable[int]) -> np.ndarray:
+        """Boolean mask of nodes reachable from `start` (the start nodes included)"""
+        seen = np.zeros(self.num_nodes, dtype=bool)
+        frontier = np.unique(np.fromiter(start, dtype=np.int32))
+        seen[frontier] = True
+        while frontier.size:
+            if frontier.size < SMALL_FRONTIER:
+                reached = np.concatenate([self.successors(u) for u in frontier.tolist()])
+            else:
+                reached = self.targets[self.expand(frontier)]
+            reached = np.unique(reached)
+            frontier = reached[~seen[reached]]
+            seen[frontier] = True
+        return seen
+
+    def strongly_connected_components(self) -> List[int]:
+        """
+        Component number per node (iterative Tarjan). Components are numbered
+        sinks first, so every edge between two components goes from a higher
+        number to a lower one.
+        """
+        n = self.num_nodes
+        offsets = self.offsets.tolist()
+        targets = self.targets.tolist()
+        order = [-1] * n
+        low = [0] * n
+        component = [-1] * n
+        on_stack = [False] * n
+        stack: List[int] = []
+        counter = components = 0
+        for root in range(n):
+            if order[root] != -1:
+                continue
+            order[root] = low[root] = counter
+            counter += 1
+            stack.append(root)
+            on_stack[root] = True
+            # (node, next CSR slot to visit) per level of the depth-first search
+            work = [(root, offsets[root])]
+            while work:
+                v, slot = work[-1]
+                if slot < offsets[v + 1]:
+                    work[-1] = (v, slot + 1)
+                    w = targets[slot]
+                    if order[w] == -1:
+                        order[w] = low[w] = counter
+                        counter += 1
+                        stack.append(w)
+                        on_stack[w] = True
+                        work.append((w, offsets[w]))
+                    elif on_stack[w] and order[w] < low[v]:
+                        low[v] = order[w]
+                    continue
+                work.pop()
+                if work and low[v] < low[work[-1][0]]:
+                    low[work[-1][0]] = low[v]
+                if low[v] == order[v]:
+                    while True:
+                        w = stack.pop()
+                        on_stack[w] = False
+                        component[w] = components
+                        if w == v:
+                            break
+                    components += 1
+        return component
+
+    def descendant_bitsets(self, max_pairs: Optional[int] = None, max_bytes: Optional[int] = None) -> Optional[List[int]]:
+        """
+        Transitive closure as one integer bitset per node: bit v of entry u
+        is set when v is reachable from u by a path of at least one edge,
+        except that u itself is always left out. Computed once per strongly
+        connected component, sinks first, so the whole closure costs one OR
+        of (at most n-bit) integers per edge.
+
+        With `max_pairs` or `max_bytes`, returns None as soon as the
+        components done so far hold more (node, descendant) pairs or bitset
+        bytes than that, so an oversized closure is given up on early rather
+        than built first.
+        """
+        component = self.strongly_connected_components()
+        num_components = max(component, default=-1) + 1
+        sizes = [0] * num_components
+        node_of = [0] * num_components
+        for u, c in enumerate(component):
+            sizes[c] += 1
+            node_of[c] = u
+        # Member bitsets of multi-node components; a single node is one bit,
+        # made when needed rather than kept as an n-bit integer per node
+        groups: Dict[int, int] = {}
+        for u, c in enumerate(component):
+            if sizes[c] > 1:
+                groups[c] = groups.get(c, 0) | 1 << u
+        sources = self.sources().tolist()
+        targets = self.targets.tolist()
+        out: List[List[int]] = [[] for _ in range(num_components)]
+        for u, v in zip(sources, targets):
+            if component[u] != component[v]:
+                out[component[u]].append(component[v])
+
+        bounded = max_pairs is not None or max_bytes is not None
+        pairs = nbytes = 0
+        # Nodes reachable from each component, which includes its members
+        # only when it has several (a self-loop reaches nothing new)
+        reach = [0] * num_components
+        for c in range(num_components):
+            bits = groups.get(c, 0)
+            for d in out[c]:
+                bits |= reach[d] | groups.get(d, 1 << node_of[d])
+            reach[c] = bits
+            if bounded:
+                pairs += sizes[c] * (bits.bit_count() - (sizes[c] > 1))
+                nbytes += sizes[c] * ((bits.bit_length() + 7) // 8)
+                if (max_pairs is not None and pairs > max_pairs) or (max_bytes is not None and nbytes > max_bytes):
+                    return None
+        return [reach[c] & ~(1 << u) if c in groups else reach[c] for u, c in enumerate(component)]
+
+
+def bitset_indices(bits: int, size: int) -> np.ndarray:
+    """Positions of the set bits of a bitset over `size` elements, ascending"""
+    if not bits:
+        return _EMPTY
+    packed = np.frombuffer(bits.to_bytes((size + 7) // 8, 'little'), np.uint8)
+    return np.flatnonzero(np.unpackbits(packed, bitorder='little')).astype(np.int32)
+
+
+def is_acyclic(node_ids: Iterable[str], edges: Iterable[Tuple[str, str]]) -> bool:
+    """
+    Check whether the given nodes and (source, target) edges form a DAG
+    in O(V + E) time without recursion.
+    """
+    return CompactGraph.from_pairs(node_ids, edges).is_acyclic()
+
+
+def analyze_graph(node_ids: Sequence[str], edges: Sequence[Tuple[str, str, str]]) -> Dict[str, Any]:
+    """
+    Full structural analysis in one O(V + E) traversal.
+
+    `edges` are (edge_id, source, target) triples. For a DAG the result holds
+    the topological order, the execution levels (nodes whose inputs are all
+    satisfied at the same depth, which can run in parallel) and the critical
+    path length in nodes. For a cyclic graph those are None and `cycles`
+    lists the node and edge IDs of one or more offending cycles.
+    """
+    graph = CompactGraph.build(node_ids, [s for _, s, _ in edges], [t for _, _, t in edges])
+    return describe_levels(graph, graph.topological_levels(), [edge_id for edge_id, _, _ in edges])
+
+
+def describe_levels(graph: CompactGraph, levels: List[List[int]], edge_ids: Sequence[str]) -> Dict[str, Any]:
+    """The analyze_graph result for levels already computed on `graph`"""
+    ids = graph.ids
+    if sum(map(len, levels)) < graph.num_nodes:
+        placed = [u for level in levels for u in level]
+        return {
+            'is_dag': False,
+            'topological_order': None,
+            'levels': None,
+            'critical_path_length': None,
+            'cycles': [
+                {'nodes': [ids[u] for u in nodes], 'edges': [edge_ids[i] for i in edge_positions]}
+                for nodes, edge_positions in graph.find_cycles(placed)
+            ],
+        }
+
+    named_levels = [[ids[u] for u in level] for level in levels]
+    return {
+        'is_dag': True,
+        'topological_order': [node_id for level in named_levels for node_id in level],
+        'levels': named_levels,
+        'critical_path_length': len(levels),
+        'cycles': [],
+    }
@@ -0,0 +1,231 @@
+"""
+Shared HTTP client for `api` nodes.
+
+PooledAPIClient implements executor.APIClient on top of one httpx.AsyncClient,
+so every api node in every run shares its connection pool and reuses
+keep-alive connections instead of opening a TCP/TLS connection per call. On
+top of the pool, per host:
+
+- concurrency limit: at most `max_per_host` requests in flight
+- token-bucket rate limit: `rate` requests per second with bursts of up to
+  `burst`; callers wait for a token rather than being rejected
+- retries with exponential backoff and full jitter, honouring Retry-After.
+  Connection failures and 429/503 responses are retried for every method,
+  other transport errors and 502/504 only for idempotent methods, so a POST
+  that may have reached the server is never sent twice
+- coalescing: identical idempotent requests (same method, URL, headers,
+  params and body) made while one is in flight share its response
+
+The response body is decoded as JSON when the server says it is JSON, text
+otherwise. Error statuses left after retrying raise httpx.HTTPStatusError,
+which the api node reports on its `error` handle.
+
+httpx clients, semaphores and in-flight maps belong to one event loop; the
+client keeps one set per loop so it also works across asyncio.run calls.
+"""
+
+import asyncio
+import os
+import random
+import time
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+import httpx
+
+from executor import APIClient
+from node_cache import canonical
+
+IDEMPOTENT_METHODS = frozenset({'GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE'})
+# Methods whose identical in-flight requests may share one response
+COALESCED_METHODS = frozenset({'GET', 'HEAD', 'OPTIONS'})
+RETRY_ALWAYS_STATUSES = frozenset({429, 503})
+RETRY_IDEMPOTENT_STATUSES = frozenset({502, 504})
+
+
+class TokenBucket:
+    """Allows `rate` acquisitions per second on average, `capacity` at once"""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity or max(rate, 1.0)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def reserve(self) -> float:
+        """Take a token and return how long to wait before using it"""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        self.tokens -= 1
+        return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    async def acquire(self) -> float:
+        wait = self.reserve()
+        if wait:
+            await asyncio.sleep(wait)
+        return wait
+
+
+class _LoopState:
+    """Per-event-loop client, host limits and in-flight requests"""
+
+    def __init__(self, client: httpx.AsyncClient):
+        self.client = client
+        self.semaphores: Dict[str, asyncio.Semaphore] = {}
+        self.buckets: Dict[str, TokenBucket] = {}
+        self.in_flight: Dict[Tuple, asyncio.Future] = {}
+
+
+class PooledAPIClient(APIClient):
+    """Pooled, rate-limited, retrying and coalescing client for api nodes"""
+
+    def __init__(
+        self,
+        max_connections: int = 100,
+        max_per_host: int = 10,
+        rate: Optional[float] = None,
+        burst: Optional[float] = None,
+        retries: int = 3,
+        backoff: float = 0.1,
+        max_backoff: float = 5.0,
+        timeout: float = 30.0,
+        keepalive_expiry: float = 30.0,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        self.max_connections = max_connections
+        self.max_per_host = max_per_host
+        self.rate = rate
+        self.burst = burst
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.timeout = timeout
+        self.keepalive_expiry = keepalive_expiry
+        self.transport = transport
+        self._states: Dict[asyncio.AbstractEventLoop, _LoopState] = {}
+        self.counters = {'requests': 0, 'attempts': 0, 'retries': 0, 'coalesced': 0, 'rate_limited': 0, 'errors': 0}
+
+    def _state(self) -> _LoopState:
+        loop = asyncio.get_running_loop()
+        state = self._states.get(loop)
+        if state is None:
+            # Drop the state of loops that have since closed
+            for closed in [other for other in self._states if other.is_closed()]:
+                del self._states[closed]
+            client = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections,
+                    keepalive_expiry=self.keepalive_expiry,
+                ),
+                timeout=self.timeout,
+                transport=self.transport,
+            )
+            state = self._states[loop] = _LoopState(client)
+        return state
+
+    async def request(self, method: str, url: str, headers: Dict[str, str], body: Any = None, params: Any = None) -> Any:
+        method = method.upper()
+        self.counters['requests'] += 1
+        if method not in COALESCED_METHODS:
+            return await self._send(method, url, headers, body, params)
+
+        state = self._state()
+        key = (method, url, canonical(headers), canonical(params), canonical(body))
+        shared = state.in_flight.get(key)
+        if shared is not None:
+            self.counters['coalesced'] += 1
+            return await asyncio.shield(shared)
+        future = asyncio.ensure_future(self._send(method, url, headers, body, params))
+        state.in_flight[key] = future
+        future.add_done_callback(lambda _: state.in_flight.pop(key, None))
+        return await asyncio.shield(future)
+
+    async def _send(self, method: str, url: str, headers: Dict[str, str], body: Any, params: Any) -> Any:
+        state = self._state()
+        host = urlsplit(url).netloc
+        semaphore = state.semaphores.get(host)
+        if semaphore is None:
+            semaphore = state.semaphores[host] = asyncio.Semaphore(self.max_per_host)
+        bucket = None
+        if self.rate:
+            bucket = state.buckets.get(host)
+            if bucket is None:
+                bucket = state.buckets[host] = TokenBucket(self.rate, self.burst)
+
+        content, json_body = (body, None) if isinstance(body, (str, bytes)) or body is None else (None, body)
+        for attempt in range(self.retries + 1):
+            if bucket is not None and await bucket.acquire():
+                self.counters['rate_limited'] += 1
+            retry_after = None
+            async with semaphore:
+                self.counters['attempts'] += 1
+                try:
+                    response = await state.client.request(
+                        method, url, headers=headers, params=params, content=content, json=json_body)
+                except httpx.TransportError as e:
+                    retryable = isinstance(e, (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)) \
+                        or method in IDEMPOTENT_METHODS
+                    if not retryable or attempt == self.retries:
+                        self.counters['errors'] += 1
+                        raise
+                else:
+                    retryable = response.status_code in RETRY_ALWAYS_STATUSES \
+                        or (response.status_code in RETRY_IDEMPOTENT_STATUSES and method in IDEMPOTENT_METHODS)
+                    if not retryable or attempt == self.retries:
+                        if response.is_error:
+                            self.counters['errors'] += 1
+                        response.raise_for_status()
+                        return decode(response)
+                    retry_after = parse_retry_after(response.headers.get('retry-after'))
+            self.counters['retries'] += 1
+            delay = random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+            await asyncio.sleep(min(retry_after, self.max_backoff) if retry_after is not None else delay)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self.counters,
+            'max_connections': self.max_connections,
+            'max_per_host': self.max_per_host,
+            'rate': self.rate,
+        }
+
+    async def aclose(self) -> None:
+        """Close the connection pool of the running loop"""
+        state = self._states.pop(asyncio.get_running_loop(), None)
+        if state is not None:
+            await state.client.aclose()
+
+
+def decode(response: httpx.Response) -> Any:
+    if 'json' in response.headers.get('content-type', ''):
+        return response.json()
+    return response.text
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Seconds from a Retry-After header; HTTP-date values are ignored"""
+    try:
+        return max(float(value), 0.0) if value is not None else None
+    except ValueError:
+        return None
+
+
+def api_client_from_env() -> Optional[PooledAPIClient]:
+    """
+    The pooled client configured by PIPELINE_HTTP_* environment variables,
+    or None (keep the offline stand-in) unless PIPELINE_HTTP_ENABLED is set
+    """
+    if os.environ.get('PIPELINE_HTTP_ENABLED', '').lower() not in ('1', 'true', 'yes'):
+        return None
+    rate = os.environ.get('PIPELINE_HTTP_RATE')
+    burst = os.environ.get('PIPELINE_HTTP_BURST')
+    return PooledAPIClient(
+        max_connections=int(os.environ.get('PIPELINE_HTTP_MAX_CONNECTIONS', 100)),
+        max_per_host=int(os.environ.get('PIPELINE_HTTP_MAX_PER_HOST', 10)),
+        rate=float(rate) if rate else None,
+        burst=float(burst) if burst else None,
+        retries=int(os.environ.get('PIPELINE_HTTP_RETRIES', 3)),
+        timeout=float(os.environ.get('PIPELINE_HTTP_TIMEOUT', 30)),
+    )
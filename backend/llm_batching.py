@@ -0,0 +1,140 @@
+"""
+Micro-batching of llm node calls across concurrent pipeline runs.
+
+BatchingLLMProvider is an executor.LLMProvider that does not call the model
+per node. Each `complete` call joins the open batch and waits. The batch is
+dispatched to a BatchLLMProvider in one call when it reaches
+`max_batch_size` prompts, or `max_wait_ms` after its first prompt arrived,
+whichever comes first. The results are then fanned back out to the waiting
+nodes. Share one instance between runs (main.py does) so nodes of different
+runs that reach an llm node at about the same time share a batch.
+
+`max_wait_ms` bounds the latency batching adds to a lone call; a full batch
+goes out immediately. If the provider fails, every call in the batch raises
+the provider's error, and a run cancelled while waiting simply drops out of
+the batch.
+"""
+
+import asyncio
+import os
+from typing import Dict, List, Optional, Tuple
+
+from executor import LLMProvider
+from metrics import llm_batch_size
+
+Prompt = Tuple[str, str]  # (prompt, system)
+
+
+class BatchLLMProvider:
+    """Interface for a model backend that completes many prompts per call"""
+
+    async def complete_batch(self, prompts: List[Prompt]) -> List[str]:
+        raise NotImplementedError
+
+
+class FakeBatchLLMProvider(BatchLLMProvider):
+    """
+    Local stand-in that echoes every prompt like EchoLLMProvider, after a
+    simulated per-batch `latency` plus `per_prompt` seconds per prompt. The
+    sizes of the batches it received are kept in `batches`.
+    """
+
+    def __init__(self, latency: float = 0.0, per_prompt: float = 0.0):
+        self.latency = latency
+        self.per_prompt = per_prompt
+        self.batches: List[int] = []
+
+    async def complete_batch(self, prompts: List[Prompt]) -> List[str]:
+        self.batches.append(len(prompts))
+        delay = self.latency + self.per_prompt * len(prompts)
+        if delay:
+            await asyncio.sleep(delay)
+        return [f"[echo] {prompt}" for prompt, _ in prompts]
+
+
+class _Batch:
+    """Prompts waiting to be dispatched together, and the timer that flushes them"""
+
+    def __init__(self):
+        self.items: List[Tuple[Prompt, asyncio.Future]] = []
+        self.timer: Optional[asyncio.TimerHandle] = None
+
+
+class BatchingLLMProvider(LLMProvider):
+    """Collects prompts into batches of up to `max_batch_size`, waiting at most `max_wait_ms`"""
+
+    def __init__(self, backend: BatchLLMProvider, max_batch_size: int = 16, max_wait_ms: float = 5.0):
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1")
+        self.backend = backend
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        # The open batch per event loop; futures cannot cross loops
+        self._open: Dict[asyncio.AbstractEventLoop, _Batch] = {}
+        self._dispatching = set()
+        self.requests = 0
+        self.batches = 0
+
+    async def complete(self, prompt: str, system: str = '') -> str:
+        loop = asyncio.get_running_loop()
+        batch = self._open.get(loop)
+        if batch is None:
+            batch = self._open[loop] = _Batch()
+            batch.timer = loop.call_later(self.max_wait_ms / 1000, self._flush, loop, batch)
+        future = loop.create_future()
+        batch.items.append(((prompt, system), future))
+        self.requests += 1
+        if len(batch.items) >= self.max_batch_size:
+            self._flush(loop, batch)
+        return await future
+
+    def _flush(self, loop: asyncio.AbstractEventLoop, batch: _Batch) -> None:
+        if self._open.get(loop) is batch:
+            del self._open[loop]
+        batch.timer.cancel()
+        task = loop.create_task(self._dispatch(batch.items))
+        self._dispatching.add(task)
+        task.add_done_callback(self._dispatching.discard)
+
+    async def _dispatch(self, items: List[Tuple[Prompt, asyncio.Future]]) -> None:
+        items = [(prompt, future) for prompt, future in items if not future.done()]
+        if not items:
+            return
+        self.batches += 1
+        llm_batch_size.observe(len(items))
+        try:
+            results = await self.backend.complete_batch([prompt for prompt, _ in items])
+            if len(results) != len(items):
+                raise ValueError(f"Provider returned {len(results)} results for {len(items)} prompts")
+        except Exception as e:
+            for _, future in items:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, future), result in zip(items, results):
+            if not future.done():
+                future.set_result(result)
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            'requests': self.requests,
+            'batches': self.batches,
+            'mean_batch_size': self.requests / self.batches if self.batches else 0.0,
+            'max_batch_size': self.max_batch_size,
+            'max_wait_ms': self.max_wait_ms,
+        }
+
+
+def llm_provider_from_env() -> Optional[BatchingLLMProvider]:
+    """
+    A batching provider over the fake backend, configured by PIPELINE_LLM_*
+    environment variables, or None (per-call stand-in) unless
+    PIPELINE_LLM_BATCHING is set
+    """
+    if os.environ.get('PIPELINE_LLM_BATCHING', '').lower() not in ('1', 'true', 'yes'):
+        return None
+    return BatchingLLMProvider(
+        FakeBatchLLMProvider(),
+        max_batch_size=int(os.environ.get('PIPELINE_LLM_MAX_BATCH_SIZE', 16)),
+        max_wait_ms=float(os.environ.get('PIPELINE_LLM_MAX_WAIT_MS', 5)),
+    )
@@ -1,10 +1,150 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-from typing import List, Dict, Any
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from pydantic import BaseModel, ValidationError
+from typing import List, Dict, Any, Literal, Tuple
+from contextlib import asynccontextmanager
+import hashlib
 import json
 
-app = FastAPI()
+from batch import BatchValidator, offload_min_bytes
+from cache import cache_from_env
+from columnar import to_python
+from executor import PipelineExecutor
+from fastpath import Topology, decode_topology, loads
+from http_client import api_client_from_env
+from llm_batching import llm_provider_from_env
+from metrics import (MetricsMiddleware, SlowRequestProfiler, collect_phases, observe_phases, phase, pipeline_edges,
+                     pipeline_nodes, profiler_from_env, registry)
+from node_cache import node_cache_from_env
+from optimizer import optimizer_from_env
+from pipeline_store import pipeline_store_from_env
+from reachability import IndexTooLarge, ReachabilityIndex, reachability_cache_from_env, structure_hash
+from scheduler import scheduler_from_env
+from sessions import IncrementalGraph, SessionStore
+from streaming import stream_chunked_run, stream_run
+from validation import validate_topology
+from wire import BodyTooLarge, UnsupportedFormat, body_format, decode_edge_list, decompress, encode_response, unpack
+
+# Validation results keyed by topology hash, see cache.py
+validation_cache = cache_from_env()
+
+# Node outputs of /pipelines/run keyed by Merkle hash, see node_cache.py
+node_cache = node_cache_from_env()
+
+# Shared pooled HTTP client for api nodes when PIPELINE_HTTP_ENABLED is set,
+# otherwise None (offline stand-in), see http_client.py
+api_client = api_client_from_env()
+
+# Micro-batching LLM provider shared by all runs when PIPELINE_LLM_BATCHING
+# is set, otherwise None (per-call stand-in), see llm_batching.py
+llm_provider = llm_provider_from_env()
+
+# Reachability indexes keyed by pipeline structure hash, see reachability.py
+reachability_cache = reachability_cache_from_env()
+
+# Saved pipelines, their versions and graph indexes, see pipeline_store.py
+pipeline_store = pipeline_store_from_env()
+
+# Worker pool, per-type concurrency caps and critical-path priorities for
+# /pipelines/run, see scheduler.py
+scheduler = scheduler_from_env()
+
+# Dead-node pruning, constant folding and chain fusion before runs, with
+# plans costed by the scheduler's estimates, see optimizer.py
+optimizer = optimizer_from_env(scheduler.estimate_ms)
+
+# Incremental editing sessions, see sessions.py
+sessions = SessionStore()
+
+# Worker pool for /pipelines/parse/batch and large /pipelines/parse bodies, see batch.py
+batch_validator = BatchValidator()
+
+# /pipelines/parse bodies at least this large are parsed on the pool (0: never), see batch.py
+parse_offload_min_bytes = offload_min_bytes()
+
+# cProfile dumps for slow /pipelines/parse requests, see metrics.py
+slow_request_profiler = profiler_from_env()
+
+def cache_metrics():
+    stats = validation_cache.stats()
+    return [
+        ('pipeline_cache_hits_total', 'counter', 'Validation cache hits', stats['hits']),
+        ('pipeline_cache_misses_total', 'counter', 'Validation cache misses', stats['misses']),
+        ('pipeline_cache_evictions_total', 'counter', 'Validation cache evictions', stats['evictions']),
+        ('pipeline_cache_entries', 'gauge', 'Entries in the validation cache', stats['entries']),
+        ('pipeline_cache_bytes', 'gauge', 'Approximate size of the validation cache', stats['bytes']),
+    ]
+
+def node_cache_metrics():
+    stats = node_cache.memory.stats()
+    return [
+        ('pipeline_node_cache_hits_total', 'counter', 'Node result cache hits (memory tier)', stats['hits']),
+        ('pipeline_node_cache_misses_total', 'counter', 'Node result cache misses (memory tier)', stats['misses']),
+        ('pipeline_node_cache_entries', 'gauge', 'Entries in the node result cache (memory tier)', stats['entries']),
+    ]
+
+def shared_cache_metrics():
+    stats = validation_cache.shared.stats()
+    return [
+        ('pipeline_shared_cache_hits_total', 'counter', 'Shared validation cache hits in this worker', stats['hits']),
+        ('pipeline_shared_cache_misses_total', 'counter', 'Shared validation cache misses in this worker', stats['misses']),
+        ('pipeline_shared_cache_entries', 'gauge', 'Entries in the shared validation cache', stats['entries'] or 0),
+    ]
+
+def reachability_cache_metrics():
+    stats = reachability_cache.stats()
+    return [
+        ('pipeline_reachability_cache_hits_total', 'counter', 'Reachability index cache hits', stats['hits']),
+        ('pipeline_reachability_cache_misses_total', 'counter', 'Reachability index cache misses', stats['misses']),
+        ('pipeline_reachability_cache_entries', 'gauge', 'Cached reachability indexes', stats['entries']),
+        ('pipeline_reachability_cache_bytes', 'gauge', 'Approximate size of the cached reachability indexes', stats['bytes']),
+    ]
+
+registry.add_collector(cache_metrics)
+registry.add_collector(node_cache_metrics)
+registry.add_collector(reachability_cache_metrics)
+if hasattr(validation_cache, 'shared'):
+    registry.add_collector(shared_cache_metrics)
+
+def api_client_metrics():
+    stats = api_client.stats()
+    return [
+        ('pipeline_api_requests_total', 'counter', 'api node requests', stats['requests']),
+        ('pipeline_api_attempts_total', 'counter', 'HTTP requests sent for api nodes, including retries', stats['attempts']),
+        ('pipeline_api_retries_total', 'counter', 'api node request retries', stats['retries']),
+        ('pipeline_api_coalesced_total', 'counter', 'api node requests served by an identical in-flight request', stats['coalesced']),
+        ('pipeline_api_rate_limited_total', 'counter', 'api node requests delayed by the rate limit', stats['rate_limited']),
+        ('pipeline_api_errors_total', 'counter', 'api node requests that failed after retries', stats['errors']),
+    ]
+
+if api_client is not None:
+    registry.add_collector(api_client_metrics)
+
+def scheduler_metrics():
+    stats = scheduler.stats()
+    pool = stats['pool']
+    return [
+        ('pipeline_scheduler_workers', 'gauge', 'Scheduler pool threads', pool['workers']),
+        ('pipeline_scheduler_tasks_total', 'counter', 'Nodes computed on the scheduler pool', pool['tasks']),
+        ('pipeline_scheduler_steals_total', 'counter', 'Pool tasks run by a worker other than the one they were queued on', pool['steals']),
+        ('pipeline_scheduler_busy_seconds_total', 'counter', 'Time scheduler pool threads spent computing nodes', pool['busy_seconds']),
+        ('pipeline_scheduler_queued', 'gauge', 'Nodes waiting for a scheduler pool thread', pool['queued']),
+    ]
+
+registry.add_collector(scheduler_metrics)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    batch_validator.shutdown()
+    scheduler.shutdown()
+    if api_client is not None:
+        await api_client.aclose()
+
+app = FastAPI(lifespan=lifespan)
 
 # Add CORS middleware to allow frontend requests
 app.add_middleware(
@@ -15,6 +155,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Request latency and error counts per route for /metrics
+app.add_middleware(MetricsMiddleware)
+
 class Node(BaseModel):
     id: str
     type: str
@@ -32,67 +175,509 @@ class Pipeline(BaseModel):
     nodes: List[Node]
     edges: List[Edge]
 
+# /pipelines/parse reads its body itself (see parse_body); document it as a Pipeline
+# in JSON or MessagePack, or as the binary edge list of wire.py
+PIPELINE_REQUEST_BODY = {
+    'requestBody': {
+        'required': True,
+        'content': {
+            'application/json': {'schema': {'$ref': '#/components/schemas/Pipeline'}},
+            'application/msgpack': {'schema': {'$ref': '#/components/schemas/Pipeline'}},
+            'application/vnd.pipeline.edgelist': {'schema': {'type': 'string', 'format': 'binary'}},
+        }
+    }
+}
+
+class StoredPipeline(Pipeline):
+    name: str = ''
+
+class PipelineRun(Pipeline):
+    inputs: Dict[str, Any] = {}
+    # False runs every node, ignoring and not filling the node cache
+    cache: bool = True
+    # False runs the pipeline exactly as drawn, with a report for every node
+    optimize: bool = True
+
+class PipelineDelta(BaseModel):
+    add_nodes: List[Node] = []
+    remove_nodes: List[str] = []
+    add_edges: List[Edge] = []
+    remove_edges: List[str] = []
+
 @app.get('/')
 def read_root():
     return {'Ping': 'Pong'}
 
-def is_dag(nodes: List[Node], edges: List[Edge]) -> bool:
-    """
-    Check if the graph formed by nodes and edges is a Directed Acyclic Graph (DAG)
-    using DFS-based cycle detection.
-    """
-    # Build adjacency list
-    graph = {}
-    node_ids = {node.id for node in nodes}
-    
-    # Initialize graph with all nodes
-    for node in nodes:
-        graph[node.id] = []
-    
-    # Add edges to graph
-    for edge in edges:
-        if edge.source in node_ids and edge.target in node_ids:
-            graph[edge.source].append(edge.target)
-    
-    # DFS-based cycle detection
-    # 0: unvisited, 1: visiting (in current path), 2: visited (completed)
-    color = {node_id: 0 for node_id in node_ids}
-    
-    def has_cycle_dfs(node_id: str) -> bool:
-        if color[node_id] == 1:  # Back edge found - cycle detected
-            return True
-        if color[node_id] == 2:  # Already processed
-            return False
-        
-        color[node_id] = 1  # Mark as visiting
-        
-        # Check all neighbors
-        for neighbor in graph[node_id]:
-            if has_cycle_dfs(neighbor):
-                return True
-        
-        color[node_id] = 2  # Mark as completed
-        return False
-    
-    # Check for cycles starting from each unvisited node
-    for node_id in node_ids:
-        if color[node_id] == 0:
-            if has_cycle_dfs(node_id):
-                return False
-    
-    return True
-
-@app.post('/pipelines/parse')
-def parse_pipeline(pipeline: Pipeline):
+def pipeline_hash(pipeline: Pipeline) -> str:
+    """Canonical topology hash of a pipeline, ignoring positions and node data"""
+    return Topology.from_pipeline(pipeline).hash()
+
+def analyze_topology(topology: Topology, detailed: bool = False) -> Dict[str, Any]:
+    """Build the /pipelines/parse response from a pipeline's topology"""
+    return {
+        'num_nodes': topology.num_nodes,
+        'num_edges': topology.num_edges,
+        **validate_topology(topology, detailed)
+    }
+
+def decode_pipeline(payload: Any, mode: str = 'strict') -> Topology:
+    """
+    Turn a decoded JSON body into a topology. Strict mode validates the full
+    Pipeline schema; lean mode only checks the fields validation reads.
+    Schema errors raise RequestValidationError (422) in both modes.
+    """
+    if mode == 'lean':
+        try:
+            return decode_topology(payload)
+        except ValueError as e:
+            raise RequestValidationError([{'type': 'value_error', 'loc': ('body',), 'msg': str(e), 'input': None}])
     try:
-        num_nodes = len(pipeline.nodes)
-        num_edges = len(pipeline.edges)
-        is_dag_result = is_dag(pipeline.nodes, pipeline.edges)
-        
-        return {
-            'num_nodes': num_nodes,
-            'num_edges': num_edges,
-            'is_dag': is_dag_result
-        }
+        return Topology.from_pipeline(Pipeline.model_validate(payload))
+    except ValidationError as e:
+        raise RequestValidationError([{**error, 'loc': ('body', *error['loc'])} for error in e.errors(include_url=False)])
+
+def read_topology(body: bytes, mode: str = 'strict', content_type: str = '', content_encoding: str = '') -> Topology:
+    """Decompress, decode and validate a request body in any of the formats of wire.py"""
+    try:
+        if content_encoding:
+            with phase('decompress'):
+                body = decompress(body, content_encoding)
+    except UnsupportedFormat as e:
+        raise HTTPException(status_code=415, detail=str(e))
+    except BodyTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    body_kind = body_format(content_type)
+    if body_kind == 'edgelist':
+        # Topology only, so strict and lean decoding are the same
+        try:
+            with phase('decode'):
+                topology = decode_edge_list(body)
+        except ValueError as e:
+            raise RequestValidationError([{'type': 'value_error', 'loc': ('body',), 'msg': str(e), 'input': None}])
+    else:
+        try:
+            with phase('decode'):
+                payload = unpack(body) if body_kind == 'msgpack' else loads(body)
+        except UnsupportedFormat as e:
+            raise HTTPException(status_code=415, detail=str(e))
+        except ValueError as e:
+            message = 'MessagePack decode error' if body_kind == 'msgpack' else 'JSON decode error'
+            raise RequestValidationError([{'type': 'json_invalid', 'loc': ('body',), 'msg': message, 'input': {}, 'ctx': {'error': str(e)}}])
+        with phase('validate'):
+            topology = decode_pipeline(payload, mode)
+    pipeline_nodes.observe(topology.num_nodes)
+    pipeline_edges.observe(topology.num_edges)
+    return topology
+
+def parse_body(body: bytes, detailed: bool = False, mode: str = 'strict', content_type: str = '', content_encoding: str = '') -> Dict[str, Any]:
+    """Decode and analyze a /pipelines/parse request body"""
+    return parse_body_keyed(body, detailed, mode, content_type, content_encoding)[1]
+
+def parse_body_keyed(body: bytes, detailed: bool = False, mode: str = 'strict', content_type: str = '',
+                     content_encoding: str = '') -> Tuple[Tuple[str, bool], Dict[str, Any]]:
+    """parse_body, also returning the validation cache key of the result"""
+    topology = read_topology(body, mode, content_type, content_encoding)
+    try:
+        key = (topology.hash(), detailed)
+        result = validation_cache.get(key)
+        if result is None:
+            result = analyze_topology(topology, detailed)
+            validation_cache.put(key, result)
+        return key, result
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Error parsing pipeline: {str(e)}")
+
+def body_key(body: bytes, detailed: bool = False, mode: str = 'strict', content_type: str = '', content_encoding: str = ''):
+    """Validation cache key of a raw request body, for results looked up before the body is decoded"""
+    return ('body', hashlib.blake2b(body, digest_size=16).hexdigest(), detailed, mode, content_type, content_encoding)
+
+@app.post('/pipelines/parse', openapi_extra=PIPELINE_REQUEST_BODY)
+async def parse_pipeline(request: Request, detailed: bool = False, mode: Literal['strict', 'lean'] = 'strict'):
+    """
+    Count nodes and edges, check the pipeline is a DAG and validate its
+    structure: `is_valid` is false when `issues` holds any error (dangling
+    edges, duplicate IDs, unknown handles or node types, cycles). Nodes not
+    reachable from an input are reported as warnings.
+
+    With `?detailed=true` the same traversal also returns the topological
+    order, parallel execution levels, critical path length and, for cyclic
+    pipelines, the node/edge IDs of the offending cycles.
+
+    `?mode=lean` skips building the Pydantic models: the body is decoded once
+    and only node IDs/types and edge IDs, endpoints and handles are read and
+    type-checked. The default strict mode validates the full Pipeline schema.
+
+    Results are cached by topology hash, so resubmitting an unchanged
+    pipeline (or one where only node positions moved) skips the traversal.
+    Large bodies are parsed on the worker process pool.
+
+    The body may be gzip, deflate or zstd compressed (`Content-Encoding`) and
+    JSON, MessagePack (`application/msgpack`) or a topology-only binary edge
+    list (`application/vnd.pipeline.edgelist`, see wire.py). The response is
+    MessagePack when `Accept` asks for it and is compressed per
+    `Accept-Encoding`.
+    """
+    body = await request.body()
+    headers = request.headers
+    args = (body, detailed, mode, headers.get('content-type', ''), headers.get('content-encoding', ''))
+    if parse_offload_min_bytes and len(body) >= parse_offload_min_bytes:
+        result = await parse_on_pool(*args)
+    else:
+        result = await run_in_threadpool(slow_request_profiler.call, 'pipelines_parse', parse_body, *args)
+    return await run_in_threadpool(encode_response, result, headers.get('accept', ''), headers.get('accept-encoding', ''))
+
+async def parse_on_pool(*args) -> Dict[str, Any]:
+    """
+    parse_body for a large body, on the worker pool. This process's
+    validation cache is checked first by body hash, and the result is stored
+    under both the body hash and the topology hash, so resubmissions and
+    smaller requests for the same pipeline hit here. The worker profiles the
+    parse and sends its phase timings back to be recorded here.
+    """
+    raw_key = await run_in_threadpool(body_key, *args)
+    result = validation_cache.get(raw_key)
+    if result is not None:
+        return result
+    key, result, phases, error = await batch_validator.run(parse_offloaded, slow_request_profiler, *args)
+    observe_phases(phases)
+    if error is not None:
+        raise HTTPException(status_code=error[0], detail=error[1])
+    pipeline_nodes.observe(result['num_nodes'])
+    pipeline_edges.observe(result['num_edges'])
+    validation_cache.put(key, result)
+    validation_cache.put(raw_key, result)
+    return result
+
+def parse_offloaded(profiler: SlowRequestProfiler, body: bytes, detailed: bool = False, mode: str = 'strict',
+                    content_type: str = '', content_encoding: str = ''):
+    """
+    parse_body in a pool worker process, under the serving process's
+    slow-request profiler, returning (cache key, result, phase timings, None). HTTPException does
+    not survive pickling, so it comes back as (None, None, phases, (status, detail)).
+    """
+    with collect_phases() as phases:
+        try:
+            key, result = profiler.call(
+                'pipelines_parse', parse_body_keyed, body, detailed, mode, content_type, content_encoding)
+            return key, result, phases, None
+        except HTTPException as e:
+            return None, None, phases, (e.status_code, e.detail)
+
+def validate_payload(payload: Any, detailed: bool = False, mode: str = 'strict') -> Dict[str, Any]:
+    """Validate one raw batch item (one JSON document, see split_batch_body); runs in batch worker processes"""
+    if isinstance(payload, (str, bytes)):
+        payload = loads(payload)
+    return analyze_topology(decode_pipeline(payload, mode), detailed)
+
+@app.post('/pipelines/parse/batch')
+async def parse_pipeline_batch(request: Request, detailed: bool = False, mode: Literal['strict', 'lean'] = 'strict'):
+    """
+    Validate many pipelines in one request. The body is a JSON array of
+    pipelines (or `{"pipelines": [...]}`), or NDJSON with one pipeline per
+    line when sent as `application/x-ndjson`. Pipelines are validated in
+    parallel on a process pool and returned in request order; an invalid
+    pipeline gets an `error` entry instead of failing the batch. `detailed`
+    and `mode` work as for /pipelines/parse.
+    """
+    try:
+        items = await batch_validator.split(await request.body(), request.headers.get('content-type', ''))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Error parsing batch: {str(e)}")
+
+    results = await batch_validator.validate(validate_payload, items, detailed, mode)
+    return {
+        'num_pipelines': len(results),
+        'num_errors': sum('error' in result for result in results),
+        'results': results
+    }
+
+def build_reachability(body: bytes, mode: str, content_type: str, content_encoding: str) -> Dict[str, Any]:
+    topology = read_topology(body, mode, content_type, content_encoding)
+    graph_id = structure_hash(topology)
+    index = reachability_cache.get(graph_id)
+    cached = index is not None
+    if not cached:
+        try:
+            with phase('reachability'):
+                index = ReachabilityIndex(topology, max_bytes=reachability_cache.max_bytes)
+        except IndexTooLarge as e:
+            raise HTTPException(status_code=413, detail=f"{e}; raise PIPELINE_REACHABILITY_CACHE_MAX_BYTES to index it")
+        if not reachability_cache.put(graph_id, index):
+            raise HTTPException(status_code=507, detail=f"The reachability index ({index.nbytes} bytes) does not fit the cache")
+    return {**index.summary(), 'cached': cached}
+
+@app.post('/pipelines/reachability', openapi_extra=PIPELINE_REQUEST_BODY)
+async def create_reachability_index(request: Request, mode: Literal['strict', 'lean'] = 'strict'):
+    """
+    Build (or find) the reachability index of a pipeline and return its
+    `graph_id` for the queries below. The body is anything /pipelines/parse
+    accepts. The index depends only on node IDs and types and edge
+    endpoints, so it survives edits to node settings; once it is evicted,
+    queries answer 404 and the pipeline must be posted again.
+    """
+    return await run_in_threadpool(
+        build_reachability, await request.body(), mode,
+        request.headers.get('content-type', ''), request.headers.get('content-encoding', '')
+    )
+
+def get_reachability_index(graph_id: str) -> ReachabilityIndex:
+    index = reachability_cache.get(graph_id)
+    if index is None:
+        raise HTTPException(status_code=404, detail=f"No reachability index for graph '{graph_id}'; POST the pipeline to /pipelines/reachability")
+    return index
+
+def unknown_node(e: KeyError):
+    return HTTPException(status_code=404, detail=f"Node '{e.args[0]}' is not in the pipeline")
+
+@app.get('/pipelines/reachability/{graph_id}')
+def read_reachability_index(graph_id: str):
+    return get_reachability_index(graph_id).summary()
+
+@app.get('/pipelines/reachability/{graph_id}/reaches')
+def read_reaches(graph_id: str, source: str, target: str):
+    """Whether a path leads from `source` to `target`"""
+    try:
+        return {'source': source, 'target': target, 'reachable': get_reachability_index(graph_id).reaches(source, target)}
+    except KeyError as e:
+        raise unknown_node(e)
+
+@app.get('/pipelines/reachability/{graph_id}/would_create_cycle')
+def read_would_create_cycle(graph_id: str, source: str, target: str):
+    """
+    Whether adding the edge `source` -> `target` would create a cycle, with
+    the existing path from `target` back to `source` that it would close.
+    Nodes not in the indexed pipeline are allowed (they have no edges yet).
+    """
+    cycle = get_reachability_index(graph_id).would_create_cycle(source, target)
+    return {'source': source, 'target': target, 'creates_cycle': cycle is not None, 'cycle': cycle or []}
+
+@app.get('/pipelines/reachability/{graph_id}/nodes/{node_id}')
+def read_reachability_node(graph_id: str, node_id: str):
+    """Every ancestor and descendant of one node"""
+    try:
+        return get_reachability_index(graph_id).node(node_id)
+    except KeyError as e:
+        raise unknown_node(e)
+
+@app.get('/pipelines/reachability/{graph_id}/impact')
+def read_impact(graph_id: str, node: List[str] = Query(...)):
+    """Nodes and outputs affected by editing the given nodes (`?node=a&node=b`): the nodes and everything downstream"""
+    try:
+        return get_reachability_index(graph_id).impact(node)
+    except KeyError as e:
+        raise unknown_node(e)
+
+@app.get('/metrics', response_class=PlainTextResponse)
+def read_metrics():
+    """Request, graph size, phase timing and cache metrics in Prometheus text format"""
+    return PlainTextResponse(registry.render(), media_type='text/plain; version=0.0.4; charset=utf-8')
+
+@app.get('/pipelines/cache')
+def cache_stats():
+    return validation_cache.stats()
+
+@app.delete('/pipelines/cache')
+def clear_cache():
+    validation_cache.clear()
+    return validation_cache.stats()
+
+@app.get('/pipelines/run/cache')
+def node_cache_stats():
+    return node_cache.stats()
+
+@app.delete('/pipelines/run/cache')
+def clear_node_cache():
+    node_cache.clear()
+    return node_cache.stats()
+
+@app.get('/pipelines/run/scheduler')
+def scheduler_stats():
+    """Pool utilization and steals, per-type cap usage and the current duration estimates"""
+    return scheduler.stats()
+
+def get_stored(read, *args):
+    """Call a pipeline_store reader, mapping unknown pipelines, versions and nodes to 404"""
+    try:
+        return read(*args)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=f"Stored pipeline not found: {e.args[0]}")
+
+def save_pipeline(pipeline: StoredPipeline, pipeline_id: str = None):
+    body = pipeline.model_dump(exclude={'name'})
+    return get_stored(pipeline_store.save, Topology.from_pipeline(pipeline), body, pipeline.name, pipeline_id)
+
+@app.post('/pipelines/store')
+def create_stored_pipeline(pipeline: StoredPipeline):
+    """
+    Save a pipeline as version 1 of a new stored pipeline. Its node types,
+    transitive closure and validation result are indexed for
+    /pipelines/store/search (see pipeline_store.py).
+    """
+    return save_pipeline(pipeline)
+
+@app.get('/pipelines/store')
+def list_stored_pipelines():
+    return {'pipelines': pipeline_store.list()}
+
+@app.get('/pipelines/store/stats')
+def stored_pipeline_stats():
+    return pipeline_store.stats()
+
+@app.get('/pipelines/store/search')
+def search_stored_pipelines(
+    type: str,
+    downstream_of: str = None,
+    downstream_of_type: str = None,
+    upstream_of: str = None,
+    upstream_of_type: str = None,
+):
+    """
+    Stored pipelines (latest versions) with a node of `type`, optionally only
+    counting nodes downstream or upstream of a node ID or of any node of a
+    type, e.g. `?type=api&downstream_of_type=customInput`. Answered from the
+    indexes without loading any pipeline.
+    """
+    return {'pipelines': pipeline_store.search(type, downstream_of, downstream_of_type, upstream_of, upstream_of_type)}
+
+@app.put('/pipelines/store/{pipeline_id}')
+def update_stored_pipeline(pipeline_id: str, pipeline: StoredPipeline):
+    """Save a new version of a stored pipeline; earlier versions are kept"""
+    return save_pipeline(pipeline, pipeline_id)
+
+@app.get('/pipelines/store/{pipeline_id}')
+def read_stored_pipeline(pipeline_id: str, version: int = Query(None, ge=1)):
+    """A stored version (the latest by default) with its validation result"""
+    return get_stored(pipeline_store.get, pipeline_id, version)
+
+@app.get('/pipelines/store/{pipeline_id}/versions')
+def list_stored_versions(pipeline_id: str):
+    return {'pipeline_id': pipeline_id, 'versions': get_stored(pipeline_store.versions, pipeline_id)}
+
+@app.get('/pipelines/store/{pipeline_id}/nodes/{node_id}')
+def read_stored_node(pipeline_id: str, node_id: str, version: int = Query(None, ge=1)):
+    """Every node upstream and downstream of one node of a stored version"""
+    return get_stored(pipeline_store.closure, pipeline_id, node_id, version)
+
+@app.delete('/pipelines/store/{pipeline_id}')
+def delete_stored_pipeline(pipeline_id: str):
+    get_stored(pipeline_store.delete, pipeline_id)
+    return {'pipeline_id': pipeline_id, 'deleted': True}
+
+def get_session(session_id: str):
+    try:
+        return sessions.get(session_id)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Session '{session_id}' does not exist")
+
+@app.post('/pipelines/sessions')
+def create_session(pipeline: Pipeline):
+    """
+    Start an incremental validation session from a full pipeline. Later
+    edits are sent as deltas to PATCH /pipelines/sessions/{session_id}.
+    """
+    try:
+        graph = IncrementalGraph.from_pipeline(
+            (node.id for node in pipeline.nodes),
+            ((edge.id, edge.source, edge.target) for edge in pipeline.edges)
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Error creating session: {str(e)}")
+    return {'session_id': sessions.create(graph), **graph.summary()}
+
+@app.get('/pipelines/sessions/{session_id}')
+def read_session(session_id: str):
+    graph, lock = get_session(session_id)
+    with lock:
+        return {'session_id': session_id, **graph.summary()}
+
+@app.patch('/pipelines/sessions/{session_id}')
+def update_session(session_id: str, delta: PipelineDelta):
+    """Apply node/edge additions and removals and return the updated DAG status"""
+    graph, lock = get_session(session_id)
+    with lock:
+        try:
+            graph.apply_delta(
+                add_nodes=[node.id for node in delta.add_nodes],
+                remove_nodes=delta.remove_nodes,
+                add_edges=[(edge.id, edge.source, edge.target) for edge in delta.add_edges],
+                remove_edges=delta.remove_edges
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=f"Error applying delta: {str(e)}")
+        return {'session_id': session_id, **graph.summary()}
+
+@app.delete('/pipelines/sessions/{session_id}')
+def delete_session(session_id: str):
+    try:
+        sessions.delete(session_id)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Session '{session_id}' does not exist")
+    return {'session_id': session_id, 'deleted': True}
+
+def build_executor(pipeline: Pipeline, cache: bool = True, optimize: bool = True) -> PipelineExecutor:
+    """Refuse structurally invalid pipelines before any node runs"""
+    report = validate_topology(Topology.from_pipeline(pipeline))
+    errors = [item['message'] for item in report['issues'] if item['severity'] == 'error']
+    try:
+        if errors:
+            raise ValueError('; '.join(errors))
+        return PipelineExecutor(pipeline.nodes, pipeline.edges, llm=llm_provider, api=api_client, cache=node_cache if cache else None,
+                                scheduler=scheduler, optimizer=optimizer if optimize else None)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Error running pipeline: {str(e)}")
+
+@app.post('/pipelines/optimize')
+def optimize_pipeline(pipeline: Pipeline):
+    """
+    What the optimizer does to a pipeline before running it: the pruned,
+    folded and fused nodes, and the plan before and after with estimated
+    milliseconds per node, in total and along the critical path. Nothing
+    runs.
+    """
+    return build_executor(pipeline).optimization.report()
+
+@app.post('/pipelines/run')
+async def run_pipeline(run: PipelineRun):
+    """
+    Execute a pipeline with the given inputs (keyed by input name) and return
+    its outputs with a per-node latency breakdown. Independent branches run
+    concurrently; LLM and API nodes use the offline stand-ins in executor.py.
+    Nodes whose inputs and settings are unchanged since an earlier run are
+    served from the node cache unless `cache` is false. Unless `optimize` is
+    false, the pipeline first goes through the optimizer (see
+    /pipelines/optimize), and the report covers the rewritten nodes.
+    """
+    executor = build_executor(run, run.cache, run.optimize)
+    return to_python(await executor.run(run.inputs))
+
+@app.post('/pipelines/run/stream')
+def stream_pipeline(run: PipelineRun):
+    """
+    Execute a pipeline and stream Server-Sent Events as it runs: node_started
+    and node_finished (with outputs) per node, then run_finished with the same
+    body /pipelines/run returns.
+    """
+    executor = build_executor(run, run.cache, run.optimize)
+    return StreamingResponse(
+        stream_run(executor, run.inputs),
+        media_type='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+@app.post('/pipelines/run/chunked')
+def stream_chunked_pipeline(run: PipelineRun, chunk_size: int = Query(1024, ge=1, le=1_000_000)):
+    """
+    Execute a pipeline in chunked streaming mode (see dataflow.py): list
+    inputs flow through the graph `chunk_size` rows at a time, and every
+    output chunk is sent as an `output_chunk` Server-Sent Event as soon as it
+    is produced, followed by run_finished with per-node row counts.
+    """
+    executor = build_executor(run, run.cache, run.optimize)
+    return StreamingResponse(
+        stream_chunked_run(executor, run.inputs, chunk_size),
+        media_type='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
@@ -0,0 +1,326 @@
+"""
+Request metrics and hot-path instrumentation.
+
+A small Prometheus registry, rendered in the text exposition format by
+GET /metrics: request latency by route, pipeline size histograms, error
+counts, and the time each /pipelines/parse request spends in every phase:
+
+- decode: JSON body to Python objects
+- validate: schema checks (Pydantic in strict mode, field extraction in lean)
+- build: interning node IDs and laying out the CSR graph
+- check: duplicate ID, dangling edge and handle checks
+- traverse: Kahn's traversal with reachability, and cycle extraction
+
+Metrics live in the process that records them; batch items validated in the
+worker pool are not included. Large /pipelines/parse bodies parsed on the
+pool collect their phase timings there (collect_phases) and the endpoint
+records them in the serving process.
+
+Slow requests can be profiled: with PIPELINE_PROFILE_SLOW_MS set, profiled
+calls run under cProfile and those slower than the threshold are written to
+PIPELINE_PROFILE_DIR as a .prof file (for pstats or snakeviz) plus a .txt
+summary sorted by cumulative time.
+"""
+
+import cProfile
+import io
+import os
+import pstats
+import re
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+SIZE_BUCKETS = (10, 100, 1_000, 10_000, 100_000, 1_000_000)
+
+# Lines of the pstats summary written next to each .prof dump
+PROFILE_REPORT_LINES = 40
+
+
+def _format_labels(labelnames: Sequence[str], values: Sequence[str], extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonic counter, one series per label combination"""
+
+    kind = 'counter'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(tuple(str(labels[name]) for name in self.labelnames), 0)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}_total{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in items]
+
+
+class Histogram:
+    """Cumulative-bucket histogram, one series per label combination"""
+
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, buckets: Sequence[float], labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per series: per-bucket counts (last one is +Inf), sum, count
+        self._series: Dict[Tuple[str, ...], Tuple[List[int], List[float]]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        index = len(self.buckets)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                index = i
+                break
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = ([0] * (len(self.buckets) + 1), [0.0, 0])
+            series[0][index] += 1
+            series[1][0] += value
+            series[1][1] += 1
+
+    def count(self, **labels: str) -> int:
+        series = self._series.get(tuple(str(labels[name]) for name in self.labelnames))
+        return series[1][1] if series else 0
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = sorted((key, (list(counts), list(totals))) for key, (counts, totals) in self._series.items())
+        lines = []
+        for key, (counts, (total, count)) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                le = _format_labels(self.labelnames, key, f'le="{_format_value(bound)}"')
+                lines.append(f"{self.name}_bucket{le} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """Named metrics plus callbacks sampled at scrape time (e.g. cache counters)"""
+
+    def __init__(self):
+        self._metrics: Dict[str, Any] = {}
+        self._collectors: List[Callable[[], List[Tuple[str, str, str, float]]]] = []
+
+    def register(self, metric):
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, buckets: Sequence[float], labelnames: Sequence[str] = ()) -> Histogram:
+        return self.register(Histogram(name, documentation, buckets, labelnames))
+
+    def add_collector(self, collector: Callable[[], List[Tuple[str, str, str, float]]]) -> None:
+        """`collector` returns (name, type, help, value) tuples of unlabelled samples"""
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format (version 0.0.4)"""
+        lines = []
+        for metric in self._metrics.values():
+            exposed = f"{metric.name}_total" if metric.kind == 'counter' else metric.name
+            lines.append(f"# HELP {exposed} {metric.documentation}")
+            lines.append(f"# TYPE {exposed} {metric.kind}")
+            lines.extend(metric.samples())
+        for collector in self._collectors:
+            for name, kind, documentation, value in collector():
+                lines.append(f"# HELP {name} {documentation}")
+                lines.append(f"# TYPE {name} {kind}")
+                lines.append(f"{name} {_format_value(value)}")
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+
+request_latency = registry.histogram(
+    'pipeline_http_request_duration_seconds', 'Time to response start, by route',
+    LATENCY_BUCKETS, ('method', 'route', 'status'))
+request_errors = registry.counter(
+    'pipeline_http_request_errors', 'Responses with status >= 400, by route', ('method', 'route', 'status'))
+pipeline_nodes = registry.histogram(
+    'pipeline_graph_nodes', 'Nodes per pipeline validated by /pipelines/parse', SIZE_BUCKETS)
+pipeline_edges = registry.histogram(
+    'pipeline_graph_edges', 'Edges per pipeline validated by /pipelines/parse', SIZE_BUCKETS)
+phase_latency = registry.histogram(
+    'pipeline_phase_duration_seconds', 'Time spent per /pipelines/parse phase', LATENCY_BUCKETS, ('phase',))
+llm_batch_size = registry.histogram(
+    'pipeline_llm_batch_size', 'Prompts per batch sent to the LLM provider', (1, 2, 4, 8, 16, 32, 64, 128))
+profiles_dumped = registry.counter(
+    'pipeline_slow_request_profiles', 'cProfile reports written for slow requests')
+
+
+# Per thread: the list collect_phases is filling, if any
+_collecting = threading.local()
+
+
+@contextmanager
+def phase(name: str) -> Iterator[None]:
+    """Time a block as one hot-path phase"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - start
+        phase_latency.observe(seconds, phase=name)
+        collected = getattr(_collecting, 'phases', None)
+        if collected is not None:
+            collected.append((name, seconds))
+
+
+@contextmanager
+def collect_phases() -> Iterator[List[Tuple[str, float]]]:
+    """
+    Also list the (phase, seconds) timed on this thread inside the block,
+    so a worker process can send them back to be recorded with observe_phases
+    """
+    outer = getattr(_collecting, 'phases', None)
+    _collecting.phases = collected = []
+    try:
+        yield collected
+    finally:
+        _collecting.phases = outer
+
+
+def observe_phases(phases: Sequence[Tuple[str, float]]) -> None:
+    for name, seconds in phases:
+        phase_latency.observe(seconds, phase=name)
+
+
+ROUTE_UNMATCHED = 'unmatched'
+
+
+def route_of(scope: Dict[str, Any]) -> str:
+    """Route template of a handled request, so paths with IDs share a series"""
+    route = scope.get('route')
+    return getattr(route, 'path', ROUTE_UNMATCHED)
+
+
+def observe_request(method: str, route: str, status: int, seconds: float) -> None:
+    request_latency.observe(seconds, method=method, route=route, status=status)
+    if status >= 400:
+        request_errors.inc(method=method, route=route, status=status)
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording latency and errors per route. Latency is
+    measured to the start of the response, so streamed responses (SSE) count
+    their time to first byte rather than their whole lifetime.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        started = False
+
+        async def send_with_metrics(message):
+            nonlocal started
+            if message['type'] == 'http.response.start' and not started:
+                started = True
+                observe_request(scope['method'], route_of(scope), message['status'], time.perf_counter() - start)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_metrics)
+        except Exception:
+            if not started:
+                observe_request(scope['method'], route_of(scope), 500, time.perf_counter() - start)
+            raise
+
+
+class SlowRequestProfiler:
+    """
+    Runs calls under cProfile and keeps the reports of those slower than
+    `threshold_ms`. Disabled (calls run unprofiled) when threshold_ms is None.
+    cProfile only sees the calling thread, so profile the function doing the
+    work (e.g. inside the threadpool), not the async endpoint around it.
+    """
+
+    def __init__(self, threshold_ms: Optional[float] = None, directory: Optional[str] = None):
+        self.threshold_ms = threshold_ms
+        self.directory = directory or os.path.join(tempfile.gettempdir(), 'pipeline-profiles')
+
+    @property
+    def enabled(self) -> bool:
+        return self.threshold_ms is not None
+
+    def call(self, label: str, func: Callable, *args, **kwargs):
+        if not self.enabled:
+            return func(*args, **kwargs)
+        profiler = cProfile.Profile()
+        start = time.perf_counter()
+        try:
+            return profiler.runcall(func, *args, **kwargs)
+        finally:
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            if elapsed_ms >= self.threshold_ms:
+                self.dump(profiler, label, elapsed_ms)
+
+    def dump(self, profiler: cProfile.Profile, label: str, elapsed_ms: float) -> str:
+        """Write `<time>-<label>-<ms>ms.prof` and a matching .txt summary; returns the .prof path"""
+        os.makedirs(self.directory, exist_ok=True)
+        stamp = time.strftime('%Y%m%dT%H%M%S') + f"{time.time() % 1:.6f}"[1:]
+        base = os.path.join(self.directory, f"{stamp}-{re.sub(r'[^A-Za-z0-9_.-]+', '_', label)}-{elapsed_ms:.0f}ms")
+        stats = pstats.Stats(profiler)
+        stats.dump_stats(base + '.prof')
+        report = io.StringIO()
+        pstats.Stats(profiler, stream=report).sort_stats('cumulative').print_stats(PROFILE_REPORT_LINES)
+        with open(base + '.txt', 'w') as f:
+            f.write(f"{label}: {elapsed_ms:.1f} ms\n")
+            f.write(report.getvalue())
+        profiles_dumped.inc()
+        return base + '.prof'
+
+
+def profiler_from_env() -> SlowRequestProfiler:
+    """Build the slow-request profiler from PIPELINE_PROFILE_* environment variables"""
+    threshold = os.environ.get('PIPELINE_PROFILE_SLOW_MS')
+    return SlowRequestProfiler(
+        threshold_ms=float(threshold) if threshold else None,
+        directory=os.environ.get('PIPELINE_PROFILE_DIR'),
+    )
@@ -0,0 +1,180 @@
+"""
+Node-level result cache for pipeline runs.
+
+Every node gets a Merkle-style key: a hash of its type and `data` plus, for
+each incoming edge, the handles and the key of the upstream node (and, for
+customInput nodes, the run input they read). A node's key therefore changes
+exactly when something upstream of it, or the node itself, changes. When
+only a downstream text template is edited, every node above it keeps its key
+and is served from the cache; only the edited node and its descendants run.
+
+Results live in a bounded in-memory LRU (cache.ResultCache) and, optionally,
+in a directory on disk that survives restarts. A disk hit is promoted into
+memory. Only JSON-serializable outputs are kept; NumPy columns from batch
+runs are stored as lists, as the disk tier would return them.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from cache import ResultCache, dumps
+from columnar import json_default, to_python
+from fastpath import loads
+
+# NumPy values (e.g. folded constants bound into fused nodes) are encoded in
+# full: str() would abbreviate long arrays and let different columns collide
+try:
+    import orjson
+
+    def canonical(value: Any) -> bytes:
+        return orjson.dumps(value, option=orjson.OPT_SORT_KEYS | orjson.OPT_SERIALIZE_NUMPY, default=json_default)
+except ImportError:  # pragma: no cover - orjson is optional
+    def canonical(value: Any) -> bytes:
+        return json.dumps(value, sort_keys=True, separators=(',', ':'), default=json_default).encode()
+
+
+def node_key(node_type: str, data: Dict[str, Any], upstream: Iterable[Tuple[Optional[str], Optional[str], str]], external: Any = None) -> str:
+    """
+    Merkle key of one node. `upstream` holds (target handle, source handle,
+    upstream key) per incoming edge; their order does not matter. `external`
+    is any value read from outside the graph, such as a run input.
+    """
+    material = [node_type, data, sorted(upstream, key=lambda item: tuple(str(part) for part in item)), external]
+    return hashlib.blake2b(canonical(material), digest_size=16).hexdigest()
+
+
+class DiskTier:
+    """
+    One JSON file per key under `directory`, sharded by key prefix. Writes go
+    through a temporary file and a rename, so readers never see partial
+    entries. When more than `max_entries` files exist the oldest tenth is
+    removed.
+    """
+
+    def __init__(self, directory: str, max_entries: int = 100_000):
+        self.directory = directory
+        self.max_entries = max_entries
+        self._writes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.json")
+
+    def get(self, key: str) -> Optional[Any]:
+        try:
+            with open(self._path(key), 'rb') as f:
+                value = loads(f.read())
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return value
+
+    def put(self, key: str, payload: bytes) -> None:
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(payload)
+            os.replace(temp_path, path)
+        except OSError:
+            if os.path.exists(temp_path):
+                os.unlink(temp_path)
+            return
+        with self._lock:
+            self._writes += 1
+            check = self._writes % max(self.max_entries // 10, 1) == 0
+        if check:
+            self.evict()
+
+    def files(self):
+        for shard in os.scandir(self.directory) if os.path.isdir(self.directory) else ():
+            if shard.is_dir():
+                for entry in os.scandir(shard.path):
+                    if entry.name.endswith('.json'):
+                        yield entry
+
+    def evict(self) -> None:
+        """Drop the least recently written tenth of the entries when over max_entries"""
+        entries = list(self.files())
+        if len(entries) <= self.max_entries:
+            return
+        entries.sort(key=lambda entry: entry.stat().st_mtime)
+        for entry in entries[:len(entries) - self.max_entries + self.max_entries // 10]:
+            try:
+                os.unlink(entry.path)
+            except OSError:
+                pass
+
+    def clear(self) -> None:
+        for entry in list(self.files()):
+            try:
+                os.unlink(entry.path)
+            except OSError:
+                pass
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'directory': self.directory,
+            'entries': sum(1 for _ in self.files()),
+            'max_entries': self.max_entries,
+            'hits': self.hits,
+            'misses': self.misses,
+        }
+
+
+class NodeResultCache:
+    """Two-tier (memory, then optional disk) store of node outputs by Merkle key"""
+
+    def __init__(self, memory: Optional[ResultCache] = None, disk: Optional[DiskTier] = None):
+        self.memory = memory or ResultCache()
+        self.disk = disk
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        value = self.memory.get(key)
+        if value is None and self.disk is not None:
+            value = self.disk.get(key)
+            if value is not None:
+                self.memory.put(key, value)
+        return value
+
+    def put(self, key: str, outputs: Dict[str, Any]) -> None:
+        outputs = to_python(outputs)
+        try:
+            payload = dumps(outputs)
+        except (TypeError, ValueError):
+            return  # not JSON-serializable
+        self.memory.put(key, outputs)
+        if self.disk is not None:
+            self.disk.put(key, payload)
+
+    def clear(self) -> None:
+        self.memory.clear()
+        if self.disk is not None:
+            self.disk.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'memory': self.memory.stats(),
+            'disk': self.disk.stats() if self.disk is not None else None,
+        }
+
+
+def node_cache_from_env() -> NodeResultCache:
+    """Build the run cache from PIPELINE_NODE_CACHE_* environment variables"""
+    directory = os.environ.get('PIPELINE_NODE_CACHE_DIR')
+    return NodeResultCache(
+        memory=ResultCache(
+            max_entries=int(os.environ.get('PIPELINE_NODE_CACHE_MAX_ENTRIES', 4096)),
+            max_bytes=int(os.environ.get('PIPELINE_NODE_CACHE_MAX_BYTES', 64 * 2**20)),
+            ttl=float(os.environ.get('PIPELINE_NODE_CACHE_TTL', 3600)),
+        ),
+        disk=DiskTier(directory, int(os.environ.get('PIPELINE_NODE_CACHE_DISK_MAX_ENTRIES', 100_000))) if directory else None,
+    )
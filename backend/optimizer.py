@@ -0,0 +1,389 @@
+"""
+Compile-time rewrites of a pipeline between validation and execution.
+
+The pipelines people draw carry work that never needs to run per request:
+branches whose results reach no output, text nodes without variables, and
+long chains of small math/filter/transform steps that each cost a task, a
+report entry and a buffered output. Optimizer.optimize rewrites a validated,
+acyclic pipeline into an equivalent one with fewer nodes:
+
+- prune: nodes that cannot reach a customOutput are dropped, except api
+  nodes with a side-effecting method (anything but GET, HEAD and OPTIONS)
+  and what feeds them. Pipelines without outputs are left whole, since their
+  node reports are all a run returns.
+- fold: math, filter, transform and text nodes fed only by constants (a
+  text node without variables, a math node without inputs, or nodes folded
+  before them) are evaluated once here and become `constant` nodes holding
+  their outputs. A node whose evaluation fails is left to fail at run time.
+- fuse: a chain of math, filter, transform and text nodes, each of whose
+  outputs go only to the next one, becomes one `fused` node that runs the
+  steps back to back in a single task. Intermediate outputs never reach the
+  run's results; consecutive math steps over a column update one array in
+  place. Constant inputs of the later steps are bound into the steps, and
+  constant nodes left without consumers are dropped. A step that fails is
+  reported under its own ID and the steps after it go on without its
+  outputs, as they would unfused.
+
+Surviving nodes keep their IDs: a constant keeps the ID of the node it
+replaces and a fused node takes the ID of the last node of its chain, so the
+edges leaving it, node reports and output names are unchanged. The run
+result's `optimizer` summary lists where the other nodes went.
+
+Optimization.report() is the before/after plan served by /pipelines/optimize:
+per-node estimated durations (the scheduler's per-type estimates) plus a
+fixed scheduling cost per node, totalled and along the critical path.
+"""
+
+import os
+from collections import deque
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from columnar import math_kernel, to_python
+from executor import (NODE_RUNTIMES, ExecutionContext, PartialFailure, field, handle_name, is_safe_request, node_runtime,
+                      run_sync)
+from scheduler import DEFAULT_COST_MS, FALLBACK_COST_MS
+
+PASSES = ('prune', 'fold', 'fuse')
+
+# Runtimes that only compute on their inputs, so they may run early, once or together
+PURE_TYPES = frozenset({'math', 'filter', 'transform', 'text'})
+
+# Executor overhead per scheduled node (task, events, report), measured on
+# a 2000-node chain of scalar transforms
+SCHEDULING_MS = 0.04
+
+
+class PlanNode:
+    """A node of a rewritten pipeline; fused nodes also carry their compiled steps"""
+
+    __slots__ = ('id', 'type', 'data', 'steps')
+
+    def __init__(self, node_id: str, node_type: str, data: Dict[str, Any], steps: Optional[List['Step']] = None):
+        self.id = node_id
+        self.type = node_type
+        self.data = data
+        self.steps = steps
+
+
+class PlanEdge:
+    __slots__ = ('id', 'source', 'sourceHandle', 'target', 'targetHandle')
+
+    def __init__(self, edge_id: str, source: str, source_handle: Optional[str], target: str, target_handle: Optional[str]):
+        self.id = edge_id
+        self.source = source
+        self.sourceHandle = source_handle
+        self.target = target
+        self.targetHandle = target_handle
+
+
+class Step:
+    """
+    One node of a fused chain. `inputs` are the (source handle, target
+    handle) pairs carrying the previous step's outputs in, `bound` the
+    constant inputs; the first step gets the fused node's inputs instead.
+    """
+
+    __slots__ = ('id', 'type', 'data', 'inputs', 'bound')
+
+    def __init__(self, node, inputs: List[Tuple[Optional[str], str]], bound: Dict[str, Any]):
+        self.id = node.id
+        self.type = node.type
+        self.data = node.data
+        self.inputs = inputs
+        self.bound = bound
+
+    def describe(self) -> Dict[str, Any]:
+        # Plain values, so the fused node's data stays JSON for plans and cache keys
+        return {'id': self.id, 'type': self.type, 'data': self.data, 'inputs': self.inputs, 'bound': to_python(self.bound)}
+
+
+@node_runtime('constant', memoize=False, batched=True, cpu_bound=True)
+async def run_constant(node, inputs, context):
+    return dict(node.data['outputs'])
+
+
+@node_runtime('fused', batched=True, cpu_bound=True)
+async def run_fused(node, inputs, context):
+    outputs: Dict[str, Any] = {}
+    # A column this node computed and nothing else references, so the next
+    # math step may write its result over it
+    owned = None
+    errors: Dict[str, str] = {}
+    for index, step in enumerate(node.steps):
+        if index == 0:
+            step_inputs = inputs
+        else:
+            step_inputs = dict(step.bound)
+            for source_handle, target_handle in step.inputs:
+                if source_handle is None and len(outputs) == 1:
+                    source_handle = next(iter(outputs))
+                if source_handle in outputs:
+                    step_inputs[target_handle] = outputs[source_handle]
+            if not step_inputs:
+                # Skipped, as PipelineExecutor skips a node whose inputs all came up empty
+                outputs, owned = {}, None
+                continue
+        try:
+            if step.type == 'math' and _writable(owned) and any(value is owned for value in step_inputs.values()):
+                kernel = math_kernel(field(step, 'operation', 'add'))
+                outputs = {'result': kernel(step_inputs.get('a', 0), step_inputs.get('b', 0), out=owned)}
+            else:
+                outputs = await NODE_RUNTIMES[step.type](step, step_inputs, context)
+        except Exception as e:
+            # Failed as PipelineExecutor fails a node: no outputs, and the
+            # steps after it run on their constants alone or are skipped
+            errors[step.id] = f"{type(e).__name__}: {e}"
+            outputs, owned = {}, None
+            continue
+        owned = outputs.get('result') if step.type == 'math' else None
+    if errors:
+        raise PartialFailure(outputs, errors)
+    return outputs
+
+
+def _writable(value: Any) -> bool:
+    return isinstance(value, np.ndarray) and value.dtype == np.float64 and value.ndim == 1
+
+
+def input_handles(edge) -> Tuple[Optional[str], str]:
+    """(source handle, target handle) of an edge, named as PipelineExecutor names them"""
+    return handle_name(edge.source, edge.sourceHandle), handle_name(edge.target, edge.targetHandle) or edge.source
+
+
+def gather(edges: Iterable, outputs: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+    """Inputs delivered by `edges` from the given node outputs, as PipelineExecutor.gather_inputs collects them"""
+    inputs: Dict[str, Any] = {}
+    for edge in edges:
+        source_handle, target_handle = input_handles(edge)
+        produced = outputs[edge.source]
+        if source_handle is None and len(produced) == 1:
+            source_handle = next(iter(produced))
+        if source_handle in produced:
+            inputs[target_handle] = produced[source_handle]
+    return inputs
+
+
+class Optimization:
+    """A pipeline before and after the optimizer's rewrites"""
+
+    def __init__(self, optimizer: 'Optimizer', nodes: List[Any], edges: List[Any], order: List[str]):
+        self.optimizer = optimizer
+        self.original = (nodes, edges, order)
+        self.nodes = nodes
+        self.edges = edges
+        # Removing nodes and merging a chain into its last node keep this a topological order
+        self.order = order
+        self.pruned: List[str] = []
+        self.folded: List[str] = []
+        self.fused: Dict[str, List[str]] = {}
+
+    def summary(self) -> Dict[str, Any]:
+        return {'pruned': self.pruned, 'folded': self.folded, 'fused': self.fused}
+
+    def report(self) -> Dict[str, Any]:
+        before = self.optimizer.plan(*self.original)
+        after = self.optimizer.plan(self.nodes, self.edges, self.order)
+        return {
+            **self.summary(),
+            'before': before,
+            'after': after,
+            'estimated_saving_ms': before['estimated_ms'] - after['estimated_ms'],
+        }
+
+
+class Optimizer:
+    """
+    Applies the enabled `passes` (prune, fold, fuse) to pipelines.
+    `estimate(node_type, data)` gives a node's expected milliseconds for
+    plans, e.g. Scheduler.estimate_ms.
+    """
+
+    def __init__(self, passes: Iterable[str] = PASSES, estimate: Optional[Callable[[str, Dict[str, Any]], float]] = None):
+        self.passes = tuple(passes)
+        unknown = sorted(set(self.passes) - set(PASSES))
+        if unknown:
+            raise ValueError(f"Unknown optimizer passes: {', '.join(unknown)}")
+        self.estimate = estimate or (lambda node_type, data: DEFAULT_COST_MS.get(node_type, FALLBACK_COST_MS))
+
+    def optimize(self, nodes: List[Any], edges: List[Any], order: List[str]) -> Optimization:
+        """
+        Rewrite an acyclic pipeline whose topological order is `order`.
+        Edges to missing nodes are dropped, as PipelineExecutor ignores them.
+        """
+        present = {node.id for node in nodes}
+        edges = [edge for edge in edges if edge.source in present and edge.target in present]
+        optimization = Optimization(self, nodes, edges, order)
+        if 'prune' in self.passes:
+            self.prune(optimization)
+        if 'fold' in self.passes:
+            self.fold(optimization)
+        if 'fuse' in self.passes:
+            self.fuse(optimization)
+        return optimization
+
+    def prune(self, optimization: Optimization) -> None:
+        nodes = {node.id: node for node in optimization.nodes}
+        roots = [node_id for node_id, node in nodes.items() if node.type == 'customOutput']
+        if not roots:
+            return
+        roots += [node_id for node_id, node in nodes.items()
+                  if node.type == 'api' and not is_safe_request(node)]
+        predecessors: Dict[str, List[str]] = {node_id: [] for node_id in nodes}
+        for edge in optimization.edges:
+            predecessors[edge.target].append(edge.source)
+        live = set(roots)
+        queue = deque(roots)
+        while queue:
+            for source in predecessors[queue.popleft()]:
+                if source not in live:
+                    live.add(source)
+                    queue.append(source)
+        optimization.pruned = [node_id for node_id in optimization.order if node_id not in live]
+        self._keep(optimization, live)
+
+    def fold(self, optimization: Optimization) -> None:
+        nodes = {node.id: node for node in optimization.nodes}
+        incoming = _incoming(optimization)
+        constants: Dict[str, Dict[str, Any]] = {}
+        context = ExecutionContext({}, None, None)
+        for node_id in optimization.order:
+            node = nodes[node_id]
+            if node.type not in PURE_TYPES or any(edge.source not in constants for edge in incoming[node_id]):
+                continue
+            inputs = gather(incoming[node_id], constants)
+            if incoming[node_id] and not inputs:
+                outputs = {}
+            else:
+                try:
+                    outputs = run_sync(NODE_RUNTIMES[node.type](node, inputs, context))
+                except Exception:
+                    continue
+            constants[node_id] = outputs
+            optimization.folded.append(node_id)
+        if not constants:
+            return
+        optimization.nodes = [
+            PlanNode(node.id, 'constant', {'outputs': constants[node.id]}) if node.id in constants else node
+            for node in optimization.nodes
+        ]
+        # A constant needs no inputs any more
+        optimization.edges = [edge for edge in optimization.edges if edge.target not in constants]
+
+    def fuse(self, optimization: Optimization) -> None:
+        nodes = {node.id: node for node in optimization.nodes}
+        incoming = _incoming(optimization)
+        outgoing: Dict[str, List[Any]] = {node_id: [] for node_id in nodes}
+        for edge in optimization.edges:
+            outgoing[edge.source].append(edge)
+
+        # Chains keyed by their last node, grown in topological order
+        chains: Dict[str, List[str]] = {}
+        for node_id in optimization.order:
+            if nodes[node_id].type not in PURE_TYPES:
+                continue
+            fed_by = {edge.source for edge in incoming[node_id] if nodes[edge.source].type != 'constant'}
+            if len(fed_by) != 1:
+                continue
+            previous = fed_by.pop()
+            if nodes[previous].type not in PURE_TYPES or any(edge.target != node_id for edge in outgoing[previous]):
+                continue
+            chained = {input_handles(edge)[1] for edge in incoming[node_id] if edge.source == previous}
+            bound = {input_handles(edge)[1] for edge in incoming[node_id] if edge.source != previous}
+            if chained & bound:
+                continue
+            chains[node_id] = chains.pop(previous, [previous]) + [node_id]
+        if not chains:
+            return
+
+        constants = {node_id: node.data['outputs'] for node_id, node in nodes.items() if node.type == 'constant'}
+        replaced: Dict[str, PlanNode] = {}
+        # IDs of the edges inside chains, and the constants some of them bound
+        removed = set()
+        bound_sources = set()
+        for last, chain in chains.items():
+            steps = [Step(nodes[chain[0]], [], {})]
+            for previous, node_id in zip(chain, chain[1:]):
+                edges = incoming[node_id]
+                steps.append(Step(
+                    nodes[node_id],
+                    [input_handles(edge) for edge in edges if edge.source == previous],
+                    gather([edge for edge in edges if edge.source != previous], constants),
+                ))
+                removed.update(id(edge) for edge in edges)
+                bound_sources.update(edge.source for edge in edges if edge.source != previous)
+            replaced[last] = PlanNode(last, 'fused', {'steps': [step.describe() for step in steps]}, steps)
+            optimization.fused[last] = chain
+
+        heads = {chain[0]: last for last, chain in chains.items()}
+        absorbed = {node_id for chain in chains.values() for node_id in chain[:-1]}
+        edges = []
+        for edge in optimization.edges:
+            if id(edge) in removed:
+                continue
+            if edge.target in heads:
+                # The fused node takes its first step's inputs; handle names
+                # lose the old node ID prefix, which no longer matches
+                edge = PlanEdge(edge.id, edge.source, edge.sourceHandle, heads[edge.target], input_handles(edge)[1] if edge.targetHandle else None)
+            edges.append(edge)
+        optimization.edges = edges
+        optimization.nodes = [replaced.get(node.id, node) for node in optimization.nodes if node.id not in absorbed]
+        optimization.order = [node_id for node_id in optimization.order if node_id not in absorbed]
+
+        # Constants whose every consumer now binds them
+        feeding = {edge.source for edge in edges}
+        orphaned = {node_id for node_id in constants if node_id not in feeding and node_id in bound_sources}
+        if orphaned:
+            self._keep(optimization, {node.id for node in optimization.nodes} - orphaned)
+
+    def _keep(self, optimization: Optimization, kept: set) -> None:
+        optimization.nodes = [node for node in optimization.nodes if node.id in kept]
+        optimization.edges = [edge for edge in optimization.edges if edge.source in kept and edge.target in kept]
+        optimization.order = [node_id for node_id in optimization.order if node_id in kept]
+
+    def cost_ms(self, node) -> float:
+        if node.type == 'constant':
+            return 0.0
+        if node.type == 'fused':
+            return sum(self.estimate(step.type, step.data or {}) for step in node.steps)
+        return self.estimate(node.type, node.data or {})
+
+    def plan(self, nodes: List[Any], edges: List[Any], order: List[str]) -> Dict[str, Any]:
+        """Nodes in execution order with estimated milliseconds, total work and the critical path"""
+        by_id = {node.id: node for node in nodes}
+        predecessors: Dict[str, List[str]] = {node_id: [] for node_id in by_id}
+        for edge in edges:
+            predecessors[edge.target].append(edge.source)
+        finish: Dict[str, float] = {}
+        steps = []
+        for node_id in order:
+            node = by_id[node_id]
+            cost = self.cost_ms(node) + SCHEDULING_MS
+            finish[node_id] = max((finish[source] for source in predecessors[node_id]), default=0.0) + cost
+            step = {'node_id': node_id, 'type': node.type, 'estimated_ms': cost}
+            if node.type == 'fused':
+                step['steps'] = [member.id for member in node.steps]
+            steps.append(step)
+        return {
+            'num_nodes': len(nodes),
+            'num_edges': len(edges),
+            # Node outputs held in the run's results for a successor
+            'intermediate_outputs': len({edge.source for edge in edges}),
+            'estimated_ms': sum(step['estimated_ms'] for step in steps),
+            'critical_path_ms': max(finish.values(), default=0.0),
+            'nodes': steps,
+        }
+
+
+def _incoming(optimization: Optimization) -> Dict[str, List[Any]]:
+    incoming: Dict[str, List[Any]] = {node.id: [] for node in optimization.nodes}
+    for edge in optimization.edges:
+        incoming[edge.target].append(edge)
+    return incoming
+
+
+def optimizer_from_env(estimate: Optional[Callable[[str, Dict[str, Any]], float]] = None) -> Optimizer:
+    """An Optimizer running the PIPELINE_OPTIMIZER_PASSES passes (default 'prune,fold,fuse'; empty for none)"""
+    spec = os.environ.get('PIPELINE_OPTIMIZER_PASSES', ','.join(PASSES))
+    return Optimizer([name.strip() for name in spec.split(',') if name.strip()], estimate)
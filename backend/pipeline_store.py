@@ -0,0 +1,376 @@
+"""
+Durable pipeline store with precomputed graph indexes.
+
+Pipelines and every saved version live in one SQLite database. Saving a
+version analyzes its graph once and writes indexes next to it, so queries
+across pipelines read index rows instead of re-parsing stored graphs:
+
+- `nodes`: node type -> (version, node), one row per node
+- `reach`: the transitive closure, one (ancestor, descendant) row per
+  reachable pair, so "is there an api node downstream of an input node" is a
+  join on indexed columns
+- `edges`: the adjacency lists, used instead of `reach` for versions whose
+  closure would exceed `max_closure_pairs` rows (long chains grow
+  quadratically), through a recursive query
+- `validations`: topology hash -> validation result, shared by every
+  version with the same topology
+
+Index rows refer to a version by its integer row ID (`vid`) and to nodes by
+their ordinal in first-appearance order (graph.CompactGraph interning), which
+keeps the indexes several times smaller than repeating pipeline and node IDs.
+Queries run against the latest version of each pipeline unless a version is
+given. The full submitted body (positions and node data included) is kept
+zlib-compressed in a table of its own, so a version can be loaded back into
+the editor without index queries reading it.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+import uuid
+import zlib
+from typing import Any, Dict, List, Optional, Tuple
+
+from cache import dumps
+from fastpath import Topology, loads
+from graph import CompactGraph, bitset_indices
+from validation import validate_topology
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS pipelines (
+    id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    latest INTEGER NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS versions (
+    vid INTEGER PRIMARY KEY,
+    pipeline_id TEXT NOT NULL,
+    version INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    topology_hash TEXT NOT NULL,
+    num_nodes INTEGER NOT NULL,
+    num_edges INTEGER NOT NULL,
+    has_closure INTEGER NOT NULL,
+    UNIQUE (pipeline_id, version)
+);
+CREATE TABLE IF NOT EXISTS bodies (
+    vid INTEGER PRIMARY KEY,
+    body BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS nodes (
+    vid INTEGER NOT NULL,
+    ordinal INTEGER NOT NULL,
+    node_id TEXT NOT NULL,
+    node_type TEXT NOT NULL,
+    PRIMARY KEY (vid, ordinal)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS nodes_by_type ON nodes (node_type, vid, node_id);
+CREATE INDEX IF NOT EXISTS nodes_by_id ON nodes (vid, node_id);
+CREATE TABLE IF NOT EXISTS edges (
+    vid INTEGER NOT NULL,
+    source INTEGER NOT NULL,
+    target INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS edges_by_source ON edges (vid, source, target);
+CREATE INDEX IF NOT EXISTS edges_by_target ON edges (vid, target, source);
+CREATE TABLE IF NOT EXISTS reach (
+    vid INTEGER NOT NULL,
+    ancestor INTEGER NOT NULL,
+    descendant INTEGER NOT NULL,
+    PRIMARY KEY (vid, ancestor, descendant)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS reach_by_descendant ON reach (vid, descendant, ancestor);
+CREATE TABLE IF NOT EXISTS validations (
+    topology_hash TEXT PRIMARY KEY,
+    result BLOB NOT NULL
+) WITHOUT ROWID;
+'''
+
+# Versions whose closure has more (ancestor, descendant) pairs than this keep
+# only their edges; a 1000-node chain already has ~500k pairs
+DEFAULT_MAX_CLOSURE_PAIRS = 500_000
+
+# Nodes reachable from :start (forwards, then backwards) over the edges of
+# one version, for versions without a materialized closure
+_DOWNSTREAM = '''
+WITH RECURSIVE walk (ordinal) AS (
+    SELECT target FROM edges WHERE vid = :vid AND source = :start
+    UNION
+    SELECT edges.target FROM edges JOIN walk ON edges.vid = :vid AND edges.source = walk.ordinal
+)
+SELECT ordinal FROM walk
+'''
+_UPSTREAM = '''
+WITH RECURSIVE walk (ordinal) AS (
+    SELECT source FROM edges WHERE vid = :vid AND target = :start
+    UNION
+    SELECT edges.source FROM edges JOIN walk ON edges.vid = :vid AND edges.target = walk.ordinal
+)
+SELECT ordinal FROM walk
+'''
+
+
+def closure_pairs(graph: CompactGraph, max_pairs: int) -> Optional[List[Tuple[int, int]]]:
+    """Every (ancestor, descendant) pair of the graph, or None when there are more than `max_pairs`"""
+    descendants = graph.descendant_bitsets(max_pairs=max_pairs)
+    if descendants is None:
+        return None
+    pairs = []
+    for u, bits in enumerate(descendants):
+        if bits:
+            found = bitset_indices(bits, graph.num_nodes).tolist()
+            pairs.extend(zip([u] * len(found), found))
+    return pairs
+
+
+class PipelineStore:
+    """
+    Pipelines, versions and their indexes in a SQLite database at `path`,
+    created on first use. Connections are per thread (and per process), so
+    one store can be shared by the request threadpool and by serve.py workers.
+    """
+
+    def __init__(self, path: str, max_closure_pairs: int = DEFAULT_MAX_CLOSURE_PAIRS):
+        self.path = path
+        self.max_closure_pairs = max_closure_pairs
+        self._local = threading.local()
+
+    def _connection(self):
+        owner = getattr(self._local, 'owner', None)
+        if owner is not None and owner[0] == os.getpid():
+            return owner[1]
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        connection.execute('PRAGMA journal_mode=WAL')
+        connection.execute('PRAGMA synchronous=NORMAL')
+        connection.executescript(SCHEMA)
+        self._local.owner = (os.getpid(), connection)
+        return connection
+
+    def save(self, topology: Topology, body: Any, name: str = '', pipeline_id: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Store a new version of `pipeline_id` (a new pipeline when None) with
+        its indexes. `body` is the full submitted pipeline. Raises KeyError
+        when `pipeline_id` does not exist.
+        """
+        graph = CompactGraph.build(topology.node_ids, topology.sources, topology.targets)
+        node_types = {}
+        for node_id, node_type in zip(topology.node_ids, topology.node_types):
+            node_types.setdefault(node_id, node_type)
+        pairs = closure_pairs(graph, self.max_closure_pairs)
+        topology_hash = topology.hash()
+        payload = zlib.compress(dumps(body), 6)
+
+        connection = self._connection()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            now = time.time()
+            if pipeline_id is None:
+                pipeline_id = uuid.uuid4().hex
+                version = 1
+            else:
+                row = connection.execute(
+                    'SELECT p.name, v.version FROM pipelines p JOIN versions v ON v.vid = p.latest WHERE p.id = ?', (pipeline_id,)
+                ).fetchone()
+                if row is None:
+                    raise KeyError(pipeline_id)
+                name = name or row[0]
+                version = row[1] + 1
+
+            result = connection.execute('SELECT result FROM validations WHERE topology_hash = ?', (topology_hash,)).fetchone()
+            if result is None:
+                validation = {'num_nodes': topology.num_nodes, 'num_edges': topology.num_edges, **validate_topology(topology)}
+                connection.execute('INSERT INTO validations VALUES (?, ?)', (topology_hash, dumps(validation)))
+            else:
+                validation = loads(result[0])
+
+            vid = connection.execute(
+                'INSERT INTO versions (pipeline_id, version, created_at, topology_hash, num_nodes, num_edges, has_closure) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (pipeline_id, version, now, topology_hash, topology.num_nodes, topology.num_edges, pairs is not None)
+            ).lastrowid
+            connection.execute(
+                'INSERT INTO pipelines VALUES (?, ?, ?, ?, ?) '
+                'ON CONFLICT (id) DO UPDATE SET name = excluded.name, updated_at = excluded.updated_at, latest = excluded.latest',
+                (pipeline_id, name, now, now, vid)
+            )
+            connection.execute('INSERT INTO bodies VALUES (?, ?)', (vid, payload))
+            connection.executemany('INSERT INTO nodes VALUES (?, ?, ?, ?)',
+                                   ((vid, ordinal, node_id, node_types[node_id]) for ordinal, node_id in enumerate(graph.ids)))
+            connection.executemany('INSERT INTO edges VALUES (?, ?, ?)',
+                                   ((vid, u, v) for u, v in zip(graph.sources().tolist(), graph.targets.tolist())))
+            if pairs is not None:
+                connection.executemany('INSERT INTO reach VALUES (?, ?, ?)', ((vid, u, v) for u, v in pairs))
+            connection.execute('COMMIT')
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        return {**self._summary(pipeline_id, name, version), 'topology_hash': topology_hash, 'validation': validation}
+
+    def _summary(self, pipeline_id: str, name: str, version: int) -> Dict[str, Any]:
+        return {'pipeline_id': pipeline_id, 'name': name, 'version': version}
+
+    def _version(self, pipeline_id: str, version: Optional[int]) -> Tuple[int, str, int, str, bool]:
+        """
+        (vid, name, version, topology hash, has closure) of the given version,
+        or of the latest; raises KeyError when either does not exist
+        """
+        columns = 'v.vid, p.name, v.version, v.topology_hash, v.has_closure'
+        connection = self._connection()
+        if version is None:
+            row = connection.execute(f'SELECT {columns} FROM pipelines p JOIN versions v ON v.vid = p.latest WHERE p.id = ?',
+                                     (pipeline_id,)).fetchone()
+        else:
+            row = connection.execute(f'SELECT {columns} FROM pipelines p JOIN versions v ON v.pipeline_id = p.id '
+                                     'WHERE p.id = ? AND v.version = ?', (pipeline_id, version)).fetchone()
+        if row is None:
+            raise KeyError(pipeline_id if version is None else f"{pipeline_id} version {version}")
+        return row
+
+    def list(self) -> List[Dict[str, Any]]:
+        rows = self._connection().execute(
+            'SELECT p.id, p.name, v.version, p.updated_at, v.num_nodes, v.num_edges, v.topology_hash '
+            'FROM pipelines p JOIN versions v ON v.vid = p.latest ORDER BY p.updated_at DESC'
+        ).fetchall()
+        return [
+            {'pipeline_id': pipeline_id, 'name': name, 'latest_version': version, 'updated_at': updated_at,
+             'num_nodes': num_nodes, 'num_edges': num_edges, 'topology_hash': topology_hash}
+            for pipeline_id, name, version, updated_at, num_nodes, num_edges, topology_hash in rows
+        ]
+
+    def get(self, pipeline_id: str, version: Optional[int] = None) -> Dict[str, Any]:
+        """A stored version with its body and validation result"""
+        vid, name, version, topology_hash, _ = self._version(pipeline_id, version)
+        connection = self._connection()
+        created_at, = connection.execute('SELECT created_at FROM versions WHERE vid = ?', (vid,)).fetchone()
+        body, = connection.execute('SELECT body FROM bodies WHERE vid = ?', (vid,)).fetchone()
+        return {
+            **self._summary(pipeline_id, name, version),
+            'created_at': created_at,
+            'topology_hash': topology_hash,
+            'validation': self.validation(topology_hash),
+            'pipeline': loads(zlib.decompress(body)),
+        }
+
+    def versions(self, pipeline_id: str) -> List[Dict[str, Any]]:
+        self._version(pipeline_id, None)
+        rows = self._connection().execute(
+            'SELECT version, created_at, topology_hash, num_nodes, num_edges FROM versions WHERE pipeline_id = ? ORDER BY version',
+            (pipeline_id,)
+        ).fetchall()
+        return [
+            {'version': version, 'created_at': created_at, 'topology_hash': topology_hash, 'num_nodes': num_nodes, 'num_edges': num_edges}
+            for version, created_at, topology_hash, num_nodes, num_edges in rows
+        ]
+
+    def delete(self, pipeline_id: str) -> None:
+        connection = self._connection()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            if connection.execute('DELETE FROM pipelines WHERE id = ?', (pipeline_id,)).rowcount == 0:
+                raise KeyError(pipeline_id)
+            vids = [(vid,) for vid, in connection.execute('SELECT vid FROM versions WHERE pipeline_id = ?', (pipeline_id,))]
+            for table in ('versions', 'bodies', 'nodes', 'edges', 'reach'):
+                connection.executemany(f'DELETE FROM {table} WHERE vid = ?', vids)
+            connection.execute('COMMIT')
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+
+    def validation(self, topology_hash: str) -> Optional[Dict[str, Any]]:
+        """Stored validation result of a topology, if any version has it"""
+        row = self._connection().execute('SELECT result FROM validations WHERE topology_hash = ?', (topology_hash,)).fetchone()
+        return loads(row[0]) if row is not None else None
+
+    def _related(self, vid: int, has_closure: bool, start: int, downstream: bool) -> List[int]:
+        """Ordinals downstream (or upstream) of one node, from the closure or the edges"""
+        connection = self._connection()
+        if has_closure:
+            sql = ('SELECT descendant FROM reach WHERE vid = ? AND ancestor = ?' if downstream else
+                   'SELECT ancestor FROM reach WHERE vid = ? AND descendant = ?')
+            return [row[0] for row in connection.execute(sql, (vid, start))]
+        params = {'vid': vid, 'start': start}
+        return [row[0] for row in connection.execute(_DOWNSTREAM if downstream else _UPSTREAM, params) if row[0] != start]
+
+    def closure(self, pipeline_id: str, node_id: str, version: Optional[int] = None) -> Dict[str, Any]:
+        """Upstream and downstream node IDs of one node; raises KeyError for unknown IDs"""
+        vid, _, version, _, has_closure = self._version(pipeline_id, version)
+        connection = self._connection()
+        row = connection.execute('SELECT ordinal, node_type FROM nodes WHERE vid = ? AND node_id = ?', (vid, node_id)).fetchone()
+        if row is None:
+            raise KeyError(f"node {node_id}")
+        ordinal, node_type = row
+        names = dict(connection.execute('SELECT ordinal, node_id FROM nodes WHERE vid = ?', (vid,)))
+        return {
+            'pipeline_id': pipeline_id,
+            'version': version,
+            'node_id': node_id,
+            'type': node_type,
+            'upstream': sorted(names[u] for u in self._related(vid, has_closure, ordinal, False)),
+            'downstream': sorted(names[v] for v in self._related(vid, has_closure, ordinal, True)),
+        }
+
+    def search(self, node_type: str, downstream_of: Optional[str] = None, downstream_of_type: Optional[str] = None,
+               upstream_of: Optional[str] = None, upstream_of_type: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Latest versions that have a `node_type` node, optionally only counting
+        nodes downstream of the node ID `downstream_of` or of any node of type
+        `downstream_of_type` (likewise upstream). Returns each pipeline with
+        its matching node IDs, most recently updated first.
+        """
+        anchors = [(downstream_of, 'node_id', True), (downstream_of_type, 'node_type', True),
+                   (upstream_of, 'node_id', False), (upstream_of_type, 'node_type', False)]
+        anchors = [(value, column, downstream) for value, column, downstream in anchors if value is not None]
+        # Only versions that have every anchor type are candidates (one index
+        # range each); then, with a closure, each anchor is one indexed lookup
+        # per candidate node: an anchor node and a reach row linking the two
+        types = ''.join(' AND n.vid IN (SELECT vid FROM nodes WHERE node_type = ?)'
+                        for _, column, _ in anchors if column == 'node_type')
+        conditions = ''.join(
+            f' AND EXISTS (SELECT 1 FROM nodes a JOIN reach r ON r.vid = a.vid '
+            f'AND r.{"ancestor" if downstream else "descendant"} = a.ordinal AND r.{"descendant" if downstream else "ancestor"} = n.ordinal '
+            f'WHERE a.vid = n.vid AND a.{column} = ?)'
+            for _, column, downstream in anchors
+        )
+        rows = self._connection().execute(
+            'SELECT p.id, p.name, v.version, v.vid, v.has_closure, n.ordinal, n.node_id '
+            'FROM nodes n JOIN pipelines p ON p.latest = n.vid JOIN versions v ON v.vid = n.vid '
+            f'WHERE n.node_type = ?{types} AND (v.has_closure = 0 OR (1{conditions})) '
+            'ORDER BY p.updated_at DESC, n.ordinal',
+            (node_type, *(value for value, column, _ in anchors if column == 'node_type'), *(value for value, _, _ in anchors))
+        ).fetchall()
+
+        found: Dict[str, Dict[str, Any]] = {}
+        for pipeline_id, name, version, vid, has_closure, ordinal, node_id in rows:
+            if has_closure or all(self._has_anchor(vid, ordinal, *anchor) for anchor in anchors):
+                entry = found.setdefault(pipeline_id, {**self._summary(pipeline_id, name, version), 'nodes': []})
+                entry['nodes'].append(node_id)
+        return list(found.values())
+
+    def _has_anchor(self, vid: int, ordinal: int, value: str, column: str, downstream: bool) -> bool:
+        """Whether `ordinal` is downstream (or upstream) of a node whose `column` equals `value`, over the edges"""
+        anchors = {row[0] for row in self._connection().execute(f'SELECT ordinal FROM nodes WHERE vid = ? AND {column} = ?', (vid, value))}
+        return bool(anchors) and bool(anchors.intersection(self._related(vid, False, ordinal, not downstream)))
+
+    def stats(self) -> Dict[str, Any]:
+        connection = self._connection()
+        counts = {table: connection.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]
+                  for table in ('pipelines', 'versions', 'nodes', 'edges', 'reach', 'validations')}
+        return {'path': self.path, 'max_closure_pairs': self.max_closure_pairs, **counts}
+
+
+def default_store_path() -> str:
+    """pipeline-store.sqlite3 in this app's directory under $XDG_DATA_HOME (default ~/.local/share)"""
+    data_home = os.environ.get('XDG_DATA_HOME') or os.path.join(os.path.expanduser('~'), '.local', 'share')
+    return os.path.join(data_home, 'vectorshift-pipelines', 'pipeline-store.sqlite3')
+
+
+def pipeline_store_from_env() -> PipelineStore:
+    """The store at PIPELINE_STORE_PATH (default default_store_path()), created on first use"""
+    return PipelineStore(
+        os.environ.get('PIPELINE_STORE_PATH') or default_store_path(),
+        max_closure_pairs=int(os.environ.get('PIPELINE_STORE_MAX_CLOSURE_PAIRS', DEFAULT_MAX_CLOSURE_PAIRS)),
+    )
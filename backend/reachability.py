@@ -0,0 +1,184 @@
+"""
+Reachability and impact queries over a cached transitive closure.
+
+A ReachabilityIndex is built once per pipeline structure: the closure in both
+directions as one integer bitset per node (CompactGraph.descendant_bitsets in
+graph.py), so that afterwards
+
+- "does A reach B" is one bit test
+- "what is downstream/upstream of A" reads one bitset
+- "would adding the edge A -> B close a cycle" is "does B reach A"
+- "what does editing these nodes affect" is an OR of their bitsets, masked
+  with the output nodes to name the affected outputs
+
+instead of a traversal per question. Indexes are cached by structure hash
+(node IDs, node types and edge endpoints, so editing node settings keeps the
+index), bounded by their bitset bytes. A closure over n nodes takes at most
+about n^2 / 4 bytes for both directions, e.g. 25 MB for a dense 10k-node
+pipeline; typical pipelines are much sparser. An index that would not fit
+the cache is refused while its closure is being built (IndexTooLarge), not
+after.
+"""
+
+import hashlib
+import os
+from typing import Any, Dict, Iterable, List, Optional
+
+from cache import ResultCache, dumps
+from fastpath import Topology
+from graph import CompactGraph, bitset_indices
+
+# Node types whose values leave the pipeline
+OUTPUT_TYPES = ('customOutput',)
+
+# Rough index bytes per node and per edge besides the bitsets (ID lists, CSR lists, maps)
+NODE_OVERHEAD_BYTES = 100
+EDGE_OVERHEAD_BYTES = 40
+
+
+class IndexTooLarge(ValueError):
+    """A pipeline whose index would exceed the size limit (413)"""
+
+
+def structure_hash(topology: Topology) -> str:
+    """Hash of what reachability depends on: node IDs and types and edge endpoints"""
+    payload = dumps([topology.node_ids, topology.node_types, topology.sources, topology.targets])
+    return hashlib.blake2b(payload, digest_size=16).hexdigest()
+
+
+class ReachabilityIndex:
+    """
+    Descendant and ancestor bitsets of every node of one pipeline. Query
+    methods take node IDs, raise KeyError for unknown ones and list nodes in
+    pipeline order. With `max_bytes`, raises IndexTooLarge as soon as the
+    index is known to need more.
+    """
+
+    def __init__(self, topology: Topology, max_bytes: Optional[int] = None):
+        graph = CompactGraph.build(topology.node_ids, topology.sources, topology.targets)
+        overhead = NODE_OVERHEAD_BYTES * graph.num_nodes + EDGE_OVERHEAD_BYTES * graph.num_edges
+        too_large = IndexTooLarge(f"The reachability index of {graph.num_nodes} nodes would exceed {max_bytes} bytes")
+        # Bitset bytes left, checked as each direction of the closure is built
+        budget = None if max_bytes is None else max_bytes - overhead
+        if budget is not None:
+            # A path through every topological level gives depth * (depth - 1) / 2
+            # pairs in each direction, one bit each, before anything is built
+            depth = len(graph.topological_levels())
+            if depth * (depth - 1) // 8 > budget:
+                raise too_large
+        self.descendants = graph.descendant_bitsets(max_bytes=budget)
+        if self.descendants is None:
+            raise too_large
+        if budget is not None:
+            budget -= sum((bits.bit_length() + 7) // 8 for bits in self.descendants)
+        self.ancestors = graph.transpose().descendant_bitsets(max_bytes=budget)
+        if self.ancestors is None:
+            raise too_large
+        self.graph_id = structure_hash(topology)
+        self.ids = graph.ids
+        self.index = graph.index
+        self.num_edges = graph.num_edges
+        # Plain lists for the path walk, where per-node numpy slices would dominate
+        self.offsets = graph.offsets.tolist()
+        self.targets = graph.targets.tolist()
+        types: Dict[str, str] = {}
+        for node_id, node_type in zip(topology.node_ids, topology.node_types):
+            types.setdefault(node_id, node_type)
+        self.types = [types[node_id] for node_id in self.ids]
+        self.outputs = sum(1 << u for u, node_type in enumerate(self.types) if node_type in OUTPUT_TYPES)
+        # Bitsets plus rough per-node and per-edge overhead, for the cache bound
+        bitset_bytes = sum((bits.bit_length() + 7) // 8 for bits in self.descendants + self.ancestors)
+        self.nbytes = bitset_bytes + overhead
+
+    @property
+    def num_nodes(self) -> int:
+        return len(self.ids)
+
+    def _names(self, bits: int) -> List[str]:
+        ids = self.ids
+        return [ids[u] for u in bitset_indices(bits, len(ids)).tolist()]
+
+    def reaches(self, source: str, target: str) -> bool:
+        """Whether a path of at least one edge leads from `source` to `target`"""
+        u, v = self.index[source], self.index[target]
+        if u == v:
+            return self._in_cycle(u)
+        return bool(self.descendants[u] >> v & 1)
+
+    def _in_cycle(self, u: int) -> bool:
+        # The bitsets leave a node out of its own closure, so a node is on a
+        # cycle when something below it is also above it, or it has a self-loop
+        return bool(self.descendants[u] & self.ancestors[u]) or u in self.targets[self.offsets[u]:self.offsets[u + 1]]
+
+    def node(self, node_id: str) -> Dict[str, Any]:
+        u = self.index[node_id]
+        return {
+            'node_id': node_id,
+            'type': self.types[u],
+            'ancestors': self._names(self.ancestors[u]),
+            'descendants': self._names(self.descendants[u]),
+            'in_cycle': self._in_cycle(u),
+        }
+
+    def would_create_cycle(self, source: str, target: str) -> Optional[List[str]]:
+        """
+        The cycle an edge `source` -> `target` would close, as an existing
+        path from `target` back to `source` (both included), or None. Nodes
+        not in the pipeline yet have no paths, so only a self-loop on them
+        closes a cycle.
+        """
+        if source == target:
+            return [source]
+        u, v = self.index.get(source), self.index.get(target)
+        if u is None or v is None or not self.descendants[v] >> u & 1:
+            return None
+        # Depth-first from target, only into ancestors of source. Each of
+        # them has a successor that is another one (or source itself), so the
+        # walk only backtracks inside cycles and costs about the path length
+        # rather than a search of everything between the two nodes.
+        above = (self.ancestors[u] | 1 << u).to_bytes((len(self.ids) + 7) // 8, 'little')
+        offsets, targets = self.offsets, self.targets
+        path, cursors, visited = [v], [offsets[v]], {v}
+        while path[-1] != u:
+            x, i = path[-1], cursors[-1]
+            end, step = offsets[x + 1], None
+            while i < end:
+                w = targets[i]
+                i += 1
+                if above[w >> 3] >> (w & 7) & 1 and w not in visited:
+                    step = w
+                    break
+            cursors[-1] = i
+            if step is None:
+                path.pop()
+                cursors.pop()
+            else:
+                visited.add(step)
+                path.append(step)
+                cursors.append(offsets[step])
+        return [self.ids[w] for w in path]
+
+    def impact(self, node_ids: Iterable[str]) -> Dict[str, Any]:
+        """Nodes whose results change when `node_ids` change: the nodes themselves and everything downstream"""
+        affected = 0
+        for node_id in node_ids:
+            u = self.index[node_id]
+            affected |= self.descendants[u] | 1 << u
+        return {'nodes': self._names(affected), 'outputs': self._names(affected & self.outputs)}
+
+    def summary(self) -> Dict[str, Any]:
+        return {'graph_id': self.graph_id, 'num_nodes': self.num_nodes, 'num_edges': self.num_edges, 'index_bytes': self.nbytes}
+
+
+def reachability_cache_from_env() -> ResultCache:
+    """
+    Index cache bounded by PIPELINE_REACHABILITY_CACHE_MAX_ENTRIES (default
+    64) indexes and PIPELINE_REACHABILITY_CACHE_MAX_BYTES (default 256 MiB),
+    each kept PIPELINE_REACHABILITY_CACHE_TTL seconds (default 3600)
+    """
+    return ResultCache(
+        max_entries=int(os.environ.get('PIPELINE_REACHABILITY_CACHE_MAX_ENTRIES', 64)),
+        max_bytes=int(os.environ.get('PIPELINE_REACHABILITY_CACHE_MAX_BYTES', 256 * 2**20)),
+        ttl=float(os.environ.get('PIPELINE_REACHABILITY_CACHE_TTL', 3600)),
+        sizeof=lambda index: index.nbytes,
+    )
@@ -0,0 +1,322 @@
+"""
+Priority scheduling of pipeline nodes across a worker pool.
+
+PipelineExecutor starts every node as soon as its inputs are ready. With a
+Scheduler it also decides where and when the node's work runs:
+
+- CPU-bound runtimes (math, filter, transform and text, registered with
+  `cpu_bound=True`) given a batch of at least `offload_rows` rows run on a
+  WorkStealingPool thread instead of the event loop. NumPy releases the GIL
+  inside its kernels, so columns of a wide pipeline are computed on several
+  cores at once. Scalar nodes stay on the loop, where a thread hop would
+  cost more than the node.
+- I/O-bound runtimes (api, llm, delay) always await on the event loop.
+- Per-type concurrency caps (`limits`, e.g. `{'api': 8}`) hold back nodes of
+  a capped type, shared by every run using the scheduler.
+
+Whenever nodes wait (for a cap or a pool worker), the one with the longest
+remaining critical path goes first: its estimated duration plus the longest
+chain of estimated durations below it. Estimates are a moving average of
+observed durations per node type (delay nodes use their configured
+duration), so priorities improve as the scheduler sees more runs. Starting
+the longest chain first is what keeps the makespan near the critical-path
+lower bound when the workers are oversubscribed.
+
+Each pool worker has its own priority queue. A node is queued on the worker
+that ran its first offloaded predecessor, whose caches still hold that
+predecessor's output column; a worker with an empty queue steals the
+highest-priority task of the others.
+"""
+
+import asyncio
+import heapq
+import itertools
+import os
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from executor import DELAY_UNITS
+
+# Batches smaller than this are cheaper to compute inline than to hand to a thread
+DEFAULT_OFFLOAD_ROWS = 4096
+
+# Estimated milliseconds per node type before any has been observed
+DEFAULT_COST_MS = {'llm': 200.0, 'api': 50.0}
+FALLBACK_COST_MS = 0.1
+
+# Weight of the newest observation in the per-type moving average
+COST_SMOOTHING = 0.2
+
+
+class WorkStealingPool:
+    """
+    Threads with one priority queue each. Tasks go to a preferred worker
+    (or the least loaded one); an idle worker steals the best task queued
+    on any other worker.
+    """
+
+    def __init__(self, workers: int):
+        self.workers = max(workers, 1)
+        # Heaps of (-priority, sequence, func, future) per worker
+        self.queues: List[List[tuple]] = [[] for _ in range(self.workers)]
+        self.locks = [threading.Lock() for _ in range(self.workers)]
+        # One permit per queued task, so a woken worker knows a task exists
+        self.available = threading.Semaphore(0)
+        self.sequence = itertools.count()
+        self.tasks = [0] * self.workers
+        self.steals = [0] * self.workers
+        self.busy = [0.0] * self.workers
+        self.started = time.perf_counter()
+        self.threads: List[threading.Thread] = []
+        self.shutting_down = False
+        self._start_lock = threading.Lock()
+
+    def _start(self) -> None:
+        with self._start_lock:
+            if self.threads:
+                return
+            for index in range(self.workers):
+                thread = threading.Thread(target=self._work, args=(index,), name=f"pipeline-worker-{index}", daemon=True)
+                thread.start()
+                self.threads.append(thread)
+
+    def submit(self, func: Callable[[], Any], priority: float = 0.0, worker: Optional[int] = None) -> Future:
+        """
+        Queue `func` and return a Future of (result, index of the worker that
+        ran it). Higher priorities run first.
+        """
+        if not self.threads:
+            self._start()
+        if worker is None or not 0 <= worker < self.workers:
+            worker = min(range(self.workers), key=lambda index: len(self.queues[index]))
+        future: Future = Future()
+        with self.locks[worker]:
+            heapq.heappush(self.queues[worker], (-priority, next(self.sequence), func, future))
+        self.available.release()
+        return future
+
+    def _take(self, index: int) -> Optional[tuple]:
+        with self.locks[index]:
+            if self.queues[index]:
+                return heapq.heappop(self.queues[index])
+        # Steal the highest-priority task queued anywhere else
+        best = None
+        for victim in range(self.workers):
+            if victim != index and self.queues[victim] and (best is None or self.queues[victim][0] < self.queues[best][0]):
+                best = victim
+        if best is not None:
+            with self.locks[best]:
+                if self.queues[best]:
+                    self.steals[index] += 1
+                    return heapq.heappop(self.queues[best])
+        return None
+
+    def _work(self, index: int) -> None:
+        while True:
+            self.available.acquire()
+            if self.shutting_down:
+                return
+            task = self._take(index)
+            # The permit guarantees a task, but another worker can take it
+            # between our scan and pop; scan again until one is found
+            while task is None:
+                task = self._take(index)
+            _, _, func, future = task
+            if not future.set_running_or_notify_cancel():
+                continue
+            start = time.perf_counter()
+            try:
+                result, error = func(), None
+            except BaseException as e:
+                result, error = None, e
+            self.busy[index] += time.perf_counter() - start
+            self.tasks[index] += 1
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result((result, index))
+
+    def stats(self) -> Dict[str, Any]:
+        elapsed = time.perf_counter() - self.started
+        return {
+            'workers': self.workers,
+            'queued': sum(len(queue) for queue in self.queues),
+            'tasks': sum(self.tasks),
+            'steals': sum(self.steals),
+            'busy_seconds': sum(self.busy),
+            'utilization': sum(self.busy) / (self.workers * elapsed) if elapsed else 0.0,
+            'per_worker': [
+                {'tasks': tasks, 'steals': steals, 'busy_seconds': busy}
+                for tasks, steals, busy in zip(self.tasks, self.steals, self.busy)
+            ],
+        }
+
+    def shutdown(self) -> None:
+        self.shutting_down = True
+        for _ in self.threads:
+            self.available.release()
+        for thread in self.threads:
+            thread.join()
+        self.threads = []
+
+
+class PriorityLimiter:
+    """
+    At most `limit` holders at a time; waiters are admitted highest priority
+    first (FIFO among equals). Waiters may come from different event loops.
+    """
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.active = 0
+        self.peak = 0
+        self.waits = 0
+        self.waiters: List[Tuple[float, int, asyncio.Future]] = []
+        self.sequence = itertools.count()
+        self.granted = set()
+        self.lock = threading.Lock()
+
+    async def acquire(self, priority: float) -> None:
+        with self.lock:
+            if self.active < self.limit and not self.waiters:
+                self._admit()
+                return
+            self.waits += 1
+            waiter = asyncio.get_running_loop().create_future()
+            heapq.heappush(self.waiters, (-priority, next(self.sequence), waiter))
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            with self.lock:
+                if waiter in self.granted:
+                    # Admitted just as we were cancelled: pass the slot on
+                    self.granted.discard(waiter)
+                    self._release()
+                else:
+                    self.waiters = [entry for entry in self.waiters if entry[2] is not waiter]
+                    heapq.heapify(self.waiters)
+            raise
+        with self.lock:
+            self.granted.discard(waiter)
+
+    def _admit(self) -> None:
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+
+    def release(self) -> None:
+        with self.lock:
+            self._release()
+
+    def _release(self) -> None:
+        self.active -= 1
+        if self.waiters and self.active < self.limit:
+            _, _, waiter = heapq.heappop(self.waiters)
+            self._admit()
+            # Counted as active from here; `granted` lets a cancellation in
+            # between hand the slot back
+            self.granted.add(waiter)
+            waiter.get_loop().call_soon_threadsafe(_admit_waiter, waiter)
+
+    def stats(self) -> Dict[str, Any]:
+        return {'limit': self.limit, 'active': self.active, 'peak': self.peak, 'waiting': len(self.waiters), 'waits': self.waits}
+
+
+def _admit_waiter(waiter: asyncio.Future) -> None:
+    if not waiter.done():
+        waiter.set_result(None)
+
+
+class Scheduler:
+    """
+    Worker pool, per-type caps and duration estimates shared by every
+    PipelineExecutor run that is given this scheduler.
+    """
+
+    def __init__(self, workers: Optional[int] = None, limits: Optional[Dict[str, int]] = None,
+                 offload_rows: int = DEFAULT_OFFLOAD_ROWS):
+        self.pool = WorkStealingPool(workers or os.cpu_count() or 1)
+        self.limiters = {node_type: PriorityLimiter(limit) for node_type, limit in (limits or {}).items()}
+        self.offload_rows = offload_rows
+        self.costs_ms: Dict[str, float] = dict(DEFAULT_COST_MS)
+
+    def estimate_ms(self, node_type: str, data: Dict[str, Any]) -> float:
+        if node_type == 'delay':
+            try:
+                return float(data.get('duration') or 1000) * DELAY_UNITS[data.get('unit') or 'ms'] * 1000
+            except (KeyError, TypeError, ValueError):
+                pass
+        return self.costs_ms.get(node_type, FALLBACK_COST_MS)
+
+    def observe(self, node_type: str, duration_ms: float) -> None:
+        """Fold a measured node duration into the estimate for its type"""
+        previous = self.costs_ms.get(node_type)
+        self.costs_ms[node_type] = duration_ms if previous is None else previous + COST_SMOOTHING * (duration_ms - previous)
+
+    def priorities(self, order: List[str], successors: Dict[str, List[str]], costs_ms: Dict[str, float]) -> Dict[str, float]:
+        """Remaining critical path per node: its cost plus the longest chain of costs below it"""
+        remaining: Dict[str, float] = {}
+        for node_id in reversed(order):
+            remaining[node_id] = costs_ms[node_id] + max((remaining[successor] for successor in successors[node_id]), default=0.0)
+        return remaining
+
+    async def run(self, node_type: str, priority: float, func: Callable[[], Any], offload: bool,
+                  worker: Optional[int] = None) -> Tuple[Any, Optional[int], float]:
+        """
+        Run `func` under its type's cap, on the pool when `offload` is set
+        (preferring `worker`) or on the loop otherwise. Returns the result,
+        the pool worker that ran it (None on the loop) and the milliseconds
+        spent waiting for a cap or a worker.
+        """
+        limiter = self.limiters.get(node_type)
+        queued = time.perf_counter()
+        if limiter is not None:
+            await limiter.acquire(priority)
+        try:
+            if not offload:
+                waited_ms = (time.perf_counter() - queued) * 1000
+                return await func(), None, waited_ms
+            future = self.pool.submit(lambda: (time.perf_counter(), func()), priority, worker)
+            (started, result), ran_on = await asyncio.wrap_future(future)
+            return result, ran_on, (started - queued) * 1000
+        finally:
+            if limiter is not None:
+                limiter.release()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'pool': self.pool.stats(),
+            'limits': {node_type: limiter.stats() for node_type, limiter in self.limiters.items()},
+            'offload_rows': self.offload_rows,
+            'estimated_ms': dict(self.costs_ms),
+        }
+
+    def shutdown(self) -> None:
+        self.pool.shutdown()
+
+
+def parse_limits(spec: str) -> Dict[str, int]:
+    """'api=8,llm=4' -> {'api': 8, 'llm': 4}"""
+    limits = {}
+    for item in spec.split(','):
+        if not item.strip():
+            continue
+        node_type, _, limit = item.partition('=')
+        if not limit.strip().isdigit() or int(limit) < 1:
+            raise ValueError(f"Invalid concurrency limit '{item.strip()}', expected <node type>=<positive integer>")
+        limits[node_type.strip()] = int(limit)
+    return limits
+
+
+def scheduler_from_env() -> Scheduler:
+    """
+    A Scheduler with PIPELINE_SCHEDULER_WORKERS pool threads (default one
+    per core), PIPELINE_SCHEDULER_LIMITS caps ('api=8,llm=4') and batches
+    offloaded from PIPELINE_SCHEDULER_OFFLOAD_ROWS rows
+    """
+    return Scheduler(
+        workers=int(os.environ.get('PIPELINE_SCHEDULER_WORKERS', 0)) or None,
+        limits=parse_limits(os.environ.get('PIPELINE_SCHEDULER_LIMITS', '')),
+        offload_rows=int(os.environ.get('PIPELINE_SCHEDULER_OFFLOAD_ROWS', DEFAULT_OFFLOAD_ROWS)),
+    )
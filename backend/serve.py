@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Production serving mode for the VectorShift Pipeline Builder backend
+
+Runs the API in several uvicorn worker processes that accept connections
+from one listening socket, so requests are spread over every core instead of
+one process. The supervisor keeps the worker count up and can be scaled
+while serving:
+
+- SIGTTIN adds a worker (up to `--max-workers`), SIGTTOU removes one
+  (never below one)
+- a worker that exits unexpectedly is replaced
+- SIGTERM or Ctrl+C stops every worker gracefully: each stops accepting
+  connections and finishes its in-flight requests (at most
+  `--graceful-timeout` seconds) before exiting
+
+Workers share validation results through a SQLite cache on the local disk
+(PIPELINE_SHARED_CACHE_PATH, see cache.py), and each parses large
+/pipelines/parse bodies on its own process pool (see batch.py). A worker's
+pool size is fixed when it starts, so pools are sized for the most workers
+the supervisor will run: `--max-workers` (default the larger of `--workers`
+and the core count) times pool processes is about the number of cores, however
+far the worker count is scaled.
+
+Incremental sessions (/pipelines/sessions) and reachability indexes
+(/pipelines/reachability) are not shared: they live in the memory of the
+worker that created them, and connections are not pinned to a worker, so
+with several workers a follow-up request may reach another one and get a
+404. Clients that use them need `--workers 1` (or `uvicorn main:app`).
+
+Usage: python serve.py [--workers N] [--host 0.0.0.0] [--port 8000]
+"""
+
+import argparse
+import logging
+import multiprocessing
+import os
+import signal
+import socket
+import tempfile
+import time
+from typing import Dict, List, MutableMapping, Optional
+
+import uvicorn
+
+logger = logging.getLogger('uvicorn.error')
+
+multiprocessing.allow_connection_pickling()
+spawn = multiprocessing.get_context('spawn')
+
+# Seconds between checks for exited workers and scaling signals
+SUPERVISE_INTERVAL = 0.2
+
+
+def configure(workers: int, environ: Optional[MutableMapping[str, str]] = None) -> Dict[str, str]:
+    """
+    Fill in the environment the workers inherit, keeping anything already
+    set: a shared validation cache and a per-worker pool size for up to
+    `workers` workers. Returns the values in effect.
+    """
+    environ = os.environ if environ is None else environ
+    environ.setdefault('PIPELINE_SHARED_CACHE_PATH', os.path.join(tempfile.gettempdir(), 'pipeline-validation-cache.sqlite3'))
+    environ.setdefault('PIPELINE_BATCH_WORKERS', str(max((os.cpu_count() or 1) // workers, 1)))
+    return {name: environ[name] for name in ('PIPELINE_SHARED_CACHE_PATH', 'PIPELINE_BATCH_WORKERS')}
+
+
+def bind_socket(config: uvicorn.Config) -> socket.socket:
+    """
+    The listening socket the workers share. Unlike uvicorn's own, it is
+    created with IPPROTO_TCP: asyncio only sets TCP_NODELAY on connections
+    whose socket reports TCP, and without it responses written in two parts
+    wait ~40 ms for the client's delayed ACK.
+    """
+    family = socket.AF_INET6 if ':' in config.host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM, socket.IPPROTO_TCP)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((config.host, config.port))
+    sock.listen(config.backlog)
+    sock.set_inheritable(True)
+    logger.info("Listening on http://%s:%d", config.host, config.port)
+    return sock
+
+
+def run_worker(config: uvicorn.Config, sockets) -> None:
+    """Entry point of a worker process"""
+    config.configure_logging()
+    uvicorn.Server(config).run(sockets=sockets)
+
+
+class Supervisor:
+    """Starts, replaces, scales and stops the worker processes"""
+
+    def __init__(self, config: uvicorn.Config, workers: int, max_workers: Optional[int] = None):
+        self.config = config
+        self.target = max(workers, 1)
+        self.max_workers = max(max_workers or self.target, self.target)
+        self.processes: List[multiprocessing.Process] = []
+        self.should_exit = False
+        self.sockets = []
+
+    def handle_exit(self, sig, frame) -> None:
+        self.should_exit = True
+
+    def handle_scale_up(self, sig, frame) -> None:
+        # Pools were sized for at most max_workers workers
+        self.target = min(self.target + 1, self.max_workers)
+
+    def handle_scale_down(self, sig, frame) -> None:
+        self.target = max(self.target - 1, 1)
+
+    def start_worker(self) -> None:
+        process = spawn.Process(target=run_worker, kwargs={'config': self.config, 'sockets': self.sockets})
+        process.start()
+        self.processes.append(process)
+        logger.info("Started worker process [%d] (%d workers)", process.pid, len(self.processes))
+
+    def stop_worker(self, process: multiprocessing.Process) -> None:
+        process.terminate()
+        process.join()
+        self.processes.remove(process)
+        logger.info("Stopped worker process [%d] (%d workers)", process.pid, len(self.processes))
+
+    def supervise(self) -> None:
+        """Replace exited workers and apply scaling requests"""
+        for process in [process for process in self.processes if not process.is_alive()]:
+            self.processes.remove(process)
+            logger.warning("Worker process [%d] exited with code %s", process.pid, process.exitcode)
+        while len(self.processes) < self.target:
+            self.start_worker()
+        while len(self.processes) > self.target:
+            # The newest worker has the fewest warm caches to lose
+            self.stop_worker(self.processes[-1])
+
+    def run(self) -> None:
+        self.sockets = [bind_socket(self.config)]
+        signal.signal(signal.SIGINT, self.handle_exit)
+        signal.signal(signal.SIGTERM, self.handle_exit)
+        signal.signal(signal.SIGTTIN, self.handle_scale_up)
+        signal.signal(signal.SIGTTOU, self.handle_scale_down)
+        logger.info("Started supervisor process [%d]", os.getpid())
+        try:
+            while not self.should_exit:
+                self.supervise()
+                time.sleep(SUPERVISE_INTERVAL)
+        finally:
+            # SIGTERM makes each uvicorn worker drain its connections and exit
+            for process in self.processes:
+                process.terminate()
+            for process in list(self.processes):
+                process.join()
+                self.processes.remove(process)
+            for sock in self.sockets:
+                sock.close()
+            logger.info("Stopped supervisor process [%d]", os.getpid())
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help='worker processes (default: one per core)')
+    parser.add_argument('--max-workers', type=int,
+                        help='most workers SIGTTIN scales to; process pools are sized for this many '
+                             '(default: the larger of --workers and the core count)')
+    parser.add_argument('--graceful-timeout', type=int, default=30,
+                        help='seconds a stopping worker waits for in-flight requests')
+    parser.add_argument('--keep-alive', type=int, default=5, help='idle keep-alive timeout in seconds')
+    parser.add_argument('--backlog', type=int, default=2048)
+    parser.add_argument('--log-level', default='info')
+    parser.add_argument('--no-access-log', action='store_true')
+    args = parser.parse_args()
+
+    max_workers = max(args.max_workers or os.cpu_count() or 1, args.workers)
+    configure(max_workers)
+    config = uvicorn.Config(
+        'main:app',
+        host=args.host,
+        port=args.port,
+        backlog=args.backlog,
+        timeout_keep_alive=args.keep_alive,
+        timeout_graceful_shutdown=args.graceful_timeout,
+        log_level=args.log_level,
+        access_log=not args.no_access_log,
+    )
+    config.configure_logging()
+    if args.workers > 1:
+        logger.warning("Sessions and reachability indexes are kept per worker; with %d workers their "
+                       "follow-up requests may get 404 (use --workers 1 for clients that need them)", args.workers)
+    Supervisor(config, args.workers, max_workers).run()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,285 @@
+"""
+Incremental pipeline validation for server-side editing sessions.
+
+A session keeps its graph and a topological order in memory and applies
+node/edge deltas instead of re-validating the whole pipeline. Edge insertion
+uses the Pearce-Kelly online topological ordering algorithm: an edge that
+already agrees with the current order is accepted in O(1), otherwise only
+the nodes whose positions lie between its endpoints are searched and
+reordered.
+
+Edges that would close a cycle are kept aside as "cyclic" edges rather than
+rejected, so the session mirrors what the user has drawn. The accepted edges
+always form a DAG, and the pipeline is a DAG exactly when no cyclic edges
+remain. Whenever an accepted edge disappears the cyclic edges are retried,
+since they may no longer close a cycle.
+"""
+
+import threading
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from graph import CompactGraph
+
+
+class IncrementalGraph:
+    """Directed multigraph with an online topological order over its accepted edges"""
+
+    def __init__(self):
+        self.order: Dict[str, int] = {}
+        self.succ: Dict[str, Dict[str, int]] = {}
+        self.pred: Dict[str, Dict[str, int]] = {}
+        self.edges: Dict[str, Tuple[str, str]] = {}
+        self.cyclic_edges: Dict[str, Tuple[str, str]] = {}
+        self.incident: Dict[str, Set[str]] = {}
+        self._next_order = 0
+
+    @classmethod
+    def from_pipeline(cls, node_ids: Iterable[str], edges: Iterable[Tuple[str, str, str]]) -> 'IncrementalGraph':
+        """
+        Bulk-load a pipeline. A Kahn pass seeds the order, so every edge of an
+        acyclic pipeline is accepted without searching; only edges among the
+        nodes Kahn's algorithm could not place go through Pearce-Kelly.
+        Edges whose endpoints are not nodes are ignored, as in is_dag. A
+        repeated edge ID raises ValueError.
+        """
+        graph = cls()
+        edges = list(edges)
+        seen = set()
+        for edge_id, _, _ in edges:
+            if edge_id in seen:
+                raise ValueError(f"Edge '{edge_id}' already exists")
+            seen.add(edge_id)
+        compact = CompactGraph.build(node_ids, [s for _, s, _ in edges], [t for _, _, t in edges])
+        index = compact.index
+        edges = [(edge_id, s, t) for edge_id, s, t in edges if s in index and t in index]
+        placed = compact.topological_order()
+        unplaced = set(range(compact.num_nodes)) - set(placed)
+        for u in placed + sorted(unplaced):
+            graph.add_node(compact.ids[u])
+
+        for edge_id, source, target in edges:
+            if graph.order[source] < graph.order[target]:
+                graph._link(edge_id, source, target)
+            else:
+                graph.add_edge(edge_id, source, target)
+        return graph
+
+    @property
+    def is_dag(self) -> bool:
+        return not self.cyclic_edges
+
+    @property
+    def num_edges(self) -> int:
+        return len(self.edges) + len(self.cyclic_edges)
+
+    def add_node(self, node_id: str) -> None:
+        if node_id in self.order:
+            raise ValueError(f"Node '{node_id}' already exists")
+        self.order[node_id] = self._next_order
+        self._next_order += 1
+        self.succ[node_id] = {}
+        self.pred[node_id] = {}
+        self.incident[node_id] = set()
+
+    def remove_node(self, node_id: str) -> None:
+        if node_id not in self.order:
+            raise KeyError(f"Node '{node_id}' does not exist")
+        for edge_id in list(self.incident[node_id]):
+            self._unlink(edge_id)
+        del self.order[node_id], self.succ[node_id], self.pred[node_id], self.incident[node_id]
+        self._retry_cyclic_edges()
+
+    def add_edge(self, edge_id: str, source: str, target: str) -> bool:
+        """Insert an edge; returns False if it closes a cycle"""
+        if edge_id in self.edges or edge_id in self.cyclic_edges:
+            raise ValueError(f"Edge '{edge_id}' already exists")
+        for node_id in (source, target):
+            if node_id not in self.order:
+                raise KeyError(f"Node '{node_id}' does not exist")
+
+        if self._reorder_for(source, target):
+            self._link(edge_id, source, target)
+            return True
+        self.cyclic_edges[edge_id] = (source, target)
+        self.incident[source].add(edge_id)
+        self.incident[target].add(edge_id)
+        return False
+
+    def remove_edge(self, edge_id: str) -> None:
+        if edge_id not in self.edges and edge_id not in self.cyclic_edges:
+            raise KeyError(f"Edge '{edge_id}' does not exist")
+        accepted = edge_id in self.edges
+        self._unlink(edge_id)
+        if accepted:
+            self._retry_cyclic_edges()
+
+    def apply_delta(
+        self,
+        add_nodes: Sequence[str] = (),
+        remove_nodes: Sequence[str] = (),
+        add_edges: Sequence[Tuple[str, str, str]] = (),
+        remove_edges: Sequence[str] = (),
+    ) -> None:
+        """
+        Apply a batch of edits: edge removals, node removals, node additions,
+        then edge additions. The whole delta is checked against the current
+        graph first, so an invalid delta raises ValueError and changes nothing.
+        """
+        edge_ids = set(self.edges) | set(self.cyclic_edges)
+        for edge_id in remove_edges:
+            if edge_id not in edge_ids:
+                raise ValueError(f"Edge '{edge_id}' does not exist")
+            edge_ids.discard(edge_id)
+
+        node_ids = set(self.order)
+        for node_id in remove_nodes:
+            if node_id not in node_ids:
+                raise ValueError(f"Node '{node_id}' does not exist")
+            node_ids.discard(node_id)
+            edge_ids -= self.incident[node_id]
+
+        for node_id in add_nodes:
+            if node_id in node_ids:
+                raise ValueError(f"Node '{node_id}' already exists")
+            node_ids.add(node_id)
+
+        for edge_id, source, target in add_edges:
+            if edge_id in edge_ids:
+                raise ValueError(f"Edge '{edge_id}' already exists")
+            for node_id in (source, target):
+                if node_id not in node_ids:
+                    raise ValueError(f"Node '{node_id}' does not exist")
+            edge_ids.add(edge_id)
+
+        for edge_id in remove_edges:
+            self.remove_edge(edge_id)
+        for node_id in remove_nodes:
+            self.remove_node(node_id)
+        for node_id in add_nodes:
+            self.add_node(node_id)
+        for edge_id, source, target in add_edges:
+            self.add_edge(edge_id, source, target)
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            'num_nodes': len(self.order),
+            'num_edges': self.num_edges,
+            'is_dag': self.is_dag,
+            'cyclic_edges': sorted(self.cyclic_edges),
+        }
+
+    def topological_order(self) -> Optional[List[str]]:
+        if not self.is_dag:
+            return None
+        return sorted(self.order, key=self.order.__getitem__)
+
+    def _link(self, edge_id: str, source: str, target: str) -> None:
+        """Record an accepted edge; the order must already agree with it"""
+        self.edges[edge_id] = (source, target)
+        self.incident[source].add(edge_id)
+        self.incident[target].add(edge_id)
+        out = self.succ[source]
+        out[target] = out.get(target, 0) + 1
+        into = self.pred[target]
+        into[source] = into.get(source, 0) + 1
+
+    def _unlink(self, edge_id: str) -> None:
+        """Drop an accepted or cyclic edge from the adjacency maps"""
+        if edge_id in self.cyclic_edges:
+            source, target = self.cyclic_edges.pop(edge_id)
+            self.incident[source].discard(edge_id)
+            self.incident[target].discard(edge_id)
+            return
+        source, target = self.edges.pop(edge_id)
+        self.incident[source].discard(edge_id)
+        self.incident[target].discard(edge_id)
+        for adjacency, a, b in ((self.succ, source, target), (self.pred, target, source)):
+            count = adjacency[a][b] - 1
+            if count:
+                adjacency[a][b] = count
+            else:
+                del adjacency[a][b]
+
+    def _retry_cyclic_edges(self) -> None:
+        for edge_id, (source, target) in list(self.cyclic_edges.items()):
+            if self._reorder_for(source, target):
+                del self.cyclic_edges[edge_id]
+                self._link(edge_id, source, target)
+
+    def _reorder_for(self, source: str, target: str) -> bool:
+        """
+        Pearce-Kelly: make the order consistent with source -> target, or
+        return False if target already reaches source.
+        """
+        order = self.order
+        lower, upper = order[target], order[source]
+        if lower > upper:
+            return True
+        if source == target:
+            return False
+
+        # Forward search from target, bounded above by the source's position
+        forward: List[str] = []
+        seen: Set[str] = {target}
+        stack = [target]
+        while stack:
+            u = stack.pop()
+            forward.append(u)
+            for v in self.succ[u]:
+                if v == source:
+                    return False
+                if v not in seen and order[v] < upper:
+                    seen.add(v)
+                    stack.append(v)
+
+        # Backward search from source, bounded below by the target's position
+        backward: List[str] = []
+        seen = {source}
+        stack = [source]
+        while stack:
+            u = stack.pop()
+            backward.append(u)
+            for v in self.pred[u]:
+                if v not in seen and order[v] > lower:
+                    seen.add(v)
+                    stack.append(v)
+
+        # Reuse the affected positions: everything reaching the source now
+        # precedes everything reachable from the target
+        backward.sort(key=order.__getitem__)
+        forward.sort(key=order.__getitem__)
+        slots = sorted(order[u] for u in backward + forward)
+        for node_id, slot in zip(backward + forward, slots):
+            order[node_id] = slot
+        return True
+
+
+class SessionStore:
+    """Bounded, thread-safe map of session ID to graph; least recently used sessions are dropped"""
+
+    def __init__(self, max_sessions: int = 256):
+        self.max_sessions = max_sessions
+        self._sessions: "OrderedDict[str, Tuple[IncrementalGraph, threading.Lock]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def create(self, graph: IncrementalGraph) -> str:
+        session_id = uuid.uuid4().hex
+        with self._lock:
+            self._sessions[session_id] = (graph, threading.Lock())
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+        return session_id
+
+    def get(self, session_id: str) -> Tuple[IncrementalGraph, threading.Lock]:
+        with self._lock:
+            if session_id not in self._sessions:
+                raise KeyError(f"Session '{session_id}' does not exist")
+            self._sessions.move_to_end(session_id)
+            return self._sessions[session_id]
+
+    def delete(self, session_id: str) -> None:
+        with self._lock:
+            if self._sessions.pop(session_id, None) is None:
+                raise KeyError(f"Session '{session_id}' does not exist")
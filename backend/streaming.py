@@ -0,0 +1,66 @@
+"""
+Server-Sent Events for streaming pipeline runs.
+
+The run executes as a background task that pushes executor events into a
+bounded queue; the response body drains the queue. When the client reads
+slower than nodes finish, the queue fills and the nodes emitting events wait
+for space, so memory stays bounded by `max_pending` events. If the client
+disconnects, the response stops iterating and the run is cancelled.
+
+Chunked runs (dataflow.py) use the same transport, with one `output_chunk`
+event per chunk of output rows instead of per-node events.
+"""
+
+import asyncio
+import json
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional
+
+from columnar import json_default
+from dataflow import run_chunked
+from executor import PipelineExecutor
+
+
+def format_sse(event: Dict[str, Any]) -> str:
+    """Encode one executor event as an SSE frame named after its type"""
+    return f"event: {event['event']}\ndata: {json.dumps(event, default=json_default)}\n\n"
+
+
+def stream_run(
+    executor: PipelineExecutor,
+    inputs: Optional[Dict[str, Any]] = None,
+    max_pending: int = 64,
+) -> AsyncIterator[str]:
+    """Yield SSE frames for each node event as it happens, ending with run_finished"""
+    return stream_events(lambda on_event: executor.run(inputs, on_event=on_event), max_pending)
+
+
+def stream_chunked_run(
+    executor: PipelineExecutor,
+    inputs: Optional[Dict[str, Any]] = None,
+    chunk_size: int = 1024,
+    max_pending: int = 64,
+) -> AsyncIterator[str]:
+    """Yield an SSE frame per output chunk of a chunked run (dataflow.py), ending with run_finished"""
+    return stream_events(lambda on_event: run_chunked(executor, inputs, chunk_size, on_event=on_event), max_pending)
+
+
+async def stream_events(run: Callable[[Callable], Awaitable[Any]], max_pending: int = 64) -> AsyncIterator[str]:
+    """Run `run(on_event)` in the background and yield its events as SSE frames"""
+    queue: asyncio.Queue = asyncio.Queue(maxsize=max_pending)
+
+    async def execute() -> None:
+        try:
+            await run(queue.put)
+        except Exception as e:
+            await queue.put({'event': 'run_failed', 'error': f"{type(e).__name__}: {e}"})
+
+    task = asyncio.ensure_future(execute())
+    try:
+        while True:
+            event = await queue.get()
+            yield format_sse(event)
+            if event['event'] in ('run_finished', 'run_failed'):
+                break
+    finally:
+        if not task.done():
+            task.cancel()
@@ -0,0 +1,71 @@
+"""
+Compiled text node templates.
+
+A text node's template is parsed once into a RenderPlan: the static segments
+between `{{variable}}` placeholders and the variable name in each slot.
+Plans are cached by template text, so every run and every record reuses
+the same plan instead of re-running the regex. Rendering fills the slots and
+joins the parts once per record; render_batch does so for whole columns of
+records.
+
+A variable with no value renders as an empty string, as in the frontend.
+Variables that nothing feeds are a property of the template and the wiring,
+so they are reported when the pipeline is checked (`missing`, used by
+validation.py as `unconnected_variable` warnings), not while rendering.
+"""
+
+import re
+from functools import lru_cache
+from typing import Any, Collection, FrozenSet, List, Mapping, Sequence, Tuple
+
+# Same pattern as textNode.js uses to find its input handles
+TEMPLATE_VARIABLE = re.compile(r'\{\{(\s*\w+\s*)\}\}')
+
+# Cached plans; templates are short and pipelines have few distinct ones
+MAX_CACHED_PLANS = 4096
+
+
+class RenderPlan:
+    """Static segments interleaved with variable slots, for one template"""
+
+    __slots__ = ('template', 'segments', 'slots', 'variables', '_format')
+
+    def __init__(self, template: str):
+        parts = TEMPLATE_VARIABLE.split(template)
+        self.template = template
+        # len(segments) == len(slots) + 1
+        self.segments: Tuple[str, ...] = tuple(parts[0::2])
+        self.slots: Tuple[str, ...] = tuple(name.strip() for name in parts[1::2])
+        self.variables: FrozenSet[str] = frozenset(self.slots)
+        # The segments as one str.format pattern, so a render is a single C-level join
+        self._format = '{}'.join(segment.replace('{', '{{').replace('}', '}}') for segment in self.segments)
+
+    def missing(self, available: Collection[str]) -> List[str]:
+        """Variables of the template not in `available`, in first-use order"""
+        return [name for name in dict.fromkeys(self.slots) if name not in available]
+
+    def render(self, values: Mapping[str, Any]) -> str:
+        return self._format.format(*[values.get(name, '') for name in self.slots])
+
+    def render_batch(self, columns: Mapping[str, Any], num_rows: int) -> List[str]:
+        """
+        Render `num_rows` records given as columns: each slot's value is a
+        sequence of `num_rows` values, or a single value used for every row
+        """
+        fill = self._format.format
+        slot_columns = []
+        for name in self.slots:
+            column = columns.get(name, '')
+            slot_columns.append(column if _is_column(column) else [column] * num_rows)
+        if not slot_columns:
+            return [self._format.format()] * num_rows
+        return [fill(*row) for row in zip(*slot_columns)]
+
+
+def _is_column(value: Any) -> bool:
+    return (isinstance(value, Sequence) and not isinstance(value, str)) or hasattr(value, '__array__')
+
+
+@lru_cache(maxsize=MAX_CACHED_PLANS)
+def compile_template(template: str) -> RenderPlan:
+    return RenderPlan(template)
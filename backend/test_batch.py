@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Tests for batch validation (batch.py and POST /pipelines/parse/batch)
+Runs in-process through FastAPI's TestClient, no backend server required
+"""
+
+import asyncio
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+from batch import BatchValidator, split_batch_body
+from main import app, batch_validator
+from test_dag_validation import create_edge, create_node
+
+
+def linear(n: int):
+    nodes = [create_node(f"n{i}", "transform") for i in range(n)]
+    edges = [create_edge(f"e{i}", f"n{i}", f"n{i + 1}") for i in range(n - 1)]
+    return {"nodes": nodes, "edges": edges}
+
+
+def cyclic():
+    pipeline = linear(3)
+    pipeline["edges"].append(create_edge("back", "n2", "n0"))
+    return pipeline
+
+
+@pytest.fixture(scope="module")
+def client():
+    with TestClient(app) as client:
+        yield client
+
+
+class TestSplitBatchBody:
+    """Request body formats"""
+
+    def test_json_array_and_object(self):
+        for body in (b'[{"a": 1}, [2]]', b'{"pipelines": [{"a": 1}, [2]]}'):
+            assert [json.loads(item) for item in split_batch_body(body)] == [{"a": 1}, [2]]
+
+    def test_ndjson_lines_stay_raw(self):
+        assert split_batch_body(b'{"a": 1}\n\nnot json\n', "application/x-ndjson") == [b'{"a": 1}', b"not json"]
+        # Only newlines end a line; other line separators may sit inside strings
+        assert split_batch_body('{"a": "x\u2028y"}\n'.encode(), "application/x-ndjson") == ['{"a": "x\u2028y"}'.encode()]
+
+    def test_split_on_the_pool(self):
+        validator = BatchValidator(workers=1)
+        try:
+            assert asyncio.run(validator.split(b'[{"a": 1}]')) == [b'{"a":1}']
+            with pytest.raises(ValueError):
+                asyncio.run(validator.split(b'{oops'))
+        finally:
+            validator.shutdown()
+
+    def test_rejects_non_list(self):
+        with pytest.raises(ValueError):
+            split_batch_body(b'{"nodes": []}')
+
+
+class TestBatchEndpoint:
+    """Ordering and per-item error isolation"""
+
+    def test_results_in_request_order(self, client):
+        pipelines = [linear(i + 1) if i % 3 else cyclic() for i in range(40)]
+        response = client.post("/pipelines/parse/batch", json=pipelines)
+        assert response.status_code == 200
+
+        body = response.json()
+        assert body["num_pipelines"] == 40
+        assert body["num_errors"] == 0
+        for i, result in enumerate(body["results"]):
+            assert result["index"] == i
+            assert result["is_dag"] == (i % 3 != 0)
+            assert result["num_nodes"] == (3 if i % 3 == 0 else i + 1)
+
+    def test_bad_items_do_not_fail_batch(self, client):
+        lines = [json.dumps(linear(2)), "{not json", json.dumps({"nodes": [{"id": "x"}], "edges": []}), json.dumps(cyclic())]
+        response = client.post(
+            "/pipelines/parse/batch?detailed=true",
+            content="\n".join(lines),
+            headers={"content-type": "application/x-ndjson"},
+        )
+        assert response.status_code == 200
+
+        results = response.json()["results"]
+        assert results[0]["is_dag"] == True
+        assert results[0]["topological_order"] == ["n0", "n1"]
+        assert "JSONDecodeError" in results[1]["error"]
+        assert "ValidationError" in results[2]["error"]
+        assert results[3]["cycles"][0]["edges"]
+        assert response.json()["num_errors"] == 2
+
+    def test_malformed_body_is_400(self, client):
+        response = client.post("/pipelines/parse/batch", content=b"{oops")
+        assert response.status_code == 400
+
+    def test_empty_batch(self, client):
+        response = client.post("/pipelines/parse/batch", json=[])
+        assert response.json() == {"num_pipelines": 0, "num_errors": 0, "results": []}
+
+
+def test_chunking_covers_every_item():
+    from main import validate_payload
+
+    validator = BatchValidator(workers=2)
+    try:
+        items = [linear(1) for _ in range(17)]
+        results = asyncio.run(validator.validate(validate_payload, items, False))
+    finally:
+        validator.shutdown()
+    assert [result["index"] for result in results] == list(range(17))
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Smoke tests for the load and soak harness in bench_load.py
+Runs in-process through httpx's ASGI transport, no backend server required
+"""
+
+import asyncio
+import gzip
+import json
+import os
+
+import httpx
+import pytest
+
+from bench_load import (build_scenarios, check, load_examples, memory_growth, parse_js_literal, parse_scales,
+                        process_tree_rss, run_load, scale_pipeline)
+from graph import is_acyclic
+from main import app
+
+
+def acyclic(pipeline):
+    node_ids = [node["id"] for node in pipeline["nodes"]]
+    return is_acyclic(node_ids, [(edge["source"], edge["target"]) for edge in pipeline["edges"]])
+
+
+class TestPayloads:
+    """Examples from the frontend, scaled up"""
+
+    def test_js_literals(self):
+        text = """{
+            // a comment
+            id: 'it\\'s', n: -1.5e2, ok: true, none: null,
+            list: [1, "two", { url: 'https://example.com/a' },],
+        }"""
+        assert parse_js_literal(text) == {
+            "id": "it's", "n": -150.0, "ok": True, "none": None, "list": [1, "two", {"url": "https://example.com/a"}],
+        }
+
+    def test_examples_load_in_both_categories(self):
+        examples = load_examples()
+        assert len(examples["valid"]) >= 1 and len(examples["invalid"]) >= 1
+        for category, items in examples.items():
+            for example in items:
+                assert acyclic(example) == (category == "valid")
+
+    def test_scaling_keeps_ids_unique_and_cycles(self):
+        for category, items in load_examples().items():
+            for example in items:
+                scaled = scale_pipeline(example, 5)
+                ids = [node["id"] for node in scaled["nodes"]]
+                assert len(ids) == len(set(ids)) == 5 * len(example["nodes"])
+                assert len(scaled["edges"]) == 5 * len(example["edges"])
+                assert acyclic(scaled) == (category == "valid")
+                for edge in scaled["edges"]:
+                    assert edge["sourceHandle"] is None or edge["sourceHandle"].startswith(edge["source"])
+
+    def test_scales_and_large_bodies(self):
+        assert parse_scales("1:60, 100:40") == {1: 60.0, 100: 40.0}
+        with pytest.raises(ValueError):
+            parse_scales("0:1")
+        scenarios, weights = build_scenarios(load_examples(), {1: 3, 1000: 1})
+        assert sum(weights) == pytest.approx(4)
+        large = max(scenarios, key=lambda scenario: scenario.num_nodes)
+        body, headers = large.encode(b"k", compress=True)
+        assert headers["Content-Encoding"] == "gzip"
+        assert json.loads(gzip.decompress(body))["edges"][0]["id"] == "k"
+
+
+class TestRunLoad:
+    """Reports and thresholds"""
+
+    def run(self, **options):
+        async def go():
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                scenarios, weights = build_scenarios(load_examples(), {1: 3, 10: 1})
+                return await run_load(client, client, scenarios, weights, log=lambda line: None, **options)
+        return json.loads(json.dumps(asyncio.run(go())))
+
+    def test_closed_loop_report(self):
+        report = self.run(duration=1.0, concurrency=2, window=0.5, repeat_ratio=0.5, probe_interval=0.05,
+                          rss=lambda: process_tree_rss(os.getpid()))
+        assert report["requests"] > 0
+        assert report["errors"] == report["mismatches"] == report["dropped"] == 0
+        assert report["latency_ms"]["p50"] <= report["latency_ms"]["p99"] <= report["latency_ms"]["max"]
+        assert set(report["by_scale"]) == {"1", "10"}
+        assert report["probe_ms"]["max"] is not None
+        assert len(report["windows"]) >= 2 and report["memory"]["peak_mib"] > 0
+        assert check(report) == []
+
+    def test_open_loop_keeps_the_rate(self):
+        report = self.run(duration=1.0, rate=40, concurrency=4, window=1.0, probe_interval=0)
+        assert 30 <= report["requests"] <= 42
+        assert report["probe_ms"]["max"] is None and report["memory"] is None
+
+    def test_errors_and_thresholds(self):
+        report = self.run(duration=0.3, concurrency=2, window=1.0, path="/missing")
+        assert report["rejected"] == report["requests"] > 0
+        report["errors"], report["error_rate"], report["mismatches"] = 5, 0.05, 1
+        report["memory"] = memory_growth([
+            {"elapsed_s": t, "rss_mib": rss} for t, rss in [(10, 100), (20, 120), (30, 180), (40, 240)]
+        ])
+        assert report["memory"]["growth_mib"] == 120
+        assert report["memory"]["growth_mib_per_hour"] == pytest.approx(6 * 3600)
+        failures = check(report, max_p99_ms=0.0, max_error_rate=0.01, max_rss_growth_mib=100)
+        assert len(failures) == 4
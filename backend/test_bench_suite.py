@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Smoke tests for the benchmark suite in bench_suite.py
+Runs in-process, no backend server required
+"""
+
+import json
+
+import pytest
+
+from bench_suite import GRAPHS, compare, make_graph, percentile, run_suite
+from graph import is_acyclic
+
+
+class TestGenerators:
+    """Synthetic graph shapes"""
+
+    @pytest.mark.parametrize("shape", GRAPHS)
+    def test_sizes_and_acyclicity(self, shape):
+        node_ids, edges = make_graph(shape, 1000)
+        assert 990 <= len(edges) <= 1100
+        assert is_acyclic(node_ids, edges) == (shape != "cyclic")
+
+    def test_percentile(self):
+        values = [float(i) for i in range(1, 101)]
+        assert percentile(values, 50) == 50.0
+        assert percentile(values, 99) == 99.0
+        assert percentile([3.0], 90) == 3.0
+
+
+class TestRunSuite:
+    """Report format and baseline comparison"""
+
+    def test_report_is_json_with_every_target(self):
+        report = run_suite([10], graphs=["chain", "cyclic"], repeat=2, log=lambda line: None)
+        report = json.loads(json.dumps(report))
+        assert report["environment"]["python"]
+        assert len(report["results"]) == 8
+        result = report["results"][0]
+        assert result["latency_ms"]["p50"] <= result["latency_ms"]["p99"]
+        assert result["throughput_per_s"] > 0
+        assert result["peak_mib"] >= 0
+
+    def test_http_targets_respect_size_limit(self):
+        report = run_suite([10], graphs=["chain"], repeat=1, max_http_edges=5, log=lambda line: None)
+        assert [result["target"] for result in report["results"]] == ["analyze", "parse"]
+
+    def test_compare_flags_regressions(self):
+        def report(p50):
+            return {"results": [{"graph": "chain", "size": 10, "edges": 10, "target": "http", "latency_ms": {"p50": p50}}]}
+
+        assert compare(report(1.1), report(1.0), threshold=1.2, log=lambda line: None) == []
+        regressions = compare(report(2.0), report(1.0), threshold=1.2, log=lambda line: None)
+        assert regressions[0]["ratio"] == 2.0
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the validation result cache in cache.py
+Runs in-process, no backend server required
+"""
+
+import time
+
+from cache import ResultCache, topology_hash
+from main import Pipeline, pipeline_hash
+
+
+def make_pipeline(x: float = 0, text: str = "{{input}}", input_name: str = "input") -> Pipeline:
+    return Pipeline(
+        nodes=[
+            {"id": "input-1", "type": "customInput", "position": {"x": x, "y": 0}, "data": {"inputName": input_name}},
+            {"id": "text-1", "type": "text", "position": {"x": 200, "y": 0}, "data": {"text": text}},
+        ],
+        edges=[
+            {"id": "e1", "source": "input-1", "target": "text-1", "sourceHandle": "input-1-value"},
+        ],
+    )
+
+
+class TestTopologyHash:
+    """Canonical hashing of pipeline topology"""
+
+    def test_position_and_data_are_ignored(self):
+        assert pipeline_hash(make_pipeline(x=0)) == pipeline_hash(make_pipeline(x=500, input_name="changed"))
+
+    def test_text_template_changes_hash(self):
+        """A text node's template defines its input handles"""
+        assert pipeline_hash(make_pipeline()) != pipeline_hash(make_pipeline(text="{{other}}"))
+
+    def test_edge_endpoints_change_hash(self):
+        a = topology_hash(["a", "b"], ["t", "t"], ["e1"], ["a"], ["b"], [None], [None])
+        b = topology_hash(["a", "b"], ["t", "t"], ["e1"], ["b"], ["a"], [None], [None])
+        assert a != b
+
+    def test_handles_change_hash(self):
+        a = topology_hash(["a"], ["t"], ["e1"], ["a"], ["a"], ["a-out"], [None])
+        b = topology_hash(["a"], ["t"], ["e1"], ["a"], ["a"], ["a-other"], [None])
+        assert a != b
+
+
+class TestResultCache:
+    """LRU, TTL and size bounds"""
+
+    def test_hit_and_miss_counters(self):
+        cache = ResultCache()
+        assert cache.get("k") is None
+        cache.put("k", {"is_dag": True})
+        assert cache.get("k") == {"is_dag": True}
+        stats = cache.stats()
+        assert stats["hits"] == 1
+        assert stats["misses"] == 1
+        assert stats["hit_rate"] == 0.5
+
+    def test_lru_eviction_by_entries(self):
+        cache = ResultCache(max_entries=2)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        cache.get("a")  # "b" is now least recently used
+        cache.put("c", 3)
+        assert cache.get("b") is None
+        assert cache.get("a") == 1
+        assert cache.get("c") == 3
+        assert cache.stats()["evictions"] == 1
+
+    def test_eviction_by_bytes(self):
+        cache = ResultCache(max_bytes=100)
+        cache.put("a", "x" * 60)
+        cache.put("b", "y" * 60)
+        assert cache.get("a") is None
+        assert cache.get("b") == "y" * 60
+        assert cache.stats()["bytes"] <= 100
+
+    def test_oversized_value_is_not_cached(self):
+        cache = ResultCache(max_bytes=10)
+        assert cache.put("a", "x" * 100) == False
+        assert cache.put("b", "x") == True
+        assert cache.get("a") is None
+        assert cache.stats()["entries"] == 1
+
+    def test_ttl_expiry(self):
+        cache = ResultCache(ttl=0.01)
+        cache.put("a", 1)
+        time.sleep(0.02)
+        assert cache.get("a") is None
+        assert cache.stats()["entries"] == 0
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the columnar math, filter and transform kernels in columnar.py
+Runs in-process, no backend server required
+"""
+
+import asyncio
+import json
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from columnar import apply_filter, apply_transform, as_array, json_default, math_kernel, to_python
+from executor import PipelineExecutor
+from main import app
+from test_executor import edge, node
+
+
+def run(executor, inputs=None):
+    return asyncio.run(executor.run(inputs))
+
+
+class TestKernels:
+    """Batches give the same rows the scalar runtimes would"""
+
+    def test_math_broadcasts_columns_and_scalars(self):
+        add = math_kernel("add")
+        assert add([1, 2, 3], 10).tolist() == [11.0, 12.0, 13.0]
+        assert math_kernel("power")([1, 2, 3], [2, 2, 2]).tolist() == [1.0, 4.0, 9.0]
+        assert add([None, "", "2"], 1).tolist() == [1.0, 1.0, 3.0]
+        assert math_kernel("add") is add
+
+    def test_math_division_by_zero_raises(self):
+        with pytest.raises(FloatingPointError):
+            math_kernel("divide")([1, 2], [1, 0])
+
+    def test_filter_splits_rows_with_a_mask(self):
+        outputs = apply_filter("startsWith", "a", ["apple", "banana", "avocado", None])
+        assert outputs["passed"].tolist() == ["apple", "avocado"]
+        assert outputs["failed"].tolist() == ["banana", None]
+        assert list(apply_filter("regex", r"\d", ["a1", "b2"])) == ["passed"]
+        assert list(apply_filter("equals", "x", ["a", "b"])) == ["failed"]
+
+    def test_filter_keeps_original_row_values(self):
+        outputs = apply_filter("contains", "1", [1, "a", 10, 2.5])
+        assert outputs["passed"].tolist() == [1, 10]
+        assert outputs["failed"].tolist() == ["a", 2.5]
+
+    def test_transforms_match_scalar_results(self):
+        rows = ["  Hello ", "World", ""]
+        assert apply_transform("uppercase", rows).tolist() == [row.upper() for row in rows]
+        assert apply_transform("trim", rows).tolist() == [row.strip() for row in rows]
+        assert apply_transform("reverse", rows).tolist() == [row[::-1] for row in rows]
+        assert apply_transform("length", rows).tolist() == [len(row) for row in rows]
+
+    def test_nested_rows_stay_objects(self):
+        column = as_array([[1, 2], [3, 4]])
+        assert column.shape == (2,)
+        assert column[0] == [1, 2]
+
+    def test_results_convert_back_to_python(self):
+        result = to_python({"rows": np.array([1.5, 2.0]), "count": np.int64(2), "nested": [np.array(["a"])]})
+        assert result == {"rows": [1.5, 2.0], "count": 2, "nested": [["a"]]}
+        assert json.dumps(np.array([1, 2]), default=json_default) == "[1, 2]"
+
+
+class TestBatchPipelines:
+    """Record batches flowing through a run"""
+
+    def batch_pipeline(self):
+        nodes = [
+            node("input-1", "customInput", inputName="prices"),
+            node("input-2", "customInput", inputName="names"),
+            node("math-1", "math", operation="multiply"),
+            node("transform-1", "transform", transformation="uppercase"),
+            node("filter-1", "filter", condition="endsWith", value="X"),
+            node("output-1", "customOutput", outputName="product"),
+            node("output-2", "customOutput", outputName="matched"),
+        ]
+        edges = [
+            edge("input-1", "value", "math-1", "a"),
+            edge("math-1", "result", "output-1", "value"),
+            edge("input-2", "value", "transform-1", "input"),
+            edge("transform-1", "output", "filter-1", "input"),
+            edge("filter-1", "passed", "output-2", "value"),
+        ]
+        return nodes, edges
+
+    def test_math_and_filter_chains_over_columns(self):
+        nodes, edges = self.batch_pipeline()
+        edges.append(edge("input-1", "value", "math-1", "b"))
+        result = run(PipelineExecutor(nodes, edges), {"prices": [1, 2, 3], "names": ["ax", "b", "cx"]})
+        assert result["status"] == "completed"
+        assert to_python(result["outputs"]) == {"product": [1.0, 4.0, 9.0], "matched": ["AX", "CX"]}
+
+    def test_empty_filter_side_skips_branch(self):
+        nodes, edges = self.batch_pipeline()
+        result = run(PipelineExecutor(nodes, edges), {"prices": [1], "names": ["a", "b"]})
+        assert result["nodes"]["output-2"]["status"] == "skipped"
+
+    def test_run_endpoint_returns_json_lists(self):
+        nodes, edges = self.batch_pipeline()
+        body = {
+            "nodes": [n.model_dump() for n in nodes],
+            "edges": [e.model_dump() for e in edges],
+            "inputs": {"prices": [1, 2], "names": ["x"]},
+            "cache": False,
+        }
+        response = TestClient(app).post("/pipelines/run", json=body)
+        assert response.status_code == 200
+        assert response.json()["outputs"] == {"product": [0.0, 0.0], "matched": ["X"]}
@@ -276,6 +276,43 @@ class TestDAGValidation:
         assert result["num_edges"] == 4
         assert result["is_dag"] == False
 
+    def test_detailed_analysis(self):
+        """Test ?detailed=true returns order, levels and offending cycles"""
+        nodes = [
+            create_node("input-1", "customInput", 0, 0),
+            create_node("math-1", "math", 200, -50),
+            create_node("filter-1", "filter", 200, 50),
+            create_node("output-1", "customOutput", 400, 0)
+        ]
+        
+        edges = [
+            create_edge("e1", "input-1", "math-1"),
+            create_edge("e2", "input-1", "filter-1"),
+            create_edge("e3", "math-1", "output-1"),
+            create_edge("e4", "filter-1", "output-1")
+        ]
+        
+        response = requests.post(f"{BASE_URL}/pipelines/parse?detailed=true", json={"nodes": nodes, "edges": edges})
+        assert response.status_code == 200
+        
+        result = response.json()
+        assert result["is_dag"] == True
+        assert result["topological_order"][0] == "input-1"
+        assert result["levels"][0] == ["input-1"]
+        assert sorted(result["levels"][1]) == ["filter-1", "math-1"]
+        assert result["critical_path_length"] == 3
+        assert result["cycles"] == []
+        
+        edges.append(create_edge("e5", "output-1", "input-1"))  # Creates cycle
+        response = requests.post(f"{BASE_URL}/pipelines/parse?detailed=true", json={"nodes": nodes, "edges": edges})
+        assert response.status_code == 200
+        
+        result = response.json()
+        assert result["is_dag"] == False
+        assert result["topological_order"] is None
+        assert len(result["cycles"]) == 1
+        assert "e5" in result["cycles"][0]["edges"]
+
 def run_manual_tests():
     """Run tests manually without pytest"""
     test_instance = TestDAGValidation()
@@ -290,7 +327,8 @@ def run_manual_tests():
         ("Self Loop (Invalid)", test_instance.test_self_loop_invalid),
         ("Complex Cycle (Invalid)", test_instance.test_complex_cycle_invalid),
         ("Disconnected Components (Valid)", test_instance.test_disconnected_components_valid),
-        ("Multiple Cycles (Invalid)", test_instance.test_multiple_cycles_invalid)
+        ("Multiple Cycles (Invalid)", test_instance.test_multiple_cycles_invalid),
+        ("Detailed Analysis", test_instance.test_detailed_analysis)
     ]
     
     print("Running DAG Validation Tests...")
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Unit tests for chunked streaming execution in dataflow.py
+Runs in-process, no backend server required
+"""
+
+import asyncio
+import tracemalloc
+
+from fastapi.testclient import TestClient
+
+from dataflow import run_chunked
+from executor import PipelineExecutor
+from main import app
+from test_executor import edge, node
+from test_streaming import parse_frame
+
+
+def run(executor, inputs=None, **options):
+    return asyncio.run(run_chunked(executor, inputs, **options))
+
+
+def etl_graph():
+    """input -> transform -> filter(passed) -> text -> output"""
+    nodes = [
+        node("input-1", "customInput", inputName="rows"),
+        node("transform-1", "transform", transformation="uppercase"),
+        node("filter-1", "filter", condition="contains", value="A"),
+        node("text-1", "text", text="<{{x}}>"),
+        node("output-1", "customOutput", outputName="out"),
+    ]
+    edges = [
+        edge("input-1", "value", "transform-1", "input"),
+        edge("transform-1", "output", "filter-1", "input"),
+        edge("filter-1", "passed", "text-1", "x"),
+        edge("text-1", "output", "output-1", "value"),
+    ]
+    return nodes, edges
+
+
+def etl_pipeline():
+    return PipelineExecutor(*etl_graph())
+
+
+class TestRunChunked:
+    """Chunked operators give the same rows as a whole-batch run"""
+
+    def test_rows_flow_through_chunks(self):
+        result = run(etl_pipeline(), {"rows": ["abc", "xyz", "bar", "a"]}, chunk_size=2)
+        assert result["status"] == "completed"
+        assert result["outputs"] == {"out": ["<ABC>", "<BAR>", "<A>"]}
+        assert result["nodes"]["transform-1"]["chunks"] == 2
+        assert result["nodes"]["text-1"]["rows_in"] == 3
+
+    def test_generator_and_async_iterator_sources(self):
+        async def rows():
+            for i in range(5):
+                yield f"a{i}"
+
+        expected = {"out": [f"<A{i}>" for i in range(5)]}
+        assert run(etl_pipeline(), {"rows": (f"a{i}" for i in range(5))}, chunk_size=2)["outputs"] == expected
+        assert run(etl_pipeline(), {"rows": rows()}, chunk_size=3)["outputs"] == expected
+
+    def test_streams_are_zipped_and_constants_broadcast(self):
+        nodes = [
+            node("input-1", "customInput", inputName="a"),
+            node("input-2", "customInput", inputName="b"),
+            node("input-3", "customInput", inputName="scale"),
+            node("math-1", "math", operation="add"),
+            node("math-2", "math", operation="multiply"),
+            node("output-1", "customOutput", outputName="out"),
+        ]
+        edges = [
+            edge("input-1", "value", "math-1", "a"),
+            edge("input-2", "value", "math-1", "b"),
+            edge("math-1", "result", "math-2", "a"),
+            edge("input-3", "value", "math-2", "b"),
+            edge("math-2", "result", "output-1", "value"),
+        ]
+        executor = PipelineExecutor(nodes, edges)
+        # Different chunk boundaries on each side are re-aligned
+        inputs = {"a": iter(range(7)), "b": list(range(7)), "scale": 10}
+        result = run(executor, inputs, chunk_size=3)
+        assert result["outputs"] == {"out": [i * 20.0 for i in range(7)]}
+
+        mismatched = run(executor, {"a": [1, 2, 3], "b": [1, 2], "scale": 1})
+        assert mismatched["status"] == "failed"
+        assert "different lengths" in mismatched["error"]
+
+    def test_constant_only_pipeline_matches_executor(self):
+        executor = etl_pipeline()
+        assert run(executor, {"rows": "abc"})["outputs"] == asyncio.run(executor.run({"rows": "abc"}))["outputs"]
+        skipped = run(executor, {"rows": "xyz"})
+        assert skipped["outputs"] == {}
+        assert skipped["nodes"]["output-1"]["status"] == "skipped"
+
+    def test_downstream_starts_before_source_is_exhausted(self):
+        seen = []
+
+        def rows():
+            for i in range(100):
+                seen.append(i)
+                yield "a"
+
+        first_chunk_at = []
+
+        async def on_event(event):
+            if event["event"] == "output_chunk" and not first_chunk_at:
+                first_chunk_at.append(len(seen))
+
+        run(etl_pipeline(), {"rows": rows()}, chunk_size=10, max_pending=1, on_event=on_event)
+        assert first_chunk_at[0] < 100
+
+    def test_memory_does_not_grow_with_input_size(self):
+        executor = etl_pipeline()
+
+        async def discard(event):
+            pass
+
+        def peak(num_rows):
+            tracemalloc.start()
+            run(executor, {"rows": (f"a{i}" for i in range(num_rows))}, chunk_size=500, on_event=discard)
+            _, peak_bytes = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            return peak_bytes
+
+        small, large = peak(5_000), peak(50_000)
+        assert large < small * 2
+
+
+class TestChunkedEndpoint:
+    """SSE transport for chunked runs"""
+
+    def test_output_chunks_then_run_finished(self):
+        nodes, edges = etl_graph()
+        body = {
+            "nodes": [n.model_dump() for n in nodes],
+            "edges": [e.model_dump() for e in edges],
+            "inputs": {"rows": ["a", "b", "ab", "ba"]},
+        }
+        response = TestClient(app).post("/pipelines/run/chunked?chunk_size=2", json=body)
+        assert response.status_code == 200
+        frames = [parse_frame(frame) for frame in response.text.strip().split("\n\n")]
+        assert [name for name, _ in frames] == ["output_chunk", "output_chunk", "run_finished"]
+        assert [data["rows"] for _, data in frames[:2]] == [["<A>"], ["<AB>", "<BA>"]]
+        assert frames[-1][1]["status"] == "completed"
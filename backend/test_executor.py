@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the asyncio pipeline execution engine in executor.py
+Runs in-process, no backend server required
+"""
+
+import asyncio
+
+import pytest
+
+from executor import APIClient, EchoLLMProvider, PipelineExecutor
+from main import Edge, Node
+
+
+def node(node_id: str, node_type: str, **data) -> Node:
+    return Node(id=node_id, type=node_type, position={"x": 0, "y": 0}, data={"nodeType": node_type, **data})
+
+
+def edge(source: str, source_handle: str, target: str, target_handle: str) -> Edge:
+    return Edge(
+        id=f"{source}-{target}-{target_handle}",
+        source=source,
+        target=target,
+        sourceHandle=f"{source}-{source_handle}",
+        targetHandle=f"{target}-{target_handle}",
+    )
+
+
+def run(executor: PipelineExecutor, inputs=None):
+    return asyncio.run(executor.run(inputs))
+
+
+class TestPipelineExecutor:
+    """Scheduling, data flow and node runtimes"""
+
+    def test_text_llm_output_chain(self):
+        nodes = [
+            node("input-1", "customInput", inputName="query"),
+            node("text-1", "text", text="Q: {{question}}"),
+            node("llm-1", "llm"),
+            node("output-1", "customOutput", outputName="answer"),
+        ]
+        edges = [
+            edge("input-1", "value", "text-1", "question"),
+            edge("text-1", "output", "llm-1", "prompt"),
+            edge("llm-1", "response", "output-1", "value"),
+        ]
+        result = run(PipelineExecutor(nodes, edges), {"query": "why?"})
+        assert result["status"] == "completed"
+        assert result["outputs"] == {"answer": "[echo] Q: why?"}
+        assert list(result["nodes"]) == ["input-1", "text-1", "llm-1", "output-1"]
+
+    def test_independent_delays_run_concurrently(self):
+        nodes = [node("input-1", "customInput", inputName="x")]
+        edges = []
+        for i in range(4):
+            nodes.append(node(f"delay-{i}", "delay", duration=100, unit="ms"))
+            nodes.append(node(f"output-{i}", "customOutput", outputName=f"out{i}"))
+            edges.append(edge("input-1", "value", f"delay-{i}", "input"))
+            edges.append(edge(f"delay-{i}", "output", f"output-{i}", "value"))
+        result = run(PipelineExecutor(nodes, edges), {"x": 1})
+        assert result["outputs"] == {f"out{i}": 1 for i in range(4)}
+        assert result["timing"]["total_ms"] < 300
+        assert result["timing"]["node_time_ms"] >= 400
+        assert result["timing"]["critical_path_ms"] >= 100
+
+    def test_filter_skips_unmatched_branch(self):
+        nodes = [
+            node("input-1", "customInput", inputName="x"),
+            node("filter-1", "filter", condition="startsWith", value="ok"),
+            node("transform-1", "transform", transformation="uppercase"),
+            node("output-1", "customOutput", outputName="passed"),
+            node("output-2", "customOutput", outputName="failed"),
+        ]
+        edges = [
+            edge("input-1", "value", "filter-1", "input"),
+            edge("filter-1", "passed", "transform-1", "input"),
+            edge("transform-1", "output", "output-1", "value"),
+            edge("filter-1", "failed", "output-2", "value"),
+        ]
+        result = run(PipelineExecutor(nodes, edges), {"x": "ok then"})
+        assert result["outputs"] == {"passed": "OK THEN"}
+        assert result["nodes"]["output-2"]["status"] == "skipped"
+
+    def test_math_and_failed_node(self):
+        nodes = [
+            node("input-1", "customInput", inputName="a"),
+            node("input-2", "customInput", inputName="b"),
+            node("math-1", "math", operation="divide"),
+            node("output-1", "customOutput", outputName="q"),
+        ]
+        edges = [
+            edge("input-1", "value", "math-1", "a"),
+            edge("input-2", "value", "math-1", "b"),
+            edge("math-1", "result", "output-1", "value"),
+        ]
+        executor = PipelineExecutor(nodes, edges)
+        assert run(executor, {"a": 6, "b": 4})["outputs"] == {"q": 1.5}
+
+        result = run(executor, {"a": 1, "b": 0})
+        assert result["status"] == "failed"
+        assert "ZeroDivisionError" in result["nodes"]["math-1"]["error"]
+        assert result["nodes"]["output-1"]["status"] == "skipped"
+
+    def test_api_errors_go_to_error_handle(self):
+        class FailingAPI(APIClient):
+            async def request(self, method, url, headers, body=None, params=None):
+                raise ConnectionError("unreachable")
+
+        nodes = [node("api-1", "api", url="http://example.invalid"), node("output-1", "customOutput", outputName="err")]
+        edges = [edge("api-1", "error", "output-1", "value")]
+        result = run(PipelineExecutor(nodes, edges, api=FailingAPI()))
+        assert result["outputs"] == {"err": "unreachable"}
+
+    def test_llm_provider_is_pluggable(self):
+        nodes = [node("llm-1", "llm"), node("output-1", "customOutput", outputName="r")]
+        edges = [edge("llm-1", "response", "output-1", "value")]
+        result = run(PipelineExecutor(nodes, edges, llm=EchoLLMProvider(latency=0.01)))
+        assert result["outputs"] == {"r": "[echo] "}
+        assert result["nodes"]["llm-1"]["duration_ms"] >= 10
+
+    def test_cycle_and_unknown_type_are_rejected(self):
+        with pytest.raises(ValueError, match="cycle"):
+            PipelineExecutor([node("a", "transform"), node("b", "transform")],
+                             [edge("a", "output", "b", "input"), edge("b", "output", "a", "input")])
+        with pytest.raises(ValueError, match="No runtime"):
+            PipelineExecutor([node("x", "mystery")], [])
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Tests for lean request decoding (fastpath.py and /pipelines/parse?mode=lean)
+Runs in-process through FastAPI's TestClient, no backend server required
+"""
+
+import pytest
+from fastapi.testclient import TestClient
+
+from fastpath import decode_topology
+from main import Pipeline, app, pipeline_hash, validation_cache
+from test_dag_validation import create_edge, create_node
+
+
+def sample_pipeline():
+    nodes = [
+        create_node("input-1", "customInput", 0, 0),
+        create_node("llm-1", "llm", 200, 0),
+        create_node("output-1", "customOutput", 400, 0),
+    ]
+    edges = [
+        create_edge("e1", "input-1", "llm-1", "input-1-value", "llm-1-prompt"),
+        create_edge("e2", "llm-1", "output-1"),
+    ]
+    return {"nodes": nodes, "edges": edges}
+
+
+@pytest.fixture
+def client():
+    validation_cache.clear()
+    return TestClient(app)
+
+
+class TestDecodeTopology:
+    """Field extraction without Pydantic"""
+
+    def test_extracts_topology_columns(self):
+        topology = decode_topology(sample_pipeline())
+        assert topology.node_ids == ["input-1", "llm-1", "output-1"]
+        assert topology.node_types == ["customInput", "llm", "customOutput"]
+        assert topology.edge_ids == ["e1", "e2"]
+        assert list(topology.edge_pairs()) == [("input-1", "llm-1"), ("llm-1", "output-1")]
+        assert topology.source_handles == ["input-1-value", None]
+
+    def test_hash_matches_strict_models(self):
+        payload = sample_pipeline()
+        assert decode_topology(payload).hash() == pipeline_hash(Pipeline.model_validate(payload))
+
+    def test_ignores_position_and_data(self):
+        payload = {"nodes": [{"id": "a", "type": "text", "position": "anything"}], "edges": []}
+        assert decode_topology(payload).node_ids == ["a"]
+
+    @pytest.mark.parametrize("payload", [
+        [],
+        {"nodes": []},
+        {"nodes": [{"id": 1, "type": "text"}], "edges": []},
+        {"nodes": ["a"], "edges": []},
+        {"nodes": [], "edges": [{"id": "e1", "source": "a"}]},
+        {"nodes": [], "edges": [{"id": "e1", "source": "a", "target": "b", "sourceHandle": 5}]},
+        {"nodes": [], "edges": [{"id": "e1", "source": "a", "target": "b", "targetHandle": {}}]},
+    ])
+    def test_rejects_malformed_topology(self, payload):
+        with pytest.raises(ValueError):
+            decode_topology(payload)
+
+
+class TestParseModes:
+    """Strict and lean modes give the same answers"""
+
+    @pytest.mark.parametrize("detailed", [False, True])
+    def test_lean_matches_strict(self, client, detailed):
+        payload = sample_pipeline()
+        payload["edges"].append(create_edge("e3", "output-1", "input-1"))
+        strict = client.post(f"/pipelines/parse?detailed={str(detailed).lower()}", json=payload)
+        validation_cache.clear()
+        lean = client.post(f"/pipelines/parse?mode=lean&detailed={str(detailed).lower()}", json=payload)
+        assert strict.status_code == lean.status_code == 200
+        assert strict.json() == lean.json()
+
+    def test_strict_still_validates_schema(self, client):
+        payload = sample_pipeline()
+        del payload["nodes"][0]["position"]
+        assert client.post("/pipelines/parse", json=payload).status_code == 422
+        assert client.post("/pipelines/parse?mode=lean", json=payload).status_code == 200
+
+    def test_invalid_json_is_422(self, client):
+        response = client.post("/pipelines/parse?mode=lean", content=b"{nope")
+        assert response.status_code == 422
+        assert response.json()["detail"][0]["type"] == "json_invalid"
+
+    def test_lean_schema_error_is_422(self, client):
+        response = client.post("/pipelines/parse?mode=lean", json={"nodes": [{"id": "a"}], "edges": []})
+        assert response.status_code == 422
+
+    @pytest.mark.parametrize("handle", [5, [1], {}])
+    def test_lean_rejects_handles_like_strict(self, client, handle):
+        payload = sample_pipeline()
+        payload["edges"][0]["sourceHandle"] = handle
+        assert client.post("/pipelines/parse", json=payload).status_code == 422
+        assert client.post("/pipelines/parse?mode=lean", json=payload).status_code == 422
+
+    def test_request_body_is_documented(self, client):
+        schema = client.get("/openapi.json").json()
+        body = schema["paths"]["/pipelines/parse"]["post"]["requestBody"]
+        assert body["content"]["application/json"]["schema"] == {"$ref": "#/components/schemas/Pipeline"}
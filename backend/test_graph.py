@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the iterative graph analysis in graph.py
+Runs in-process, no backend server required
+"""
+
+from graph import CompactGraph, bitset_indices, index_nodes, is_acyclic, analyze_graph
+
+
+class TestIsAcyclic:
+    """Cycle detection on plain node ID / edge tuples"""
+
+    def test_empty_graph(self):
+        assert is_acyclic([], []) == True
+
+    def test_linear_chain(self):
+        assert is_acyclic(["a", "b", "c"], [("a", "b"), ("b", "c")]) == True
+
+    def test_simple_cycle(self):
+        assert is_acyclic(["a", "b"], [("a", "b"), ("b", "a")]) == False
+
+    def test_self_loop(self):
+        assert is_acyclic(["a"], [("a", "a")]) == False
+
+    def test_edges_to_unknown_nodes_are_ignored(self):
+        assert is_acyclic(["a", "b"], [("a", "b"), ("b", "ghost"), ("ghost", "a")]) == True
+
+    def test_deep_chain_does_not_hit_recursion_limit(self):
+        """A 100k-node chain overflowed the old recursive DFS"""
+        node_ids = [f"n{i}" for i in range(100_000)]
+        edges = [(node_ids[i], node_ids[i + 1]) for i in range(len(node_ids) - 1)]
+        assert is_acyclic(node_ids, edges) == True
+        assert is_acyclic(node_ids, edges + [(node_ids[-1], node_ids[0])]) == False
+
+
+class TestCompactGraph:
+    """CSR layout and traversals over interned indices"""
+
+    def test_duplicate_ids_are_interned_once(self):
+        assert index_nodes(["a", "b", "a"]) == {"a": 0, "b": 1}
+
+    def test_csr_layout_and_edge_positions(self):
+        graph = CompactGraph.build(["a", "b", "c"], ["b", "a", "ghost", "a"], ["c", "c", "a", "b"])
+        assert graph.num_edges == 3
+        assert graph.offsets.tolist() == [0, 2, 3, 3]
+        assert graph.successors(0).tolist() == [2, 1]
+        # Slots map back to positions in the input edge list, skipping the dangling edge
+        assert graph.edge_index.tolist() == [1, 3, 0]
+        assert graph.indegree.tolist() == [0, 1, 2]
+
+    def test_transpose_reverses_edges(self):
+        graph = CompactGraph.from_pairs(["a", "b", "c"], [("a", "b"), ("a", "c"), ("b", "c")])
+        reverse = graph.transpose()
+        assert reverse.successors(2).tolist() == [0, 1]
+        assert reverse.successors(0).tolist() == []
+
+    def test_order_respects_edges(self):
+        graph = CompactGraph.from_pairs(["c", "b", "a"], [("a", "b"), ("b", "c"), ("a", "c")])
+        order = graph.topological_order()
+        position = {u: i for i, u in enumerate(order)}
+        index = graph.index
+        assert len(order) == 3
+        assert position[index["a"]] < position[index["b"]] < position[index["c"]]
+
+    def test_cycle_leaves_order_incomplete(self):
+        graph = CompactGraph.from_pairs(["a", "b", "c"], [("a", "b"), ("b", "c"), ("c", "b")])
+        assert graph.topological_order() == [graph.index["a"]]
+
+    def test_wide_and_narrow_frontiers_agree(self):
+        """Fan-out wider than SMALL_FRONTIER takes the vectorized path"""
+        leaves = [f"l{i}" for i in range(200)]
+        edges = [("root", leaf) for leaf in leaves] + [(leaf, "sink") for leaf in leaves]
+        graph = CompactGraph.from_pairs(["root"] + leaves + ["sink"], edges)
+        levels = graph.topological_levels()
+        assert [len(level) for level in levels] == [1, 200, 1]
+        assert graph.is_acyclic() == True
+
+    def test_reachable(self):
+        graph = CompactGraph.from_pairs(["a", "b", "c", "d"], [("a", "b"), ("b", "c"), ("d", "c")])
+        assert graph.reachable([graph.index["a"]]).tolist() == [True, True, True, False]
+        assert graph.transpose().reachable([graph.index["c"]]).tolist() == [True, True, True, True]
+
+    def test_components_are_numbered_sinks_first(self):
+        graph = CompactGraph.from_pairs(["a", "b", "c", "d"], [("a", "b"), ("b", "c"), ("c", "b"), ("c", "d")])
+        component = graph.strongly_connected_components()
+        assert component[1] == component[2]
+        assert component[0] > component[1] > component[3]
+
+    def test_descendant_bitsets(self):
+        graph = CompactGraph.from_pairs(["a", "b", "c", "d", "e"], [("a", "b"), ("b", "c"), ("c", "b"), ("c", "d"), ("e", "e")])
+        names = lambda bits: [graph.ids[u] for u in bitset_indices(bits, graph.num_nodes).tolist()]
+        assert [names(bits) for bits in graph.descendant_bitsets()] == [["b", "c", "d"], ["c", "d"], ["b", "d"], [], []]
+
+    def test_descendant_bitsets_limits(self):
+        graph = CompactGraph.from_pairs(["a", "b", "c", "d", "e"], [("a", "b"), ("b", "c"), ("c", "b"), ("c", "d"), ("e", "e")])
+        # 3 + 2 + 2 pairs
+        assert graph.descendant_bitsets(max_pairs=7) == graph.descendant_bitsets()
+        assert graph.descendant_bitsets(max_pairs=6) is None
+        assert graph.descendant_bitsets(max_bytes=0) is None
+        assert graph.descendant_bitsets(max_bytes=100) == graph.descendant_bitsets()
+
+
+class TestAnalyzeGraph:
+    """Extended analysis: order, levels, critical path and cycles"""
+
+    def test_diamond_levels(self):
+        edges = [("e1", "in", "a"), ("e2", "in", "b"), ("e3", "a", "out"), ("e4", "b", "out")]
+        result = analyze_graph(["out", "b", "a", "in"], edges)
+        assert result["is_dag"] == True
+        assert result["topological_order"][0] == "in"
+        assert result["topological_order"][-1] == "out"
+        assert result["levels"][0] == ["in"]
+        assert sorted(result["levels"][1]) == ["a", "b"]
+        assert result["levels"][2] == ["out"]
+        assert result["critical_path_length"] == 3
+        assert result["cycles"] == []
+
+    def test_level_is_longest_path_not_shortest(self):
+        edges = [("e1", "a", "b"), ("e2", "b", "c"), ("e3", "a", "c")]
+        result = analyze_graph(["a", "b", "c"], edges)
+        assert result["levels"] == [["a"], ["b"], ["c"]]
+
+    def test_empty_graph(self):
+        result = analyze_graph([], [])
+        assert result["is_dag"] == True
+        assert result["levels"] == []
+        assert result["critical_path_length"] == 0
+
+    def test_cycle_reports_nodes_and_edges(self):
+        edges = [("e1", "in", "m"), ("e2", "m", "f"), ("e3", "f", "t"), ("e4", "t", "m"), ("e5", "t", "out")]
+        result = analyze_graph(["in", "m", "f", "t", "out"], edges)
+        assert result["is_dag"] == False
+        assert result["topological_order"] is None
+        assert len(result["cycles"]) == 1
+        cycle = result["cycles"][0]
+        assert sorted(cycle["nodes"]) == ["f", "m", "t"]
+        assert sorted(cycle["edges"]) == ["e2", "e3", "e4"]
+        # Edges follow the node order: nodes[i] -> nodes[i + 1]
+        by_id = {edge_id: (source, target) for edge_id, source, target in edges}
+        nodes = cycle["nodes"]
+        for i, edge_id in enumerate(cycle["edges"]):
+            assert by_id[edge_id] == (nodes[i], nodes[(i + 1) % len(nodes)])
+
+    def test_self_loop_and_disjoint_cycles(self):
+        edges = [("e1", "a", "a"), ("e2", "b", "c"), ("e3", "c", "b")]
+        result = analyze_graph(["a", "b", "c"], edges)
+        assert result["is_dag"] == False
+        assert sorted(sorted(c["edges"]) for c in result["cycles"]) == [["e1"], ["e2", "e3"]]
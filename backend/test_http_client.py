@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Tests for the pooled api node HTTP client in http_client.py
+Runs against a local stub HTTP server started by the tests, no backend server required
+"""
+
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+import pytest
+
+from executor import PipelineExecutor
+from http_client import PooledAPIClient, TokenBucket, parse_retry_after
+from test_executor import edge, node
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def reply(self, status, payload, headers=None):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def handle_request(self):
+        server = self.server
+        with server.lock:
+            server.connections.add(self.client_address)
+            server.hits[self.path] = server.hits.get(self.path, 0) + 1
+            hits = server.hits[self.path]
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length).decode() if length else None
+        if self.path.startswith("/slow"):
+            time.sleep(0.2)
+        if self.path.startswith("/flaky") and hits <= 2:
+            self.reply(503, {"error": "busy"}, {"Retry-After": "0"})
+        elif self.path.startswith("/bad-gateway"):
+            self.reply(502, {"error": "bad gateway"})
+        else:
+            self.reply(200, {"method": self.command, "path": self.path, "body": body, "hits": hits})
+
+    do_GET = do_POST = do_PUT = handle_request
+
+
+@pytest.fixture
+def stub_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    server.lock = threading.Lock()
+    server.connections = set()
+    server.hits = {}
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server, f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+class TestTokenBucket:
+    """Rate limiting"""
+
+    def test_burst_then_rate(self):
+        bucket = TokenBucket(rate=10, capacity=2)
+        assert bucket.reserve() == 0.0
+        assert bucket.reserve() == 0.0
+        assert 0.09 < bucket.reserve() <= 0.1
+
+    def test_parse_retry_after(self):
+        assert parse_retry_after("2") == 2.0
+        assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") is None
+        assert parse_retry_after(None) is None
+
+
+class TestPooledAPIClient:
+    """Pooling, retries, coalescing and limits against a stub server"""
+
+    def test_connections_are_reused(self, stub_server):
+        server, base = stub_server
+        client = PooledAPIClient()
+
+        async def calls():
+            for i in range(5):
+                await client.request("GET", f"{base}/item/{i}", {})
+            await client.aclose()
+
+        run(calls())
+        assert len(server.connections) == 1
+
+    def test_retries_retryable_statuses(self, stub_server):
+        server, base = stub_server
+        client = PooledAPIClient(backoff=0.001)
+        response = run(client.request("POST", f"{base}/flaky", {}, body={"x": 1}))
+        assert response["hits"] == 3
+        assert json.loads(response["body"]) == {"x": 1}
+        assert client.stats()["retries"] == 2
+
+    def test_non_idempotent_methods_are_not_retried_on_502(self, stub_server):
+        server, base = stub_server
+        client = PooledAPIClient(backoff=0.001)
+        with pytest.raises(httpx.HTTPStatusError):
+            run(client.request("POST", f"{base}/bad-gateway", {}))
+        assert server.hits["/bad-gateway"] == 1
+
+        with pytest.raises(httpx.HTTPStatusError):
+            run(client.request("PUT", f"{base}/bad-gateway", {}))
+        assert server.hits["/bad-gateway"] == 1 + 1 + client.retries
+
+    def test_identical_in_flight_requests_are_coalesced(self, stub_server):
+        server, base = stub_server
+        client = PooledAPIClient()
+
+        async def calls():
+            return await asyncio.gather(*(client.request("GET", f"{base}/slow", {"X-Key": "1"}) for _ in range(5)),
+                                        client.request("GET", f"{base}/slow", {"X-Key": "2"}))
+
+        responses = run(calls())
+        assert server.hits["/slow"] == 2
+        assert client.stats()["coalesced"] == 4
+        assert responses[0] == responses[4]
+
+    def test_per_host_concurrency_limit(self, stub_server):
+        server, base = stub_server
+        client = PooledAPIClient(max_per_host=2)
+
+        async def calls():
+            start = time.perf_counter()
+            await asyncio.gather(*(client.request("GET", f"{base}/slow?i={i}", {}) for i in range(4)))
+            return time.perf_counter() - start
+
+        # Four 200 ms requests, two at a time
+        assert run(calls()) >= 0.38
+
+    def test_rate_limit_spaces_requests(self, stub_server):
+        server, base = stub_server
+        client = PooledAPIClient(rate=20, burst=1)
+
+        async def calls():
+            start = time.perf_counter()
+            await asyncio.gather(*(client.request("GET", f"{base}/item/{i}", {}) for i in range(5)))
+            return time.perf_counter() - start
+
+        assert run(calls()) >= 0.19
+        assert client.stats()["rate_limited"] == 4
+
+    def test_api_node_uses_client(self, stub_server):
+        server, base = stub_server
+        nodes = [
+            node("input-1", "customInput", inputName="payload"),
+            node("api-1", "api", method="POST", url=f"{base}/echo", headers='{"X-Test": "1"}'),
+            node("api-2", "api", url=f"{base}/bad-gateway"),
+            node("output-1", "customOutput", outputName="response"),
+            node("output-2", "customOutput", outputName="error"),
+        ]
+        edges = [
+            edge("input-1", "value", "api-1", "body"),
+            edge("api-1", "response", "output-1", "value"),
+            edge("api-2", "error", "output-2", "value"),
+        ]
+        executor = PipelineExecutor(nodes, edges, api=PooledAPIClient(backoff=0.001))
+        result = run(executor.run({"payload": {"q": "hi"}}))
+        assert json.loads(result["outputs"]["response"]["body"]) == {"q": "hi"}
+        assert "502" in result["outputs"]["error"]
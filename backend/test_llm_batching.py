@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Unit tests for micro-batching of llm node calls in llm_batching.py
+Runs in-process, no backend server required
+"""
+
+import asyncio
+import time
+
+import pytest
+
+from executor import PipelineExecutor
+from llm_batching import BatchingLLMProvider, BatchLLMProvider, FakeBatchLLMProvider
+from test_executor import edge, node
+
+
+def llm_pipeline(llm) -> PipelineExecutor:
+    nodes = [
+        node("input-1", "customInput", inputName="query"),
+        node("llm-1", "llm"),
+        node("output-1", "customOutput", outputName="answer"),
+    ]
+    edges = [
+        edge("input-1", "value", "llm-1", "prompt"),
+        edge("llm-1", "response", "output-1", "value"),
+    ]
+    return PipelineExecutor(nodes, edges, llm=llm)
+
+
+class TestBatchingLLMProvider:
+    """Size and time windows, fan-out and failures"""
+
+    def test_concurrent_runs_share_batches(self):
+        backend = FakeBatchLLMProvider(latency=0.01)
+        llm = BatchingLLMProvider(backend, max_batch_size=8, max_wait_ms=50)
+        executor = llm_pipeline(llm)
+
+        async def runs():
+            return await asyncio.gather(*(executor.run({"query": f"q{i}"}) for i in range(20)))
+
+        results = asyncio.run(runs())
+        assert [result["outputs"]["answer"] for result in results] == [f"[echo] q{i}" for i in range(20)]
+        assert backend.batches == [8, 8, 4]
+        assert llm.stats()["mean_batch_size"] == 20 / 3
+
+    def test_lone_call_waits_at_most_max_wait(self):
+        backend = FakeBatchLLMProvider()
+        llm = BatchingLLMProvider(backend, max_batch_size=64, max_wait_ms=30)
+
+        async def call():
+            start = time.perf_counter()
+            result = await llm.complete("hi")
+            return result, time.perf_counter() - start
+
+        result, elapsed = asyncio.run(call())
+        assert result == "[echo] hi"
+        assert 0.025 <= elapsed < 0.5
+        assert backend.batches == [1]
+
+    def test_full_batch_is_dispatched_without_waiting(self):
+        llm = BatchingLLMProvider(FakeBatchLLMProvider(), max_batch_size=4, max_wait_ms=10_000)
+
+        async def calls():
+            return await asyncio.wait_for(asyncio.gather(*(llm.complete(str(i)) for i in range(4))), timeout=1)
+
+        assert asyncio.run(calls()) == ["[echo] 0", "[echo] 1", "[echo] 2", "[echo] 3"]
+
+    def test_provider_failure_fails_every_waiting_node(self):
+        class BrokenProvider(BatchLLMProvider):
+            async def complete_batch(self, prompts):
+                raise RuntimeError("model unavailable")
+
+        executor = llm_pipeline(BatchingLLMProvider(BrokenProvider(), max_batch_size=2, max_wait_ms=5))
+
+        async def runs():
+            return await asyncio.gather(*(executor.run({"query": "q"}) for _ in range(3)))
+
+        for result in asyncio.run(runs()):
+            assert result["status"] == "failed"
+            assert result["nodes"]["llm-1"]["error"] == "RuntimeError: model unavailable"
+
+    def test_cancelled_caller_drops_out_of_batch(self):
+        backend = FakeBatchLLMProvider()
+        llm = BatchingLLMProvider(backend, max_batch_size=8, max_wait_ms=20)
+
+        async def calls():
+            doomed = asyncio.ensure_future(llm.complete("gone"))
+            kept = asyncio.ensure_future(llm.complete("kept"))
+            await asyncio.sleep(0)
+            doomed.cancel()
+            return await kept
+
+        assert asyncio.run(calls()) == "[echo] kept"
+        assert backend.batches == [1]
+
+    def test_invalid_batch_size(self):
+        with pytest.raises(ValueError):
+            BatchingLLMProvider(FakeBatchLLMProvider(), max_batch_size=0)
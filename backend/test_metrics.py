@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Tests for request metrics and slow-request profiling in metrics.py
+Runs in-process through FastAPI's TestClient, no backend server required
+"""
+
+import pstats
+
+from fastapi.testclient import TestClient
+
+from main import app, validation_cache
+from metrics import MetricsRegistry, SlowRequestProfiler, phase_latency, request_errors, request_latency
+from test_dag_validation import create_edge, create_node
+
+
+def sample_pipeline():
+    return {
+        "nodes": [create_node("input-1", "customInput"), create_node("output-1", "customOutput")],
+        "edges": [create_edge("e1", "input-1", "output-1", "input-1-value", "output-1-value")],
+    }
+
+
+class TestRegistry:
+    """Prometheus text exposition format"""
+
+    def test_counter_and_histogram_rendering(self):
+        registry = MetricsRegistry()
+        counter = registry.counter("jobs", "Jobs done", ("kind",))
+        histogram = registry.histogram("job_seconds", "Job time", (0.1, 1.0))
+        counter.inc(kind='a "quoted"')
+        counter.inc(2, kind="b")
+        histogram.observe(0.05)
+        histogram.observe(0.5)
+        histogram.observe(5)
+        registry.add_collector(lambda: [("queue_depth", "gauge", "Queued jobs", 3)])
+
+        lines = registry.render().splitlines()
+        assert "# TYPE jobs_total counter" in lines
+        assert 'jobs_total{kind="a \\"quoted\\""} 1' in lines
+        assert 'jobs_total{kind="b"} 2' in lines
+        assert "# TYPE job_seconds histogram" in lines
+        assert 'job_seconds_bucket{le="0.1"} 1' in lines
+        assert 'job_seconds_bucket{le="1.0"} 2' in lines
+        assert 'job_seconds_bucket{le="+Inf"} 3' in lines
+        assert "job_seconds_sum 5.55" in lines
+        assert "job_seconds_count 3" in lines
+        assert "queue_depth 3" in lines
+
+
+class TestMetricsEndpoint:
+    """Request, phase and size metrics recorded by the app"""
+
+    def test_parse_records_phases_and_latency(self):
+        validation_cache.clear()
+        client = TestClient(app)
+        before = {name: phase_latency.count(phase=name) for name in ("decode", "validate", "build", "check", "traverse")}
+        requests_before = request_latency.count(method="POST", route="/pipelines/parse", status=200)
+
+        assert client.post("/pipelines/parse", json=sample_pipeline()).status_code == 200
+
+        for name, count in before.items():
+            assert phase_latency.count(phase=name) == count + 1
+        assert request_latency.count(method="POST", route="/pipelines/parse", status=200) == requests_before + 1
+
+        body = client.get("/metrics")
+        assert body.status_code == 200
+        assert body.headers["content-type"].startswith("text/plain; version=0.0.4")
+        assert 'pipeline_phase_duration_seconds_count{phase="traverse"}' in body.text
+        assert "pipeline_graph_nodes_bucket" in body.text
+        assert "pipeline_cache_misses_total" in body.text
+
+    def test_errors_are_counted_by_route_template(self):
+        client = TestClient(app)
+        invalid = request_errors.value(method="POST", route="/pipelines/parse", status=422)
+        missing = request_errors.value(method="GET", route="/pipelines/sessions/{session_id}", status=404)
+        unmatched = request_errors.value(method="GET", route="unmatched", status=404)
+
+        client.post("/pipelines/parse", content=b"{nope")
+        client.get("/pipelines/sessions/does-not-exist")
+        client.get("/no/such/path")
+
+        assert request_errors.value(method="POST", route="/pipelines/parse", status=422) == invalid + 1
+        assert request_errors.value(method="GET", route="/pipelines/sessions/{session_id}", status=404) == missing + 1
+        assert request_errors.value(method="GET", route="unmatched", status=404) == unmatched + 1
+
+
+class TestSlowRequestProfiler:
+    """Opt-in cProfile dumps"""
+
+    def test_disabled_by_default(self, tmp_path):
+        profiler = SlowRequestProfiler(directory=str(tmp_path))
+        assert profiler.call("sum", sum, [1, 2, 3]) == 6
+        assert list(tmp_path.iterdir()) == []
+
+    def test_dumps_only_slow_calls(self, tmp_path):
+        assert SlowRequestProfiler(threshold_ms=60_000, directory=str(tmp_path)).call("fast", sum, [1]) == 1
+        assert list(tmp_path.iterdir()) == []
+
+        assert SlowRequestProfiler(threshold_ms=0, directory=str(tmp_path)).call("slow/path", sorted, [3, 1, 2]) == [1, 2, 3]
+        files = sorted(path.suffix for path in tmp_path.iterdir())
+        assert files == [".prof", ".txt"]
+        prof = next(tmp_path.glob("*.prof"))
+        assert "slow_path" in prof.name
+        assert pstats.Stats(str(prof)).total_calls > 0
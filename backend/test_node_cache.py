@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the node result cache in node_cache.py
+Runs in-process, no backend server required
+"""
+
+import asyncio
+
+import numpy as np
+from fastapi.testclient import TestClient
+
+from cache import ResultCache
+from executor import APIClient, EchoLLMProvider, PipelineExecutor
+from main import app, node_cache
+from node_cache import DiskTier, NodeResultCache, node_key
+from test_executor import edge, node
+
+
+class CountingLLM(EchoLLMProvider):
+    def __init__(self):
+        super().__init__()
+        self.calls = 0
+
+    async def complete(self, prompt: str, system: str = '') -> str:
+        self.calls += 1
+        return await super().complete(prompt, system)
+
+
+def llm_pipeline(template: str = "Q: {{question}}", suffix: str = "!"):
+    """input -> llm -> text(template) -> transform -> output"""
+    nodes = [
+        node("input-1", "customInput", inputName="query"),
+        node("llm-1", "llm"),
+        node("text-1", "text", text=template + suffix),
+        node("output-1", "customOutput", outputName="answer"),
+    ]
+    edges = [
+        edge("input-1", "value", "llm-1", "prompt"),
+        edge("llm-1", "response", "text-1", "question"),
+        edge("text-1", "output", "output-1", "value"),
+    ]
+    return nodes, edges
+
+
+def run(executor, inputs=None):
+    return asyncio.run(executor.run(inputs))
+
+
+class TestNodeKey:
+    """Merkle keys"""
+
+    def test_key_covers_data_upstream_and_external(self):
+        base = node_key("text", {"text": "a"}, [("x", "output", "k1")])
+        assert base == node_key("text", {"text": "a"}, [("x", "output", "k1")])
+        assert base != node_key("text", {"text": "b"}, [("x", "output", "k1")])
+        assert base != node_key("text", {"text": "a"}, [("x", "output", "k2")])
+        assert base != node_key("text", {"text": "a"}, [("y", "output", "k1")])
+        assert base != node_key("text", {"text": "a"}, [("x", "output", "k1")], external=1)
+
+    def test_key_ignores_edge_and_dict_order(self):
+        upstream = [("a", "out", "k1"), ("b", "out", "k2")]
+        assert node_key("math", {"x": 1, "y": 2}, upstream) == node_key("math", {"y": 2, "x": 1}, upstream[::-1])
+
+    def test_key_covers_whole_numpy_columns(self):
+        column = np.arange(2000)
+        edited = column.copy()
+        edited[1000] = -1
+        key = node_key("constant", {"outputs": {"output": column}}, [])
+        assert key != node_key("constant", {"outputs": {"output": edited}}, [])
+        assert key == node_key("constant", {"outputs": {"output": column.tolist()}}, [])
+
+
+class TestExecutorCache:
+    """Only the dirty part of the graph re-runs"""
+
+    def test_unchanged_run_is_served_from_cache(self):
+        llm, cache = CountingLLM(), NodeResultCache()
+        nodes, edges = llm_pipeline()
+        first = run(PipelineExecutor(nodes, edges, llm=llm, cache=cache), {"query": "why?"})
+        second = run(PipelineExecutor(nodes, edges, llm=llm, cache=cache), {"query": "why?"})
+
+        assert llm.calls == 1
+        assert second["outputs"] == first["outputs"] == {"answer": "Q: [echo] why?!"}
+        assert second["nodes"]["llm-1"]["cached"] == True
+        assert second["nodes"]["text-1"]["cached"] == True
+        # Output nodes always run so the run's outputs are filled in
+        assert "cached" not in second["nodes"]["output-1"]
+        assert second["cache"] == {"hits": 2, "misses": 0}
+
+    def test_downstream_edit_reuses_upstream_results(self):
+        llm, cache = CountingLLM(), NodeResultCache()
+        run(PipelineExecutor(*llm_pipeline(), llm=llm, cache=cache), {"query": "why?"})
+        result = run(PipelineExecutor(*llm_pipeline(suffix="?"), llm=llm, cache=cache), {"query": "why?"})
+
+        assert llm.calls == 1
+        assert result["nodes"]["llm-1"]["cached"] == True
+        assert "cached" not in result["nodes"]["text-1"]
+        assert result["outputs"] == {"answer": "Q: [echo] why??"}
+
+    def test_changed_input_reruns_descendants(self):
+        llm, cache = CountingLLM(), NodeResultCache()
+        nodes, edges = llm_pipeline()
+        run(PipelineExecutor(nodes, edges, llm=llm, cache=cache), {"query": "why?"})
+        result = run(PipelineExecutor(nodes, edges, llm=llm, cache=cache), {"query": "how?"})
+
+        assert llm.calls == 2
+        assert result["outputs"] == {"answer": "Q: [echo] how?!"}
+        assert result["cache"] == {"hits": 0, "misses": 2}
+
+    def test_batch_columns_are_cached(self):
+        cache = NodeResultCache()
+        nodes = [
+            node("input-1", "customInput", inputName="x"),
+            node("math-1", "math", operation="multiply"),
+            node("transform-1", "transform", transformation="uppercase"),
+            node("output-1", "customOutput", outputName="y"),
+            node("output-2", "customOutput", outputName="z"),
+        ]
+        edges = [
+            edge("input-1", "value", "math-1", "a"),
+            edge("input-1", "value", "math-1", "b"),
+            edge("input-1", "value", "transform-1", "input"),
+            edge("math-1", "result", "output-1", "value"),
+            edge("transform-1", "output", "output-2", "value"),
+        ]
+        inputs = {"x": [1, 2, 3]}
+        first = run(PipelineExecutor(nodes, edges, cache=cache), inputs)
+        second = run(PipelineExecutor(nodes, edges, cache=cache), inputs)
+        assert second["cache"] == {"hits": 2, "misses": 0}
+        assert list(second["outputs"]["y"]) == list(first["outputs"]["y"]) == [1.0, 4.0, 9.0]
+        assert list(second["outputs"]["z"]) == list(first["outputs"]["z"]) == ["1", "2", "3"]
+
+    def test_api_errors_are_not_cached(self):
+        class FlakyAPI(APIClient):
+            calls = 0
+
+            async def request(self, method, url, headers, body=None, params=None):
+                self.calls += 1
+                if self.calls == 1:
+                    raise ConnectionError("refused")
+                return {"ok": True}
+
+        api, cache = FlakyAPI(), NodeResultCache()
+        nodes = [node("api-1", "api", url="http://example.invalid"), node("output-1", "customOutput", outputName="out")]
+        edges = [edge("api-1", "response", "output-1", "value")]
+        run(PipelineExecutor(nodes, edges, api=api, cache=cache))
+        result = run(PipelineExecutor(nodes, edges, api=api, cache=cache))
+        run(PipelineExecutor(nodes, edges, api=api, cache=cache))
+
+        assert result["outputs"] == {"out": {"ok": True}}
+        assert api.calls == 2
+
+    def test_only_safe_api_requests_are_cached(self):
+        class CountingAPI(APIClient):
+            calls = 0
+
+            async def request(self, method, url, headers, body=None, params=None):
+                self.calls += 1
+                return {"method": method}
+
+        for method, calls in (("GET", 1), ("get", 1), ("POST", 3), ("DELETE", 3)):
+            api, cache = CountingAPI(), NodeResultCache()
+            nodes = [node("api-1", "api", method=method, url="http://example.invalid"),
+                     node("output-1", "customOutput", outputName="out")]
+            edges = [edge("api-1", "response", "output-1", "value")]
+            for _ in range(3):
+                run(PipelineExecutor(nodes, edges, api=api, cache=cache))
+            assert api.calls == calls
+
+
+class TestTiers:
+    """Bounded memory tier and on-disk tier"""
+
+    def test_memory_tier_evicts_least_recently_used(self):
+        cache = NodeResultCache(memory=ResultCache(max_entries=2))
+        for key in ("a", "b", "c"):
+            cache.put(key, {"output": key})
+        assert cache.get("a") is None
+        assert cache.get("c") == {"output": "c"}
+        assert cache.stats()["memory"]["evictions"] == 1
+
+    def test_disk_tier_survives_a_new_memory_tier(self, tmp_path):
+        NodeResultCache(disk=DiskTier(str(tmp_path))).put("ab12", {"output": [1, 2]})
+        restarted = NodeResultCache(disk=DiskTier(str(tmp_path)))
+        assert restarted.get("ab12") == {"output": [1, 2]}
+        # Promoted into memory: the second lookup does not touch the disk
+        assert restarted.get("ab12") == {"output": [1, 2]}
+        assert restarted.disk.hits == 1
+        restarted.clear()
+        assert restarted.stats()["disk"]["entries"] == 0
+
+    def test_disk_tier_is_bounded(self, tmp_path):
+        disk = DiskTier(str(tmp_path), max_entries=10)
+        for i in range(25):
+            disk.put(f"{i:04x}", b"{}")
+        assert disk.stats()["entries"] <= 10
+
+    def test_unserializable_outputs_are_skipped(self):
+        cache = NodeResultCache()
+        cache.put("k", {"output": object()})
+        assert cache.get("k") is None
+
+
+class TestRunEndpoint:
+    """Node cache behind /pipelines/run"""
+
+    def test_rerun_hits_cache_unless_disabled(self):
+        node_cache.clear()
+        client = TestClient(app)
+        nodes, edges = llm_pipeline()
+        body = {"nodes": [n.model_dump() for n in nodes], "edges": [e.model_dump() for e in edges], "inputs": {"query": "q"}}
+
+        assert client.post("/pipelines/run", json=body).json()["cache"] == {"hits": 0, "misses": 2}
+        assert client.post("/pipelines/run", json=body).json()["cache"] == {"hits": 2, "misses": 0}
+        assert "cache" not in client.post("/pipelines/run", json={**body, "cache": False}).json()
+        assert client.get("/pipelines/run/cache").json()["memory"]["entries"] == 2
+        assert client.delete("/pipelines/run/cache").json()["memory"]["entries"] == 0
@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""
+Tests for dead-node pruning, constant folding and chain fusion in optimizer.py
+Runs in-process through FastAPI's TestClient, no backend server required
+"""
+
+import asyncio
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from columnar import to_python
+from dataflow import run_chunked
+from executor import PipelineExecutor
+from main import app
+from node_cache import NodeResultCache
+from optimizer import Optimizer, Step, optimizer_from_env
+from test_executor import edge, node, run
+
+
+def both(nodes, edges, inputs):
+    """Results of the pipeline as drawn and optimized, which must produce the same outputs"""
+    plain = run(PipelineExecutor(nodes, edges), inputs)
+    optimized = run(PipelineExecutor(nodes, edges, optimizer=Optimizer()), inputs)
+    assert to_python(optimized["outputs"]) == to_python(plain["outputs"])
+    return plain, optimized
+
+
+def text_chain():
+    """input -> trim -> uppercase -> filter(contains A) -> output, plus an llm branch nothing reads"""
+    nodes = [
+        node("input-1", "customInput", inputName="x"),
+        node("transform-1", "transform", transformation="trim"),
+        node("transform-2", "transform", transformation="uppercase"),
+        node("filter-1", "filter", condition="contains", value="A"),
+        node("output-1", "customOutput", outputName="y"),
+        node("llm-1", "llm"),
+    ]
+    edges = [
+        edge("input-1", "value", "transform-1", "input"),
+        edge("transform-1", "output", "transform-2", "input"),
+        edge("transform-2", "output", "filter-1", "input"),
+        edge("filter-1", "passed", "output-1", "value"),
+        edge("input-1", "value", "llm-1", "prompt"),
+    ]
+    return nodes, edges
+
+
+def math_chain():
+    """(x * x + 3) / 2 with the constants as text nodes"""
+    nodes = [
+        node("input-1", "customInput", inputName="x"),
+        node("math-1", "math", operation="multiply"),
+        node("three", "text", text="3"),
+        node("math-2", "math", operation="add"),
+        node("two", "text", text="2"),
+        node("math-3", "math", operation="divide"),
+        node("output-1", "customOutput", outputName="y"),
+    ]
+    edges = [
+        edge("input-1", "value", "math-1", "a"),
+        edge("input-1", "value", "math-1", "b"),
+        edge("math-1", "result", "math-2", "a"),
+        edge("three", "output", "math-2", "b"),
+        edge("math-2", "result", "math-3", "a"),
+        edge("two", "output", "math-3", "b"),
+        edge("math-3", "result", "output-1", "value"),
+    ]
+    return nodes, edges
+
+
+class TestOptimizer:
+    """Rewrites keep outputs identical"""
+
+    def test_chains_are_fused_and_dead_branches_pruned(self):
+        nodes, edges = text_chain()
+        _, optimized = both(nodes, edges, {"x": "  abc "})
+        assert optimized["optimizer"] == {
+            "pruned": ["llm-1"],
+            "folded": [],
+            "fused": {"filter-1": ["transform-1", "transform-2", "filter-1"]},
+        }
+        assert list(optimized["nodes"]) == ["input-1", "filter-1", "output-1"]
+        assert optimized["outputs"] == {"y": "ABC"}
+
+    def test_fused_filters_skip_what_follows(self):
+        nodes, edges = text_chain()
+        plain, optimized = both(nodes, edges, {"x": "xyz"})
+        assert optimized["nodes"]["output-1"]["status"] == plain["nodes"]["output-1"]["status"] == "skipped"
+        both(nodes, edges, {"x": ["a", " b", "ca "]})
+
+    def test_constants_are_folded_and_bound_into_math_chains(self):
+        nodes, edges = math_chain()
+        _, optimized = both(nodes, edges, {"x": 4})
+        assert optimized["outputs"] == {"y": 9.5}
+        assert optimized["optimizer"]["folded"] == ["three", "two"]
+        assert optimized["optimizer"]["fused"] == {"math-3": ["math-1", "math-2", "math-3"]}
+        # The constants now live inside the fused steps
+        assert list(optimized["nodes"]) == ["input-1", "math-3", "output-1"]
+        _, batch = both(nodes, edges, {"x": list(range(10_000))})
+        assert np.array_equal(batch["outputs"]["y"], (np.arange(10_000.0) ** 2 + 3) / 2)
+
+    def test_chains_of_constants_fold_completely(self):
+        nodes = [
+            node("text-1", "text", text="hello"),
+            node("transform-1", "transform", transformation="uppercase"),
+            node("math-1", "math", operation="divide"),
+            node("output-1", "customOutput", outputName="y"),
+            node("output-2", "customOutput", outputName="z"),
+        ]
+        edges = [
+            edge("text-1", "output", "transform-1", "input"),
+            edge("transform-1", "output", "output-1", "value"),
+            edge("math-1", "result", "output-2", "value"),
+        ]
+        _, optimized = both(nodes, edges, {})
+        assert optimized["outputs"]["y"] == "HELLO"
+        # 0 / 0 fails at run time, as it would unoptimized
+        assert optimized["optimizer"]["folded"] == ["text-1", "transform-1"]
+        assert optimized["nodes"]["math-1"]["status"] == "failed"
+
+    def test_partly_skipped_steps_still_run_with_their_constants(self):
+        nodes = [
+            node("input-1", "customInput", inputName="x"),
+            node("filter-1", "filter", condition="equals", value="1"),
+            node("five", "text", text="5"),
+            node("math-1", "math", operation="add"),
+            node("output-1", "customOutput", outputName="y"),
+        ]
+        edges = [
+            edge("input-1", "value", "filter-1", "input"),
+            edge("filter-1", "passed", "math-1", "a"),
+            edge("five", "output", "math-1", "b"),
+            edge("math-1", "result", "output-1", "value"),
+        ]
+        assert both(nodes, edges, {"x": "1"})[1]["outputs"] == {"y": 6.0}
+        assert both(nodes, edges, {"x": "2"})[1]["outputs"] == {"y": 5.0}
+
+    @pytest.mark.parametrize("head", [
+        # Folding the constant into the multiply fails, so it fuses with the text node
+        [node("const", "text", text="const")],
+        [node("input-1", "customInput", inputName="x"), node("transform-1", "transform", transformation="uppercase")],
+    ])
+    def test_failed_steps_fail_alone(self, head):
+        feed = head[-1].id
+        nodes = head + [
+            node("math-1", "math", operation="multiply"),
+            node("other", "text", text="const"),
+            node("text-1", "text", text="{{v}}-{{w}}"),
+            node("output-1", "customOutput", outputName="y"),
+        ]
+        edges = [
+            edge(feed, "output", "math-1", "a"),
+            edge(feed, "output", "math-1", "b"),
+            edge("math-1", "result", "text-1", "v"),
+            edge("other", "output", "text-1", "w"),
+            edge("text-1", "output", "output-1", "value"),
+        ]
+        if len(head) == 2:
+            edges.append(edge("input-1", "value", "transform-1", "input"))
+        plain, optimized = both(nodes, edges, {"x": "abc"})
+        assert "math-1" in optimized["optimizer"]["fused"]["text-1"]
+        assert optimized["outputs"] == {"y": "-const"}
+        assert optimized["status"] == plain["status"] == "failed"
+        assert optimized["nodes"]["math-1"]["error"] == plain["nodes"]["math-1"]["error"]
+        for node_id, entry in optimized["nodes"].items():
+            assert entry["status"] == plain["nodes"][node_id]["status"]
+
+    def test_branches_and_side_effects_are_kept(self):
+        nodes, edges = text_chain()
+        nodes += [node("transform-3", "transform", transformation="length"), node("api-1", "api", method="POST")]
+        # transform-1 now feeds two nodes, so it cannot fuse with transform-2
+        edges += [edge("transform-1", "output", "transform-3", "input"), edge("transform-3", "output", "api-1", "body")]
+        _, optimized = both(nodes, edges, {"x": " abc"})
+        assert optimized["optimizer"]["pruned"] == ["llm-1"]
+        assert optimized["optimizer"]["fused"] == {"filter-1": ["transform-2", "filter-1"]}
+        assert optimized["nodes"]["api-1"]["outputs"]["response"]["body"] == 3
+
+    def test_pipelines_without_outputs_are_not_pruned(self):
+        nodes = [node("input-1", "customInput", inputName="x"), node("llm-1", "llm")]
+        edges = [edge("input-1", "value", "llm-1", "prompt")]
+        _, optimized = both(nodes, edges, {"x": "q"})
+        assert optimized["nodes"]["llm-1"]["outputs"] == {"response": "[echo] q"}
+
+    def test_chunked_runs(self):
+        nodes, edges = math_chain()
+        executor = PipelineExecutor(nodes, edges, optimizer=Optimizer())
+        result = asyncio.run(run_chunked(executor, {"x": list(range(10))}, chunk_size=4))
+        assert result["outputs"]["y"] == [(x * x + 3) / 2 for x in range(10)]
+        assert result["optimizer"]["fused"] == {"math-3": ["math-1", "math-2", "math-3"]}
+
+    def test_plan_estimates(self):
+        nodes, edges = math_chain()
+        report = PipelineExecutor(nodes, edges, optimizer=Optimizer()).optimization.report()
+        assert report["before"]["num_nodes"] == 7 and report["after"]["num_nodes"] == 3
+        assert report["after"]["nodes"][1] == {
+            "node_id": "math-3", "type": "fused", "steps": ["math-1", "math-2", "math-3"],
+            "estimated_ms": report["after"]["nodes"][1]["estimated_ms"],
+        }
+        assert report["estimated_saving_ms"] > 0
+        assert report["after"]["critical_path_ms"] < report["before"]["critical_path_ms"]
+
+    def test_fused_nodes_are_cached(self):
+        nodes, edges = math_chain()
+        cache = NodeResultCache()
+        first = run(PipelineExecutor(nodes, edges, cache=cache, optimizer=Optimizer()), {"x": [1, 2, 3]})
+        second = run(PipelineExecutor(nodes, edges, cache=cache, optimizer=Optimizer()), {"x": [1, 2, 3]})
+        assert second["cache"] == {"hits": 1, "misses": 0}
+        assert second["nodes"]["math-3"]["cached"] == True
+        assert list(second["outputs"]["y"]) == list(first["outputs"]["y"]) == [2.0, 3.5, 6.0]
+
+    def test_bound_columns_are_described_as_lists(self):
+        nodes, _ = math_chain()
+        step = Step(nodes[3], [("result", "a")], {"b": np.arange(3.0)})
+        assert step.describe()["bound"] == {"b": [0.0, 1.0, 2.0]}
+
+    def test_passes_from_env(self, monkeypatch):
+        monkeypatch.setenv("PIPELINE_OPTIMIZER_PASSES", "prune")
+        nodes, edges = text_chain()
+        result = run(PipelineExecutor(nodes, edges, optimizer=optimizer_from_env()), {"x": "a"})
+        assert result["optimizer"] == {"pruned": ["llm-1"], "folded": [], "fused": {}}
+        with pytest.raises(ValueError):
+            Optimizer(["inline"])
+
+
+class TestOptimizeEndpoints:
+    """/pipelines/optimize and the optimize flag of /pipelines/run"""
+
+    def body(self):
+        nodes, edges = math_chain()
+        return {"nodes": [n.model_dump() for n in nodes], "edges": [e.model_dump() for e in edges]}
+
+    def test_optimize_reports_the_plan(self):
+        report = TestClient(app).post("/pipelines/optimize", json=self.body()).json()
+        assert report["fused"] == {"math-3": ["math-1", "math-2", "math-3"]}
+        assert [step["node_id"] for step in report["after"]["nodes"]] == ["input-1", "math-3", "output-1"]
+
+    def test_runs_can_opt_out(self):
+        client = TestClient(app)
+        body = {**self.body(), "inputs": {"x": [1, 2]}, "cache": False}
+        optimized = client.post("/pipelines/run", json=body).json()
+        plain = client.post("/pipelines/run", json={**body, "optimize": False}).json()
+        assert optimized["outputs"] == plain["outputs"] == {"y": [2.0, 3.5]}
+        assert len(optimized["nodes"]) == 3 and len(plain["nodes"]) == 7
+        assert "optimizer" not in plain
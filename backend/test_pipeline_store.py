@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Tests for the durable pipeline store and its graph indexes in pipeline_store.py
+Runs in-process through FastAPI's TestClient, no backend server required
+"""
+
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from fastpath import decode_topology
+from graph import CompactGraph
+from pipeline_store import PipelineStore, closure_pairs, pipeline_store_from_env
+from test_dag_validation import create_edge, create_node
+
+
+def pipeline(nodes, edges):
+    return {
+        "nodes": [create_node(node_id, node_type) for node_id, node_type in nodes],
+        "edges": [create_edge(f"e{i}", source, target) for i, (source, target) in enumerate(edges)],
+    }
+
+
+# in -> llm -> api -> out, plus an api node that no input feeds
+AGENT = pipeline(
+    [("in", "customInput"), ("llm", "llm"), ("call", "api"), ("out", "customOutput"), ("lookup", "api")],
+    [("in", "llm"), ("llm", "call"), ("call", "out"), ("lookup", "out")],
+)
+# api -> llm -> out, no input at all
+SCHEDULED = pipeline(
+    [("fetch", "api"), ("llm", "llm"), ("out", "customOutput")],
+    [("fetch", "llm"), ("llm", "out")],
+)
+
+
+def save(store, payload, name="", pipeline_id=None):
+    return store.save(decode_topology(payload), payload, name, pipeline_id)
+
+
+@pytest.fixture(params=[500_000, 0], ids=["closure", "edges"])
+def store(request, tmp_path):
+    """Every query runs against the materialized closure and the recursive edge walk"""
+    return PipelineStore(str(tmp_path / "pipelines.sqlite3"), max_closure_pairs=request.param)
+
+
+class TestClosure:
+    """Transitive closure rows"""
+
+    def test_acyclic_and_cyclic_graphs(self):
+        graph = CompactGraph.build(["a", "b", "c", "d"], ["a", "b", "a"], ["b", "c", "c"])
+        assert sorted(closure_pairs(graph, 100)) == [(0, 1), (0, 2), (1, 2)]
+        cyclic = CompactGraph.build(["a", "b", "c"], ["a", "b", "c"], ["b", "c", "b"])
+        assert sorted(closure_pairs(cyclic, 100)) == [(0, 1), (0, 2), (1, 2), (2, 1)]
+
+    def test_too_many_pairs(self):
+        chain = [str(i) for i in range(100)]
+        graph = CompactGraph.build(chain, chain[:-1], chain[1:])
+        assert closure_pairs(graph, 100 * 99 // 2) is not None
+        assert closure_pairs(graph, 100) is None
+
+    def test_large_closures_are_given_up_early(self):
+        chain = [str(i) for i in range(30_000)]
+        graph = CompactGraph.build(chain, chain[:-1], chain[1:])
+        start = time.perf_counter()
+        assert closure_pairs(graph, 500_000) is None
+        # The full closure takes seconds and hundreds of MiB
+        assert time.perf_counter() - start < 1.0
+
+
+class TestPipelineStore:
+    """Versions, lookups and indexed queries"""
+
+    def test_versions_are_kept(self, store):
+        first = save(store, AGENT, "agent")
+        assert first["version"] == 1
+        assert first["validation"]["is_dag"] == True
+        second = save(store, SCHEDULED, pipeline_id=first["pipeline_id"])
+        assert second["version"] == 2 and second["name"] == "agent"
+        assert [v["num_nodes"] for v in store.versions(first["pipeline_id"])] == [5, 3]
+        assert store.get(first["pipeline_id"])["pipeline"] == SCHEDULED
+        assert store.get(first["pipeline_id"], 1)["pipeline"] == AGENT
+        with pytest.raises(KeyError):
+            store.get(first["pipeline_id"], 3)
+        with pytest.raises(KeyError):
+            save(store, AGENT, pipeline_id="missing")
+
+    def test_validation_results_are_shared_by_hash(self, store):
+        first = save(store, AGENT)
+        save(store, AGENT)
+        assert store.stats()["validations"] == 1
+        assert store.validation(first["topology_hash"]) == first["validation"]
+        assert store.validation("unknown") is None
+
+    def test_closure_of_a_node(self, store):
+        saved = save(store, AGENT)
+        closure = store.closure(saved["pipeline_id"], "call")
+        assert closure["upstream"] == ["in", "llm"]
+        assert closure["downstream"] == ["out"]
+        assert store.closure(saved["pipeline_id"], "lookup")["upstream"] == []
+        with pytest.raises(KeyError):
+            store.closure(saved["pipeline_id"], "nope")
+
+    def test_search(self, store):
+        agent = save(store, AGENT, "agent")["pipeline_id"]
+        scheduled = save(store, SCHEDULED, "scheduled")["pipeline_id"]
+        assert {p["pipeline_id"]: p["nodes"] for p in store.search("api")} == {agent: ["call", "lookup"], scheduled: ["fetch"]}
+        downstream = store.search("api", downstream_of_type="customInput")
+        assert [(p["pipeline_id"], p["nodes"]) for p in downstream] == [(agent, ["call"])]
+        assert [p["pipeline_id"] for p in store.search("llm", downstream_of_type="api")] == [scheduled]
+        assert [p["nodes"] for p in store.search("api", upstream_of="out", downstream_of="in")] == [["call"]]
+        assert store.search("transform") == []
+
+    def test_search_reads_latest_versions(self, store):
+        saved = save(store, AGENT)
+        save(store, SCHEDULED, pipeline_id=saved["pipeline_id"])
+        assert store.search("api", downstream_of_type="customInput") == []
+
+    def test_cycles(self, store):
+        cyclic = pipeline([("in", "customInput"), ("a", "llm"), ("b", "api")], [("in", "a"), ("a", "b"), ("b", "a")])
+        saved = save(store, cyclic)
+        assert saved["validation"]["is_dag"] == False
+        assert store.closure(saved["pipeline_id"], "a")["downstream"] == ["b"]
+        assert store.closure(saved["pipeline_id"], "a")["upstream"] == ["b", "in"]
+
+    def test_delete(self, store):
+        saved = save(store, AGENT)
+        store.delete(saved["pipeline_id"])
+        assert store.list() == [] and store.search("api") == []
+        assert store.stats()["nodes"] == 0 and store.stats()["reach"] == 0
+        with pytest.raises(KeyError):
+            store.delete(saved["pipeline_id"])
+
+    def test_database_is_created_on_first_use(self, tmp_path, monkeypatch):
+        path = tmp_path / "lazy.sqlite3"
+        monkeypatch.setenv("PIPELINE_STORE_PATH", str(path))
+        store = pipeline_store_from_env()
+        assert not path.exists()
+        assert store.list() == []
+        assert path.exists()
+
+    def test_default_path_is_per_user_data(self, tmp_path, monkeypatch):
+        monkeypatch.delenv("PIPELINE_STORE_PATH", raising=False)
+        monkeypatch.setenv("XDG_DATA_HOME", str(tmp_path / "data"))
+        path = tmp_path / "data" / "vectorshift-pipelines" / "pipeline-store.sqlite3"
+        store = pipeline_store_from_env()
+        assert store.path == str(path)
+        assert store.list() == []
+        assert path.exists()
+
+    def test_reopening_keeps_everything(self, store):
+        saved = save(store, AGENT, "agent")
+        reopened = PipelineStore(store.path, store.max_closure_pairs)
+        assert reopened.list()[0]["name"] == "agent"
+        assert reopened.closure(saved["pipeline_id"], "in")["downstream"] == ["call", "llm", "out"]
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setattr(main, "pipeline_store", PipelineStore(str(tmp_path / "pipelines.sqlite3")))
+    with TestClient(main.app) as client:
+        yield client
+
+
+class TestStoreEndpoints:
+    """/pipelines/store routes"""
+
+    def test_create_update_read_and_delete(self, client):
+        created = client.post("/pipelines/store", json={**AGENT, "name": "agent"}).json()
+        pipeline_id = created["pipeline_id"]
+        assert client.put(f"/pipelines/store/{pipeline_id}", json=SCHEDULED).json()["version"] == 2
+        assert client.get(f"/pipelines/store/{pipeline_id}?version=1").json()["pipeline"]["nodes"][0]["id"] == "in"
+        assert len(client.get(f"/pipelines/store/{pipeline_id}/versions").json()["versions"]) == 2
+        assert client.get("/pipelines/store").json()["pipelines"][0]["latest_version"] == 2
+        assert client.delete(f"/pipelines/store/{pipeline_id}").json()["deleted"] == True
+        assert client.get(f"/pipelines/store/{pipeline_id}").status_code == 404
+
+    def test_search_and_node_closure(self, client):
+        pipeline_id = client.post("/pipelines/store", json=AGENT).json()["pipeline_id"]
+        found = client.get("/pipelines/store/search", params={"type": "api", "downstream_of_type": "customInput"}).json()
+        assert found["pipelines"][0]["nodes"] == ["call"]
+        node = client.get(f"/pipelines/store/{pipeline_id}/nodes/call").json()
+        assert node["upstream"] == ["in", "llm"] and node["type"] == "api"
+        assert client.get(f"/pipelines/store/{pipeline_id}/nodes/nope").status_code == 404
+        assert client.put("/pipelines/store/missing", json=AGENT).status_code == 404
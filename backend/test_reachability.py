@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Tests for the cached reachability index and its endpoints in reachability.py
+Runs in-process through FastAPI's TestClient, no backend server required
+"""
+
+import inspect
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from fastpath import decode_topology
+from reachability import IndexTooLarge, ReachabilityIndex, reachability_cache_from_env, structure_hash
+from test_pipeline_store import AGENT, pipeline
+
+
+def index(payload):
+    return ReachabilityIndex(decode_topology(payload))
+
+
+class TestReachabilityIndex:
+    """Queries over the descendant and ancestor bitsets"""
+
+    def test_reaches(self):
+        agent = index(AGENT)
+        assert agent.reaches("in", "out") == True
+        assert agent.reaches("out", "in") == False
+        assert agent.reaches("lookup", "call") == False
+        assert agent.reaches("in", "in") == False
+        with pytest.raises(KeyError):
+            agent.reaches("in", "nope")
+
+    def test_node_ancestors_and_descendants(self):
+        node = index(AGENT).node("call")
+        assert node == {"node_id": "call", "type": "api", "ancestors": ["in", "llm"], "descendants": ["out"], "in_cycle": False}
+
+    def test_would_create_cycle_returns_the_closed_path(self):
+        agent = index(AGENT)
+        assert agent.would_create_cycle("out", "in") == ["in", "llm", "call", "out"]
+        assert agent.would_create_cycle("call", "llm") == ["llm", "call"]
+        assert agent.would_create_cycle("in", "out") is None
+        assert agent.would_create_cycle("lookup", "in") is None
+        assert agent.would_create_cycle("new", "in") is None
+        assert agent.would_create_cycle("new", "new") == ["new"]
+
+    def test_cycle_paths_follow_existing_edges(self):
+        # a -> b -> c -> d with a shortcut a -> d, and a cycle b <-> c on the way
+        payload = pipeline(
+            [("a", "llm"), ("b", "llm"), ("c", "llm"), ("d", "llm")],
+            [("a", "b"), ("b", "c"), ("c", "b"), ("c", "d"), ("a", "d")],
+        )
+        edges = {(edge["source"], edge["target"]) for edge in payload["edges"]}
+        path = index(payload).would_create_cycle("d", "a")
+        assert path[0] == "a" and path[-1] == "d" and len(set(path)) == len(path)
+        assert all(step in edges for step in zip(path, path[1:]))
+
+    def test_cycles_and_self_loops(self):
+        cyclic = index(pipeline(
+            [("in", "customInput"), ("a", "llm"), ("b", "api"), ("c", "text")],
+            [("in", "a"), ("a", "b"), ("b", "a"), ("c", "c")],
+        ))
+        assert cyclic.reaches("a", "a") == True and cyclic.reaches("c", "c") == True
+        assert cyclic.reaches("in", "in") == False
+        assert cyclic.node("b")["in_cycle"] == True and cyclic.node("in")["in_cycle"] == False
+        assert cyclic.node("a")["descendants"] == ["b"]
+
+    def test_impact_names_affected_outputs(self):
+        agent = index(AGENT)
+        assert agent.impact(["llm"]) == {"nodes": ["llm", "call", "out"], "outputs": ["out"]}
+        assert agent.impact(["out"])["outputs"] == ["out"]
+        assert agent.impact([]) == {"nodes": [], "outputs": []}
+
+    def test_structure_hash_ignores_node_settings(self):
+        edited = {**AGENT, "nodes": [{**node, "data": {**node["data"], "extra": 1}} for node in AGENT["nodes"]]}
+        assert structure_hash(decode_topology(edited)) == structure_hash(decode_topology(AGENT))
+        rewired = {**AGENT, "edges": AGENT["edges"][:-1]}
+        assert structure_hash(decode_topology(rewired)) != structure_hash(decode_topology(AGENT))
+
+    def test_large_chain(self):
+        chain = [(f"n{i}", "llm") for i in range(5000)]
+        long = index(pipeline(chain, [(chain[i][0], chain[i + 1][0]) for i in range(len(chain) - 1)]))
+        assert long.reaches("n0", "n4999") == True and long.reaches("n4999", "n0") == False
+        assert len(long.node("n2500")["descendants"]) == 2499
+        assert len(long.would_create_cycle("n4999", "n0")) == 5000
+
+    def test_size_limit(self):
+        chain = [(f"n{i}", "llm") for i in range(2000)]
+        payload = pipeline(chain, [(chain[i][0], chain[i + 1][0]) for i in range(len(chain) - 1)])
+        nbytes = index(payload).nbytes
+        assert ReachabilityIndex(decode_topology(payload), max_bytes=nbytes).nbytes == nbytes
+        # Too deep to fit, rejected before any closure is built
+        with pytest.raises(IndexTooLarge):
+            ReachabilityIndex(decode_topology(payload), max_bytes=400_000)
+        # Deep enough to fit by depth alone, rejected while the closure is built
+        tops, bottoms = [f"t{i}" for i in range(1000)], [f"b{i}" for i in range(1000)]
+        wide = pipeline([(node_id, "llm") for node_id in tops + ["hub"] + bottoms],
+                        [(top, "hub") for top in tops] + [("hub", bottom) for bottom in bottoms])
+        assert index(wide).nbytes > 500_000
+        with pytest.raises(IndexTooLarge):
+            ReachabilityIndex(decode_topology(wide), max_bytes=500_000)
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(main, "reachability_cache", reachability_cache_from_env())
+    with TestClient(main.app) as client:
+        yield client
+
+
+class TestReachabilityEndpoints:
+    """/pipelines/reachability routes"""
+
+    def test_build_and_query(self, client):
+        built = client.post("/pipelines/reachability", json=AGENT).json()
+        assert built["num_nodes"] == 5 and built["cached"] == False
+        graph_id = built["graph_id"]
+        assert client.post("/pipelines/reachability", json=AGENT).json() == {**built, "cached": True}
+        base = f"/pipelines/reachability/{graph_id}"
+        assert client.get(base).json()["num_edges"] == 4
+        assert client.get(f"{base}/reaches", params={"source": "in", "target": "out"}).json()["reachable"] == True
+        cycle = client.get(f"{base}/would_create_cycle", params={"source": "out", "target": "llm"}).json()
+        assert cycle["creates_cycle"] == True and cycle["cycle"] == ["llm", "call", "out"]
+        assert client.get(f"{base}/nodes/llm").json()["descendants"] == ["call", "out"]
+        assert client.get(f"{base}/impact?node=call&node=lookup").json()["nodes"] == ["call", "out", "lookup"]
+
+    def test_unknown_graphs_and_nodes(self, client):
+        graph_id = client.post("/pipelines/reachability", json=AGENT).json()["graph_id"]
+        assert client.get("/pipelines/reachability/missing/reaches", params={"source": "a", "target": "b"}).status_code == 404
+        assert client.get(f"/pipelines/reachability/{graph_id}/nodes/nope").status_code == 404
+        assert client.get(f"/pipelines/reachability/{graph_id}/impact?node=nope").status_code == 404
+        assert client.post("/pipelines/reachability", content=b"{").status_code in (400, 422)
+
+    def test_indexes_that_do_not_fit_are_refused(self, client, monkeypatch):
+        monkeypatch.setenv("PIPELINE_REACHABILITY_CACHE_MAX_BYTES", "100000")
+        monkeypatch.setattr(main, "reachability_cache", reachability_cache_from_env())
+        chain = [(f"n{i}", "llm") for i in range(2000)]
+        response = client.post("/pipelines/reachability", json=pipeline(chain, [(chain[i][0], chain[i + 1][0]) for i in range(1999)]))
+        assert response.status_code == 413
+        assert main.reachability_cache.stats()["entries"] == 0
+        assert client.post("/pipelines/reachability", json=AGENT).status_code == 200
+
+    def test_queries_run_off_the_event_loop(self):
+        routes = [route for route in main.app.routes if route.path.startswith("/pipelines/reachability/")]
+        assert len(routes) == 5
+        for route in routes:
+            assert inspect.iscoroutinefunction(route.endpoint) == False
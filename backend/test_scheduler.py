@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Tests for the worker pool, concurrency caps and critical-path priorities in scheduler.py
+Runs in-process, no backend server required
+"""
+
+import asyncio
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from executor import PipelineExecutor
+from scheduler import PriorityLimiter, Scheduler, WorkStealingPool, parse_limits, scheduler_from_env
+from test_executor import edge, node, run
+
+
+@pytest.fixture
+def scheduler():
+    scheduler = Scheduler(workers=2, offload_rows=100)
+    yield scheduler
+    scheduler.shutdown()
+
+
+def blocked_pool(workers):
+    """A pool whose workers are all held until the returned event is set"""
+    pool = WorkStealingPool(workers)
+    release = threading.Event()
+    started = threading.Semaphore(0)
+
+    def hold():
+        started.release()
+        release.wait()
+
+    holds = [pool.submit(hold, worker=index) for index in range(workers)]
+    for _ in range(workers):
+        started.acquire()
+    return pool, release, holds
+
+
+class TestWorkStealingPool:
+    """Priority queues per worker, with stealing"""
+
+    def test_higher_priority_runs_first(self):
+        pool, release, _ = blocked_pool(1)
+        ran = []
+        futures = [pool.submit(lambda p=p: ran.append(p), priority=p) for p in (1, 5, 3)]
+        release.set()
+        for future in futures:
+            future.result(timeout=5)
+        assert ran == [5, 3, 1]
+        pool.shutdown()
+
+    def test_idle_workers_steal(self):
+        pool, release, holds = blocked_pool(2)
+        futures = [pool.submit(lambda: time.sleep(0.002), worker=0) for _ in range(20)]
+        release.set()
+        ran_on = [future.result(timeout=5)[1] for future in futures]
+        stats = pool.stats()
+        pool.shutdown()
+        # Everything was queued on worker 0, so whatever worker 1 ran it stole
+        assert 1 in ran_on
+        assert stats["steals"] == ran_on.count(1)
+        assert stats["tasks"] == 22
+
+    def test_exceptions_reach_the_future(self):
+        pool = WorkStealingPool(1)
+        with pytest.raises(ZeroDivisionError):
+            pool.submit(lambda: 1 / 0).result(timeout=5)
+        pool.shutdown()
+
+
+class TestPriorityLimiter:
+    """Per-type concurrency caps"""
+
+    def test_waiters_are_admitted_by_priority(self):
+        async def scenario():
+            limiter = PriorityLimiter(1)
+            order = []
+
+            async def use(priority):
+                await limiter.acquire(priority)
+                order.append(priority)
+                await asyncio.sleep(0.01)
+                limiter.release()
+
+            await limiter.acquire(0)
+            tasks = [asyncio.ensure_future(use(priority)) for priority in (1, 9, 5)]
+            await asyncio.sleep(0.01)
+            limiter.release()
+            await asyncio.gather(*tasks)
+            return limiter, order
+
+        limiter, order = asyncio.run(scenario())
+        assert order == [9, 5, 1]
+        assert limiter.stats()["peak"] == 1 and limiter.stats()["active"] == 0
+
+    def test_cancelled_waiters_free_their_slot(self):
+        async def scenario():
+            limiter = PriorityLimiter(1)
+            await limiter.acquire(0)
+            waiter = asyncio.ensure_future(limiter.acquire(1))
+            await asyncio.sleep(0)
+            waiter.cancel()
+            await asyncio.gather(waiter, return_exceptions=True)
+            limiter.release()
+            await asyncio.wait_for(limiter.acquire(2), timeout=1)
+            return limiter
+
+        assert asyncio.run(scenario()).stats()["active"] == 1
+
+
+class TestScheduler:
+    """Critical-path priorities and executor integration"""
+
+    def test_priorities_follow_the_remaining_critical_path(self, scheduler):
+        successors = {"a": ["b", "c"], "b": ["d"], "c": [], "d": []}
+        costs = {"a": 1.0, "b": 2.0, "c": 10.0, "d": 3.0}
+        assert scheduler.priorities(["a", "b", "c", "d"], successors, costs) == {"a": 11.0, "b": 5.0, "c": 10.0, "d": 3.0}
+        assert scheduler.estimate_ms("delay", {"duration": 2, "unit": "s"}) == 2000
+        scheduler.observe("math", 10.0)
+        scheduler.observe("math", 20.0)
+        assert scheduler.estimate_ms("math", {}) == 12.0
+
+    def test_large_batches_are_offloaded(self, scheduler):
+        nodes = [
+            node("input-1", "customInput", inputName="x"),
+            node("math-1", "math", operation="multiply"),
+            node("transform-1", "transform", transformation="length"),
+            node("output-1", "customOutput", outputName="y"),
+            node("output-2", "customOutput", outputName="z"),
+        ]
+        edges = [
+            edge("input-1", "value", "math-1", "a"),
+            edge("input-1", "value", "math-1", "b"),
+            edge("math-1", "result", "output-1", "value"),
+            edge("input-1", "value", "transform-1", "input"),
+            edge("transform-1", "output", "output-2", "value"),
+        ]
+        rows = list(range(1000))
+        expected = run(PipelineExecutor(nodes, edges), {"x": rows})
+        result = run(PipelineExecutor(nodes, edges, scheduler=scheduler), {"x": rows})
+        assert np.array_equal(result["outputs"]["y"], expected["outputs"]["y"])
+        assert result["timing"]["scheduler"]["offloaded"] == 2
+        assert scheduler.stats()["pool"]["tasks"] == 2
+        # Scalars stay on the event loop
+        assert run(PipelineExecutor(nodes, edges, scheduler=scheduler), {"x": 3})["timing"]["scheduler"]["offloaded"] == 0
+
+    def test_capped_types_start_longest_chain_first(self):
+        scheduler = Scheduler(workers=1, limits={"delay": 1})
+        # The short branch comes first in node and edge order, so without
+        # priorities it would take the only delay slot first
+        nodes = [node("input-1", "customInput", inputName="x"), node("short", "delay", duration=20, unit="ms")]
+        edges = [edge("input-1", "value", "short", "input")]
+        previous = "input-1"
+        for i in range(3):
+            nodes.append(node(f"long-{i}", "delay", duration=20, unit="ms"))
+            edges.append(edge(previous, "value" if previous == "input-1" else "output", f"long-{i}", "input"))
+            previous = f"long-{i}"
+        result = run(PipelineExecutor(nodes, edges, scheduler=scheduler), {"x": 1})
+        report = result["nodes"]
+        assert report["long-0"]["started_ms"] < report["short"]["started_ms"]
+        assert report["short"]["waited_ms"] > 0
+        assert scheduler.stats()["limits"]["delay"]["peak"] == 1
+        scheduler.shutdown()
+
+    def test_failures_in_the_pool_fail_the_node(self, scheduler):
+        nodes = [node("input-1", "customInput", inputName="x"), node("math-1", "math", operation="divide")]
+        edges = [edge("input-1", "value", "math-1", "a"), edge("input-1", "value", "math-1", "b")]
+        result = run(PipelineExecutor(nodes, edges, scheduler=scheduler), {"x": [0] * 500})
+        assert result["nodes"]["math-1"]["status"] == "failed"
+
+    def test_configuration_from_env(self, monkeypatch):
+        assert parse_limits("api=8, llm=2") == {"api": 8, "llm": 2}
+        with pytest.raises(ValueError):
+            parse_limits("api=0")
+        monkeypatch.setenv("PIPELINE_SCHEDULER_WORKERS", "3")
+        monkeypatch.setenv("PIPELINE_SCHEDULER_LIMITS", "api=4")
+        scheduler = scheduler_from_env()
+        assert scheduler.pool.workers == 3 and scheduler.limiters["api"].limit == 4
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+Tests for multi-worker serving: the shared validation cache (cache.py),
+/pipelines/parse offloading (batch.py, main.py) and the supervisor (serve.py)
+Runs in-process, no backend server required (serve.py is started by the tests)
+"""
+
+import http.client
+import json
+import multiprocessing
+import os
+import signal
+import subprocess
+import sys
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from bench_workers import free_port
+from cache import ResultCache, SharedTier, TieredResultCache, cache_from_env
+from metrics import SlowRequestProfiler, phase_latency
+from serve import Supervisor, configure
+from test_dag_validation import create_edge, create_node
+
+
+def put_in_child(path, key, payload):
+    SharedTier(path).put(key, payload)
+
+
+class TestSharedTier:
+    """SQLite tier shared between processes"""
+
+    def test_entries_are_visible_across_processes(self, tmp_path):
+        path = str(tmp_path / "cache.sqlite3")
+        tier = SharedTier(path)
+        assert tier.get("k") is None
+        child = multiprocessing.get_context("spawn").Process(target=put_in_child, args=(path, "k", b'{"is_dag": true}'))
+        child.start()
+        child.join()
+        assert tier.get("k") == {"is_dag": True}
+        assert tier.stats()["hits"] == 1 and tier.stats()["misses"] == 1
+
+    def test_expired_entries_miss(self, tmp_path):
+        tier = SharedTier(str(tmp_path / "cache.sqlite3"), ttl=0.05)
+        tier.put("k", b"1")
+        assert tier.get("k") == 1
+        time.sleep(0.1)
+        assert tier.get("k") is None
+
+    def test_oldest_entries_are_evicted(self, tmp_path):
+        tier = SharedTier(str(tmp_path / "cache.sqlite3"), max_entries=10)
+        for i in range(25):
+            tier.put(f"k{i}", b"1")
+        assert tier.stats()["entries"] <= 10
+        assert tier.get("k24") == 1
+        assert tier.get("k0") is None
+        tier.clear()
+        assert tier.stats()["entries"] == 0
+
+    def test_unusable_database_is_a_miss(self, tmp_path):
+        tier = SharedTier(str(tmp_path / "missing" / "cache.sqlite3"))
+        tier.put("k", b"1")
+        assert tier.get("k") is None
+        assert tier.stats()["entries"] is None
+
+
+class TestTieredResultCache:
+    """Memory in front of the shared tier"""
+
+    def test_shared_hits_are_promoted_to_memory(self, tmp_path):
+        path = str(tmp_path / "cache.sqlite3")
+        first = TieredResultCache(ResultCache(), SharedTier(path))
+        second = TieredResultCache(ResultCache(), SharedTier(path))
+        first.put(("hash", False), {"is_dag": True})
+        assert second.get(("hash", False)) == {"is_dag": True}
+        assert second.get(("hash", True)) is None
+        assert second.memory.stats()["entries"] == 1
+        assert second.stats()["shared"]["hits"] == 1
+
+    def test_cache_from_env(self, tmp_path, monkeypatch):
+        monkeypatch.delenv("PIPELINE_SHARED_CACHE_PATH", raising=False)
+        assert isinstance(cache_from_env(), ResultCache)
+        monkeypatch.setenv("PIPELINE_SHARED_CACHE_PATH", str(tmp_path / "cache.sqlite3"))
+        monkeypatch.setenv("PIPELINE_SHARED_CACHE_MAX_ENTRIES", "50")
+        cache = cache_from_env()
+        assert isinstance(cache, TieredResultCache)
+        assert cache.shared.max_entries == 50
+
+
+@pytest.fixture
+def offloading_client(monkeypatch):
+    monkeypatch.setattr(main, "parse_offload_min_bytes", 1)
+    with TestClient(main.app) as client:
+        yield client
+
+
+class TestParseOffload:
+    """Large /pipelines/parse bodies are parsed on the process pool"""
+
+    def test_offloaded_result_matches_inline(self, offloading_client):
+        pipeline = {
+            "nodes": [create_node("a", "customInput"), create_node("b", "customOutput")],
+            "edges": [create_edge("e1", "a", "b")],
+        }
+        main.validation_cache.clear()
+        offloaded = offloading_client.post("/pipelines/parse?detailed=true", json=pipeline)
+        main.validation_cache.clear()
+        inline = main.parse_body(json.dumps(pipeline).encode(), detailed=True)
+        assert offloaded.status_code == 200
+        assert offloaded.json() == inline
+
+    def test_offloaded_parse_is_cached_profiled_and_timed(self, offloading_client, monkeypatch, tmp_path):
+        monkeypatch.setattr(main, "slow_request_profiler", SlowRequestProfiler(threshold_ms=0, directory=str(tmp_path)))
+        pipeline = {
+            "nodes": [create_node("a", "customInput"), create_node("b", "customOutput")],
+            "edges": [create_edge("e1", "a", "b")],
+        }
+        main.validation_cache.clear()
+        traversals = phase_latency.count(phase="traverse")
+        first = offloading_client.post("/pipelines/parse", json=pipeline)
+        assert phase_latency.count(phase="traverse") == traversals + 1
+        assert sorted(path.suffix for path in tmp_path.iterdir()) == [".prof", ".txt"]
+        # Stored under the body hash and the topology hash
+        assert main.validation_cache.stats()["entries"] == 2
+
+        hits = main.validation_cache.stats()["hits"]
+        again = offloading_client.post("/pipelines/parse", json=pipeline)
+        assert again.json() == first.json()
+        assert phase_latency.count(phase="traverse") == traversals + 1
+        assert main.validation_cache.stats()["hits"] == hits + 1
+        key = (main.decode_pipeline(pipeline).hash(), False)
+        assert main.validation_cache.get(key) == first.json()
+
+    def test_offloaded_errors_keep_their_status(self, offloading_client):
+        response = offloading_client.post("/pipelines/parse", content=b"{not json", headers={"Content-Type": "application/json"})
+        assert response.status_code == 422
+        response = offloading_client.post("/pipelines/parse", json={"nodes": [{"id": "a"}], "edges": []})
+        assert response.status_code == 422
+        assert response.json()["detail"][0]["loc"][:3] == ["body", "nodes", 0]
+
+
+class TestServe:
+    """serve.py configuration and supervisor"""
+
+    def test_configure_keeps_explicit_settings(self):
+        environ = {"PIPELINE_BATCH_WORKERS": "3"}
+        settings = configure(workers=2, environ=environ)
+        assert settings["PIPELINE_BATCH_WORKERS"] == "3"
+        assert settings["PIPELINE_SHARED_CACHE_PATH"].endswith(".sqlite3")
+        assert configure(workers=10_000, environ={})["PIPELINE_BATCH_WORKERS"] == "1"
+
+    def test_scaling_stops_at_max_workers(self):
+        supervisor = Supervisor(None, workers=2, max_workers=3)
+        for _ in range(3):
+            supervisor.handle_scale_up(signal.SIGTTIN, None)
+        assert supervisor.target == 3
+        assert Supervisor(None, workers=4, max_workers=2).max_workers == 4
+
+    def test_workers_serve_scale_and_stop(self, tmp_path):
+        port = free_port()
+        log = open(tmp_path / "serve.log", "w+")
+        env = {**os.environ, "PIPELINE_SHARED_CACHE_PATH": str(tmp_path / "cache.sqlite3")}
+        server = subprocess.Popen(
+            [sys.executable, "serve.py", "--workers", "2", "--max-workers", "3", "--host", "127.0.0.1", "--port", str(port), "--no-access-log"],
+            cwd=os.path.dirname(os.path.abspath(__file__)), env=env, stdout=log, stderr=subprocess.STDOUT,
+        )
+
+        def wait_for(text, timeout=30):
+            deadline = time.monotonic() + timeout
+            while time.monotonic() < deadline:
+                log.seek(0)
+                if text in log.read():
+                    return True
+                time.sleep(0.1)
+            return False
+
+        try:
+            assert wait_for("Application startup complete") == True
+            connection = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+            connection.request("POST", "/pipelines/parse", json.dumps({"nodes": [], "edges": []}), {"Content-Type": "application/json"})
+            response = connection.getresponse()
+            assert response.status == 200
+            assert json.loads(response.read())["is_dag"] == True
+            connection.close()
+
+            server.send_signal(signal.SIGTTIN)
+            assert wait_for("(3 workers)") == True
+            server.send_signal(signal.SIGTTOU)
+            assert wait_for("Stopped worker process") == True
+        finally:
+            server.send_signal(signal.SIGTERM)
+            assert server.wait(timeout=30) == 0
+            log.close()
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Unit tests for incremental validation sessions in sessions.py
+Runs in-process, no backend server required
+"""
+
+import random
+
+import pytest
+from fastapi.testclient import TestClient
+
+from graph import is_acyclic
+from main import app
+from sessions import IncrementalGraph, SessionStore
+
+
+def assert_order_consistent(graph: IncrementalGraph):
+    """Every accepted edge must point forward in the maintained order"""
+    for source, target in graph.edges.values():
+        assert graph.order[source] < graph.order[target]
+
+
+class TestIncrementalGraph:
+    """Online topological order maintenance"""
+
+    def test_from_pipeline_dag(self):
+        graph = IncrementalGraph.from_pipeline(["c", "b", "a"], [("e1", "a", "b"), ("e2", "b", "c")])
+        assert graph.is_dag == True
+        assert graph.topological_order() == ["a", "b", "c"]
+
+    def test_from_pipeline_with_cycle(self):
+        graph = IncrementalGraph.from_pipeline(["a", "b"], [("e1", "a", "b"), ("e2", "b", "a")])
+        assert graph.is_dag == False
+        assert len(graph.cyclic_edges) == 1
+        assert graph.num_edges == 2
+
+    def test_from_pipeline_rejects_duplicate_edge_ids(self):
+        for edges in ([("e1", "a", "b"), ("e1", "a", "b")], [("e1", "a", "b"), ("e1", "b", "a")]):
+            with pytest.raises(ValueError):
+                IncrementalGraph.from_pipeline(["a", "b"], edges)
+        response = TestClient(app).post("/pipelines/sessions", json={
+            "nodes": [{"id": n, "type": "text", "position": {"x": 0, "y": 0}, "data": {}} for n in "ab"],
+            "edges": [{"id": "e1", "source": "a", "target": "b"}, {"id": "e1", "source": "b", "target": "a"}],
+        })
+        assert response.status_code == 400
+
+    def test_back_edge_reorders(self):
+        graph = IncrementalGraph.from_pipeline(["a", "b", "c"], [])
+        assert graph.add_edge("e1", "c", "a") == True
+        assert graph.add_edge("e2", "b", "c") == True
+        assert graph.topological_order() == ["b", "c", "a"]
+        assert_order_consistent(graph)
+
+    def test_cycle_then_removal_restores_dag(self):
+        graph = IncrementalGraph.from_pipeline(["a", "b", "c"], [("e1", "a", "b"), ("e2", "b", "c")])
+        assert graph.add_edge("e3", "c", "a") == False
+        assert graph.is_dag == False
+        graph.remove_edge("e2")
+        assert graph.is_dag == True
+        assert_order_consistent(graph)
+
+    def test_self_loop(self):
+        graph = IncrementalGraph.from_pipeline(["a"], [])
+        assert graph.add_edge("e1", "a", "a") == False
+        graph.remove_node("a")
+        assert graph.is_dag == True
+        assert graph.num_edges == 0
+
+    def test_invalid_delta_changes_nothing(self):
+        graph = IncrementalGraph.from_pipeline(["a", "b"], [("e1", "a", "b")])
+        with pytest.raises(ValueError):
+            graph.apply_delta(remove_nodes=["a"], add_edges=[("e2", "a", "b")])
+        assert graph.summary() == {"num_nodes": 2, "num_edges": 1, "is_dag": True, "cyclic_edges": []}
+
+    def test_delta_can_reuse_removed_ids(self):
+        graph = IncrementalGraph.from_pipeline(["a", "b"], [("e1", "a", "b")])
+        graph.apply_delta(remove_nodes=["b"], add_nodes=["b"], add_edges=[("e1", "b", "a")])
+        assert graph.summary() == {"num_nodes": 2, "num_edges": 1, "is_dag": True, "cyclic_edges": []}
+
+    def test_random_edits_match_full_validation(self):
+        rng = random.Random(7)
+        node_ids = [f"n{i}" for i in range(30)]
+        graph = IncrementalGraph.from_pipeline(node_ids, [])
+        live = {}
+        for step in range(600):
+            if live and rng.random() < 0.35:
+                edge_id = rng.choice(sorted(live))
+                del live[edge_id]
+                graph.remove_edge(edge_id)
+            else:
+                edge_id = f"e{step}"
+                live[edge_id] = (rng.choice(node_ids), rng.choice(node_ids))
+                graph.add_edge(edge_id, *live[edge_id])
+            assert graph.is_dag == is_acyclic(node_ids, live.values())
+            assert_order_consistent(graph)
+
+
+class TestSessionStore:
+    """Session bookkeeping"""
+
+    def test_lru_bound(self):
+        store = SessionStore(max_sessions=2)
+        first = store.create(IncrementalGraph())
+        store.create(IncrementalGraph())
+        store.create(IncrementalGraph())
+        with pytest.raises(KeyError):
+            store.get(first)
+
+    def test_delete(self):
+        store = SessionStore()
+        session_id = store.create(IncrementalGraph())
+        store.delete(session_id)
+        with pytest.raises(KeyError):
+            store.delete(session_id)
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Unit tests for SSE streaming of pipeline runs in streaming.py
+Runs in-process, no backend server required
+"""
+
+import asyncio
+import json
+import time
+
+from executor import PipelineExecutor
+from streaming import stream_run
+from test_executor import edge, node
+
+
+def parse_frame(frame: str):
+    event_line, data_line = frame.strip().split("\n")
+    assert event_line.startswith("event: ")
+    return event_line[len("event: "):], json.loads(data_line[len("data: "):])
+
+
+def fast_and_slow_pipeline() -> PipelineExecutor:
+    nodes = [
+        node("input-1", "customInput", inputName="x"),
+        node("output-fast", "customOutput", outputName="fast"),
+        node("delay-1", "delay", duration=200, unit="ms"),
+        node("output-slow", "customOutput", outputName="slow"),
+    ]
+    edges = [
+        edge("input-1", "value", "output-fast", "value"),
+        edge("input-1", "value", "delay-1", "input"),
+        edge("delay-1", "output", "output-slow", "value"),
+    ]
+    return PipelineExecutor(nodes, edges)
+
+
+class TestStreamRun:
+    """Event order, time-to-first-result and backpressure"""
+
+    def test_fast_branch_arrives_before_slow_branch_finishes(self):
+        async def collect():
+            start = time.perf_counter()
+            events = []
+            async for frame in stream_run(fast_and_slow_pipeline(), {"x": 1}):
+                events.append((time.perf_counter() - start, *parse_frame(frame)))
+            return events
+
+        events = asyncio.run(collect())
+        names = [(name, data.get("node_id")) for _, name, data in events]
+        assert names[-1] == ("run_finished", None)
+        assert names.index(("node_finished", "output-fast")) < names.index(("node_finished", "delay-1"))
+
+        fast_at = next(t for t, name, data in events if name == "node_finished" and data["node_id"] == "output-fast")
+        assert fast_at < 0.15
+        assert events[-1][2]["outputs"] == {"fast": 1, "slow": 1}
+
+    def test_slow_consumer_applies_backpressure(self):
+        async def collect():
+            frames = []
+            stream = stream_run(fast_and_slow_pipeline(), {"x": 1}, max_pending=1)
+            async for frame in stream:
+                frames.append(frame)
+                await asyncio.sleep(0.05)
+            return frames
+
+        frames = asyncio.run(collect())
+        assert parse_frame(frames[-1])[0] == "run_finished"
+        # Nothing is dropped: 4 nodes started and finished, plus run_finished
+        assert len(frames) == 9
+
+    def test_closing_stream_cancels_run(self):
+        async def close_early():
+            stream = stream_run(fast_and_slow_pipeline(), {"x": 1})
+            first = await stream.__anext__()
+            await stream.aclose()
+            await asyncio.sleep(0.01)
+            return first, [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+
+        first, leftover = asyncio.run(close_early())
+        assert parse_frame(first)[0] == "node_started"
+        # The 200 ms delay node would still be sleeping had the run not been cancelled
+        assert all(task.done() for task in leftover)
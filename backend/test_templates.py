@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Unit tests for compiled text node templates in templates.py
+Runs in-process, no backend server required
+"""
+
+import asyncio
+
+import pytest
+
+from executor import PipelineExecutor
+from templates import TEMPLATE_VARIABLE, compile_template
+from test_executor import edge, node
+
+
+class TestRenderPlan:
+    """Compilation, caching and rendering"""
+
+    def test_plan_splits_segments_and_slots(self):
+        plan = compile_template("Hi {{ name }}, {{greeting}}!")
+        assert plan.segments == ("Hi ", ", ", "!")
+        assert plan.slots == ("name", "greeting")
+        assert plan.variables == {"name", "greeting"}
+        assert compile_template("Hi {{ name }}, {{greeting}}!") is plan
+
+    def test_render_fills_slots_and_keeps_braces(self):
+        plan = compile_template("{json: {{x}}} {{x}} {{ y }}")
+        assert plan.render({"x": 1, "y": None}) == "{json: 1} 1 None"
+        assert plan.render({}) == "{json: }  "
+        assert compile_template("no variables").render({"x": 1}) == "no variables"
+
+    def test_missing_variables_are_known_before_rendering(self):
+        plan = compile_template("{{a}} {{b}} {{a}} {{c}}")
+        assert plan.missing({"b"}) == ["a", "c"]
+        assert plan.missing({"a", "b", "c"}) == []
+
+    def test_render_batch_broadcasts_constants(self):
+        plan = compile_template("{{greeting}}, {{name}}")
+        rows = plan.render_batch({"greeting": "Hi", "name": ["Ada", "Bob"]}, 2)
+        assert rows == ["Hi, Ada", "Hi, Bob"]
+        assert compile_template("static").render_batch({}, 3) == ["static"] * 3
+
+    @pytest.mark.parametrize("template", ["{{input}}", "a {{ b }} c", "{{x}}{{y}}", "{ {{x}} }"])
+    def test_render_matches_regex_substitution(self, template):
+        values = {"input": "I", "b": 2, "x": "X"}
+        expected = TEMPLATE_VARIABLE.sub(lambda m: str(values.get(m.group(1).strip(), "")), template)
+        assert compile_template(template).render(values) == expected
+
+
+class TestTextRuntime:
+    """Text nodes render through the compiled plan"""
+
+    def pipeline(self):
+        nodes = [
+            node("input-1", "customInput", inputName="names"),
+            node("text-1", "text", text="Dear {{name}},"),
+            node("output-1", "customOutput", outputName="letters"),
+        ]
+        edges = [
+            edge("input-1", "value", "text-1", "name"),
+            edge("text-1", "output", "output-1", "value"),
+        ]
+        return PipelineExecutor(nodes, edges)
+
+    def test_single_value_and_batch(self):
+        executor = self.pipeline()
+        assert asyncio.run(executor.run({"names": "Ada"}))["outputs"] == {"letters": "Dear Ada,"}
+        result = asyncio.run(executor.run({"names": ["Ada", "Bob"]}))
+        assert result["outputs"] == {"letters": ["Dear Ada,", "Dear Bob,"]}
+
+    def test_batches_of_different_lengths_fail(self):
+        nodes = [
+            node("input-1", "customInput", inputName="a"),
+            node("input-2", "customInput", inputName="b"),
+            node("text-1", "text", text="{{a}}{{b}}"),
+        ]
+        edges = [edge("input-1", "value", "text-1", "a"), edge("input-2", "value", "text-1", "b")]
+        result = asyncio.run(PipelineExecutor(nodes, edges).run({"a": [1, 2], "b": [1]}))
+        assert result["status"] == "failed"
+        assert "different lengths" in result["nodes"]["text-1"]["error"]
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Unit tests for structural pipeline validation in validation.py
+Runs in-process, no backend server required
+"""
+
+from fastapi.testclient import TestClient
+
+from fastpath import decode_topology
+from main import app, validation_cache
+from test_dag_validation import create_edge, create_node
+from validation import template_variables, validate_topology
+
+
+def pipeline(nodes, edges):
+    return {"nodes": nodes, "edges": edges}
+
+
+def text_node(node_id: str, text: str):
+    node = create_node(node_id, "text", 200, 0)
+    node["data"]["text"] = text
+    return node
+
+
+def valid_pipeline():
+    return pipeline(
+        [
+            create_node("input-1", "customInput", 0, 0),
+            text_node("text-1", "Hi {{ name }}"),
+            create_node("output-1", "customOutput", 400, 0),
+        ],
+        [
+            create_edge("e1", "input-1", "text-1", "input-1-value", "text-1-name"),
+            create_edge("e2", "text-1", "output-1", "text-1-output", "output-1-value"),
+        ],
+    )
+
+
+def validate(payload, detailed=False):
+    return validate_topology(decode_topology(payload), detailed)
+
+
+def issue_types(result):
+    return sorted(item["type"] for item in result["issues"])
+
+
+class TestValidateTopology:
+    """Issues found alongside cycle detection"""
+
+    def test_valid_pipeline_has_no_issues(self):
+        result = validate(valid_pipeline())
+        assert result["is_dag"] == True
+        assert result["is_valid"] == True
+        assert result["issues"] == []
+
+    def test_template_variables(self):
+        assert template_variables("{{a}} and {{ b }} and {{a}}") == {"a", "b"}
+        assert template_variables(None) == {"input"}
+
+    def test_dangling_edge(self):
+        payload = valid_pipeline()
+        payload["edges"].append(create_edge("e3", "text-1", "ghost"))
+        result = validate(payload)
+        assert result["is_dag"] == True
+        assert result["is_valid"] == False
+        assert result["issues"][0]["type"] == "dangling_edge"
+        assert result["issues"][0]["node_id"] == "ghost"
+
+    def test_duplicate_ids(self):
+        payload = valid_pipeline()
+        payload["nodes"].append(create_node("text-1", "llm", 0, 0))
+        payload["edges"].append(create_edge("e1", "input-1", "output-1"))
+        assert issue_types(validate(payload)) == ["duplicate_edge_id", "duplicate_node_id"]
+
+    def test_handle_mismatches(self):
+        payload = valid_pipeline()
+        payload["edges"][0]["targetHandle"] = "text-1-other"
+        payload["edges"][1]["sourceHandle"] = "output-1-value"
+        result = validate(payload)
+        # The text node's {{ name }} is left unfed by the misdirected edge
+        assert issue_types(result) == ["invalid_source_handle", "invalid_target_handle", "unconnected_variable"]
+        assert result["num_errors"] == 2
+
+    def test_text_handles_follow_template(self):
+        payload = valid_pipeline()
+        payload["nodes"][1]["data"]["text"] = "{{other}}"
+        assert issue_types(validate(payload)) == ["invalid_target_handle", "unconnected_variable"]
+
+    def test_unconnected_template_variables_are_warnings(self):
+        payload = valid_pipeline()
+        payload["nodes"][1]["data"]["text"] = "{{name}} and {{extra}}, {{extra}} again"
+        result = validate(payload)
+        assert result["is_valid"] == True
+        assert result["num_warnings"] == 1
+        assert result["issues"][0]["type"] == "unconnected_variable"
+        assert result["issues"][0]["variable"] == "extra"
+
+    def test_unknown_node_type(self):
+        payload = valid_pipeline()
+        payload["nodes"].append(create_node("x-1", "mystery", 0, 0))
+        payload["edges"].append(create_edge("e3", "input-1", "x-1", "input-1-value", "x-1-in"))
+        assert issue_types(validate(payload)) == ["unknown_node_type"]
+
+    def test_unreachable_nodes_and_outputs_are_warnings(self):
+        payload = valid_pipeline()
+        payload["nodes"].append(text_node("text-2", "constant"))
+        payload["nodes"].append(create_node("output-2", "customOutput", 400, 200))
+        payload["edges"].append(create_edge("e3", "text-2", "output-2", "text-2-output", "output-2-value"))
+        result = validate(payload)
+        assert result["is_valid"] == True
+        assert result["num_warnings"] == 2
+        assert issue_types(result) == ["output_without_input", "unreachable_node"]
+
+    def test_reachability_through_wide_fan_out(self):
+        """Wide levels propagate reachability with the vectorized traversal"""
+        nodes = [create_node("input-1", "customInput", 0, 0), create_node("output-1", "customOutput", 0, 0)]
+        edges = []
+        for i in range(100):
+            nodes.append(create_node(f"t{i}", "transform", 0, 0))
+            edges.append(create_edge(f"a{i}", "input-1", f"t{i}", "input-1-value", f"t{i}-input"))
+            edges.append(create_edge(f"b{i}", f"t{i}", "output-1", f"t{i}-output", "output-1-value"))
+        nodes.append(create_node("orphan", "transform", 0, 0))
+        result = validate(pipeline(nodes, edges))
+        assert [item["node_id"] for item in result["issues"]] == ["orphan"]
+
+    def test_cycle_is_an_error(self):
+        payload = valid_pipeline()
+        payload["nodes"].append(create_node("llm-1", "llm", 0, 0))
+        payload["edges"].append(create_edge("e3", "llm-1", "llm-1", "llm-1-response", "llm-1-prompt"))
+        result = validate(payload, detailed=True)
+        assert result["is_dag"] == False
+        assert issue_types(result) == ["cycle", "unreachable_node"]
+        assert result["cycles"][0]["edges"] == ["e3"]
+
+
+class TestValidationEndpoints:
+    """Reports on /pipelines/parse and refusal on /pipelines/run"""
+
+    def test_parse_reports_issues(self):
+        validation_cache.clear()
+        payload = valid_pipeline()
+        payload["edges"].append(create_edge("e3", "text-1", "ghost"))
+        body = TestClient(app).post("/pipelines/parse", json=payload).json()
+        assert body["is_dag"] == True
+        assert body["is_valid"] == False
+        assert body["issues"][0]["type"] == "dangling_edge"
+
+    def test_template_edit_changes_cache_key(self):
+        validation_cache.clear()
+        client = TestClient(app)
+        payload = valid_pipeline()
+        assert client.post("/pipelines/parse", json=payload).json()["is_valid"] == True
+        payload["nodes"][1]["data"]["text"] = "{{renamed}}"
+        assert client.post("/pipelines/parse", json=payload).json()["is_valid"] == False
+
+    def test_run_refuses_invalid_pipeline(self):
+        payload = valid_pipeline()
+        payload["edges"][0]["targetHandle"] = "text-1-other"
+        response = TestClient(app).post("/pipelines/run", json={**payload, "inputs": {}})
+        assert response.status_code == 400
+        assert "unknown handle 'text-1-other'" in response.json()["detail"]
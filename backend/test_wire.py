@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Tests for compressed and binary /pipelines/parse wire formats in wire.py
+Runs in-process through FastAPI's TestClient, no backend server required
+"""
+
+import gzip
+import json
+import zlib
+
+import pytest
+from fastapi.testclient import TestClient
+
+from fastpath import decode_topology
+from main import app, validation_cache
+from test_dag_validation import create_edge, create_node
+from wire import (EDGE_LIST, BodyTooLarge, UnsupportedFormat, accepted, decode_edge_list, decompress,
+                  encode_edge_list)
+
+
+def pipeline(n: int = 4):
+    nodes = [create_node("in", "customInput")] + [create_node(f"t{i}", "transform") for i in range(n)]
+    nodes.append({"id": "txt", "type": "text", "position": {"x": 0, "y": 0}, "data": {"text": "Hi {{ name }}, ✓"}})
+    edges = [create_edge("e-in", "in", "t0", "in-value", "t0-input")]
+    edges += [create_edge(f"e{i}", f"t{i}", f"t{i + 1}") for i in range(n - 1)]
+    edges.append(create_edge("e-txt", f"t{n - 1}", "txt", None, "txt-name"))
+    return {"nodes": nodes, "edges": edges}
+
+
+def edge_list(payload) -> bytes:
+    return encode_edge_list(decode_topology(payload))
+
+
+@pytest.fixture(scope="module")
+def client():
+    with TestClient(app) as client:
+        yield client
+
+
+def parse(client, body, content_type="application/json", **headers):
+    validation_cache.clear()
+    return client.post("/pipelines/parse?detailed=true", content=body, headers={"Content-Type": content_type, **headers})
+
+
+class TestEdgeList:
+    """Binary topology-only format"""
+
+    def test_round_trip(self):
+        topology = decode_topology(pipeline())
+        decoded = decode_edge_list(encode_edge_list(topology))
+        for name in ("node_ids", "node_types", "templates", "edge_ids", "sources", "targets", "source_handles", "target_handles"):
+            assert getattr(decoded, name) == getattr(topology, name)
+        assert decoded.hash() == topology.hash()
+
+    def test_empty_strings_and_empty_pipeline(self):
+        payload = {"nodes": [{"id": "", "type": "text", "data": {"text": ""}}], "edges": []}
+        assert decode_edge_list(edge_list(payload)).templates == [""]
+        assert decode_edge_list(edge_list({"nodes": [], "edges": []})).num_nodes == 0
+
+    def test_malformed_bodies(self):
+        body = edge_list(pipeline())
+        with pytest.raises(ValueError, match="header"):
+            decode_edge_list(b"JSON" + body[4:])
+        with pytest.raises(ValueError, match="size"):
+            decode_edge_list(body[:-4])
+        with pytest.raises(ValueError, match="out of range"):
+            decode_edge_list(body[:-4] + (10_000).to_bytes(4, "little"))
+        topology = decode_topology(pipeline())
+        topology.sources[0] = None
+        with pytest.raises(ValueError, match="edge source ID must be set"):
+            decode_edge_list(encode_edge_list(topology))
+
+    def test_nul_characters_are_rejected(self):
+        with pytest.raises(ValueError, match="NUL"):
+            edge_list({"nodes": [{"id": "a\x00b", "type": "text"}], "edges": []})
+
+
+class TestDecompress:
+    """Content-Encoding handling"""
+
+    def test_gzip_deflate_and_stacked_codings(self):
+        raw = b'{"nodes": [], "edges": []}'
+        assert decompress(gzip.compress(raw), "gzip") == raw
+        assert decompress(zlib.compress(raw), "deflate") == raw
+        assert decompress(gzip.compress(zlib.compress(raw)), "deflate, gzip") == raw
+        assert decompress(raw, "identity") == raw
+
+    def test_errors(self):
+        with pytest.raises(UnsupportedFormat):
+            decompress(b"x", "br")
+        with pytest.raises(BodyTooLarge):
+            decompress(gzip.compress(b" " * 10_000), "gzip", limit=1_000)
+        with pytest.raises(ValueError, match="Truncated"):
+            decompress(gzip.compress(b"x" * 1000)[:-8], "gzip")
+        with pytest.raises(ValueError, match="Invalid gzip"):
+            decompress(b"not gzip", "gzip")
+
+    def test_zstd(self):
+        zstandard = pytest.importorskip("zstandard")
+        raw = b"x" * 5000
+        assert decompress(zstandard.ZstdCompressor().compress(raw), "zstd") == raw
+        with pytest.raises(BodyTooLarge):
+            decompress(zstandard.ZstdCompressor().compress(raw), "zstd", limit=100)
+
+    def test_accepted(self):
+        assert accepted("gzip, deflate, br", ("zstd", "gzip")) == "gzip"
+        assert accepted("zstd;q=0.5, gzip", ("zstd", "gzip")) == "zstd"
+        assert accepted("gzip;q=0", ("gzip",)) is None
+        assert accepted("", ("gzip",)) is None
+
+
+class TestParseEndpoint:
+    """Content negotiation on POST /pipelines/parse"""
+
+    def test_every_request_format_gives_the_same_result(self, client):
+        payload = pipeline(50)
+        raw = json.dumps(payload).encode()
+        expected = parse(client, raw).json()
+        assert parse(client, gzip.compress(raw), **{"Content-Encoding": "gzip"}).json() == expected
+        assert parse(client, edge_list(payload), EDGE_LIST).json() == expected
+        assert parse(client, gzip.compress(edge_list(payload)), EDGE_LIST, **{"Content-Encoding": "gzip"}).json() == expected
+
+    def test_msgpack_request_and_response(self, client):
+        msgpack = pytest.importorskip("msgpack")
+        payload = pipeline()
+        expected = parse(client, json.dumps(payload).encode()).json()
+        response = parse(client, msgpack.packb(payload), "application/msgpack", Accept="application/msgpack")
+        assert response.headers["content-type"] == "application/msgpack"
+        assert msgpack.unpackb(response.content) == expected
+        assert parse(client, b"\xc1", "application/msgpack").status_code == 422
+
+    def test_large_responses_are_compressed(self, client):
+        raw = json.dumps(pipeline(200)).encode()
+        response = parse(client, raw, **{"Accept-Encoding": "gzip"})
+        assert response.headers["content-encoding"] == "gzip"
+        assert response.json()["num_nodes"] == 202
+        assert "accept-encoding" in response.headers["vary"].lower()
+        small = client.post("/pipelines/parse", json={"nodes": [], "edges": []}, headers={"Accept-Encoding": "gzip"})
+        assert "content-encoding" not in small.headers
+
+    def test_errors(self, client, monkeypatch):
+        raw = json.dumps(pipeline()).encode()
+        assert parse(client, raw, **{"Content-Encoding": "br"}).status_code == 415
+        assert parse(client, b"garbage", **{"Content-Encoding": "gzip"}).status_code == 400
+        assert parse(client, b"VSE1", EDGE_LIST).status_code == 422
+        monkeypatch.setenv("PIPELINE_MAX_BODY_BYTES", "100")
+        assert parse(client, gzip.compress(raw), **{"Content-Encoding": "gzip"}).status_code == 413
@@ -0,0 +1,209 @@
+"""
+Structural validation of VectorShift pipelines.
+
+An acyclic pipeline can still be broken: edges that point at missing nodes,
+two nodes sharing an ID, or an edge wired to a handle its node does not have
+all used to pass as `is_dag: true` and only failed once the pipeline ran.
+validate_topology reports these alongside cycle detection:
+
+- errors: duplicate node or edge IDs, dangling edges, unknown node types,
+  source/target handles the node does not have, and cycles
+- warnings: nodes not reachable from any customInput, customOutput nodes
+  with no customInput upstream (they can only ever output constants), and
+  text node variables no edge feeds (they always render empty)
+
+Handle names follow the frontend node components; a text node's input
+handles are the `{{variables}}` of its template. Reachability is propagated
+during the same Kahn traversal that detects cycles, so a valid pipeline is
+checked in one pass over its edges.
+"""
+
+from collections import Counter
+from typing import Any, Collection, Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+from fastpath import Topology
+from graph import CompactGraph, describe_levels
+from metrics import phase
+from templates import compile_template
+
+# (input handles, output handles) per node type; None means "from the template"
+NODE_HANDLES: Dict[str, Tuple[Optional[Tuple[str, ...]], Tuple[str, ...]]] = {
+    'customInput': ((), ('value',)),
+    'customOutput': (('value',), ()),
+    'text': (None, ('output',)),
+    'llm': (('system', 'prompt'), ('response',)),
+    'math': (('a', 'b'), ('result',)),
+    'filter': (('input',), ('passed', 'failed')),
+    'delay': (('input',), ('output',)),
+    'transform': (('input',), ('output',)),
+    'api': (('body', 'params'), ('response', 'error')),
+}
+
+# Template a text node starts with in the frontend
+DEFAULT_TEMPLATE = '{{input}}'
+
+# Issues listed in a response; the counts always cover all of them
+MAX_ISSUES = 100
+
+
+def template_variables(template: Optional[str]) -> Set[str]:
+    """Variable names of a text node template, i.e. its input handles"""
+    return set(compile_template(template or DEFAULT_TEMPLATE).variables)
+
+
+def issue(kind: str, severity: str, message: str, **ids: Any) -> Dict[str, Any]:
+    return {'type': kind, 'severity': severity, 'message': message, **ids}
+
+
+def check_handles(topology: Topology, node_type: Dict[str, str], kept: np.ndarray) -> Tuple[List[Dict[str, Any]], List[Tuple[str, str]]]:
+    """
+    Handles on kept (non-dangling) edges that their endpoint node does not
+    have, and the (node ID, variable) pairs of text node variables that no
+    edge feeds
+    """
+    # Input and output handle names per node; None for unknown types, which are reported separately
+    inputs: Dict[str, Optional[Collection[str]]] = {}
+    outputs: Dict[str, Optional[Collection[str]]] = {}
+    templates = dict(zip(reversed(topology.node_ids), reversed(topology.templates)))
+    # Variables fed by an edge, per text node
+    connected: Dict[str, Set[str]] = {}
+    for node_id, kind in node_type.items():
+        handles = NODE_HANDLES.get(kind)
+        if handles is None:
+            inputs[node_id] = outputs[node_id] = None
+        else:
+            inputs[node_id] = template_variables(templates[node_id]) if handles[0] is None else handles[0]
+            outputs[node_id] = handles[1]
+            if handles[0] is None:
+                connected[node_id] = set()
+
+    # Handle names never contain '-' (text variables are \w+), so a handle
+    # ID splits at its last '-' into the node ID and the handle name
+    issues = []
+    columns = zip(kept.tolist(), topology.edge_ids, topology.sources, topology.targets, topology.source_handles, topology.target_handles)
+    for is_kept, edge_id, source, target, source_handle, target_handle in columns:
+        if not is_kept:
+            continue
+        if source_handle is not None:
+            node_id, _, name = source_handle.rpartition('-')
+            names = outputs[source]
+            valid_source = names is None or (node_id == source and name in names)
+        else:
+            valid_source = True
+        if target_handle is not None:
+            node_id, _, name = target_handle.rpartition('-')
+            names = inputs[target]
+            valid_target = names is None or (node_id == target and name in names)
+            if valid_target and target in connected:
+                connected[target].add(name)
+        elif target in connected:
+            # The executor names the input of an edge without a handle after its source
+            connected[target].add(source)
+            valid_target = True
+        else:
+            valid_target = True
+
+        if not valid_source:
+            issues.append(issue(
+                'invalid_source_handle', 'error',
+                f"Edge '{edge_id}' leaves {node_type[source]} node '{source}' from unknown handle '{source_handle}'",
+                edge_id=edge_id, node_id=source,
+            ))
+        if not valid_target:
+            issues.append(issue(
+                'invalid_target_handle', 'error',
+                f"Edge '{edge_id}' enters {node_type[target]} node '{target}' at unknown handle '{target_handle}'",
+                edge_id=edge_id, node_id=target,
+            ))
+
+    unconnected = [
+        (node_id, name)
+        for node_id, fed in connected.items()
+        for name in compile_template(templates[node_id] or DEFAULT_TEMPLATE).missing(fed)
+    ]
+    return issues, unconnected
+
+
+def validate_topology(topology: Topology, detailed: bool = False) -> Dict[str, Any]:
+    """
+    Check a pipeline's structure. The result has `is_dag`, `is_valid` (no
+    errors), error/warning counts and the first MAX_ISSUES issues; with
+    `detailed` it also carries the analyze_graph fields (order, levels,
+    critical path, cycles) from the same traversal.
+    """
+    with phase('build'):
+        graph = CompactGraph.build(topology.node_ids, topology.sources, topology.targets)
+    index = graph.index
+    issues = []
+
+    with phase('check'):
+        # First occurrence wins for duplicated IDs, as in the graph itself
+        node_type = dict(zip(reversed(topology.node_ids), reversed(topology.node_types)))
+        if graph.num_nodes < topology.num_nodes:
+            for node_id, count in Counter(topology.node_ids).items():
+                if count > 1:
+                    issues.append(issue('duplicate_node_id', 'error', f"Node ID '{node_id}' is used by {count} nodes", node_id=node_id))
+        if len(set(topology.edge_ids)) < topology.num_edges:
+            for edge_id, count in Counter(topology.edge_ids).items():
+                if count > 1:
+                    issues.append(issue('duplicate_edge_id', 'error', f"Edge ID '{edge_id}' is used by {count} edges", edge_id=edge_id))
+
+        for node_id in graph.ids:
+            if node_type[node_id] not in NODE_HANDLES:
+                issues.append(issue('unknown_node_type', 'error', f"Node '{node_id}' has unknown type '{node_type[node_id]}'", node_id=node_id))
+
+        kept = np.zeros(topology.num_edges, dtype=bool)
+        kept[graph.edge_index] = True
+        for i in np.flatnonzero(~kept).tolist():
+            edge_id, source, target = topology.edge_ids[i], topology.sources[i], topology.targets[i]
+            missing = source if source not in index else target
+            issues.append(issue('dangling_edge', 'error', f"Edge '{edge_id}' references missing node '{missing}'", edge_id=edge_id, node_id=missing))
+
+        handle_issues, unconnected = check_handles(topology, node_type, kept)
+        issues.extend(handle_issues)
+
+    with phase('traverse'):
+        inputs = [u for u, node_id in enumerate(graph.ids) if node_type[node_id] == 'customInput']
+        reach = np.zeros(graph.num_nodes, dtype=bool)
+        reach[inputs] = True
+        levels = graph.topological_levels(reach)
+        is_dag = sum(map(len, levels)) == graph.num_nodes
+
+        analysis = None
+        if detailed or not is_dag:
+            analysis = describe_levels(graph, levels, topology.edge_ids)
+        if not is_dag:
+            # Kahn's algorithm stops at the cycle, so finish reachability separately
+            reach = graph.reachable(inputs)
+            for cycle in analysis['cycles']:
+                path = ' -> '.join(cycle['nodes'] + cycle['nodes'][:1])
+                issues.append(issue('cycle', 'error', f"Pipeline contains a cycle: {path}", nodes=cycle['nodes'], edges=cycle['edges']))
+
+    num_errors = len(issues)
+    # Warnings can cover every node, so only those that fit in the response are built
+    unreachable = np.flatnonzero(~reach)
+    for u in unreachable[:max(MAX_ISSUES - num_errors, 0)].tolist():
+        node_id = graph.ids[u]
+        if node_type[node_id] == 'customOutput':
+            issues.append(issue('output_without_input', 'warning', f"Output '{node_id}' has no input upstream", node_id=node_id))
+        else:
+            issues.append(issue('unreachable_node', 'warning', f"Node '{node_id}' is not reachable from any input", node_id=node_id))
+    for node_id, name in unconnected[:max(MAX_ISSUES - len(issues), 0)]:
+        issues.append(issue(
+            'unconnected_variable', 'warning',
+            f"Variable '{name}' of text node '{node_id}' has no incoming edge and renders empty",
+            node_id=node_id, variable=name,
+        ))
+
+    result = {
+        'is_dag': is_dag,
+        'is_valid': num_errors == 0,
+        'num_errors': num_errors,
+        'num_warnings': len(unreachable) + len(unconnected),
+        'issues': issues[:MAX_ISSUES],
+    }
+    if detailed:
+        result.update(analysis)
+    return result
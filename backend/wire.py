@@ -0,0 +1,252 @@
+"""
+Compressed and binary wire formats for /pipelines/parse.
+
+Request bodies are chosen by content negotiation:
+
+- `Content-Encoding: gzip`, `deflate` or `zstd` (zstd needs the optional
+  zstandard package) is decompressed first, up to `PIPELINE_MAX_BODY_BYTES`
+  (default 256 MiB) so a small compressed body cannot expand without bound
+- `Content-Type: application/msgpack` bodies are MessagePack (optional
+  msgpack package) with the same structure as the JSON body
+- `Content-Type: application/vnd.pipeline.edgelist` bodies are the binary
+  topology-only edge list below, decoded straight into a Topology
+- anything else is JSON, as before
+
+Responses are JSON, or MessagePack when `Accept` asks for it, and are
+compressed with zstd or gzip per `Accept-Encoding` once larger than
+COMPRESS_MIN_BYTES.
+
+Edge list format, little-endian:
+
+    magic       4 bytes   b'VSE1'
+    counts      4 uint32  strings, nodes, edges, string table bytes
+    strings     UTF-8, NUL-separated, then zero padding to a multiple of 4 bytes
+    columns     int32 string indices (-1 for none): node ids, node types,
+                text templates (per node); edge ids, sources, targets,
+                source handles, target handles (per edge)
+
+Every string is stored once, so a node ID costs 4 bytes per edge that
+references it, and decoding is one UTF-8 decode, one split and index
+lookups instead of a JSON parse.
+"""
+
+import gzip
+import io
+import json
+import os
+import zlib
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+from fastapi import Response
+
+from fastpath import Topology
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - msgpack is optional
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - zstandard is optional
+    zstandard = None
+
+try:
+    import orjson
+    dumps = orjson.dumps
+except ImportError:  # pragma: no cover - orjson is optional
+    def dumps(value: Any) -> bytes:
+        return json.dumps(value, separators=(',', ':')).encode()
+
+JSON = 'application/json'
+MSGPACK = 'application/msgpack'
+MSGPACK_TYPES = (MSGPACK, 'application/x-msgpack', 'application/vnd.msgpack')
+EDGE_LIST = 'application/vnd.pipeline.edgelist'
+
+EDGE_LIST_MAGIC = b'VSE1'
+_HEADER = np.dtype('<u4')
+_INDEX = np.dtype('<i4')
+
+_DECOMPRESS_ERRORS = (zlib.error, zstandard.ZstdError) if zstandard is not None else (zlib.error,)
+
+# Responses smaller than this are not worth a compressor's CPU time
+COMPRESS_MIN_BYTES = 1024
+GZIP_LEVEL = 5
+ZSTD_LEVEL = 3
+
+
+class UnsupportedFormat(ValueError):
+    """A content type or encoding this server cannot decode (415)"""
+
+
+class BodyTooLarge(ValueError):
+    """A compressed body that expands past the size limit (413)"""
+
+
+def max_body_bytes() -> int:
+    return int(os.environ.get('PIPELINE_MAX_BODY_BYTES', 256 * 2**20))
+
+
+def media_type(header: str) -> str:
+    return header.split(';', 1)[0].strip().lower()
+
+
+def body_format(content_type: str) -> str:
+    """'json', 'msgpack' or 'edgelist' for a Content-Type header"""
+    kind = media_type(content_type)
+    if kind in MSGPACK_TYPES:
+        return 'msgpack'
+    if kind == EDGE_LIST:
+        return 'edgelist'
+    return 'json'
+
+
+def _inflate(body: bytes, wbits: int, limit: int) -> bytes:
+    """zlib/gzip decompression of every member, failing past `limit` bytes"""
+    parts: List[bytes] = []
+    size = 0
+    while body:
+        decompressor = zlib.decompressobj(wbits)
+        part = decompressor.decompress(body, limit - size + 1)
+        size += len(part)
+        if size > limit:
+            raise BodyTooLarge(f"Decompressed body exceeds {limit} bytes")
+        if not decompressor.eof:
+            raise ValueError('Truncated compressed body')
+        parts.append(part)
+        body = decompressor.unused_data
+    return b''.join(parts)
+
+
+def decompress(body: bytes, content_encoding: str, limit: Optional[int] = None) -> bytes:
+    """Undo a Content-Encoding header (codings are applied in order, so undone in reverse)"""
+    limit = max_body_bytes() if limit is None else limit
+    codings = [coding.strip().lower() for coding in content_encoding.split(',') if coding.strip()]
+    for coding in reversed(codings):
+        try:
+            if coding in ('gzip', 'x-gzip'):
+                body = _inflate(body, 16 + zlib.MAX_WBITS, limit)
+            elif coding == 'deflate':
+                # zlib-wrapped as HTTP specifies; 32 also accepts gzip headers
+                body = _inflate(body, 32 + zlib.MAX_WBITS, limit)
+            elif coding == 'zstd':
+                if zstandard is None:
+                    raise UnsupportedFormat('zstd request bodies require the zstandard package')
+                body = zstandard.ZstdDecompressor().stream_reader(io.BytesIO(body)).read(limit + 1)
+                if len(body) > limit:
+                    raise BodyTooLarge(f"Decompressed body exceeds {limit} bytes")
+            elif coding != 'identity':
+                raise UnsupportedFormat(f"Unsupported Content-Encoding '{coding}'")
+        except _DECOMPRESS_ERRORS as e:
+            raise ValueError(f"Invalid {coding} body: {e}")
+    return body
+
+
+def unpack(body: bytes) -> Any:
+    """Decode a MessagePack body"""
+    if msgpack is None:
+        raise UnsupportedFormat('MessagePack request bodies require the msgpack package')
+    try:
+        return msgpack.unpackb(body, raw=False, strict_map_key=False)
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"Invalid MessagePack body: {e}")
+
+
+def encode_edge_list(topology: Topology) -> bytes:
+    """Encode a topology in the edge list format"""
+    index: Dict[str, int] = {}
+
+    def column(values: Sequence[Optional[str]]) -> np.ndarray:
+        ids = []
+        for value in values:
+            if value is None:
+                ids.append(-1)
+                continue
+            if '\x00' in value:
+                raise ValueError('Edge list strings cannot contain NUL characters')
+            ids.append(index.setdefault(value, len(index)))
+        return np.array(ids, dtype=_INDEX)
+
+    columns = [column(values) for values in (
+        topology.node_ids, topology.node_types, topology.templates,
+        topology.edge_ids, topology.sources, topology.targets, topology.source_handles, topology.target_handles,
+    )]
+    table = '\x00'.join(index).encode()
+    counts = np.array([len(index), topology.num_nodes, topology.num_edges, len(table)], dtype=_HEADER)
+    padding = b'\x00' * (-len(table) % 4)
+    return b''.join([EDGE_LIST_MAGIC, counts.tobytes(), table, padding, *(values.tobytes() for values in columns)])
+
+
+def decode_edge_list(body: bytes) -> Topology:
+    """Decode an edge list body; raises ValueError when it is malformed"""
+    if len(body) < 20 or body[:4] != EDGE_LIST_MAGIC:
+        raise ValueError('Edge list body must start with the VSE1 header')
+    num_strings, num_nodes, num_edges, table_size = (int(count) for count in np.frombuffer(body, _HEADER, 4, 4))
+    start = 20 + table_size + (-table_size % 4)
+    if len(body) != start + 4 * (3 * num_nodes + 5 * num_edges):
+        raise ValueError('Edge list body size does not match its header')
+
+    try:
+        strings: List[Optional[str]] = body[20:20 + table_size].decode().split('\x00') if num_strings else []
+    except UnicodeDecodeError:
+        raise ValueError('Edge list string table is not valid UTF-8')
+    if len(strings) != num_strings:
+        raise ValueError(f"Edge list string table holds {len(strings)} strings, header says {num_strings}")
+    indices = np.frombuffer(body, _INDEX, offset=start)
+    if indices.size and (indices.min() < -1 or indices.max() >= num_strings):
+        raise ValueError('Edge list index out of range')
+    # Index -1 (no value) reads the None appended at the end
+    strings.append(None)
+    lookup = strings.__getitem__
+
+    topology = Topology()
+    offset = 0
+    for name, count in (
+        ('node_ids', num_nodes), ('node_types', num_nodes), ('templates', num_nodes),
+        ('edge_ids', num_edges), ('sources', num_edges), ('targets', num_edges),
+        ('source_handles', num_edges), ('target_handles', num_edges),
+    ):
+        setattr(topology, name, list(map(lookup, indices[offset:offset + count].tolist())))
+        offset += count
+    for what, values in (('node', topology.node_ids), ('node type', topology.node_types), ('edge', topology.edge_ids),
+                         ('edge source', topology.sources), ('edge target', topology.targets)):
+        if None in values:
+            raise ValueError(f"Every {what} ID must be set")
+    return topology
+
+
+def accepted(header: str, options: Sequence[str]) -> Optional[str]:
+    """
+    The first of `options` (in server preference order) that an Accept or
+    Accept-Encoding header allows with a non-zero quality, or None
+    """
+    allowed = set()
+    for item in header.lower().split(','):
+        name, _, params = item.strip().partition(';')
+        quality = params.strip()
+        if quality.startswith('q=') and quality[2:].strip() in ('0', '0.0', '0.00', '0.000'):
+            continue
+        allowed.add(name.strip())
+    for option in options:
+        if option in allowed:
+            return option
+    return None
+
+
+def encode_response(result: Any, accept: str = '', accept_encoding: str = '') -> Response:
+    """Serialize a response body per the Accept and Accept-Encoding headers"""
+    if msgpack is not None and accepted(accept, MSGPACK_TYPES):
+        body, content_type = msgpack.packb(result), MSGPACK
+    else:
+        body, content_type = dumps(result), JSON
+    headers = {'Vary': 'Accept, Accept-Encoding'}
+    if len(body) >= COMPRESS_MIN_BYTES:
+        coding = accepted(accept_encoding, ('zstd', 'gzip') if zstandard is not None else ('gzip',))
+        if coding == 'zstd':
+            body = zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(body)
+        elif coding == 'gzip':
+            body = gzip.compress(body, GZIP_LEVEL, mtime=0)
+        if coding is not None:
+            headers['Content-Encoding'] = coding
+    return Response(body, media_type=content_type, headers=headers)
@@ -8,6 +8,17 @@ const selector = (state) => ({
   edges: state.edges,
 });
 
+// Pipelines larger than this are sent gzip-compressed when the browser supports it
+const COMPRESS_MIN_BYTES = 64 * 1024;
+
+const encodeBody = async (json) => {
+    if (json.length < COMPRESS_MIN_BYTES || typeof CompressionStream === 'undefined') {
+        return { body: json, headers: {} };
+    }
+    const stream = new Blob([json]).stream().pipeThrough(new CompressionStream('gzip'));
+    return { body: await new Response(stream).blob(), headers: { 'Content-Encoding': 'gzip' } };
+};
+
 export const SubmitButton = () => {
     const { nodes, edges } = useStore(selector, shallow);
     const [isLoading, setIsLoading] = useState(false);
@@ -20,12 +31,14 @@ export const SubmitButton = () => {
                 edges: edges
             };
 
+            const { body, headers } = await encodeBody(JSON.stringify(pipelineData));
             const response = await fetch('http://localhost:8000/pipelines/parse', {
                 method: 'POST',
                 headers: {
                     'Content-Type': 'application/json',
+                    ...headers,
                 },
-                body: JSON.stringify(pipelineData)
+                body
             });
 
             if (!response.ok) {
@@ -43,7 +56,10 @@ Valid DAG: ${result.is_dag ? 'Yes' : 'No'}
 
 ${result.is_dag ? 
     'Your pipeline is a valid Directed Acyclic Graph and ready for execution!' : 
-    'Warning: Your pipeline contains cycles and cannot be executed as a DAG.'}`;
+    'Warning: Your pipeline contains cycles and cannot be executed as a DAG.'}${
+  result.issues && result.issues.length ? 
+    '\n\nIssues:\n' + result.issues.map(issue => `- [${issue.severity}] ${issue.message}`).join('\n') : 
+    ''}`;
 
             alert(message);
 